@@ -0,0 +1,40 @@
+"""batalla_games
+
+Revision ID: 4d7a2c9e8b13
+Revises: 9b4e1f7c2a58
+Create Date: 2026-10-19 10:42:17.308415
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+revision: str = '4d7a2c9e8b13'
+down_revision: Union[str, None] = '9b4e1f7c2a58'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    op.create_table(
+        'batalla_games',
+        sa.Column('id', sa.Integer(), nullable=False),
+        sa.Column('invitation_id', sa.Integer(), nullable=True),
+        sa.Column('status', sa.String(length=10), nullable=False),
+        sa.Column('winner_id', sa.Integer(), nullable=True),
+        sa.Column('version', sa.Integer(), nullable=False),
+        sa.Column('state', sa.LargeBinary(), nullable=False),
+        sa.Column('created_at', sa.DateTime(timezone=True), nullable=True),
+        sa.Column('updated_at', sa.DateTime(timezone=True), nullable=True),
+        sa.ForeignKeyConstraint(['invitation_id'], ['game_invitations.id'], ondelete='SET NULL'),
+        sa.ForeignKeyConstraint(['winner_id'], ['users.id'], ondelete='SET NULL'),
+        sa.PrimaryKeyConstraint('id'),
+        sa.UniqueConstraint('invitation_id'),
+    )
+    op.create_index(op.f('ix_batalla_games_id'), 'batalla_games', ['id'], unique=False)
+
+
+def downgrade() -> None:
+    op.drop_index(op.f('ix_batalla_games_id'), table_name='batalla_games')
+    op.drop_table('batalla_games')
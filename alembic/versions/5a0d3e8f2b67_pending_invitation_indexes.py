@@ -0,0 +1,31 @@
+"""pending_invitation_indexes
+
+Revision ID: 5a0d3e8f2b67
+Revises: e4c8a97b1f36
+Create Date: 2026-10-18 19:12:33.701846
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+revision: str = '5a0d3e8f2b67'
+down_revision: Union[str, None] = 'e4c8a97b1f36'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+# Kolumna typu enum przechowuje nazwy członków GameInvitationStatus.
+_PENDING = sa.text("status = 'PENDING'")
+
+
+def upgrade() -> None:
+    op.create_index('ix_game_invitations_pending_invitee', 'game_invitations', ['invitee_id', 'created_at'], unique=False, postgresql_where=_PENDING)
+    op.create_index('ix_game_invitations_pending_inviter', 'game_invitations', ['inviter_id', 'invitee_id'], unique=False, postgresql_where=_PENDING)
+    op.create_index('ix_game_invitations_pending_created', 'game_invitations', ['created_at'], unique=False, postgresql_where=_PENDING)
+
+
+def downgrade() -> None:
+    op.drop_index('ix_game_invitations_pending_created', table_name='game_invitations')
+    op.drop_index('ix_game_invitations_pending_inviter', table_name='game_invitations')
+    op.drop_index('ix_game_invitations_pending_invitee', table_name='game_invitations')
@@ -0,0 +1,40 @@
+"""user_stats
+
+Revision ID: 7e3b9d1a5c42
+Revises: 4d7a2c9e8b13
+Create Date: 2026-10-20 09:14:52.671203
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+revision: str = '7e3b9d1a5c42'
+down_revision: Union[str, None] = '4d7a2c9e8b13'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    op.create_table(
+        'user_stats',
+        sa.Column('user_id', sa.Integer(), nullable=False),
+        sa.Column('game_type', sa.String(length=40), nullable=False),
+        sa.Column('invited', sa.Integer(), nullable=False),
+        sa.Column('accepted', sa.Integer(), nullable=False),
+        sa.Column('played', sa.Integer(), nullable=False),
+        sa.Column('won', sa.Integer(), nullable=False),
+        sa.Column('drawn', sa.Integer(), nullable=False),
+        sa.Column('current_streak', sa.Integer(), nullable=False),
+        sa.Column('best_streak', sa.Integer(), nullable=False),
+        sa.Column('friends', sa.Integer(), nullable=False),
+        sa.Column('updated_at', sa.DateTime(timezone=True), nullable=True),
+        sa.ForeignKeyConstraint(['user_id'], ['users.id'], ondelete='CASCADE'),
+        sa.PrimaryKeyConstraint('user_id', 'game_type'),
+    )
+    # Statystyki liczone dotąd tylko z historii — wypełnij tabelę: python user_stats.py --rebuild
+
+
+def downgrade() -> None:
+    op.drop_table('user_stats')
@@ -0,0 +1,47 @@
+"""tictactoe_matches
+
+Revision ID: 9b4e1f7c2a58
+Revises: f2a86c4d1e95
+Create Date: 2026-10-18 23:21:40.552817
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+revision: str = '9b4e1f7c2a58'
+down_revision: Union[str, None] = 'f2a86c4d1e95'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    op.create_table(
+        'tictactoe_matches',
+        sa.Column('id', sa.Integer(), nullable=False),
+        sa.Column('invitation_id', sa.Integer(), nullable=True),
+        sa.Column('player_x_id', sa.Integer(), nullable=False),
+        sa.Column('player_o_id', sa.Integer(), nullable=False),
+        sa.Column('winner_id', sa.Integer(), nullable=True),
+        sa.Column('outcome', sa.String(length=10), nullable=False),
+        sa.Column('moves', sa.String(length=9), nullable=False),
+        sa.Column('started_at', sa.DateTime(timezone=True), nullable=False),
+        sa.Column('finished_at', sa.DateTime(timezone=True), nullable=False),
+        sa.ForeignKeyConstraint(['invitation_id'], ['game_invitations.id'], ondelete='SET NULL'),
+        sa.ForeignKeyConstraint(['player_o_id'], ['users.id'], ondelete='CASCADE'),
+        sa.ForeignKeyConstraint(['player_x_id'], ['users.id'], ondelete='CASCADE'),
+        sa.ForeignKeyConstraint(['winner_id'], ['users.id'], ondelete='CASCADE'),
+        sa.PrimaryKeyConstraint('id'),
+        sa.UniqueConstraint('invitation_id'),
+    )
+    op.create_index(op.f('ix_tictactoe_matches_id'), 'tictactoe_matches', ['id'], unique=False)
+    op.create_index(op.f('ix_tictactoe_matches_player_o_id'), 'tictactoe_matches', ['player_o_id'], unique=False)
+    op.create_index(op.f('ix_tictactoe_matches_player_x_id'), 'tictactoe_matches', ['player_x_id'], unique=False)
+
+
+def downgrade() -> None:
+    op.drop_index(op.f('ix_tictactoe_matches_player_x_id'), table_name='tictactoe_matches')
+    op.drop_index(op.f('ix_tictactoe_matches_player_o_id'), table_name='tictactoe_matches')
+    op.drop_index(op.f('ix_tictactoe_matches_id'), table_name='tictactoe_matches')
+    op.drop_table('tictactoe_matches')
@@ -0,0 +1,26 @@
+"""email_outbox_sending
+
+Revision ID: a6e2c5f8d031
+Revises: 7e3b9d1a5c42
+Create Date: 2026-10-18 21:04:11.268417
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+
+revision: str = 'a6e2c5f8d031'
+down_revision: Union[str, None] = '7e3b9d1a5c42'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    # ALTER TYPE ... ADD VALUE nie może działać w transakcji na PostgreSQL < 12.
+    with op.get_context().autocommit_block():
+        op.execute("ALTER TYPE emailoutboxstatus ADD VALUE IF NOT EXISTS 'SENDING'")
+
+
+def downgrade() -> None:
+    # Wartości enuma nie da się usunąć bez przebudowy typu — przerwane wysyłki wracają do kolejki.
+    op.execute("UPDATE email_outbox SET status = 'PENDING' WHERE status = 'SENDING'")
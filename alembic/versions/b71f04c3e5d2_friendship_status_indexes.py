@@ -0,0 +1,25 @@
+"""friendship_status_indexes
+
+Revision ID: b71f04c3e5d2
+Revises: 8d2e6b0a4c19
+Create Date: 2026-10-18 17:31:07.914220
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+
+revision: str = 'b71f04c3e5d2'
+down_revision: Union[str, None] = '8d2e6b0a4c19'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    op.create_index('ix_friendships_requester_status', 'friendships', ['requester_id', 'status'], unique=False)
+    op.create_index('ix_friendships_addressee_status', 'friendships', ['addressee_id', 'status'], unique=False)
+
+
+def downgrade() -> None:
+    op.drop_index('ix_friendships_addressee_status', table_name='friendships')
+    op.drop_index('ix_friendships_requester_status', table_name='friendships')
@@ -0,0 +1,79 @@
+"""content_addressed_avatars
+
+Revision ID: c39d7e2a6f14
+Revises: 5a0d3e8f2b67
+Create Date: 2026-10-18 21:04:51.318276
+
+"""
+import hashlib
+import json
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+revision: str = 'c39d7e2a6f14'
+down_revision: Union[str, None] = '5a0d3e8f2b67'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+_users = sa.table(
+    'users',
+    sa.column('id', sa.Integer),
+    sa.column('avatar', sa.Text),
+    sa.column('avatar_hash', sa.String),
+)
+_avatars = sa.table(
+    'avatars',
+    sa.column('hash', sa.String),
+    sa.column('config', sa.Text),
+)
+
+
+def _canonical(raw: str) -> str:
+    # Jak avatars.canonical_avatar, ale bez walidacji — stare zapisy przenosimy takie, jakie są.
+    try:
+        return json.dumps(json.loads(raw), sort_keys=True, separators=(',', ':'))
+    except ValueError:
+        return raw
+
+
+def upgrade() -> None:
+    op.create_table(
+        'avatars',
+        sa.Column('hash', sa.String(length=64), nullable=False),
+        sa.Column('config', sa.Text(), nullable=False),
+        sa.Column('created_at', sa.DateTime(timezone=True), nullable=True),
+        sa.PrimaryKeyConstraint('hash'),
+    )
+    op.add_column('users', sa.Column('avatar_hash', sa.String(length=64), nullable=True))
+    op.create_foreign_key('fk_users_avatar_hash', 'users', 'avatars', ['avatar_hash'], ['hash'])
+
+    connection = op.get_bind()
+    configs = {}
+    assignments = []
+    for user_id, raw in connection.execute(sa.select(_users.c.id, _users.c.avatar).where(_users.c.avatar.isnot(None))):
+        config = _canonical(raw)
+        avatar_hash = hashlib.sha256(config.encode('utf-8')).hexdigest()
+        configs[avatar_hash] = config
+        assignments.append({'user_id': user_id, 'new_hash': avatar_hash})
+    if configs:
+        connection.execute(_avatars.insert(), [{'hash': h, 'config': c} for h, c in configs.items()])
+        connection.execute(
+            _users.update().where(_users.c.id == sa.bindparam('user_id')).values(avatar_hash=sa.bindparam('new_hash')),
+            assignments,
+        )
+
+    op.drop_column('users', 'avatar')
+
+
+def downgrade() -> None:
+    op.add_column('users', sa.Column('avatar', sa.Text(), nullable=True))
+    op.execute(
+        _users.update().values(
+            avatar=sa.select(_avatars.c.config).where(_avatars.c.hash == _users.c.avatar_hash).scalar_subquery()
+        )
+    )
+    op.drop_constraint('fk_users_avatar_hash', 'users', type_='foreignkey')
+    op.drop_column('users', 'avatar_hash')
+    op.drop_table('avatars')
@@ -0,0 +1,35 @@
+"""friendship_recent_indexes
+
+Revision ID: d5b8e3f1a027
+Revises: a6e2c5f8d031
+Create Date: 2026-10-18 21:26:40.513902
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+revision: str = 'd5b8e3f1a027'
+down_revision: Union[str, None] = 'a6e2c5f8d031'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    # Lista "recent" sortuje po (updated_at, id) — bez NULL-i klucz może iść prosto z indeksu.
+    op.execute('UPDATE friendships SET updated_at = COALESCE(created_at, now()) WHERE updated_at IS NULL')
+    op.alter_column('friendships', 'updated_at', existing_type=sa.DateTime(timezone=True), nullable=False)
+    # Nowe indeksy zaczynają się od (strona relacji, status), więc zastępują poprzednie.
+    op.create_index('ix_friendships_requester_status_updated', 'friendships', ['requester_id', 'status', 'updated_at', 'id'], unique=False)
+    op.create_index('ix_friendships_addressee_status_updated', 'friendships', ['addressee_id', 'status', 'updated_at', 'id'], unique=False)
+    op.drop_index('ix_friendships_addressee_status', table_name='friendships')
+    op.drop_index('ix_friendships_requester_status', table_name='friendships')
+
+
+def downgrade() -> None:
+    op.create_index('ix_friendships_requester_status', 'friendships', ['requester_id', 'status'], unique=False)
+    op.create_index('ix_friendships_addressee_status', 'friendships', ['addressee_id', 'status'], unique=False)
+    op.drop_index('ix_friendships_addressee_status_updated', table_name='friendships')
+    op.drop_index('ix_friendships_requester_status_updated', table_name='friendships')
+    op.alter_column('friendships', 'updated_at', existing_type=sa.DateTime(timezone=True), nullable=True)
@@ -0,0 +1,33 @@
+"""username_trigram_index
+
+Revision ID: e4c8a97b1f36
+Revises: b71f04c3e5d2
+Create Date: 2026-10-18 18:05:52.360418
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+
+revision: str = 'e4c8a97b1f36'
+down_revision: Union[str, None] = 'b71f04c3e5d2'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    # Na Supabase pg_trgm jest dostępne, ale nie zawsze domyślnie włączone.
+    op.execute('CREATE EXTENSION IF NOT EXISTS pg_trgm')
+    op.create_index(
+        'ix_users_username_trgm',
+        'users',
+        ['username'],
+        unique=False,
+        postgresql_using='gin',
+        postgresql_ops={'username': 'gin_trgm_ops'},
+    )
+
+
+def downgrade() -> None:
+    # Rozszerzenia nie usuwamy — mogą z niego korzystać inne obiekty w bazie.
+    op.drop_index('ix_users_username_trgm', table_name='users')
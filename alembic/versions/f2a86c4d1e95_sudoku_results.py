@@ -0,0 +1,39 @@
+"""sudoku_results
+
+Revision ID: f2a86c4d1e95
+Revises: c39d7e2a6f14
+Create Date: 2026-10-18 22:37:05.914032
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+revision: str = 'f2a86c4d1e95'
+down_revision: Union[str, None] = 'c39d7e2a6f14'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    op.create_table(
+        'sudoku_results',
+        sa.Column('id', sa.Integer(), nullable=False),
+        sa.Column('user_id', sa.Integer(), nullable=False),
+        sa.Column('puzzle_id', sa.String(length=32), nullable=False),
+        sa.Column('difficulty', sa.String(length=10), nullable=False),
+        sa.Column('seconds', sa.Integer(), nullable=False),
+        sa.Column('created_at', sa.DateTime(timezone=True), nullable=True),
+        sa.ForeignKeyConstraint(['user_id'], ['users.id'], ondelete='CASCADE'),
+        sa.PrimaryKeyConstraint('id'),
+        sa.UniqueConstraint('puzzle_id'),
+    )
+    op.create_index(op.f('ix_sudoku_results_id'), 'sudoku_results', ['id'], unique=False)
+    op.create_index('ix_sudoku_results_user_difficulty_seconds', 'sudoku_results', ['user_id', 'difficulty', 'seconds'], unique=False)
+
+
+def downgrade() -> None:
+    op.drop_index('ix_sudoku_results_user_difficulty_seconds', table_name='sudoku_results')
+    op.drop_index(op.f('ix_sudoku_results_id'), table_name='sudoku_results')
+    op.drop_table('sudoku_results')
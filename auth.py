@@ -1,5 +1,13 @@
+import asyncio
+import json
 import logging
+import multiprocessing
 import os
+import statistics
+import threading
+import time
+from concurrent.futures import ProcessPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
 
 from passlib.context import CryptContext
 from datetime import datetime, timedelta, timezone
@@ -26,7 +34,65 @@ if _HASH_SCHEME not in _SUPPORTED_HASH_SCHEMES:
         f"Dostępne opcje: {', '.join(_SUPPORTED_HASH_SCHEMES)}"
     )
 
-pwd_context = CryptContext(schemes=[_HASH_SCHEME], deprecated="auto")
+# Koszt hashowania: HASH_ROUNDS ustawia go na sztywno (time_cost dla argon2, rounds dla
+# bcrypt/pbkdf2_sha256), a HASH_CALIBRATE=true dobiera go raz na maszynie tak, by
+# weryfikacja hasła trwała ok. HASH_TARGET_MS, i zapisuje wynik w HASH_CALIBRATION_FILE —
+# kolejne starty i pozostałe workery używają tych samych parametrów. Hashe z kosztem
+# niższym niż bieżący (a dla argon2 — z inną pamięcią) są przeliczane przy najbliższym logowaniu.
+HASH_ROUNDS = int(os.getenv("HASH_ROUNDS", "0")) or None
+HASH_MEMORY_COST_KIB = int(os.getenv("HASH_MEMORY_COST_KIB", "0")) or None
+HASH_CALIBRATE = os.getenv("HASH_CALIBRATE", "false").lower() in ("1", "true", "yes")
+HASH_TARGET_MS = float(os.getenv("HASH_TARGET_MS", "50"))
+HASH_CALIBRATION_FILE = os.getenv(
+    "HASH_CALIBRATION_FILE", os.path.join(os.path.dirname(__file__), ".hash_calibration.json")
+)
+
+# Minimalne parametry niezależnie od konfiguracji i wyniku kalibracji (zalecenia OWASP:
+# argon2id m=19 MiB, t=2; bcrypt koszt 10; PBKDF2-HMAC-SHA256 600 000 iteracji).
+_MIN_ROUNDS = {"argon2": 2, "bcrypt": 10, "pbkdf2_sha256": 600_000}
+_ARGON2_MIN_MEMORY_COST_KIB = 19 * 1024
+_CALIBRATION_PASSWORD = "kalibracja-Hasla-123"
+
+
+def _context_settings(rounds: int | None = None, memory_cost: int | None = None) -> dict:
+    floor = _MIN_ROUNDS[_HASH_SCHEME]
+    if rounds is None:
+        rounds = CryptContext(schemes=[_HASH_SCHEME]).handler().default_rounds
+    elif rounds < floor:
+        logger.warning("Koszt hashowania %s podniesiono z %s do minimum %s", _HASH_SCHEME, rounds, floor)
+    rounds = max(rounds, floor)
+    # min_rounds = bieżący koszt: hash słabszy niż obecne (skonfigurowane lub skalibrowane)
+    # parametry jest przeliczany przy logowaniu. Kalibracja jest zapisywana w pliku, więc
+    # wszystkie workery mają ten sam koszt i nie przeliczają sobie nawzajem hashy.
+    settings: dict = {
+        f"{_HASH_SCHEME}__min_rounds": rounds,
+        f"{_HASH_SCHEME}__default_rounds": rounds,
+    }
+    if memory_cost is not None and _HASH_SCHEME == "argon2":
+        if memory_cost < _ARGON2_MIN_MEMORY_COST_KIB:
+            logger.warning("Pamięć argon2 podniesiono z %s do minimum %s KiB", memory_cost, _ARGON2_MIN_MEMORY_COST_KIB)
+        settings["argon2__memory_cost"] = max(memory_cost, _ARGON2_MIN_MEMORY_COST_KIB)
+    return settings
+
+
+def _build_context(settings: dict) -> CryptContext:
+    return CryptContext(schemes=[_HASH_SCHEME], deprecated="auto", **settings)
+
+
+_hash_settings = _context_settings(HASH_ROUNDS, HASH_MEMORY_COST_KIB)
+pwd_context = _build_context(_hash_settings)
+
+
+def configure_password_hashing(settings: dict) -> None:
+    """Ustawia parametry hashowania w bieżącym procesie (także w procesach puli)."""
+    global _hash_settings, pwd_context
+    _hash_settings = dict(settings)
+    pwd_context = _build_context(_hash_settings)
+
+
+def hash_settings() -> dict:
+    """Aktualne parametry hashowania — do przekazania procesom roboczym."""
+    return dict(_hash_settings)
 
 
 def verify_password(plain_password, hashed_password):
@@ -37,6 +103,184 @@ def get_password_hash(password):
     return pwd_context.hash(password)
 
 
+def password_needs_rehash(hashed_password: str) -> bool:
+    return pwd_context.needs_update(hashed_password)
+
+
+def _measure_verify_ms(settings: dict, samples: int = 3) -> float:
+    context = _build_context(settings)
+    hashed = context.hash(_CALIBRATION_PASSWORD)
+    timings = []
+    for _ in range(samples):
+        start = time.perf_counter()
+        context.verify(_CALIBRATION_PASSWORD, hashed)
+        timings.append((time.perf_counter() - start) * 1000)
+    return statistics.median(timings)
+
+
+def calibrate_hash_cost(target_ms: float = HASH_TARGET_MS) -> dict:
+    """Dobiera koszt hashowania tak, by weryfikacja trwała ok. `target_ms` na tej maszynie.
+
+    Zwraca ustawienia dla configure_password_hashing().
+    """
+    min_rounds = _MIN_ROUNDS[_HASH_SCHEME]
+
+    if _HASH_SCHEME == "argon2":
+        # Pamięć zostaje stała (chyba że nawet time_cost=1 jest za wolny), rośnie time_cost.
+        memory_cost = HASH_MEMORY_COST_KIB or _build_context({}).handler().memory_cost
+        rounds = min_rounds
+        elapsed = _measure_verify_ms(_context_settings(rounds, memory_cost))
+        while elapsed > target_ms and memory_cost > _ARGON2_MIN_MEMORY_COST_KIB:
+            memory_cost = max(memory_cost // 2, _ARGON2_MIN_MEMORY_COST_KIB)
+            elapsed = _measure_verify_ms(_context_settings(rounds, memory_cost))
+        while elapsed < target_ms:
+            candidate = _measure_verify_ms(_context_settings(rounds + 1, memory_cost))
+            if candidate > target_ms and candidate - target_ms > target_ms - elapsed:
+                break
+            rounds, elapsed = rounds + 1, candidate
+        settings = _context_settings(rounds, memory_cost)
+    elif _HASH_SCHEME == "bcrypt":
+        # Każda runda podwaja koszt — wybieramy najbliższą wartość.
+        rounds = min_rounds
+        elapsed = _measure_verify_ms(_context_settings(rounds))
+        while elapsed * 2 - target_ms < target_ms - elapsed and rounds < 31:
+            rounds += 1
+            elapsed = _measure_verify_ms(_context_settings(rounds))
+        settings = _context_settings(rounds)
+    else:
+        # Koszt PBKDF2 jest liniowy względem liczby rund.
+        elapsed = _measure_verify_ms(_context_settings(min_rounds))
+        rounds = max(min_rounds, int(min_rounds * target_ms / max(elapsed, 0.001)))
+        elapsed = _measure_verify_ms(_context_settings(rounds))
+        settings = _context_settings(rounds)
+
+    if elapsed > target_ms * 1.5:
+        logger.warning(
+            "Minimalne parametry %s przekraczają cel %.0f ms (zmierzono %.1f ms)",
+            _HASH_SCHEME,
+            target_ms,
+            elapsed,
+        )
+    logger.info(
+        "Kalibracja hashowania %s: %s (weryfikacja ~%.1f ms, cel %.0f ms)",
+        _HASH_SCHEME,
+        settings,
+        elapsed,
+        target_ms,
+    )
+    return settings
+
+
+# Hashowanie haseł (argon2/bcrypt) jest kosztowne dla CPU, więc wykonujemy je w osobnej
+# puli procesów zamiast w threadpoolu obsługującym endpointy. Kolejka jest ograniczona —
+# po jej zapełnieniu nowe żądania są odrzucane (503), zamiast czekać w nieskończoność.
+# HASH_WORKERS=0 wyłącza pulę procesów (hashowanie w domyślnym threadpoolu).
+HASH_WORKERS = int(os.getenv("HASH_WORKERS", str(os.cpu_count() or 1)))
+HASH_QUEUE_SIZE = int(os.getenv("HASH_QUEUE_SIZE", str(max(HASH_WORKERS, 1) * 8)))
+
+_hash_executor: ProcessPoolExecutor | None = None
+_hash_executor_lock = threading.Lock()
+_hash_in_flight = 0
+_hash_in_flight_lock = threading.Lock()
+
+
+class HashingOverloadedError(RuntimeError):
+    """Kolejka hashowania haseł jest pełna."""
+
+
+def _get_hash_executor() -> ProcessPoolExecutor | None:
+    global _hash_executor
+    if HASH_WORKERS <= 0:
+        return None
+    with _hash_executor_lock:
+        if _hash_executor is None:
+            _hash_executor = ProcessPoolExecutor(
+                max_workers=HASH_WORKERS,
+                mp_context=multiprocessing.get_context("spawn"),
+                initializer=configure_password_hashing,
+                initargs=(hash_settings(),),
+            )
+            logger.info("Uruchomiono pulę hashowania haseł (%s procesów)", HASH_WORKERS)
+        return _hash_executor
+
+
+def shutdown_hash_executor() -> None:
+    global _hash_executor
+    with _hash_executor_lock:
+        if _hash_executor is not None:
+            _hash_executor.shutdown(wait=False, cancel_futures=True)
+            _hash_executor = None
+
+
+def load_or_calibrate() -> dict:
+    """Parametry z pliku kalibracji, a gdy go brak (lub zmienił się schemat albo cel) — nowa kalibracja.
+
+    Pomiar różni się między procesami i restartami o ±1 rundę, więc liczymy go raz i
+    zapisujemy; inaczej każdy worker hashowałby hasła z trochę innymi parametrami.
+    """
+    key = {"scheme": _HASH_SCHEME, "target_ms": HASH_TARGET_MS, "memory_cost": HASH_MEMORY_COST_KIB}
+    try:
+        with open(HASH_CALIBRATION_FILE, encoding="utf-8") as file:
+            saved = json.load(file)
+        if saved.get("key") == key:
+            return saved["settings"]
+    except (OSError, ValueError, KeyError, AttributeError):
+        pass
+    settings = calibrate_hash_cost()
+    temporary = f"{HASH_CALIBRATION_FILE}.{os.getpid()}.tmp"
+    try:
+        with open(temporary, "w", encoding="utf-8") as file:
+            json.dump({"key": key, "settings": settings}, file)
+        os.replace(temporary, HASH_CALIBRATION_FILE)
+    except OSError as e:
+        logger.warning("Nie udało się zapisać kalibracji hashowania do %s: %s", HASH_CALIBRATION_FILE, e)
+    return settings
+
+
+def init_password_hashing() -> None:
+    """Wczytuje lub kalibruje koszt hashowania (jeśli włączono) i uruchamia pulę procesów."""
+    if HASH_CALIBRATE and HASH_ROUNDS is None:
+        configure_password_hashing(load_or_calibrate())
+        # Pula musi zostać utworzona po kalibracji, żeby procesy dostały nowe parametry.
+        shutdown_hash_executor()
+    _get_hash_executor()
+
+
+async def _run_in_hash_pool(func, *args):
+    global _hash_in_flight
+    with _hash_in_flight_lock:
+        if _hash_in_flight >= HASH_QUEUE_SIZE:
+            raise HashingOverloadedError(
+                f"Przekroczono limit kolejki hashowania ({HASH_QUEUE_SIZE})"
+            )
+        _hash_in_flight += 1
+    try:
+        loop = asyncio.get_running_loop()
+        return await loop.run_in_executor(_get_hash_executor(), func, *args)
+    except BrokenProcessPool:
+        # Proces roboczy padł (np. OOM) — następne żądanie utworzy nową pulę.
+        logger.error("Pula hashowania haseł uległa awarii, zostanie utworzona ponownie")
+        shutdown_hash_executor()
+        raise
+    finally:
+        with _hash_in_flight_lock:
+            _hash_in_flight -= 1
+
+
+def hash_pool_status() -> dict:
+    with _hash_in_flight_lock:
+        in_flight = _hash_in_flight
+    return {"workers": HASH_WORKERS, "in_flight": in_flight, "queue_size": HASH_QUEUE_SIZE}
+
+
+async def verify_password_async(plain_password: str, hashed_password: str) -> bool:
+    return await _run_in_hash_pool(verify_password, plain_password, hashed_password)
+
+
+async def get_password_hash_async(password: str) -> str:
+    return await _run_in_hash_pool(get_password_hash, password)
+
+
 def create_access_token(data: dict, expires_delta: timedelta | None = None) -> str:
     to_encode = data.copy()
     if expires_delta:
@@ -48,12 +292,25 @@ def create_access_token(data: dict, expires_delta: timedelta | None = None) -> s
     return encoded_jwt
 
 
-def decode_token(token: str):
+def decode_payload(token: str, scope: str | None = None) -> dict | None:
+    """Zwraca zawartość tokena. Tokeny z innym `scope` (np. bilety strumienia zdarzeń)
+    są odrzucane, więc nie da się ich użyć zamiast zwykłego tokena dostępu."""
     try:
         payload = jwt.decode(token, SECRET_KEY, algorithms=[ALGORITHM])
-        email: str = payload.get("sub")
-        if email is None:
-            return None
-        return email
     except JWTError:
         return None
+    if payload.get("sub") is None or payload.get("scope") != scope:
+        return None
+    return payload
+
+
+def decode_token(token: str, scope: str | None = None):
+    """Zwraca `sub` tokena (zob. decode_payload)."""
+    payload = decode_payload(token, scope)
+    return payload["sub"] if payload is not None else None
+
+
+if __name__ == "__main__":
+    # Kalibracja bez uruchamiania serwera, np. żeby przypiąć wynik w HASH_ROUNDS.
+    logging.basicConfig(level=logging.INFO, format="%(levelname)s %(name)s: %(message)s")
+    print(calibrate_hash_cost())
@@ -0,0 +1,148 @@
+import functools
+import hashlib
+import io
+import json
+import os
+from pathlib import Path
+
+from PIL import Image
+from sqlalchemy import insert, select
+from starlette.concurrency import run_in_threadpool
+
+from cache import TTLCache
+from models import Avatar
+
+# Warstwy i warianty jak w "wybor awatara/script.js" (config, colors), w kolejności rysowania.
+AVATAR_LAYERS_DIR = Path(__file__).resolve().parent / "wybor awatara" / "img"
+AVATAR_STYLES = {"skora": 3, "usta": 6, "oczy": 4, "wlosy": 6, "koszulka": 3, "spodnie": 3}
+AVATAR_COLORS = {
+    "wlosy": ["czarne", "blond", "braz"],
+    "koszulka": ["czarna", "czerwona", "niebieska", "zielona", "biala", "rozowa"],
+    "spodnie": ["czarne", "biale", "szare", "niebieskie"],
+}
+
+# Zmiana sposobu renderowania musi zmienić adres obrazka (odpowiedzi są immutable).
+AVATAR_RENDER_VERSION = 1
+
+AVATAR_CACHE_MAX_ENTRIES = int(os.getenv("AVATAR_CACHE_MAX_ENTRIES", "2048"))
+AVATAR_CACHE_TTL_SECONDS = float(os.getenv("AVATAR_CACHE_TTL_SECONDS", "3600"))
+
+# Klucze: ("config", hash) -> JSON, ("png", hash) -> wyrenderowany obrazek.
+# Treść pod danym hashem nigdy się nie zmienia, więc cache nie wymaga unieważniania.
+avatar_cache = TTLCache(maxsize=AVATAR_CACHE_MAX_ENTRIES, ttl=AVATAR_CACHE_TTL_SECONDS)
+
+
+def canonical_avatar(raw: str) -> str:
+    """Waliduje konfigurację z kreatora i zwraca ją jako kanoniczny JSON (stałe klucze i kolejność)."""
+    try:
+        state = json.loads(raw)
+    except ValueError:
+        raise ValueError("Konfiguracja awatara nie jest poprawnym JSON-em")
+    if not isinstance(state, dict):
+        raise ValueError("Konfiguracja awatara musi być obiektem JSON")
+
+    canonical = {}
+    for part, styles in AVATAR_STYLES.items():
+        value = state.get(part)
+        if type(value) is not int or not 1 <= value <= styles:
+            raise ValueError(f"Nieprawidłowa wartość '{part}' w konfiguracji awatara")
+        canonical[part] = value
+        if part in AVATAR_COLORS:
+            key = part + "ColorIndex"
+            color = state.get(key)
+            if type(color) is not int or not 0 <= color < len(AVATAR_COLORS[part]):
+                raise ValueError(f"Nieprawidłowa wartość '{key}' w konfiguracji awatara")
+            canonical[key] = color
+    return json.dumps(canonical, sort_keys=True, separators=(",", ":"))
+
+
+def avatar_hash(config: str) -> str:
+    return hashlib.sha256(config.encode("utf-8")).hexdigest()
+
+
+def avatar_url(hash_: str | None) -> str | None:
+    if not hash_:
+        return None
+    return f"/api/avatars/{hash_}.png?v={AVATAR_RENDER_VERSION}"
+
+
+async def store_avatar(db, config: str) -> str:
+    """Zapisuje konfigurację (jeśli jeszcze jej nie ma) i zwraca jej hash. Bez commita."""
+    hash_ = avatar_hash(config)
+    values = {"hash": hash_, "config": config}
+    dialect = db.bind.dialect.name
+    if dialect == "postgresql":
+        from sqlalchemy.dialects.postgresql import insert as dialect_insert
+    elif dialect == "sqlite":
+        from sqlalchemy.dialects.sqlite import insert as dialect_insert
+    else:
+        dialect_insert = None
+
+    if dialect_insert is not None:
+        # Ten sam awatar może zapisać naraz kilku użytkowników — konflikt nie jest błędem.
+        await db.execute(dialect_insert(Avatar).values(**values).on_conflict_do_nothing(index_elements=["hash"]))
+    elif await db.scalar(select(Avatar.hash).where(Avatar.hash == hash_)) is None:
+        await db.execute(insert(Avatar).values(**values))
+    avatar_cache.set(("config", hash_), config)
+    return hash_
+
+
+async def get_avatar_config(db, hash_: str | None) -> str | None:
+    if not hash_:
+        return None
+    config = avatar_cache.get(("config", hash_))
+    if config is None:
+        config = await db.scalar(select(Avatar.config).where(Avatar.hash == hash_))
+        if config is not None:
+            avatar_cache.set(("config", hash_), config)
+    return config
+
+
+@functools.lru_cache(maxsize=None)
+def _layer(path: Path) -> Image.Image:
+    with Image.open(path) as image:
+        return image.convert("RGBA")
+
+
+def _layer_paths(state: dict) -> list[Path]:
+    paths = []
+    for part, styles in AVATAR_STYLES.items():
+        # Stare zapisy sprzed walidacji mogą mieć braki — zamiast błędu rysujemy wariant 1.
+        style = state.get(part)
+        style = style if type(style) is int and 1 <= style <= styles else 1
+        if part in AVATAR_COLORS:
+            colors = AVATAR_COLORS[part]
+            index = state.get(part + "ColorIndex")
+            index = index if type(index) is int and 0 <= index < len(colors) else 0
+            paths.append(AVATAR_LAYERS_DIR / part / f"{part}{style}_{colors[index]}.png")
+        else:
+            paths.append(AVATAR_LAYERS_DIR / part / f"{part}{style}.png")
+    return paths
+
+
+def render_avatar(config: str) -> bytes:
+    """Składa warstwy kreatora w jeden PNG (ten sam wynik co renderAvatar w przeglądarce)."""
+    try:
+        state = json.loads(config)
+    except ValueError:
+        state = {}
+    if not isinstance(state, dict):
+        state = {}
+    layers = [_layer(path) for path in _layer_paths(state)]
+    image = Image.new("RGBA", layers[0].size)
+    for layer in layers:
+        image.alpha_composite(layer)
+    buffer = io.BytesIO()
+    image.save(buffer, "PNG", optimize=True)
+    return buffer.getvalue()
+
+
+async def get_avatar_png(db, hash_: str) -> bytes | None:
+    png = avatar_cache.get(("png", hash_))
+    if png is None:
+        config = await get_avatar_config(db, hash_)
+        if config is None:
+            return None
+        png = await run_in_threadpool(render_avatar, config)
+        avatar_cache.set(("png", hash_), png)
+    return png
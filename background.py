@@ -0,0 +1,53 @@
+import asyncio
+import logging
+
+from starlette.concurrency import run_in_threadpool
+
+logger = logging.getLogger(__name__)
+
+
+async def _wait(interval_seconds: float, wake: asyncio.Event | None) -> None:
+    if wake is None:
+        await asyncio.sleep(interval_seconds)
+        return
+    try:
+        await asyncio.wait_for(wake.wait(), timeout=interval_seconds)
+    except asyncio.TimeoutError:
+        pass
+    wake.clear()
+
+
+async def _run_periodically(
+    name: str, interval_seconds: float, func, wake: asyncio.Event | None
+) -> None:
+    while True:
+        await _wait(interval_seconds, wake)
+        try:
+            if asyncio.iscoroutinefunction(func):
+                await func()
+            else:
+                await run_in_threadpool(func)
+        except Exception:
+            logger.exception("Zadanie w tle '%s' zakończyło się błędem", name)
+
+
+def start_periodic(
+    name: str, interval_seconds: float, func, wake: asyncio.Event | None = None
+) -> asyncio.Task | None:
+    """Uruchamia `func` co `interval_seconds` (funkcje synchroniczne w threadpoolu).
+
+    Ustawienie zdarzenia `wake` uruchamia zadanie od razu, bez czekania na interwał.
+    Zadania działają w każdym procesie (workerze) osobno, więc muszą być idempotentne.
+    Interwał <= 0 wyłącza zadanie.
+    """
+    if interval_seconds <= 0:
+        logger.info("Zadanie w tle '%s' wyłączone", name)
+        return None
+    return asyncio.create_task(_run_periodically(name, interval_seconds, func, wake), name=name)
+
+
+async def stop_all(tasks: list[asyncio.Task | None]) -> None:
+    running = [task for task in tasks if task is not None]
+    for task in running:
+        task.cancel()
+    await asyncio.gather(*running, return_exceptions=True)
@@ -0,0 +1,11 @@
+"""Powtarzalny benchmark obciążeniowy API (seedowanie bazy, mieszanki ruchu, porównanie z bazą).
+
+Użycie:
+    python -m bench seed --users 2000 --friends 10
+    python -m bench run --mix plansza --concurrency 50 --duration 60 --out bench/results/base.json
+    python -m bench compare bench/results/base.json bench/results/new.json
+
+Seed zakłada konta bench_NNNNNN (wspólne hasło), pierścień znajomości (każdy ma za
+znajomych `friends` sąsiadów z każdej strony) oraz aktywne i historyczne zaproszenia —
+układ jest deterministyczny, więc `run` zna znajomych każdego konta bez pytania bazy.
+"""
@@ -0,0 +1,121 @@
+import argparse
+import asyncio
+import json
+import logging
+import os
+import subprocess
+import sys
+from datetime import datetime, timezone
+
+from bench.load import MIXES
+from bench.report import compare, format_comparison, summarize
+
+
+def _git_commit() -> str | None:
+    try:
+        return subprocess.run(
+            ["git", "rev-parse", "--short", "HEAD"], capture_output=True, text=True, check=True
+        ).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+def _seed(args) -> int:
+    # Import dopiero tutaj: seed potrzebuje bazy, run i compare tylko HTTP i plików.
+    from bench.seed import seed
+
+    print(json.dumps(seed(args.users, args.friends, args.history, args.batch_size), indent=2))
+    return 0
+
+
+def _run(args) -> int:
+    from bench.load import run
+
+    result = run(
+        args.url, args.mix, args.concurrency, args.duration, args.warmup, args.users, args.friends, args.seed
+    )
+    report = {
+        "created_at": datetime.now(timezone.utc).isoformat(timespec="seconds"),
+        "commit": _git_commit(),
+        "config": {
+            "url": args.url,
+            "mix": args.mix,
+            "weights": MIXES[args.mix],
+            "concurrency": args.concurrency,
+            "duration": args.duration,
+            "warmup": args.warmup,
+            "users": args.users,
+            "friends": args.friends,
+            "seed": args.seed,
+        },
+        **summarize(asyncio.run(result)),
+    }
+    text = json.dumps(report, indent=2, ensure_ascii=False)
+    if args.out:
+        os.makedirs(os.path.dirname(args.out) or ".", exist_ok=True)
+        with open(args.out, "w", encoding="utf-8") as f:
+            f.write(text + "\n")
+    print(text)
+    if args.compare:
+        return _compare_files(args.compare, report, args.tolerance, args.min_delta_ms)
+    return 0
+
+
+def _compare_files(baseline_path: str, current: dict, tolerance: float, min_delta_ms: float) -> int:
+    with open(baseline_path, encoding="utf-8") as f:
+        baseline = json.load(f)
+    if baseline["config"] != current["config"]:
+        print("Uwaga: pomiary mają różną konfigurację (mieszanka, współbieżność, seed) — porównanie może mylić.")
+    findings = compare(baseline, current, tolerance, min_delta_ms)
+    print(format_comparison(findings))
+    regressions = [item for item in findings if item["regression"]]
+    print(f"\nRegresje: {len(regressions)}")
+    return 1 if regressions else 0
+
+
+def _compare(args) -> int:
+    with open(args.current, encoding="utf-8") as f:
+        current = json.load(f)
+    return _compare_files(args.baseline, current, args.tolerance, args.min_delta_ms)
+
+
+def main(argv: list[str] | None = None) -> int:
+    parser = argparse.ArgumentParser(prog="python -m bench", description="Benchmark obciążeniowy API")
+    commands = parser.add_subparsers(dest="command", required=True)
+
+    layout = argparse.ArgumentParser(add_help=False)
+    layout.add_argument("--users", type=int, default=2000, help="liczba kont bench_*")
+    layout.add_argument("--friends", type=int, default=10, help="znajomi z każdej strony pierścienia")
+
+    thresholds = argparse.ArgumentParser(add_help=False)
+    thresholds.add_argument("--tolerance", type=float, default=0.10, help="dopuszczalny wzrost czasu / spadek rps (ułamek)")
+    thresholds.add_argument("--min-delta-ms", type=float, default=2.0, help="mniejsze różnice czasu to szum")
+
+    seed_parser = commands.add_parser("seed", parents=[layout], help="zastąp konta bench_* świeżymi danymi")
+    seed_parser.add_argument("--history", type=int, default=20, help="starsze zaproszenia na konto")
+    seed_parser.add_argument("--batch-size", type=int, default=5000)
+    seed_parser.set_defaults(handler=_seed)
+
+    run_parser = commands.add_parser("run", parents=[layout, thresholds], help="zmierz serwer pod obciążeniem")
+    run_parser.add_argument("--url", default="http://127.0.0.1:8000")
+    run_parser.add_argument("--mix", choices=list(MIXES), default="mixed")
+    run_parser.add_argument("--concurrency", type=int, default=50)
+    run_parser.add_argument("--duration", type=float, default=60)
+    run_parser.add_argument("--warmup", type=float, default=10)
+    run_parser.add_argument("--seed", type=int, default=1)
+    run_parser.add_argument("--out", help="zapisz wynik (np. jako nowy plik bazowy)")
+    run_parser.add_argument("--compare", help="plik bazowy do porównania po pomiarze")
+    run_parser.set_defaults(handler=_run)
+
+    compare_parser = commands.add_parser("compare", parents=[thresholds], help="porównaj dwa wyniki")
+    compare_parser.add_argument("baseline")
+    compare_parser.add_argument("current")
+    compare_parser.set_defaults(handler=_compare)
+
+    args = parser.parse_args(argv)
+    logging.basicConfig(level=logging.INFO, format="%(asctime)s %(levelname)s %(name)s: %(message)s")
+    return args.handler(args)
+
+
+if __name__ == "__main__":
+    sys.exit(main())
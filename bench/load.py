@@ -0,0 +1,183 @@
+"""Generator ruchu: stała liczba wirtualnych użytkowników w zamkniętej pętli (bez przerw między żądaniami).
+
+Każdy wirtualny użytkownik to jedno zaseedowane konto; w pętli losuje scenariusz z
+mieszanki (ziarno `--seed`, więc kolejność jest powtarzalna) i wykonuje jego żądania
+po kolei. Czasy zapisujemy per trasa (szablon adresu, nie konkretny URL).
+"""
+import asyncio
+import logging
+import random
+import time
+from collections import defaultdict
+
+import httpx
+
+from bench.seed import PASSWORD, email, friends_of, username
+
+logger = logging.getLogger("bench")
+
+# Scenariusz -> waga w mieszance.
+MIXES = {
+    # Otwarta plansza bez strumienia zdarzeń: odpytywanie zaproszeń jak w plansza/script.js.
+    "plansza": {"plansza": 8, "friends": 1, "invite": 1},
+    "social": {"friends": 5, "search": 4, "invite": 1},
+    "mixed": {"plansza": 5, "friends": 2, "search": 2, "invite": 1, "login": 1},
+    "login": {"login": 1},
+}
+
+
+class Recorder:
+    def __init__(self):
+        self.latencies: dict[str, list[float]] = defaultdict(list)
+        self.statuses: dict[str, dict[int, int]] = defaultdict(lambda: defaultdict(int))
+        self.errors: dict[str, int] = defaultdict(int)
+        self.recording = False
+
+    async def request(self, client: httpx.AsyncClient, route: str, method: str, url: str, **kwargs):
+        start = time.perf_counter()
+        try:
+            response = await client.request(method, url, **kwargs)
+        except httpx.HTTPError:
+            if self.recording:
+                self.errors[route] += 1
+            return None
+        elapsed = time.perf_counter() - start
+        if self.recording:
+            self.latencies[route].append(elapsed)
+            self.statuses[route][response.status_code] += 1
+            if response.status_code >= 400:
+                self.errors[route] += 1
+        return response
+
+
+class VirtualUser:
+    """Stan jednego konta: token i ETagi (przeglądarka rewaliduje odpowiedzi z cache)."""
+
+    def __init__(self, index: int, users: int, friends: int):
+        self.index = index
+        self.users = users
+        self.friends = friends_of(index, users, friends)
+        self.headers: dict[str, str] = {}
+        self.etags: dict[str, str] = {}
+
+    async def get(self, recorder: Recorder, client: httpx.AsyncClient, route: str, url: str, **kwargs):
+        headers = dict(self.headers)
+        if url in self.etags:
+            headers["If-None-Match"] = self.etags[url]
+        response = await recorder.request(client, route, "GET", url, headers=headers, **kwargs)
+        if response is not None and response.headers.get("etag"):
+            self.etags[url] = response.headers["etag"]
+        return response
+
+
+async def login(recorder: Recorder, client: httpx.AsyncClient, user: VirtualUser) -> bool:
+    for _ in range(10):
+        response = await recorder.request(
+            client, "POST /login", "POST", "/api/login",
+            json={"email": email(user.index), "password": PASSWORD},
+        )
+        if response is not None and response.status_code == 200:
+            user.headers = {"Authorization": f"Bearer {response.json()['access_token']}"}
+            return True
+        if response is not None and response.status_code != 503:
+            return False
+        # 503 przy przepełnionej kolejce hashowania — serwer podaje Retry-After.
+        retry = response.headers.get("retry-after") if response is not None else None
+        await asyncio.sleep(float(retry or 1))
+    return False
+
+
+async def _plansza(recorder, client, user, rand):
+    # Wejście na planszę, potem cykle odpytywania: received co 5 s, status własnego zaproszenia co 3 s.
+    await user.get(recorder, client, "GET /me", "/api/me")
+    response = await user.get(recorder, client, "GET /game-invitations/my-pending", "/api/game-invitations/my-pending")
+    pending = response.json() if response is not None and response.status_code == 200 else []
+    for _ in range(3):
+        await user.get(recorder, client, "GET /game-invitations/received", "/api/game-invitations/received")
+        if pending:
+            await user.get(
+                recorder, client, "GET /game-invitations/status/{id}", f"/api/game-invitations/status/{pending[0]['id']}"
+            )
+
+
+async def _friends(recorder, client, user, rand):
+    await user.get(recorder, client, "GET /friends", "/api/friends")
+
+
+async def _search(recorder, client, user, rand):
+    # Prefiks losowej nazwy (bench_0, bench_00..., bench_0012) — od szerokich do zawężonych wyników.
+    query = username(rand.randrange(user.users))[: rand.randint(7, 10)]
+    await user.get(recorder, client, "GET /users/search", "/api/users/search", params={"query": query})
+
+
+async def _invite(recorder, client, user, rand):
+    # Zaproszenie do dalszego znajomego (bliższy sąsiad ma już aktywne z seeda) i anulowanie.
+    friend = user.friends[rand.randrange(2, len(user.friends))] if len(user.friends) > 2 else user.friends[0]
+    response = await recorder.request(
+        client, "POST /game-invitations/send", "POST", "/api/game-invitations/send", headers=user.headers,
+        json={"invitee_username": username(friend), "game_type": "kolko-i-krzyzyk"},
+    )
+    if response is None or response.status_code != 200:
+        return
+    invitation_id = response.json()["invitation_id"]
+    await user.get(recorder, client, "GET /game-invitations/status/{id}", f"/api/game-invitations/status/{invitation_id}")
+    await recorder.request(
+        client, "POST /game-invitations/cancel/{id}", "POST", f"/api/game-invitations/cancel/{invitation_id}",
+        headers=user.headers,
+    )
+
+
+async def _login(recorder, client, user, rand):
+    await login(recorder, client, user)
+
+
+SCENARIOS = {"plansza": _plansza, "friends": _friends, "search": _search, "invite": _invite, "login": _login}
+
+
+async def _worker(recorder, client, user, mix, rand, deadline):
+    names = list(mix)
+    weights = [mix[name] for name in names]
+    iterations = 0
+    while time.monotonic() < deadline:
+        await SCENARIOS[rand.choices(names, weights)[0]](recorder, client, user, rand)
+        iterations += 1
+    return iterations
+
+
+async def run(
+    url: str, mix: str, concurrency: int, duration: float, warmup: float,
+    users: int, friends: int, seed: int,
+) -> dict:
+    """Loguje `concurrency` kont, rozgrzewa serwer i mierzy przez `duration` sekund."""
+    recorder = Recorder()
+    rand = random.Random(seed)
+    indexes = rand.sample(range(users), concurrency)
+    virtual_users = [VirtualUser(index, users, friends) for index in indexes]
+    limits = httpx.Limits(max_connections=concurrency, max_keepalive_connections=concurrency)
+    async with httpx.AsyncClient(base_url=url, limits=limits, timeout=30) as client:
+        semaphore = asyncio.Semaphore(8)
+
+        async def log_in(user):
+            async with semaphore:
+                return await login(recorder, client, user)
+
+        if not all(await asyncio.gather(*(log_in(user) for user in virtual_users))):
+            raise RuntimeError("Nie udało się zalogować wszystkich kont — czy baza jest zaseedowana (python -m bench seed)?")
+
+        for phase, seconds in (("rozgrzewka", warmup), ("pomiar", duration)):
+            recorder.recording = phase == "pomiar"
+            logger.info("Faza: %s (%ss, %s użytkowników, mieszanka %s)", phase, seconds, concurrency, mix)
+            deadline = time.monotonic() + seconds
+            start = time.perf_counter()
+            iterations = await asyncio.gather(*(
+                _worker(recorder, client, user, MIXES[mix], random.Random(rand.getrandbits(64)), deadline)
+                for user in virtual_users
+            ))
+            elapsed = time.perf_counter() - start
+    return {
+        "seconds": elapsed,
+        "iterations": sum(iterations),
+        "latencies": recorder.latencies,
+        "statuses": recorder.statuses,
+        "errors": recorder.errors,
+    }
@@ -0,0 +1,81 @@
+"""Podsumowanie pomiaru (percentyle, przepustowość) i porównanie z plikiem bazowym."""
+
+
+def percentile(sorted_values: list[float], p: float) -> float:
+    """Percentyl metodą najbliższej rangi (wartości muszą być posortowane)."""
+    if not sorted_values:
+        return 0.0
+    rank = max(1, -(-len(sorted_values) * p // 100))
+    return sorted_values[int(rank) - 1]
+
+
+def summarize(result: dict) -> dict:
+    seconds = result["seconds"]
+    routes = {}
+    total = 0
+    for route in sorted(set(result["latencies"]) | set(result["errors"])):
+        values = sorted(result["latencies"].get(route, []))
+        total += len(values)
+        routes[route] = {
+            "requests": len(values),
+            "errors": result["errors"].get(route, 0),
+            "statuses": {str(code): count for code, count in sorted(result["statuses"].get(route, {}).items())},
+            "rps": round(len(values) / seconds, 2),
+            "mean_ms": round(sum(values) / len(values) * 1000, 2) if values else None,
+            "p50_ms": round(percentile(values, 50) * 1000, 2),
+            "p95_ms": round(percentile(values, 95) * 1000, 2),
+            "p99_ms": round(percentile(values, 99) * 1000, 2),
+            "max_ms": round(values[-1] * 1000, 2) if values else None,
+        }
+    return {
+        "seconds": round(seconds, 2),
+        "requests": total,
+        "rps": round(total / seconds, 2),
+        "scenarios": result["iterations"],
+        "routes": routes,
+    }
+
+
+def compare(baseline: dict, current: dict, tolerance: float, min_delta_ms: float) -> list[dict]:
+    """Trasy, które są wolniejsze (p50/p95/p99) lub mają mniejszą przepustowość niż w pliku bazowym.
+
+    Regresja to wzrost o więcej niż `tolerance` (ułamek) i zarazem o więcej niż
+    `min_delta_ms` — drobne różnice szybkich tras to zwykle szum.
+    """
+    findings = []
+    for route, before in baseline["routes"].items():
+        after = current["routes"].get(route)
+        if after is None or not after["requests"]:
+            findings.append({"route": route, "metric": "requests", "before": before["requests"], "after": 0, "regression": True})
+            continue
+        for metric in ("p50_ms", "p95_ms", "p99_ms"):
+            old, new = before[metric], after[metric]
+            change = (new - old) / old if old else 0.0
+            findings.append({
+                "route": route, "metric": metric, "before": old, "after": new, "change": round(change, 3),
+                "regression": change > tolerance and new - old > min_delta_ms,
+            })
+        old, new = before["rps"], after["rps"]
+        change = (new - old) / old if old else 0.0
+        findings.append({
+            "route": route, "metric": "rps", "before": old, "after": new, "change": round(change, 3),
+            "regression": change < -tolerance,
+        })
+        error_rate = after["errors"] / after["requests"]
+        if error_rate > before["errors"] / max(1, before["requests"]) + 0.01:
+            findings.append({
+                "route": route, "metric": "error_rate", "before": before["errors"], "after": after["errors"],
+                "regression": True,
+            })
+    return findings
+
+
+def format_comparison(findings: list[dict]) -> str:
+    lines = [f"{'trasa':<42} {'metryka':<10} {'przed':>10} {'po':>10} {'zmiana':>8}"]
+    for item in findings:
+        change = f"{item['change']:+.1%}" if "change" in item else ""
+        flag = "  <-- REGRESJA" if item["regression"] else ""
+        lines.append(
+            f"{item['route']:<42} {item['metric']:<10} {item['before']:>10} {item['after']:>10} {change:>8}{flag}"
+        )
+    return "\n".join(lines)
@@ -0,0 +1,112 @@
+"""Seedowanie lokalnej bazy kontami, znajomościami i zaproszeniami do benchmarku."""
+import logging
+import time
+from datetime import datetime, timedelta, timezone
+
+from sqlalchemy import delete, insert, select
+
+from auth import get_password_hash
+from database import engine
+from models import Friendship, FriendshipStatus, GameInvitation, GameInvitationStatus, User
+from user_stats import BATALLA, TICTACTOE, rebuild
+
+logger = logging.getLogger("bench")
+
+USERNAME_PREFIX = "bench_"
+PASSWORD = "bench-password"
+_HISTORY_STATUSES = (GameInvitationStatus.ACCEPTED, GameInvitationStatus.DECLINED, GameInvitationStatus.EXPIRED)
+
+
+def username(index: int) -> str:
+    return f"{USERNAME_PREFIX}{index:06d}"
+
+
+def email(index: int) -> str:
+    return f"{username(index)}@bench.example"
+
+
+def friends_of(index: int, users: int, friends: int) -> list[int]:
+    """Znajomi konta w pierścieniu (tak samo liczą seed i generator ruchu)."""
+    return [(index + offset) % users for step in range(1, friends + 1) for offset in (step, -step)]
+
+
+def _batches(rows, size: int):
+    batch = []
+    for row in rows:
+        batch.append(row)
+        if len(batch) >= size:
+            yield batch
+            batch = []
+    if batch:
+        yield batch
+
+
+def seed(users: int, friends: int, history: int, batch_size: int = 5000) -> dict:
+    """Zastępuje poprzednie konta bench_* nowym zestawem; zwraca liczby wstawionych wierszy."""
+    if users < 3 or not 0 < friends < users // 2:
+        raise ValueError("Potrzeba co najmniej 3 kont i 0 < friends < users / 2")
+    start = time.perf_counter()
+    hashed = get_password_hash(PASSWORD)  # jedno hashowanie dla wszystkich kont
+    now = datetime.now(timezone.utc)
+    counts = {}
+    with engine.begin() as conn:
+        # Jawnie, nie tylko kaskadą z users (SQLite domyślnie nie egzekwuje kluczy obcych).
+        old = select(User.id).where(User.username.like(f"{USERNAME_PREFIX}%")).scalar_subquery()
+        conn.execute(delete(Friendship).where(Friendship.requester_id.in_(old) | Friendship.addressee_id.in_(old)))
+        conn.execute(delete(GameInvitation).where(GameInvitation.inviter_id.in_(old) | GameInvitation.invitee_id.in_(old)))
+        conn.execute(delete(User).where(User.username.like(f"{USERNAME_PREFIX}%")))
+        for batch in _batches(
+            ({"username": username(i), "email": email(i), "hashed_password": hashed} for i in range(users)),
+            batch_size,
+        ):
+            conn.execute(insert(User), batch)
+        ids = dict(conn.execute(select(User.username, User.id).where(User.username.like(f"{USERNAME_PREFIX}%"))).all())
+        user_id = [ids[username(i)] for i in range(users)]
+        counts["users"] = users
+
+        # Każda para sąsiadów raz (zapraszający to konto o niższym przesunięciu w pierścieniu).
+        friendships = (
+            {
+                "requester_id": user_id[i],
+                "addressee_id": user_id[(i + step) % users],
+                "status": FriendshipStatus.ACCEPTED,
+                "created_at": now,
+                "updated_at": now,
+            }
+            for i in range(users)
+            for step in range(1, friends + 1)
+        )
+        for batch in _batches(friendships, batch_size):
+            conn.execute(insert(Friendship), batch)
+        counts["friendships"] = users * friends
+
+        # Jedno aktywne zaproszenie do sąsiada (to, co odpytuje plansza) i historia starszych.
+        def invitations():
+            for i in range(users):
+                yield {
+                    "inviter_id": user_id[(i + 1) % users],
+                    "invitee_id": user_id[i],
+                    "game_type": BATALLA,
+                    "status": GameInvitationStatus.PENDING,
+                    "created_at": now,
+                    "updated_at": now,
+                }
+                for n in range(history):
+                    at = now - timedelta(hours=n + 1)
+                    yield {
+                        "inviter_id": user_id[i],
+                        "invitee_id": user_id[(i + 1 + n % friends) % users],
+                        "game_type": TICTACTOE if n % 2 else BATALLA,
+                        "status": _HISTORY_STATUSES[n % len(_HISTORY_STATUSES)],
+                        "created_at": at,
+                        "updated_at": at,
+                    }
+
+        for batch in _batches(invitations(), batch_size):
+            conn.execute(insert(GameInvitation), batch)
+        counts["invitations"] = users * (1 + history)
+
+    counts["user_stats"] = rebuild(batch_size)["rows"]
+    counts["seconds"] = round(time.perf_counter() - start, 2)
+    logger.info("Zaseedowano %s kont benchmarku", users)
+    return counts
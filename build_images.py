@@ -0,0 +1,283 @@
+"""Optymalizacja grafik frontendu (krok budowania, wynik w katalogu optimized/).
+
+Użycie:
+    python build_images.py
+    python build_images.py --workers 8 --force
+
+Dla każdego PNG z IMAGE_DIRS powstają warianty AVIF (jeśli Pillow ją obsługuje),
+WebP i PNG w gęstościach 1x/2x/3x — liczonych od szerokości, w jakiej strona
+wyświetla obrazek (DISPLAY_WIDTHS), nigdy większe niż źródło. Małe ikony ze SPRITES
+są dodatkowo sklejane w arkusze z gotowym CSS. Wszystko opisuje optimized/manifest.json,
+z którego korzysta static_assets.py (negocjacja formatu po nagłówku Accept).
+Pliki, których źródło się nie zmieniło, nie są kodowane ponownie.
+"""
+import argparse
+import fnmatch
+import hashlib
+import io
+import json
+import logging
+import os
+import sys
+import time
+from concurrent.futures import ProcessPoolExecutor
+from pathlib import Path
+
+from PIL import Image, features
+
+logger = logging.getLogger("build_images")
+
+ROOT = Path(__file__).resolve().parent
+OUTPUT_DIR = "optimized"
+MANIFEST_NAME = "manifest.json"
+# Zmiana ustawień kodowania musi unieważnić wcześniejsze wyniki.
+_BUILD_VERSION = 1
+
+IMAGE_DIRS = ["karty", "plansza/img", "zasady/img", "img_glowna"]
+
+# Szerokość wyświetlania w CSS px (1x); pozostałe pliki mają 1x = rozmiar źródła.
+DISPLAY_WIDTHS = {
+    "karty/*.png": 200,
+    "plansza/img/heart*.png": 25,
+    "plansza/img/star*.png": 25,
+    "plansza/img/brain*.png": 25,
+    "img_glowna/power-off.png": 40,
+    "img_glowna/pl.png": 28,
+    "img_glowna/en.png": 28,
+}
+DENSITIES = [1, 2, 3]
+
+# Arkusze sprite'ów: nazwa -> (rozmiar komórki w CSS px, pliki w kolejności klatek).
+SPRITES = {
+    "plansza-icons": (25, [
+        "plansza/img/heart.png", "plansza/img/heart_empty.png",
+        "plansza/img/star.png", "plansza/img/star_empty.png",
+        "plansza/img/brain.png", "plansza/img/brain_empty.png",
+    ]),
+}
+
+WEBP_QUALITY = 85
+AVIF_QUALITY = 60
+_MIME_TYPES = {"avif": "image/avif", "webp": "image/webp", "png": "image/png"}
+
+
+def _formats() -> list[str]:
+    """Formaty od najlepszego; AVIF tylko jeśli Pillow ma koder."""
+    return (["avif"] if features.check("avif") else []) + ["webp", "png"]
+
+
+def _display_width(relative: str, source_width: int) -> int:
+    for pattern, width in DISPLAY_WIDTHS.items():
+        if fnmatch.fnmatch(relative, pattern):
+            return min(width, source_width)
+    return source_width
+
+
+def _sha256(path: Path) -> str:
+    return hashlib.sha256(path.read_bytes()).hexdigest()
+
+
+def _encode(image: Image.Image, fmt: str) -> bytes:
+    buffer = io.BytesIO()
+    if fmt == "avif":
+        image.save(buffer, "AVIF", quality=AVIF_QUALITY)
+    elif fmt == "webp":
+        # Grafiki z małą paletą (pixel art) bezstratnie wychodzą mniejsze niż stratnie.
+        lossless = image.getcolors(256) is not None
+        image.save(buffer, "WEBP", quality=WEBP_QUALITY, lossless=lossless, method=6)
+    else:
+        # Do 256 kolorów (z przezroczystością) PNG z paletą jest bezstratny i kilka razy mniejszy.
+        if image.getcolors(256) is not None:
+            image = image.quantize(colors=256, method=Image.Quantize.FASTOCTREE, dither=Image.Dither.NONE)
+        image.save(buffer, "PNG", optimize=True)
+    return buffer.getvalue()
+
+
+def _resize(image: Image.Image, width: int) -> Image.Image:
+    if width == image.width:
+        return image
+    height = max(1, round(image.height * width / image.width))
+    return image.resize((width, height), Image.Resampling.LANCZOS)
+
+
+def _write(relative: str, body: bytes) -> None:
+    path = ROOT / relative
+    path.parent.mkdir(parents=True, exist_ok=True)
+    path.write_bytes(body)
+
+
+def build_image(relative: str, formats: list[str]) -> dict:
+    """Koduje wszystkie warianty jednego obrazka (uruchamiane w procesach roboczych)."""
+    source = ROOT / relative
+    source_bytes = source.stat().st_size
+    with Image.open(source) as opened:
+        image = opened.convert("RGBA")
+    base_width = _display_width(relative, image.width)
+    stem = Path(OUTPUT_DIR, relative).with_suffix("")
+    variants = []
+    serve_width = base_width
+    for density in DENSITIES:
+        width = base_width * density
+        if width > image.width:
+            break
+        serve_width = width
+        resized = _resize(image, width)
+        for fmt in formats:
+            body = _encode(resized, fmt)
+            if len(body) >= source_bytes:
+                # Oryginał i tak jest serwowany jako ostateczna wersja zapasowa.
+                continue
+            path = f"{stem.as_posix()}.{width}w.{fmt}"
+            _write(path, body)
+            variants.append({
+                "path": path,
+                "format": fmt,
+                "density": density,
+                "width": resized.width,
+                "height": resized.height,
+                "bytes": len(body),
+            })
+    return {
+        "source_sha256": _sha256(source),
+        "source_bytes": source_bytes,
+        "width": image.width,
+        "height": image.height,
+        "display_width": base_width,
+        # Serwer podmienia oryginał tylko na wariant tej szerokości (najwyższa gęstość),
+        # żeby na żadnym ekranie nie stracić jakości.
+        "serve_width": serve_width,
+        "variants": variants,
+    }
+
+
+def build_sprite(name: str, cell: int, sources: list[str], formats: list[str]) -> dict:
+    """Skleja ikony w poziomy pasek (dla każdej gęstości) i zapisuje CSS z image-set()."""
+    frames = []
+    for relative in sources:
+        with Image.open(ROOT / relative) as opened:
+            frames.append((Path(relative).stem, opened.convert("RGBA")))
+    sheets = {}
+    for density in DENSITIES:
+        size = cell * density
+        if any(size > frame.width for _, frame in frames):
+            break
+        sheet = Image.new("RGBA", (size * len(frames), size))
+        for index, (_, frame) in enumerate(frames):
+            sheet.paste(frame.resize((size, size), Image.Resampling.LANCZOS), (index * size, 0))
+        for fmt in formats:
+            path = f"{OUTPUT_DIR}/sprites/{name}.{density}x.{fmt}"
+            _write(path, _encode(sheet, fmt))
+            sheets.setdefault(density, {})[fmt] = path
+
+    def image_set() -> str:
+        return ", ".join(
+            f'url("{Path(path).name}") type("{_MIME_TYPES[fmt]}") {density}x'
+            for density, paths in sheets.items()
+            for fmt, path in paths.items()
+        )
+
+    fallback = Path(sheets[1]["png"]).name
+    lines = [
+        f".sprite-{name} {{",
+        "    display: inline-block;",
+        f"    width: {cell}px;",
+        f"    height: {cell}px;",
+        f'    background-image: url("{fallback}");',
+        f"    background-image: image-set({image_set()});",
+        f"    background-size: {cell * len(frames)}px {cell}px;",
+        "    background-repeat: no-repeat;",
+        "}",
+    ]
+    for index, (frame_name, _) in enumerate(frames):
+        lines.append(f".sprite-{name}.{frame_name} {{ background-position: -{index * cell}px 0; }}")
+    css_path = f"{OUTPUT_DIR}/sprites/{name}.css"
+    _write(css_path, ("\n".join(lines) + "\n").encode("utf-8"))
+    return {
+        "css": css_path,
+        "cell": cell,
+        "frames": [frame_name for frame_name, _ in frames],
+        "sheets": {str(density): paths for density, paths in sheets.items()},
+        "sources_sha256": [_sha256(ROOT / relative) for relative in sources],
+    }
+
+
+def _load_manifest() -> dict:
+    path = ROOT / OUTPUT_DIR / MANIFEST_NAME
+    try:
+        manifest = json.loads(path.read_text(encoding="utf-8"))
+    except (FileNotFoundError, ValueError):
+        return {}
+    return manifest if manifest.get("version") == _BUILD_VERSION else {}
+
+
+def _is_current(entry: dict | None, source_hashes: list[str], formats: list[str]) -> bool:
+    if not entry or entry.get("formats") != formats:
+        return False
+    paths = [variant["path"] for variant in entry.get("variants", [])]
+    paths += [path for sheet in entry.get("sheets", {}).values() for path in sheet.values()]
+    recorded = entry.get("sources_sha256") or [entry.get("source_sha256")]
+    return recorded == source_hashes and all((ROOT / path).is_file() for path in paths)
+
+
+def main(argv: list[str] | None = None) -> int:
+    parser = argparse.ArgumentParser(description="Warianty AVIF/WebP/PNG i sprite'y grafik frontendu")
+    parser.add_argument("--workers", type=int, default=os.cpu_count() or 1)
+    parser.add_argument("--force", action="store_true", help="koduj wszystko od nowa")
+    args = parser.parse_args(argv)
+
+    logging.basicConfig(level=logging.INFO, format="%(asctime)s %(levelname)s %(name)s: %(message)s")
+    formats = _formats()
+    if "avif" not in formats:
+        logger.warning("Pillow bez obsługi AVIF — generuję tylko WebP i PNG")
+    previous = {} if args.force else _load_manifest()
+    images = dict(previous.get("images", {}))
+    sprites = dict(previous.get("sprites", {}))
+
+    sources = sorted(
+        path.relative_to(ROOT).as_posix()
+        for directory in IMAGE_DIRS
+        for path in (ROOT / directory).glob("*.png")
+    )
+    images = {relative: entry for relative, entry in images.items() if relative in sources}
+    pending = [
+        relative for relative in sources
+        if not _is_current(images.get(relative), [_sha256(ROOT / relative)], formats)
+    ]
+
+    start = time.perf_counter()
+    with ProcessPoolExecutor(max_workers=args.workers) as executor:
+        for relative, entry in zip(pending, executor.map(build_image, pending, [formats] * len(pending))):
+            images[relative] = {**entry, "formats": formats}
+        sprite_jobs = {
+            name: executor.submit(build_sprite, name, cell, files, formats)
+            for name, (cell, files) in SPRITES.items()
+            if not _is_current(sprites.get(name), [_sha256(ROOT / path) for path in files], formats)
+        }
+        for name, job in sprite_jobs.items():
+            sprites[name] = {**job.result(), "formats": formats}
+    sprites = {name: entry for name, entry in sprites.items() if name in SPRITES}
+
+    manifest = {"version": _BUILD_VERSION, "images": images, "sprites": sprites}
+    _write(f"{OUTPUT_DIR}/{MANIFEST_NAME}", json.dumps(manifest, indent=2, sort_keys=True).encode("utf-8"))
+
+    source_bytes = sum(entry["source_bytes"] for entry in images.values())
+    best_bytes = sum(
+        min([entry["source_bytes"]] + [
+            variant["bytes"] for variant in entry["variants"] if variant["width"] == entry["serve_width"]
+        ])
+        for entry in images.values()
+    )
+    logger.info(
+        "Zakodowano %s z %s obrazków i %s sprite'ów w %.1fs; źródła %s KiB -> najlepsze warianty %s KiB",
+        len(pending),
+        len(sources),
+        len(sprite_jobs),
+        time.perf_counter() - start,
+        source_bytes // 1024,
+        best_bytes // 1024,
+    )
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,225 @@
+"""Masowy import użytkowników (seedowanie środowisk testowych i stagingu).
+
+Użycie:
+    python bulk_import.py users.csv
+    python bulk_import.py users.ndjson --batch-size 5000 --workers 8
+
+Każdy rekord musi mieć `username` i `email` oraz `password` (hashowane równolegle na
+wszystkich rdzeniach) albo gotowe `hashed_password`. Duplikaty w pliku i konta już
+istniejące w bazie są pomijane. Na PostgreSQL wiersze ładowane są przez COPY,
+na innych bazach wielowierszowymi INSERT-ami.
+"""
+import argparse
+import csv
+import io
+import json
+import logging
+import multiprocessing
+import os
+import sys
+import time
+from concurrent.futures import ProcessPoolExecutor
+from typing import Iterator
+
+from pydantic import ValidationError
+from sqlalchemy import insert, or_, select
+
+from auth import (
+    HASH_CALIBRATE,
+    HASH_ROUNDS,
+    configure_password_hashing,
+    get_password_hash,
+    hash_settings,
+    load_or_calibrate,
+)
+from database import engine
+from models import User
+from schemas import UserCreate
+
+logger = logging.getLogger("bulk_import")
+
+
+def _read_records(path: str, fmt: str) -> Iterator[dict]:
+    with open(path, encoding="utf-8", newline="") as f:
+        if fmt == "csv":
+            yield from csv.DictReader(f)
+        else:
+            for line in f:
+                if line.strip():
+                    yield json.loads(line)
+
+
+def _chunks(records: Iterator[dict], size: int) -> Iterator[list[dict]]:
+    chunk = []
+    for record in records:
+        chunk.append(record)
+        if len(chunk) >= size:
+            yield chunk
+            chunk = []
+    if chunk:
+        yield chunk
+
+
+def _validate(record: dict) -> dict | None:
+    username = (record.get("username") or "").strip()
+    email = (record.get("email") or "").strip()
+    hashed_password = record.get("hashed_password")
+    try:
+        if hashed_password:
+            # Walidujemy nazwę i email tym samym schematem co /register (hasło zastępcze).
+            user = UserCreate(username=username, email=email, password="x" * 6)
+        else:
+            user = UserCreate(username=username, email=email, password=record.get("password") or "")
+    except ValidationError as e:
+        logger.debug("Pominięto rekord %s: %s", email or username, e.errors()[0]["msg"])
+        return None
+    # Email po normalizacji EmailStr — tak samo jak zapisuje go /register (inaczej logowanie
+    # i sprawdzanie duplikatów rozjeżdżają się na wielkości liter w domenie).
+    return {
+        "username": user.username,
+        "email": user.email,
+        "password": record.get("password"),
+        "hashed_password": hashed_password,
+    }
+
+
+class _Importer:
+    def __init__(self, executor: ProcessPoolExecutor, workers: int, use_copy: bool):
+        self.executor = executor
+        self.workers = workers
+        self.use_copy = use_copy
+        self.seen_emails: set[str] = set()
+        self.seen_usernames: set[str] = set()
+        self.read = 0
+        self.imported = 0
+        self.skipped = 0
+        self.hash_seconds = 0.0
+        self.hashed = 0
+
+    def _filter_new(self, conn, rows: list[dict]) -> list[dict]:
+        """Rekordy, których email i nazwa nie są zajęte w bazie, w poprzednich partiach ani wcześniej w tej."""
+        emails = [row["email"] for row in rows]
+        usernames = [row["username"] for row in rows]
+        # Jedno zapytanie na partię zamiast dwóch SELECT-ów na użytkownika.
+        existing = conn.execute(
+            select(User.email, User.username).where(
+                or_(User.email.in_(emails), User.username.in_(usernames))
+            )
+        ).all()
+        taken_emails = self.seen_emails | {email for email, _ in existing}
+        taken_usernames = self.seen_usernames | {username for _, username in existing}
+
+        fresh = []
+        for row in rows:
+            if row["email"] in taken_emails or row["username"] in taken_usernames:
+                continue
+            taken_emails.add(row["email"])
+            taken_usernames.add(row["username"])
+            fresh.append(row)
+        return fresh
+
+    def _hash_passwords(self, rows: list[dict]) -> None:
+        pending = [row for row in rows if not row["hashed_password"]]
+        if not pending:
+            return
+        start = time.perf_counter()
+        chunksize = max(1, len(pending) // (self.workers * 4))
+        hashes = self.executor.map(
+            get_password_hash, [row["password"] for row in pending], chunksize=chunksize
+        )
+        for row, hashed in zip(pending, hashes):
+            row["hashed_password"] = hashed
+        self.hash_seconds += time.perf_counter() - start
+        self.hashed += len(pending)
+
+    def _load(self, conn, rows: list[dict]) -> None:
+        if self.use_copy:
+            buffer = io.StringIO()
+            writer = csv.writer(buffer)
+            for row in rows:
+                writer.writerow((row["username"], row["email"], row["hashed_password"]))
+            buffer.seek(0)
+            with conn.connection.cursor() as cursor:
+                cursor.copy_expert(
+                    "COPY users (username, email, hashed_password) FROM STDIN WITH (FORMAT csv)",
+                    buffer,
+                )
+        else:
+            conn.execute(insert(User), [
+                {
+                    "username": row["username"],
+                    "email": row["email"],
+                    "hashed_password": row["hashed_password"],
+                }
+                for row in rows
+            ])
+
+    def import_chunk(self, chunk: list[dict]) -> None:
+        self.read += len(chunk)
+        rows = [row for row in map(_validate, chunk) if row is not None]
+        # Najpierw krótki odczyt, żeby nie hashować haseł kont, które już istnieją.
+        with engine.connect() as conn:
+            rows = self._filter_new(conn, rows)
+        # Hashowanie trwa sekundy — poza transakcją, żeby nie trzymać połączenia z puli.
+        self._hash_passwords(rows)
+        with engine.begin() as conn:
+            rows = self._filter_new(conn, rows)  # konta założone w międzyczasie
+            if rows:
+                self._load(conn, rows)
+        self.seen_emails.update(row["email"] for row in rows)
+        self.seen_usernames.update(row["username"] for row in rows)
+        self.imported += len(rows)
+        self.skipped += len(chunk) - len(rows)
+
+
+def main(argv: list[str] | None = None) -> int:
+    parser = argparse.ArgumentParser(description="Masowy import użytkowników z CSV/NDJSON")
+    parser.add_argument("path", help="plik .csv lub .ndjson")
+    parser.add_argument("--format", choices=["csv", "ndjson"], help="domyślnie z rozszerzenia pliku")
+    parser.add_argument("--batch-size", type=int, default=2000)
+    parser.add_argument("--workers", type=int, default=os.cpu_count() or 1)
+    parser.add_argument("--no-copy", action="store_true", help="użyj INSERT zamiast COPY")
+    args = parser.parse_args(argv)
+
+    logging.basicConfig(level=logging.INFO, format="%(asctime)s %(levelname)s %(name)s: %(message)s")
+    fmt = args.format or ("ndjson" if args.path.endswith((".ndjson", ".jsonl")) else "csv")
+    use_copy = engine.dialect.name == "postgresql" and not args.no_copy
+
+    # Te same parametry co serwer (zapisana kalibracja), żeby nie przeliczał hashy przy logowaniu.
+    if HASH_CALIBRATE and HASH_ROUNDS is None:
+        configure_password_hashing(load_or_calibrate())
+
+    start = time.perf_counter()
+    with ProcessPoolExecutor(
+        max_workers=args.workers,
+        mp_context=multiprocessing.get_context("spawn"),
+        initializer=configure_password_hashing,
+        initargs=(hash_settings(),),
+    ) as executor:
+        importer = _Importer(executor, args.workers, use_copy)
+        for chunk in _chunks(_read_records(args.path, fmt), args.batch_size):
+            importer.import_chunk(chunk)
+            elapsed = time.perf_counter() - start
+            logger.info(
+                "Przetworzono %s rekordów, zaimportowano %s (%.0f/s)",
+                importer.read,
+                importer.imported,
+                importer.imported / elapsed if elapsed else 0,
+            )
+
+    elapsed = time.perf_counter() - start
+    print(json.dumps({
+        "read": importer.read,
+        "imported": importer.imported,
+        "skipped": importer.skipped,
+        "seconds": round(elapsed, 2),
+        "users_per_second": round(importer.imported / elapsed, 1) if elapsed else None,
+        "hashes_per_second": round(importer.hashed / importer.hash_seconds, 1)
+        if importer.hash_seconds else None,
+        "loader": "copy" if use_copy else "insert",
+    }, indent=2))
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -1,9 +1,14 @@
 from sqlalchemy import create_engine
-from sqlalchemy.orm import declarative_base, sessionmaker
+from sqlalchemy.ext.asyncio import AsyncSession, async_sessionmaker, create_async_engine
+from sqlalchemy.orm import Session, declarative_base, sessionmaker
+from starlette.concurrency import run_in_threadpool
 import os
 from dotenv import load_dotenv
 from urllib.parse import quote_plus
 
+from db_pool import PoolStats, instrument_engine, timed_pool_class, validate_pre_ping
+from metrics import instrument_queries
+
 # Załaduj zmienne z .env (zawsze z katalogu projektu)
 dotenv_path = os.path.join(os.path.dirname(__file__), ".env")
 load_dotenv(dotenv_path=dotenv_path)
@@ -18,7 +23,44 @@ db_port = os.getenv("DATABASE_PORT", "5432")
 db_name = os.getenv("DATABASE_NAME", "inzynierka_db")
 
 DATABASE_URL = f"postgresql://{db_user}:{db_password}@{db_host}:{db_port}/{db_name}"
+ASYNC_DATABASE_URL = f"postgresql+asyncpg://{db_user}:{db_password}@{db_host}:{db_port}/{db_name}"
+
+# Tryb dostępu do bazy w endpointach:
+#   sync  — psycopg2, zapytania wykonywane w threadpoolu (ograniczenie: liczba wątków)
+#   async — asyncpg, zapytania w pętli zdarzeń (ograniczenie: pula połączeń)
+_SUPPORTED_DB_MODES = ["sync", "async"]
+DB_MODE = os.getenv("DB_MODE", "sync")
+if DB_MODE not in _SUPPORTED_DB_MODES:
+    raise ValueError(
+        f"Nieobsługiwany tryb bazy danych: '{DB_MODE}'. "
+        f"Dostępne opcje: {', '.join(_SUPPORTED_DB_MODES)}"
+    )
+
+# Pula połączeń (osobno dla silnika sync i async). DATABASE_PRE_PING:
+#   always — SELECT 1 przy każdym pobraniu połączenia (dodatkowy round trip do poolera)
+#   idle   — tylko gdy połączenie leżało w puli dłużej niż DATABASE_PRE_PING_IDLE_SECONDS
+#   never  — bez sprawdzania (zerwane połączenia zgłoszą błąd przy pierwszym zapytaniu)
+DATABASE_POOL_SIZE = int(os.getenv("DATABASE_POOL_SIZE", "5"))
+DATABASE_MAX_OVERFLOW = int(os.getenv("DATABASE_MAX_OVERFLOW", "10"))
+DATABASE_POOL_TIMEOUT = float(os.getenv("DATABASE_POOL_TIMEOUT", "30"))
+DATABASE_POOL_RECYCLE = int(os.getenv("DATABASE_POOL_RECYCLE", "1800"))
+DATABASE_PRE_PING = os.getenv("DATABASE_PRE_PING", "idle")
+DATABASE_PRE_PING_IDLE_SECONDS = float(os.getenv("DATABASE_PRE_PING_IDLE_SECONDS", "30"))
+validate_pre_ping(DATABASE_PRE_PING)
+
 
+def _pool_options(stats: PoolStats, asyncio: bool = False) -> dict:
+    return {
+        "poolclass": timed_pool_class(stats, asyncio=asyncio),
+        "pool_size": DATABASE_POOL_SIZE,
+        "max_overflow": DATABASE_MAX_OVERFLOW,
+        "pool_timeout": DATABASE_POOL_TIMEOUT,
+        "pool_recycle": DATABASE_POOL_RECYCLE,
+        "pool_pre_ping": DATABASE_PRE_PING == "always",
+    }
+
+
+pool_stats = PoolStats()
 engine = create_engine(
     DATABASE_URL,
     connect_args={
@@ -26,16 +68,113 @@ engine = create_engine(
         "sslmode": "require",
         "options": "-c client_encoding=UTF8"
     },
-    pool_pre_ping=True,
+    **_pool_options(pool_stats),
 )
+instrument_engine(engine, pool_stats, DATABASE_PRE_PING, DATABASE_PRE_PING_IDLE_SECONDS)
+instrument_queries(engine)
 SessionLocal = sessionmaker(autocommit=False, autoflush=False, bind=engine)
+# Sesje endpointów nie wygaszają obiektów po commit — w trybie async odczyt wygaszonego
+# atrybutu wymagałby niejawnego zapytania, więc oba tryby zachowują się tak samo.
+RequestSessionLocal = sessionmaker(
+    autocommit=False, autoflush=False, expire_on_commit=False, bind=engine
+)
+
+async_engine = None
+async_pool_stats = None
+AsyncSessionLocal = None
+if DB_MODE == "async":
+    async_pool_stats = PoolStats()
+    async_engine = create_async_engine(
+        ASYNC_DATABASE_URL,
+        connect_args={
+            "timeout": 10,
+            "ssl": "require",
+            # Przy poolerze w trybie transakcyjnym (port 6543) ustaw 0.
+            "statement_cache_size": int(os.getenv("DATABASE_STATEMENT_CACHE_SIZE", "100")),
+        },
+        **_pool_options(async_pool_stats, asyncio=True),
+    )
+    instrument_engine(
+        async_engine.sync_engine,
+        async_pool_stats,
+        DATABASE_PRE_PING,
+        DATABASE_PRE_PING_IDLE_SECONDS,
+    )
+    instrument_queries(async_engine.sync_engine)
+    AsyncSessionLocal = async_sessionmaker(
+        async_engine, class_=AsyncSession, autoflush=False, expire_on_commit=False
+    )
 
 Base = declarative_base()
 
 
+def pool_status() -> dict:
+    status = {"sync": pool_stats.snapshot(engine.pool)}
+    if async_engine is not None:
+        status["async"] = async_pool_stats.snapshot(async_engine.pool)
+    return status
+
+
 def get_db():
     db = SessionLocal()
     try:
         yield db
     finally:
         db.close()
+
+
+class SyncSessionAdapter:
+    """Synchroniczna sesja z interfejsem AsyncSession (zapytania idą do threadpoola)."""
+
+    def __init__(self, session: Session):
+        self.sync_session = session
+
+    @property
+    def bind(self):
+        return self.sync_session.bind
+
+    def add(self, instance) -> None:
+        self.sync_session.add(instance)
+
+    async def execute(self, statement, params=None):
+        return await run_in_threadpool(self.sync_session.execute, statement, params)
+
+    async def scalar(self, statement, params=None):
+        return await run_in_threadpool(self.sync_session.scalar, statement, params)
+
+    async def scalars(self, statement, params=None):
+        return await run_in_threadpool(self.sync_session.scalars, statement, params)
+
+    async def get(self, entity, ident):
+        return await run_in_threadpool(self.sync_session.get, entity, ident)
+
+    async def delete(self, instance) -> None:
+        await run_in_threadpool(self.sync_session.delete, instance)
+
+    async def flush(self) -> None:
+        await run_in_threadpool(self.sync_session.flush)
+
+    async def commit(self) -> None:
+        await run_in_threadpool(self.sync_session.commit)
+
+    async def rollback(self) -> None:
+        await run_in_threadpool(self.sync_session.rollback)
+
+    async def refresh(self, instance) -> None:
+        await run_in_threadpool(self.sync_session.refresh, instance)
+
+    async def close(self) -> None:
+        await run_in_threadpool(self.sync_session.close)
+
+
+async def get_async_db():
+    """Sesja dla endpointów `async def` — AsyncSession lub adapter, zależnie od DB_MODE."""
+    if AsyncSessionLocal is not None:
+        async with AsyncSessionLocal() as session:
+            yield session
+    else:
+        session = SyncSessionAdapter(RequestSessionLocal())
+        try:
+            yield session
+        finally:
+            await session.close()
@@ -0,0 +1,139 @@
+import logging
+import threading
+import time
+
+from sqlalchemy import event, exc
+from sqlalchemy.pool import AsyncAdaptedQueuePool, QueuePool
+
+logger = logging.getLogger(__name__)
+
+_SUPPORTED_PRE_PING = ["always", "idle", "never"]
+
+
+class PoolStats:
+    """Liczniki puli połączeń: czas oczekiwania na wolne połączenie i czas całego checkoutu."""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.checkouts = 0
+        self.checkout_seconds_total = 0.0
+        self.checkout_seconds_max = 0.0
+        self.wait_seconds_total = 0.0
+        self.wait_seconds_max = 0.0
+        self.timeouts = 0
+        self.connects = 0
+        self.pings = 0
+        self.ping_failures = 0
+
+    def record_wait(self, seconds: float, timed_out: bool = False) -> None:
+        with self._lock:
+            self.wait_seconds_total += seconds
+            self.wait_seconds_max = max(self.wait_seconds_max, seconds)
+            if timed_out:
+                self.timeouts += 1
+
+    def record_checkout(self, seconds: float) -> None:
+        with self._lock:
+            self.checkouts += 1
+            self.checkout_seconds_total += seconds
+            self.checkout_seconds_max = max(self.checkout_seconds_max, seconds)
+
+    def record_connect(self) -> None:
+        with self._lock:
+            self.connects += 1
+
+    def record_ping(self, ok: bool) -> None:
+        with self._lock:
+            self.pings += 1
+            if not ok:
+                self.ping_failures += 1
+
+    def snapshot(self, pool) -> dict:
+        with self._lock:
+            checkouts = self.checkouts or 1
+            return {
+                "size": pool.size(),
+                "checked_out": pool.checkedout(),
+                "checked_in": pool.checkedin(),
+                "overflow": max(pool.overflow(), 0),
+                "checkouts": self.checkouts,
+                "checkout_ms_avg": round(self.checkout_seconds_total / checkouts * 1000, 3),
+                "checkout_ms_max": round(self.checkout_seconds_max * 1000, 3),
+                "wait_ms_avg": round(self.wait_seconds_total / checkouts * 1000, 3),
+                "wait_ms_max": round(self.wait_seconds_max * 1000, 3),
+                "timeouts": self.timeouts,
+                "connects": self.connects,
+                "pings": self.pings,
+                "ping_failures": self.ping_failures,
+            }
+
+
+class _TimedPoolMixin:
+    pool_stats: PoolStats
+
+    def connect(self):
+        # Cały checkout: oczekiwanie, ewentualne nowe połączenie i pre-ping.
+        start = time.perf_counter()
+        try:
+            return super().connect()
+        finally:
+            self.pool_stats.record_checkout(time.perf_counter() - start)
+
+    def _do_get(self):
+        # Samo oczekiwanie na wolne połączenie z kolejki (lub utworzenie nowego).
+        start = time.perf_counter()
+        try:
+            record = super()._do_get()
+        except exc.TimeoutError:
+            self.pool_stats.record_wait(time.perf_counter() - start, timed_out=True)
+            raise
+        self.pool_stats.record_wait(time.perf_counter() - start)
+        return record
+
+
+def timed_pool_class(stats: PoolStats, asyncio: bool = False) -> type:
+    base = AsyncAdaptedQueuePool if asyncio else QueuePool
+    return type(f"Timed{base.__name__}", (_TimedPoolMixin, base), {"pool_stats": stats})
+
+
+def validate_pre_ping(strategy: str) -> None:
+    if strategy not in _SUPPORTED_PRE_PING:
+        raise ValueError(
+            f"Nieobsługiwana strategia pre-ping: '{strategy}'. "
+            f"Dostępne opcje: {', '.join(_SUPPORTED_PRE_PING)}"
+        )
+
+
+def instrument_engine(sync_engine, stats: PoolStats, pre_ping: str, idle_seconds: float) -> None:
+    """Podpina liczniki i (dla strategii "idle") pre-ping tylko dla dłużej nieużywanych połączeń.
+
+    "always" to wbudowane pool_pre_ping=True (zapytanie przy każdym checkoucie),
+    "idle" pinguje połączenie tylko wtedy, gdy leżało w puli dłużej niż `idle_seconds`.
+    """
+
+    @event.listens_for(sync_engine, "connect")
+    def _on_connect(dbapi_connection, connection_record):
+        stats.record_connect()
+        connection_record.info["last_checkin"] = time.monotonic()
+
+    @event.listens_for(sync_engine, "checkin")
+    def _on_checkin(dbapi_connection, connection_record):
+        if connection_record is not None:
+            connection_record.info["last_checkin"] = time.monotonic()
+
+    if pre_ping != "idle":
+        return
+
+    @event.listens_for(sync_engine, "checkout")
+    def _on_checkout(dbapi_connection, connection_record, connection_proxy):
+        last_checkin = connection_record.info.get("last_checkin")
+        if last_checkin is not None and time.monotonic() - last_checkin < idle_seconds:
+            return
+        try:
+            sync_engine.dialect.do_ping(dbapi_connection)
+        except Exception as e:
+            stats.record_ping(ok=False)
+            logger.warning("Połączenie z bazą nie odpowiada, zostanie odnowione: %s", e)
+            # Pula odrzuci to połączenie i spróbuje ponownie z nowym.
+            raise exc.DisconnectionError() from e
+        stats.record_ping(ok=True)
@@ -1,21 +1,70 @@
+import ipaddress
 import logging
+import os
+import secrets
 
-from fastapi import Depends, HTTPException, status
+from fastapi import Depends, HTTPException, Request, status
 from fastapi.security import HTTPAuthorizationCredentials, HTTPBearer
-from sqlalchemy.orm import Session
+from sqlalchemy import select
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy.orm import make_transient_to_detached
 
 from auth import decode_token
-from database import get_db
+from cache import TTLCache
+from database import get_async_db
 from models import User
 
 logger = logging.getLogger(__name__)
 
 security = HTTPBearer()
 
+# Cache zalogowanych użytkowników (klucz: `sub` z tokena, czyli email). Większość
+# uwierzytelnionych żądań (m.in. polling z plansza/script.js) nie odpytuje wtedy bazy.
+# Endpointy zmieniające wiersz `users` muszą wołać invalidate_user_cache().
+# Cache działa w obrębie procesu — przy kilku workerach spójność zapewnia krótki TTL,
+# a żądania zmieniające dane (POST/PUT/DELETE...) zawsze czytają użytkownika z bazy.
+USER_CACHE_TTL_SECONDS = float(os.getenv("USER_CACHE_TTL_SECONDS", "30"))
+USER_CACHE_MAX_ENTRIES = int(os.getenv("USER_CACHE_MAX_ENTRIES", "4096"))
 
-def get_current_user(
+user_cache = TTLCache(maxsize=USER_CACHE_MAX_ENTRIES, ttl=USER_CACHE_TTL_SECONDS)
+
+# /metrics i szczegóły /api/health (pule, cache, liczby gier) są tylko dla monitoringu:
+# dla adresów z METRICS_ALLOWED_NETWORKS albo z nagłówkiem Authorization: Bearer <METRICS_TOKEN>.
+# Za reverse proxy adresem klienta jest proxy — wtedy lepiej użyć tokena.
+METRICS_TOKEN = os.getenv("METRICS_TOKEN", "")
+METRICS_ALLOWED_NETWORKS = [
+    ipaddress.ip_network(network.strip())
+    for network in os.getenv("METRICS_ALLOWED_NETWORKS", "127.0.0.1/32,::1/128").split(",")
+    if network.strip()
+]
+
+_USER_COLUMNS = tuple(column.key for column in User.__table__.columns)
+
+
+def invalidate_user_cache(*emails: str | None) -> None:
+    for email in emails:
+        if email:
+            user_cache.pop(email)
+
+
+# Tylko te metody mogą dostać użytkownika z cache — nie zmieniają wiersza `users`.
+_CACHED_METHODS = {"GET", "HEAD", "OPTIONS"}
+
+
+def _attach_cached_user(db: AsyncSession, values: dict) -> User:
+    # Odtwarzamy obiekt jako "detached" i dołączamy do sesji żądania bez zapytania
+    # SELECT. Wiersz mógł w międzyczasie zmienić lub usunąć inny worker, dlatego
+    # endpointy zapisujące zmiany dostają użytkownika prosto z bazy (get_current_user).
+    user = User(**values)
+    make_transient_to_detached(user)
+    db.add(user)
+    return user
+
+
+async def get_current_user(
+    request: Request,
     credentials: HTTPAuthorizationCredentials = Depends(security),
-    db: Session = Depends(get_db),
+    db: AsyncSession = Depends(get_async_db),
 ) -> User:
     email = decode_token(credentials.credentials)
     if email is None:
@@ -24,10 +73,42 @@ def get_current_user(
             detail="Nieprawidłowy token",
             headers={"WWW-Authenticate": "Bearer"},
         )
-    user = db.query(User).filter(User.email == email).first()
+
+    if request.method in _CACHED_METHODS:
+        cached = user_cache.get(email)
+        if cached is not None:
+            return _attach_cached_user(db, cached)
+
+    generation = user_cache.generation
+    user = await db.scalar(select(User).where(User.email == email))
     if user is None:
         raise HTTPException(
             status_code=status.HTTP_404_NOT_FOUND,
             detail="Użytkownik nie znaleziony",
         )
+    user_cache.set(
+        email,
+        {column: getattr(user, column) for column in _USER_COLUMNS},
+        generation=generation,
+    )
     return user
+
+
+def has_metrics_access(request: Request) -> bool:
+    if METRICS_TOKEN:
+        scheme, _, token = request.headers.get("authorization", "").partition(" ")
+        if scheme.lower() == "bearer" and secrets.compare_digest(token.encode(), METRICS_TOKEN.encode()):
+            return True
+    try:
+        address = ipaddress.ip_address(request.client.host if request.client else "")
+    except ValueError:
+        return False
+    return any(address in network for network in METRICS_ALLOWED_NETWORKS)
+
+
+async def require_metrics_access(request: Request) -> None:
+    if not has_metrics_access(request):
+        raise HTTPException(
+            status_code=status.HTTP_403_FORBIDDEN,
+            detail="Brak dostępu do metryk",
+        )
@@ -0,0 +1,88 @@
+import os
+import secrets
+import threading
+import time
+
+from fastapi import Request, Response, status
+
+# Listy odpytywane w pollingu (klucz licznika wersji):
+#   friends              — GET /friends
+#   friend_requests      — GET /friends/requests
+#   invitations_received — GET /game-invitations/received
+#   invitations_sent     — GET /game-invitations/my-pending
+FRIENDS = "friends"
+FRIEND_REQUESTS = "friend_requests"
+INVITATIONS_RECEIVED = "invitations_received"
+INVITATIONS_SENT = "invitations_sent"
+
+# Liczniki są w pamięci procesu, więc przy kilku workerach zmiana z innego procesu
+# jest niewidoczna. ETag zawiera przedział czasu tej długości — po jego upływie
+# klient i tak dostaje świeżą listę. 0 = bez limitu (jeden worker).
+ETAG_REVALIDATE_SECONDS = float(os.getenv("ETAG_REVALIDATE_SECONDS", "60"))
+
+# Po restarcie liczniki startują od zera — identyfikator procesu unieważnia stare ETagi.
+_BOOT_ID = secrets.token_hex(4)
+
+
+class ChangeVersions:
+    """Liczniki zmian list per użytkownik oraz globalna epoka profili.
+
+    Listy zawierają nazwy i awatary innych użytkowników, więc zmiana dowolnego
+    profilu (lub usunięcie konta) podbija epokę wspólną dla wszystkich list.
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._versions: dict[tuple[int, str], int] = {}
+        self._profile_epoch = 0
+
+    def bump(self, scope: str, *user_ids: int) -> None:
+        with self._lock:
+            for user_id in user_ids:
+                key = (user_id, scope)
+                self._versions[key] = self._versions.get(key, 0) + 1
+
+    def bump_profiles(self) -> None:
+        with self._lock:
+            self._profile_epoch += 1
+
+    def etag(self, scope: str, user_id: int) -> str:
+        with self._lock:
+            version = self._versions.get((user_id, scope), 0)
+            epoch = self._profile_epoch
+        bucket = int(time.time() // ETAG_REVALIDATE_SECONDS) if ETAG_REVALIDATE_SECONDS > 0 else 0
+        return f'W/"{_BOOT_ID}.{user_id}.{scope}.{version}.{epoch}.{bucket}"'
+
+
+change_versions = ChangeVersions()
+
+
+def _opaque(tag: str) -> str:
+    tag = tag.strip()
+    return tag[2:] if tag.startswith("W/") else tag
+
+
+def is_not_modified(request: Request, etag: str) -> bool:
+    """Porównanie słabe (RFC 9110) z nagłówkiem If-None-Match."""
+    header = request.headers.get("if-none-match")
+    if not header:
+        return False
+    if header.strip() == "*":
+        return True
+    return _opaque(etag) in {_opaque(tag) for tag in header.split(",")}
+
+
+# Odpowiedź zależy od użytkownika (tokena), a przeglądarka ma ją zawsze rewalidować.
+_CACHE_HEADERS = {"Cache-Control": "private, no-cache", "Vary": "Authorization"}
+
+
+def not_modified_response(request: Request, etag: str) -> Response | None:
+    """304 bez dotykania bazy, jeśli klient ma aktualną wersję listy."""
+    if not is_not_modified(request, etag):
+        return None
+    return Response(status_code=status.HTTP_304_NOT_MODIFIED, headers={"ETag": etag, **_CACHE_HEADERS})
+
+
+def set_etag(response: Response, etag: str) -> None:
+    response.headers["ETag"] = etag
+    response.headers.update(_CACHE_HEADERS)
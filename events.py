@@ -0,0 +1,65 @@
+import asyncio
+import itertools
+import logging
+import os
+from collections import defaultdict
+from typing import Iterable
+
+logger = logging.getLogger(__name__)
+
+EVENTS_QUEUE_SIZE = int(os.getenv("EVENTS_QUEUE_SIZE", "100"))
+
+
+class EventHub:
+    """Pub/sub w pamięci procesu: każde połączenie SSE ma własną kolejkę zdarzeń użytkownika.
+
+    Działa w obrębie jednego procesu — przy kilku workerach klient dostaje tylko
+    zdarzenia z procesu, do którego jest podłączony (po ponownym połączeniu i tak
+    odświeża stan z API). Metody wołamy z wątku pętli zdarzeń.
+    """
+
+    def __init__(self, queue_size: int):
+        self._queue_size = queue_size
+        self._subscribers: dict[int, set[asyncio.Queue]] = defaultdict(set)
+        self._ids = itertools.count(1)
+        self.published = 0
+        self.dropped = 0
+
+    def subscribe(self, user_id: int) -> asyncio.Queue:
+        queue = asyncio.Queue(maxsize=self._queue_size)
+        self._subscribers[user_id].add(queue)
+        return queue
+
+    def unsubscribe(self, user_id: int, queue: asyncio.Queue) -> None:
+        queues = self._subscribers.get(user_id)
+        if queues is None:
+            return
+        queues.discard(queue)
+        if not queues:
+            del self._subscribers[user_id]
+
+    def publish(self, user_ids: Iterable[int], event_type: str, data: dict) -> None:
+        event = {"id": next(self._ids), "type": event_type, "data": data}
+        for user_id in user_ids:
+            for queue in self._subscribers.get(user_id, ()):
+                try:
+                    queue.put_nowait(event)
+                except asyncio.QueueFull:
+                    # Klient nie nadąża — zamiast gubić pojedyncze zdarzenia każemy mu
+                    # odświeżyć cały stan z API.
+                    self.dropped += queue.qsize()
+                    while not queue.empty():
+                        queue.get_nowait()
+                    queue.put_nowait({"id": event["id"], "type": "resync", "data": {}})
+                self.published += 1
+
+    def stats(self) -> dict:
+        return {
+            "users": len(self._subscribers),
+            "connections": sum(len(queues) for queues in self._subscribers.values()),
+            "published": self.published,
+            "dropped": self.dropped,
+        }
+
+
+event_hub = EventHub(EVENTS_QUEUE_SIZE)
@@ -0,0 +1 @@
+"""Logika gier po stronie serwera (generatory, silniki rozgrywki)."""
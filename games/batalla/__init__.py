@@ -0,0 +1,17 @@
+from games.batalla.engine import Game, MoveError
+from games.batalla.questions import (
+    BATALLA_QUESTIONS_RELOAD_SECONDS,
+    LEVELS,
+    Question,
+    QuestionSampler,
+    question_bank,
+)
+from games.batalla.rules import CLASS_NAMES, DEFAULT_RULES, Rules, rules_from_config
+from games.batalla.sessions import (
+    BATALLA_SNAPSHOT_INTERVAL_SECONDS,
+    GameSession,
+    end_player_games,
+    games,
+    publish_state,
+    snapshot_games_job,
+)
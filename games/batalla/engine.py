@@ -0,0 +1,589 @@
+"""Silnik Wielkiej Studenckiej Batalli — jedyne źródło prawdy o stanie rozgrywki.
+
+Stan gracza to wiersz liczb w jednej tablicy `array('h')` (klasa, piętro, pole,
+monety, kryształki, hp, ...), a losowość to jeden 64-bitowy stan generatora
+splitmix64 — rzuty kostką, pytania i kolejność kart Szansy wynikają z ziarna
+i kolejnych akcji, więc tę samą grę da się odtworzyć z ziarna i listy ruchów.
+Cała partia mieści się w ~100 bajtach migawki (`to_snapshot`).
+
+Pytania na polach Sala i Aula (i obrona w dziekanacie) zadaje warstwa sesji z banku
+pytań — silnik wyznacza tylko poziom, liczbę pytań i rozlicza odpowiedzi (`answer`).
+"""
+import struct
+import sys
+from array import array
+
+from games.batalla.rules import (
+    AULA,
+    BIBLIOTEKA,
+    CLASS_NAMES,
+    DEFAULT_RULES,
+    DZIEKANAT,
+    FIELD_NAMES,
+    PRAKTYKI,
+    SALA,
+    START,
+    STOLOWKA,
+    SZANSA,
+    Rules,
+)
+
+MAX_PLAYERS = 4
+
+LOBBY = 0
+PLAYING = 1
+FINISHED = 2
+PHASES = ("lobby", "playing", "finished")
+
+# Kolumny wiersza gracza w tablicy `players`.
+_CLASS, _FLOOR, _POS, _COINS, _CRYSTALS, _HP, _LUCK, _WISDOM, _SKIP, _PREPAID, _FLAGS = range(11)
+STRIDE = 11
+
+FLAG_OUT = 1  # odpadł (hp spadło do zera albo się poddał)
+FLAG_CARD = 2  # ma kartę skrócenia praktyk
+FLAG_HINT = 4  # podpowiedź z biblioteki do najbliższego pytania
+FLAG_EXCHANGED = 8  # wymiana w dziekanacie na tym piętrze już wykorzystana
+FLAG_CARD_BOUGHT = 16  # karta praktyk na tym piętrze już kupiona
+_FLOOR_FLAGS = FLAG_EXCHANGED | FLAG_CARD_BOUGHT
+
+# Wybory, które gracz musi podjąć przed końcem tury (bity pola `pending`).
+PENDING_BONUS = 1  # po zapłaceniu czesnego: moneta / hp / szczęście
+PENDING_DZIEKANAT = 2
+PENDING_BIBLIOTEKA = 4
+PENDING_EXAM = 8  # pytania do odpowiedzenia
+PENDING_NAMES = {
+    PENDING_BONUS: "bonus",
+    PENDING_DZIEKANAT: "dziekanat",
+    PENDING_BIBLIOTEKA: "biblioteka",
+    PENDING_EXAM: "exam",
+}
+
+# Za co są pytania (pole `exam_kind`).
+EXAM_SALA = 1
+EXAM_AULA = 2
+EXAM_DEFENSE = 3
+
+_SNAPSHOT_FORMAT = 2
+# format, graczy, faza, tura, zwycięzca, wybory, karta, rzut, wersja, rng
+_HEADER_V1 = struct.Struct("<BBBBbBBBIQ")
+# ... oraz egzamin: rodzaj, poziom, pytań, pozostało, poprawnych
+_HEADER = struct.Struct("<BBBBbBBBIQBBBBB")
+_MASK64 = (1 << 64) - 1
+
+
+class MoveError(ValueError):
+    """Niedozwolona akcja (komunikat można pokazać graczowi)."""
+
+
+class Game:
+    __slots__ = (
+        "rules", "user_ids", "players", "phase", "turn", "winner",
+        "pending", "rng", "deck", "deck_pos", "last_roll", "version", "events",
+        "exam_kind", "exam_level", "exam_total", "exam_left", "exam_correct",
+    )
+
+    def __init__(self, user_ids: tuple[int, ...], seed: int, rules: Rules = DEFAULT_RULES):
+        if not 2 <= len(user_ids) <= MAX_PLAYERS:
+            raise ValueError(f"Gra wymaga od 2 do {MAX_PLAYERS} graczy")
+        self.rules = rules
+        self.user_ids = tuple(user_ids)
+        self.players = array("h", [0] * (STRIDE * len(user_ids)))
+        for index in range(len(user_ids)):
+            self.players[index * STRIDE + _CLASS] = -1
+        self.phase = LOBBY
+        self.turn = 0
+        self.winner: int | None = None
+        self.pending = 0
+        self.rng = seed & _MASK64
+        self.deck = bytearray(range(len(rules.chance_cards)))
+        self.deck_pos = 0
+        self.last_roll = 0
+        self.version = 0
+        self.events: list[dict] = []  # skutki ostatniej akcji (dla komunikatów, poza migawką)
+        self.exam_kind = self.exam_level = self.exam_total = self.exam_left = self.exam_correct = 0
+
+    # --- losowość ---
+
+    def _rand(self, n: int) -> int:
+        """Liczba z [0, n) z generatora splitmix64."""
+        self.rng = z = (self.rng + 0x9E3779B97F4A7C15) & _MASK64
+        z = ((z ^ (z >> 30)) * 0xBF58476D1CE4E5B9) & _MASK64
+        z = ((z ^ (z >> 27)) * 0x94D049BB133111EB) & _MASK64
+        return (z ^ (z >> 31)) % n
+
+    def _shuffle_deck(self) -> None:
+        deck = self.deck
+        for i in range(len(deck) - 1, 0, -1):
+            j = self._rand(i + 1)
+            deck[i], deck[j] = deck[j], deck[i]
+        self.deck_pos = 0
+
+    def _draw_card(self) -> int:
+        if self.deck_pos >= len(self.deck):
+            self._shuffle_deck()
+        card = self.deck[self.deck_pos]
+        self.deck_pos += 1
+        return card
+
+    # --- dostęp do wierszy graczy ---
+
+    def _get(self, player: int, column: int) -> int:
+        return self.players[player * STRIDE + column]
+
+    def _set(self, player: int, column: int, value: int) -> None:
+        self.players[player * STRIDE + column] = value
+
+    def _add(self, player: int, column: int, delta: int) -> None:
+        index = player * STRIDE + column
+        self.players[index] = max(0, self.players[index] + delta)
+
+    def _has(self, player: int, flag: int) -> bool:
+        return bool(self.players[player * STRIDE + _FLAGS] & flag)
+
+    def _flag(self, player: int, flag: int, on: bool = True) -> None:
+        index = player * STRIDE + _FLAGS
+        self.players[index] = self.players[index] | flag if on else self.players[index] & ~flag
+
+    def _class(self, player: int):
+        return self.rules.classes[CLASS_NAMES[self._get(player, _CLASS)]]
+
+    def _on_last_floor(self, player: int) -> bool:
+        return self._get(player, _FLOOR) == len(self.rules.floors) - 1
+
+    def _event(self, player: int, kind: str, **data) -> None:
+        self.events.append({"player": player, "type": kind, **data})
+
+    @property
+    def finished(self) -> bool:
+        return self.phase == FINISHED
+
+    def index_of(self, user_id: int) -> int | None:
+        try:
+            return self.user_ids.index(user_id)
+        except ValueError:
+            return None
+
+    # --- akcje graczy ---
+
+    def choose_class(self, player: int, name: str) -> None:
+        if self.phase != LOBBY:
+            raise MoveError("Gra już się rozpoczęła")
+        if name not in CLASS_NAMES:
+            raise MoveError("Nieznana klasa postaci")
+        if self._get(player, _CLASS) >= 0:
+            raise MoveError("Klasa została już wybrana")
+        self.events = []
+        self._set(player, _CLASS, CLASS_NAMES.index(name))
+        self._event(player, "class", name=name)
+        if all(self._get(i, _CLASS) >= 0 for i in range(len(self.user_ids))):
+            self._start()
+        self.version += 1
+
+    def _start(self) -> None:
+        for player in range(len(self.user_ids)):
+            klass = self._class(player)
+            self._set(player, _HP, klass.hp)
+            self._set(player, _LUCK, klass.luck)
+            self._set(player, _WISDOM, klass.wisdom)
+            self._set(player, _COINS, klass.coins)
+        self._shuffle_deck()
+        self.phase = PLAYING
+        self.turn = 0
+        self._event(0, "start")
+
+    def roll(self, player: int) -> int:
+        self._check_turn(player)
+        if self.pending:
+            raise MoveError("Najpierw dokończ wybór na polu")
+        self.events = []
+        value = self._rand(self.rules.dice_sides) + 1
+        self.last_roll = value
+        self._event(player, "roll", value=value)
+        if self._step(player, value, 1, tuition=True):
+            self._land(player)
+        self._end_action(player)
+        return value
+
+    def options(self) -> list[str]:
+        """Możliwe odpowiedzi na bieżący wybór (najniższy ustawiony bit `pending`)."""
+        if not self.pending or self.phase != PLAYING:
+            return []
+        return self._options_for(self.pending & -self.pending)
+
+    def _options_for(self, pending: int) -> list[str]:
+        player = self.turn
+        coins = self._get(player, _COINS)
+        rules = self.rules
+        if pending == PENDING_EXAM:
+            return []  # odpowiedź to osobna akcja (`answer`)
+        if pending == PENDING_BONUS:
+            return ["coin", "hp", "luck"]
+        if pending == PENDING_BIBLIOTEKA:
+            if self._on_last_floor(player):
+                return (["crystal"] if coins >= rules.library_crystal_price else []) + ["end"]
+            hint = coins >= rules.hint_price and not self._has(player, FLAG_HINT)
+            return (["hint"] if hint else []) + ["end"]
+        options = []
+        crystals = self._get(player, _CRYSTALS)
+        if self._on_last_floor(player):
+            if crystals >= rules.crystals_to_advance:
+                options.append("defend")
+            return options + ["end"]
+        if coins >= self._tuition_cost(player):
+            options.append("prepay")
+        if not self._has(player, FLAG_EXCHANGED):
+            if coins >= rules.exchange_hp_price:
+                options.append("hp")
+            if coins >= rules.exchange_crystal_price:
+                options.append("crystal")
+        if coins >= rules.internship_card_price and not self._has(player, FLAG_CARD | FLAG_CARD_BOUGHT):
+            options.append("card")
+        if crystals >= rules.crystals_to_advance:
+            options.append("advance")
+        return options + ["end"]
+
+    def answer(self, player: int, correct: bool) -> None:
+        """Rozlicza odpowiedź na bieżące pytanie (poprawność sprawdza warstwa z bankiem pytań)."""
+        self._check_turn(player)
+        if self.pending & -self.pending != PENDING_EXAM:
+            raise MoveError("Nie ma teraz pytania do odpowiedzi")
+        self.events = []
+        self._event(player, "answer", correct=bool(correct))
+        self.exam_correct += bool(correct)
+        self.exam_left -= 1
+        if not self.exam_left:
+            self._resolve_exam(player)
+        self._end_action(player)
+
+    def exam_roll(self, player: int) -> bool:
+        """Odpowiedź wylosowana z ziarna gry (k20 + mądrość + szczęście // 2) — gdy bank pytań jest pusty."""
+        rules = self.rules
+        threshold = rules.exam_thresholds[min(self.exam_level, len(rules.exam_thresholds) - 1)]
+        bonus = self._get(player, _WISDOM) + self._get(player, _LUCK) // 2
+        if self._has(player, FLAG_HINT):
+            bonus += rules.hint_bonus
+        return self._rand(rules.exam_die) + 1 + bonus >= threshold
+
+    def choose(self, player: int, option: str) -> None:
+        self._check_turn(player)
+        if not self.pending:
+            raise MoveError("Nie ma teraz nic do wybrania")
+        if self.pending & -self.pending == PENDING_EXAM:
+            raise MoveError("Najpierw odpowiedz na pytanie")
+        if option not in self.options():
+            raise MoveError("Ta opcja nie jest teraz dostępna")
+        self.events = []
+        self._event(player, "choice", option=option)
+        rules = self.rules
+        pending = self.pending & -self.pending
+        done = True
+        if pending == PENDING_BONUS:
+            self._add(player, {"coin": _COINS, "hp": _HP, "luck": _LUCK}[option], 1)
+        elif option == "hint":
+            self._add(player, _COINS, -rules.hint_price)
+            self._flag(player, FLAG_HINT)
+        elif option == "crystal" and pending == PENDING_BIBLIOTEKA:
+            self._add(player, _COINS, -rules.library_crystal_price)
+            self._add(player, _CRYSTALS, 1)
+        elif option == "prepay":
+            self._add(player, _COINS, -self._tuition_cost(player))
+            self._add(player, _PREPAID, 1)
+            done = False
+        elif option in ("hp", "crystal"):
+            price = rules.exchange_hp_price if option == "hp" else rules.exchange_crystal_price
+            self._add(player, _COINS, -price)
+            self._add(player, _HP if option == "hp" else _CRYSTALS, 1)
+            self._flag(player, FLAG_EXCHANGED)
+            done = False
+        elif option == "card":
+            self._add(player, _COINS, -rules.internship_card_price)
+            self._flag(player, FLAG_CARD | FLAG_CARD_BOUGHT)
+            done = False
+        elif option == "advance":
+            self._advance(player)
+        elif option == "defend":
+            self._defend(player)
+        if done:
+            self.pending &= ~pending
+        self._end_action(player)
+
+    def resign(self, player: int) -> None:
+        if self.phase == FINISHED:
+            raise MoveError("Gra jest już zakończona")
+        if self._has(player, FLAG_OUT):
+            raise MoveError("Już nie bierzesz udziału w grze")
+        self.events = []
+        self._event(player, "resign")
+        self._eliminate(player)
+        self._end_action(player)
+
+    # --- reguły ---
+
+    def _check_turn(self, player: int) -> None:
+        if self.phase == LOBBY:
+            raise MoveError("Gra czeka na wybór klas")
+        if self.phase == FINISHED:
+            raise MoveError("Gra jest już zakończona")
+        if player != self.turn:
+            raise MoveError("Teraz tura innego gracza")
+
+    def _end_action(self, player: int) -> None:
+        self.version += 1
+        if self.phase == PLAYING and (not self.pending or self._has(self.turn, FLAG_OUT)):
+            self.pending = 0
+            if player == self.turn:
+                self._next_turn()
+
+    def _next_turn(self) -> None:
+        count = len(self.user_ids)
+        player = self.turn
+        while True:
+            player = (player + 1) % count
+            if self._has(player, FLAG_OUT):
+                continue
+            if self._get(player, _SKIP):
+                self._add(player, _SKIP, -1)
+                self._event(player, "skip")
+                continue
+            self.turn = player
+            return
+
+    def _tuition_cost(self, player: int) -> int:
+        return self.rules.last_floor_tuition if self._on_last_floor(player) else self.rules.tuition
+
+    def _occupied(self, player: int, floor: int, pos: int) -> bool:
+        # Na polu Start może stać kilku graczy (tam też wszyscy zaczynają).
+        if pos == START:
+            return False
+        for other in range(len(self.user_ids)):
+            if (
+                other != player
+                and not self._has(other, FLAG_OUT)
+                and self._get(other, _FLOOR) == floor
+                and self._get(other, _POS) == pos
+            ):
+                return True
+        return False
+
+    def _step(self, player: int, steps: int, direction: int, tuition: bool) -> bool:
+        """Przesuwa gracza; zajęte pole końcowe przeskakuje dalej. False, gdy spadł piętro niżej."""
+        floor = self._get(player, _FLOOR)
+        size = len(self.rules.floors[floor])
+        pos = self._get(player, _POS)
+        while steps > 0 or self._occupied(player, floor, pos):
+            pos = (pos + direction) % size
+            steps -= 1
+            if tuition and pos == START:
+                self._set(player, _POS, pos)
+                if not self._pay_tuition(player):
+                    return False
+        self._set(player, _POS, pos)
+        return True
+
+    def _pay_tuition(self, player: int) -> bool:
+        cost = self._tuition_cost(player)
+        if self._get(player, _PREPAID):
+            self._add(player, _PREPAID, -1)
+        elif self._get(player, _COINS) >= cost:
+            self._add(player, _COINS, -cost)
+        elif self._get(player, _CRYSTALS):
+            self._add(player, _CRYSTALS, -1)
+            self._event(player, "tuition", paid=False, lost="crystal")
+            return True
+        elif self._get(player, _FLOOR):
+            self._change_floor(player, -1)
+            self._event(player, "tuition", paid=False, lost="floor")
+            return False
+        else:
+            self._event(player, "tuition", paid=False, lost=None)
+            return True
+        self._event(player, "tuition", paid=True)
+        self.pending |= PENDING_BONUS
+        return True
+
+    def _change_floor(self, player: int, delta: int) -> None:
+        self._add(player, _FLOOR, delta)
+        self._set(player, _POS, START)
+        self._flag(player, _FLOOR_FLAGS, on=False)
+
+    def _start_exam(self, player: int, kind: int, questions: int) -> None:
+        """Pytania na polu: Leniuch dostaje trudniejsze, Mądrala łatwiejsze, ostatnie piętro +1."""
+        rules = self.rules
+        level = rules.exam_base_level + self._class(player).question_shift + self._on_last_floor(player)
+        self.exam_kind = kind
+        self.exam_level = min(max(level, 0), len(rules.exam_thresholds) - 1)
+        self.exam_total = self.exam_left = questions
+        self.exam_correct = 0
+        self.pending |= PENDING_EXAM
+        self._event(player, "exam", questions=questions, level=self.exam_level)
+
+    def _resolve_exam(self, player: int) -> None:
+        self.pending &= ~PENDING_EXAM
+        self._flag(player, FLAG_HINT, on=False)
+        correct, total, kind = self.exam_correct, self.exam_total, self.exam_kind
+        self.exam_kind = 0
+        self._event(player, "exam_result", questions=total, correct=correct)
+        if kind == EXAM_SALA:
+            if correct:
+                self._add(player, _CRYSTALS, 1)
+        elif kind == EXAM_AULA:
+            # Na ostatnim piętrze kryształek tylko za komplet odpowiedzi.
+            if correct >= (total if self._on_last_floor(player) else 1):
+                self._add(player, _CRYSTALS, 1)
+        elif correct == total:
+            self._finish(player)
+        else:
+            self._add(player, _CRYSTALS, -1)
+
+    def _land(self, player: int) -> None:
+        rules = self.rules
+        field = rules.floors[self._get(player, _FLOOR)][self._get(player, _POS)]
+        self._event(player, "field", field=FIELD_NAMES[field])
+        if field == SALA:
+            self._start_exam(player, EXAM_SALA, 1)
+        elif field == AULA:
+            self._start_exam(player, EXAM_AULA, 2)
+        elif field == PRAKTYKI:
+            if self._has(player, FLAG_CARD):
+                self._flag(player, FLAG_CARD, on=False)
+                turns = rules.internship_card_turns
+            else:
+                turns = self._class(player).internship_turns
+            self._set(player, _SKIP, turns)
+        elif field == SZANSA:
+            card_index = self._draw_card()
+            card = rules.chance_cards[card_index]
+            self._event(player, "card", card=card_index, text=card.text)
+            self._add(player, _COINS, card.coins)
+            self._add(player, _LUCK, card.luck)
+            self._add(player, _WISDOM, card.wisdom)
+            self._add(player, _HP, card.hp)
+            if card.move:
+                self._step(player, abs(card.move), 1 if card.move > 0 else -1, tuition=False)
+            if card.hp < 0 and not self._get(player, _HP):
+                self._eliminate(player)
+        elif field == STOLOWKA:
+            if not self._on_last_floor(player):
+                self._add(player, _HP, self._class(player).canteen_hp)
+        elif field in (BIBLIOTEKA, DZIEKANAT):
+            # Wybór tylko wtedy, gdy jest z czego wybierać (samo "end" pomijamy).
+            pending = PENDING_BIBLIOTEKA if field == BIBLIOTEKA else PENDING_DZIEKANAT
+            if self._options_for(pending) != ["end"]:
+                self.pending |= pending
+        # Start i łazienki nic nie robią.
+
+    def _advance(self, player: int) -> None:
+        self._add(player, _CRYSTALS, -self.rules.crystals_to_advance)
+        self._change_floor(player, 1)
+        self._event(player, "floor", floor=self._get(player, _FLOOR))
+
+    def _defend(self, player: int) -> None:
+        # Obrona: komplet odpowiedzi kończy grę, porażka kosztuje kryształek.
+        self._start_exam(player, EXAM_DEFENSE, self.rules.defense_questions)
+
+    def _eliminate(self, player: int) -> None:
+        self._flag(player, FLAG_OUT)
+        self._event(player, "out")
+        alive = [i for i in range(len(self.user_ids)) if not self._has(i, FLAG_OUT)]
+        if len(alive) == 1:
+            self._finish(alive[0])
+
+    def _finish(self, winner: int) -> None:
+        self.winner = winner
+        self.phase = FINISHED
+        self.pending = 0
+        self._event(winner, "win")
+
+    # --- stan i migawki ---
+
+    def state(self) -> dict:
+        floors = self.rules.floors
+        offsets = [sum(len(floor) for floor in floors[:i]) for i in range(len(floors))]
+        players = []
+        for player in range(len(self.user_ids)):
+            row = self.players[player * STRIDE:(player + 1) * STRIDE]
+            players.append({
+                "class": CLASS_NAMES[row[_CLASS]] if row[_CLASS] >= 0 else None,
+                "floor": row[_FLOOR] + 1,
+                "cell": offsets[row[_FLOOR]] + row[_POS],
+                "coins": row[_COINS],
+                "crystals": row[_CRYSTALS],
+                "hp": row[_HP],
+                "luck": row[_LUCK],
+                "wisdom": row[_WISDOM],
+                "skip_turns": row[_SKIP],
+                "prepaid_tuition": row[_PREPAID],
+                "internship_card": bool(row[_FLAGS] & FLAG_CARD),
+                "hint": bool(row[_FLAGS] & FLAG_HINT),
+                "out": bool(row[_FLAGS] & FLAG_OUT),
+            })
+        pending = self.pending & -self.pending
+        return {
+            "phase": PHASES[self.phase],
+            "turn": self.turn if self.phase == PLAYING else None,
+            "pending": PENDING_NAMES.get(pending),
+            "options": self.options(),
+            "last_roll": self.last_roll or None,
+            "winner": self.winner,
+            "version": self.version,
+            "players": players,
+            "exam": {
+                "questions": self.exam_total,
+                "answered": self.exam_total - self.exam_left,
+                "correct": self.exam_correct,
+                "level": self.exam_level,
+            } if self.pending & PENDING_EXAM else None,
+            "events": self.events,
+        }
+
+    def to_snapshot(self) -> bytes:
+        players = array("h", self.players)
+        if sys.byteorder != "little":
+            players.byteswap()
+        header = _HEADER.pack(
+            _SNAPSHOT_FORMAT,
+            len(self.user_ids),
+            self.phase,
+            self.turn,
+            -1 if self.winner is None else self.winner,
+            self.pending,
+            self.deck_pos,
+            self.last_roll,
+            self.version,
+            self.rng,
+            self.exam_kind,
+            self.exam_level,
+            self.exam_total,
+            self.exam_left,
+            self.exam_correct,
+        )
+        return header + struct.pack(f"<{len(self.user_ids)}I", *self.user_ids) + players.tobytes() + bytes(self.deck)
+
+    @classmethod
+    def from_snapshot(cls, data: bytes, rules: Rules = DEFAULT_RULES) -> "Game":
+        fmt = data[0]
+        if fmt == 1:
+            header, exam = _HEADER_V1, (0, 0, 0, 0, 0)  # sprzed pytań z banku
+            fields = header.unpack_from(data)
+        elif fmt == _SNAPSHOT_FORMAT:
+            header = _HEADER
+            fields = header.unpack_from(data)
+            fields, exam = fields[:10], fields[10:]
+        else:
+            raise ValueError(f"Nieobsługiwany format migawki: {fmt}")
+        _, count, phase, turn, winner, pending, deck_pos, last_roll, version, rng = fields
+        offset = header.size
+        user_ids = struct.unpack_from(f"<{count}I", data, offset)
+        offset += 4 * count
+        game = cls(user_ids, rng, rules)
+        size = 2 * STRIDE * count
+        game.players = array("h")
+        game.players.frombytes(data[offset:offset + size])
+        if sys.byteorder != "little":
+            game.players.byteswap()
+        game.deck = bytearray(data[offset + size:])
+        game.phase, game.turn, game.pending = phase, turn, pending
+        game.winner = None if winner < 0 else winner
+        game.deck_pos, game.last_roll, game.version = deck_pos, last_roll, version
+        game.exam_kind, game.exam_level, game.exam_total, game.exam_left, game.exam_correct = exam
+        return game
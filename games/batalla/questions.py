@@ -0,0 +1,193 @@
+"""Bank pytań do pól Sala i Aula.
+
+Pytania są wczytywane z pliku JSON do pamięci i indeksowane listami numerów
+według poziomu (0 łatwe – 3 bardzo trudne) oraz pary (poziom, temat). Każda gra
+losuje przez własny `QuestionSampler`, który nie powtarza pytań, dopóki pula się
+nie wyczerpie — losowanie to jedna zamiana w leniwym tasowaniu Fishera–Yatesa, O(1).
+Zmiana pliku jest wykrywana po mtime i bank podmieniany w całości (bez restartu).
+"""
+import json
+import logging
+import os
+import random
+import threading
+from dataclasses import dataclass
+from pathlib import Path
+
+logger = logging.getLogger(__name__)
+
+BATALLA_QUESTIONS_PATH = os.getenv(
+    "BATALLA_QUESTIONS_PATH", str(Path(__file__).with_name("questions.json"))
+)
+BATALLA_QUESTIONS_RELOAD_SECONDS = float(os.getenv("BATALLA_QUESTIONS_RELOAD_SECONDS", "5"))
+
+LEVELS = ("łatwe", "średnie", "trudne", "bardzo trudne")
+
+_MISSING = (0, -1)
+
+
+@dataclass(frozen=True)
+class Question:
+    id: str
+    topic: str
+    level: int
+    text: str
+    answers: tuple[str, ...]
+    correct: int
+
+    def public(self, hint: bool = False) -> dict:
+        """Pytanie bez poprawnej odpowiedzi; podpowiedź zostawia jedną błędną (numery odpowiedzi bez zmian)."""
+        answers = list(enumerate(self.answers))
+        if hint:
+            removed = [i for i, _ in answers if i != self.correct][:-1]
+            answers = [(i, answer) for i, answer in answers if i not in removed]
+        return {
+            "id": self.id,
+            "topic": self.topic,
+            "level": self.level,
+            "question": self.text,
+            "answers": [{"index": i, "text": answer} for i, answer in answers],
+        }
+
+
+class QuestionSet:
+    """Niezmienny zestaw pytań z indeksami; przy przeładowaniu powstaje nowy obiekt."""
+
+    def __init__(self, questions: list[Question], version: int):
+        self.version = version
+        self.questions = questions
+        self.by_id = {question.id: question for question in questions}
+        pools: dict[object, list[int]] = {}
+        for index, question in enumerate(questions):
+            pools.setdefault(question.level, []).append(index)
+            pools.setdefault((question.level, question.topic), []).append(index)
+        self.pools = pools
+        self.topics = sorted({question.topic for question in questions})
+
+    def pool(self, level: int, topic: str | None = None) -> list[int]:
+        return self.pools.get(level if topic is None else (level, topic), [])
+
+    def counts(self) -> dict[str, dict[int, int]]:
+        return {topic: {level: len(self.pool(level, topic)) for level in range(len(LEVELS))} for topic in self.topics}
+
+
+def _parse(raw: list, source: str) -> list[Question]:
+    questions = []
+    seen = set()
+    for position, item in enumerate(raw):
+        try:
+            question = Question(
+                id=str(item["id"]),
+                topic=str(item["topic"]),
+                level=int(item["level"]),
+                text=str(item["question"]),
+                answers=tuple(str(answer) for answer in item["answers"]),
+                correct=int(item["correct"]),
+            )
+        except (KeyError, TypeError, ValueError) as exc:
+            raise ValueError(f"{source}: pytanie nr {position + 1} jest niepełne ({exc})") from exc
+        if question.id in seen:
+            raise ValueError(f"{source}: powtórzony identyfikator pytania '{question.id}'")
+        if not 0 <= question.level < len(LEVELS):
+            raise ValueError(f"{source}: pytanie '{question.id}' ma nieznany poziom {question.level}")
+        if len(question.answers) < 2 or not 0 <= question.correct < len(question.answers):
+            raise ValueError(f"{source}: pytanie '{question.id}' ma nieprawidłowe odpowiedzi")
+        seen.add(question.id)
+        questions.append(question)
+    return questions
+
+
+class QuestionBank:
+    """Aktualny zestaw pytań i jego przeładowanie po zmianie pliku."""
+
+    def __init__(self, path: str):
+        self.path = path
+        self.current = QuestionSet([], 0)
+        self._lock = threading.Lock()
+        self._stamp: tuple[int, int] | None = None
+        self.reloads = 0
+        self.errors = 0
+
+    def load(self) -> None:
+        """Wczytuje plik i podmienia zestaw; przy błędzie zostaje poprzedni (i wyjątek idzie dalej)."""
+        with self._lock:
+            stat = os.stat(self.path)
+            with open(self.path, encoding="utf-8") as f:
+                raw = json.load(f)
+            if not isinstance(raw, list):
+                raise ValueError(f"{self.path}: oczekiwano listy pytań")
+            questions = _parse(raw, self.path)
+            self.current = QuestionSet(questions, self.current.version + 1)
+            self._stamp = (stat.st_mtime_ns, stat.st_size)
+            self.reloads += 1
+        logger.info("Wczytano bank pytań: %s pytań z %s", len(questions), self.path)
+
+    def reload_if_changed(self) -> None:
+        """Zadanie w tle: przeładowanie po zmianie pliku (porównanie mtime i rozmiaru)."""
+        try:
+            stat = os.stat(self.path)
+        except FileNotFoundError:
+            if self._stamp != _MISSING:
+                self._stamp = _MISSING
+                logger.warning("Brak pliku z pytaniami %s — odpowiedzi rozstrzyga rzut kością", self.path)
+            return
+        if (stat.st_mtime_ns, stat.st_size) == self._stamp:
+            return
+        try:
+            self.load()
+        except (OSError, ValueError):
+            self.errors += 1
+            # Zapamiętujemy stempel, żeby nie logować tego samego błędu co kilka sekund.
+            self._stamp = (stat.st_mtime_ns, stat.st_size)
+            logger.exception("Nie udało się przeładować banku pytań, zostaje poprzednia wersja")
+
+    def stats(self) -> dict:
+        current = self.current
+        return {
+            "questions": len(current.questions),
+            "topics": len(current.topics),
+            "per_level": [len(current.pool(level)) for level in range(len(LEVELS))],
+            "version": current.version,
+            "reloads": self.reloads,
+            "errors": self.errors,
+        }
+
+
+question_bank = QuestionBank(BATALLA_QUESTIONS_PATH)
+
+
+class QuestionSampler:
+    """Losowanie bez powtórzeń w obrębie jednej gry.
+
+    Dla każdej puli pamiętamy, ile pytań już padło (k), i słownik zamian leniwego
+    tasowania — losowanie to wybór pozycji z [k, n) i jedna zamiana, bez kopiowania
+    puli. Po wyczerpaniu puli zaczynamy nowy cykl; po przeładowaniu banku stan znika.
+    """
+
+    __slots__ = ("_version", "_pools")
+
+    def __init__(self):
+        self._version = 0
+        self._pools: dict[object, tuple[int, dict[int, int]]] = {}
+
+    def draw(self, questions: QuestionSet, level: int, topic: str | None = None) -> Question | None:
+        """Pytanie z poziomu `level`; przy pustej puli — z najbliższego poziomu, który ma pytania."""
+        if self._version != questions.version:
+            self._version = questions.version
+            self._pools = {}
+        for candidate in sorted(range(len(LEVELS)), key=lambda other: (abs(other - level), -other)):
+            pool = questions.pool(candidate, topic)
+            if pool:
+                return questions.questions[pool[self._next(candidate if topic is None else (candidate, topic), len(pool))]]
+        return None
+
+    def _next(self, key, size: int) -> int:
+        drawn, swaps = self._pools.get(key, (0, {}))
+        if drawn >= size:
+            drawn, swaps = 0, {}
+        pick = random.randrange(drawn, size)
+        value = swaps.get(pick, pick)
+        swaps[pick] = swaps.get(drawn, drawn)
+        swaps.pop(drawn, None)
+        self._pools[key] = (drawn + 1, swaps)
+        return value
@@ -0,0 +1,146 @@
+"""Zasady Wielkiej Studenckiej Batalli (zasady/zasady.txt) jako dane dla silnika.
+
+Plansza odpowiada polom z plansza/index.html: każde piętro to pętla pól, pole 0
+to Start (czesne). Liczby, których zasady nie podają (progi pytań, ceny w
+dziekanacie, kryształki na piętro), są tu w jednym miejscu, żeby łatwo je stroić.
+"""
+from dataclasses import dataclass, field, fields, replace
+
+START = 0
+SALA = 1
+LAZIENKA = 2
+AULA = 3
+DZIEKANAT = 4
+PRAKTYKI = 5
+SZANSA = 6
+BIBLIOTEKA = 7
+STOLOWKA = 8  # "strefa relaksu" na planszy — automaty z jedzeniem
+
+FIELD_NAMES = ("start", "sala", "lazienka", "aula", "dziekanat", "praktyki", "szansa", "biblioteka", "strefarelaksu")
+
+_CODES = {"T": START, "S": SALA, "L": LAZIENKA, "A": AULA, "D": DZIEKANAT, "P": PRAKTYKI, "C": SZANSA, "B": BIBLIOTEKA, "R": STOLOWKA}
+
+
+def _floor(layout: str) -> bytes:
+    return bytes(_CODES[code] for code in layout)
+
+
+# Piętra I–III z plansza/index.html (c0–c49, c50–c83, c84–c101).
+FLOORS = (
+    _floor("TSSLASDSSLSPSSLCABSRSLSALSDSSLPSSCLASBCDSACSSLSPSS"),
+    _floor("TSLSSDCASSLSPSSBSASALCSDSSALBRSASC"),
+    _floor("TSPADSCSALSBSPSALC"),
+)
+
+
+@dataclass(frozen=True)
+class PlayerClass:
+    hp: int
+    luck: int
+    wisdom: int
+    coins: int
+    question_shift: int  # przesunięcie poziomu pytań (+1 trudniejsze)
+    internship_turns: int
+    canteen_hp: int
+
+
+@dataclass(frozen=True)
+class ChanceCard:
+    text: str
+    coins: int = 0
+    hp: int = 0
+    luck: int = 0
+    wisdom: int = 0
+    move: int = 0
+
+
+CLASSES = {
+    "sportowiec": PlayerClass(hp=5, luck=2, wisdom=3, coins=1, question_shift=0, internship_turns=2, canteen_hp=2),
+    "leniuch": PlayerClass(hp=3, luck=5, wisdom=2, coins=2, question_shift=1, internship_turns=3, canteen_hp=1),
+    "madrala": PlayerClass(hp=3, luck=2, wisdom=5, coins=0, question_shift=-1, internship_turns=3, canteen_hp=1),
+}
+CLASS_NAMES = tuple(CLASSES)
+
+CHANCE_CARDS = (
+    ChanceCard("Przelew od rodziców!", coins=2),
+    ChanceCard("Urodziny — koperta od babci!", coins=1),
+    ChanceCard("Stypendium naukowe!", hp=1),
+    ChanceCard("Oblałeś kolokwium!", hp=-1),
+    ChanceCard("Prowadzący odwołał zajęcia!", luck=1),
+    ChanceCard("Niespodziewana kartkówka!", wisdom=-2),
+    ChanceCard("Znalazłeś notatki kolegi!", wisdom=2),
+    ChanceCard("Energy drink zawiódł!", move=-3),
+    ChanceCard("Kolega z roku pomógł!", move=2),
+    ChanceCard("Konkurs wiedzy!", hp=1, wisdom=1),
+    ChanceCard("Mandat w tramwaju!", coins=-1),
+)
+
+
+@dataclass(frozen=True)
+class Rules:
+    floors: tuple[bytes, ...] = FLOORS
+    classes: dict[str, PlayerClass] = field(default_factory=lambda: dict(CLASSES))
+    chance_cards: tuple[ChanceCard, ...] = CHANCE_CARDS
+    dice_sides: int = 6
+    tuition: int = 1
+    last_floor_tuition: int = 3
+    crystals_to_advance: int = 3  # na ostatnim piętrze: do obrony w dziekanacie
+    exchange_hp_price: int = 2
+    exchange_crystal_price: int = 3
+    internship_card_price: int = 2
+    internship_card_turns: int = 1
+    hint_price: int = 1
+    hint_bonus: int = 3
+    library_crystal_price: int = 2  # ostatnie piętro
+    # Pytanie to rzut k20 + mądrość + szczęście // 2 (+ podpowiedź) przeciw progowi poziomu.
+    exam_die: int = 20
+    exam_thresholds: tuple[int, ...] = (8, 11, 14, 17)
+    exam_base_level: int = 1
+    defense_questions: int = 2
+
+
+DEFAULT_RULES = Rules()
+
+
+def rules_from_config(config: dict, base: Rules = DEFAULT_RULES) -> Rules:
+    """Zasady z pliku konfiguracyjnego (np. do symulacji): podane pola nadpisują `base`.
+
+    Piętra podaje się jako napisy z kodami pól (jak w FLOORS), klasy jako częściowe
+    nadpisania ({"leniuch": {"coins": 3}}), karty Szansy jako pełną listę obiektów.
+    """
+    known = {item.name for item in fields(Rules)}
+    unknown = set(config) - known
+    if unknown:
+        raise ValueError(f"Nieznane pola zasad: {', '.join(sorted(unknown))}")
+    changes = {}
+    for name, value in config.items():
+        if name == "floors":
+            try:
+                value = tuple(_floor(layout) for layout in value)
+            except KeyError as exc:
+                raise ValueError(f"Nieznany kod pola {exc} w układzie piętra") from exc
+            if not value or any(not layout or layout[0] != START for layout in value):
+                raise ValueError("Każde piętro musi zaczynać się polem Start (T)")
+        elif name == "classes":
+            classes = dict(base.classes)
+            for class_name, overrides in value.items():
+                if class_name not in classes:
+                    raise ValueError(f"Nieznana klasa postaci '{class_name}'")
+                try:
+                    classes[class_name] = replace(classes[class_name], **overrides)
+                except TypeError as exc:
+                    raise ValueError(f"Nieprawidłowe nadpisanie klasy '{class_name}' ({exc})") from exc
+            value = classes
+        elif name == "chance_cards":
+            try:
+                value = tuple(ChanceCard(**card) for card in value)
+            except TypeError as exc:
+                raise ValueError(f"Nieprawidłowa karta Szansy ({exc})") from exc
+            if not value:
+                raise ValueError("Talia Szansy nie może być pusta")
+        elif name == "exam_thresholds":
+            value = tuple(int(threshold) for threshold in value)
+        else:
+            value = int(value)
+        changes[name] = value
+    return replace(base, **changes)
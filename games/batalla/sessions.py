@@ -0,0 +1,320 @@
+import logging
+import os
+import secrets
+import time
+
+from sqlalchemy import select
+from sqlalchemy.exc import SQLAlchemyError
+from starlette.concurrency import run_in_threadpool
+
+from database import SessionLocal
+from events import event_hub
+from games.batalla.engine import FINISHED, PENDING_EXAM, PHASES, PLAYING, Game, MoveError
+from games.batalla.questions import QuestionSampler, question_bank
+from models import BatallaGame, GameInvitation, User
+from user_stats import BATALLA, LOSS, WIN, game_results
+
+logger = logging.getLogger(__name__)
+
+# Gry żyją w pamięci procesu, który przyjął zaproszenie (jak partie kółka i krzyżyka),
+# a migawki w tabeli batalla_games pozwalają je podjąć po restarcie lub wyrzuceniu z pamięci.
+BATALLA_MAX_SESSIONS = int(os.getenv("BATALLA_MAX_SESSIONS", "10000"))
+BATALLA_SNAPSHOT_INTERVAL_SECONDS = float(os.getenv("BATALLA_SNAPSHOT_INTERVAL_SECONDS", "10"))
+# Gra bez akcji przez tyle sekund zostaje tylko w bazie (wraca do pamięci przy następnym odczycie).
+BATALLA_IDLE_TTL_SECONDS = float(os.getenv("BATALLA_IDLE_TTL_SECONDS", "900"))
+
+
+class GameSession:
+    __slots__ = ("id", "row_id", "game", "usernames", "updated_at", "sampler", "question", "last_answer")
+
+    def __init__(self, game_id: int, game: Game, usernames: tuple[str, ...], row_id: int | None = None):
+        self.id = game_id
+        # Id wiersza migawki — po usunięciu konta gracza invitation_id w batalla_games staje się NULL.
+        self.row_id = row_id
+        self.game = game
+        self.usernames = usernames
+        self.updated_at = time.monotonic()
+        self.sampler = QuestionSampler()
+        self.question = None  # bieżące pytanie (poprawna odpowiedź zostaje na serwerze)
+        self.last_answer: dict | None = None
+        self.sync_question()
+
+    def apply(self, player: int, action: str, value: str | None) -> None:
+        """Wykonuje akcję gracza; MoveError, gdy zasady na nią nie pozwalają."""
+        game = self.game
+        self.last_answer = None
+        if action == "class":
+            game.choose_class(player, value or "")
+        elif action == "roll":
+            game.roll(player)
+        elif action == "choose":
+            game.choose(player, value or "")
+        elif action == "answer":
+            self._answer(player, value)
+        else:
+            game.resign(player)
+        self.sync_question()
+
+    def _answer(self, player: int, value: str | None) -> None:
+        question = self.question
+        if question is None:
+            raise MoveError("Nie ma teraz pytania do odpowiedzi")
+        try:
+            index = int(value)
+        except (TypeError, ValueError):
+            raise MoveError("Nieprawidłowa odpowiedź")
+        correct = index == question.correct
+        self.game.answer(player, correct)
+        self.question = None
+        self.last_answer = {"question": question.id, "answer": index, "correct": correct, "correct_answer": question.correct}
+
+    def sync_question(self) -> None:
+        """Przy oczekującym pytaniu losuje je z banku (bez powtórzeń w tej grze); pusty bank — rzut kością."""
+        game = self.game
+        while game.phase == PLAYING and game.pending & -game.pending == PENDING_EXAM:
+            if self.question is not None:
+                return
+            self.question = self.sampler.draw(question_bank.current, game.exam_level)
+            if self.question is None:
+                game.answer(game.turn, game.exam_roll(game.turn))
+        self.question = None
+
+    def state(self) -> dict:
+        state = self.game.state()
+        for player, username in zip(state["players"], self.usernames):
+            player["username"] = username
+        question = None
+        if self.question is not None:
+            question = self.question.public(hint=state["players"][self.game.turn]["hint"])
+        return {"id": self.id, **state, "question": question, "last_answer": self.last_answer}
+
+    def to_row_values(self) -> dict:
+        game = self.game
+        return {
+            "status": PHASES[game.phase],
+            "winner_id": game.user_ids[game.winner] if game.winner is not None else None,
+            "version": game.version,
+            "state": game.to_snapshot(),
+        }
+
+
+class GameRegistry:
+    """Trwające gry w pamięci procesu, kluczem jest id zaakceptowanego zaproszenia.
+
+    Akcje wykonujemy w wątku pętli zdarzeń (bez blokad); zmienione gry trafiają do
+    zbioru `_dirty` i zadanie w tle zapisuje ich migawki hurtem, zamiast pisać do
+    bazy przy każdym rzucie kostką.
+    """
+
+    def __init__(self, max_sessions: int):
+        self.max_sessions = max_sessions
+        self._sessions: dict[int, GameSession] = {}
+        self._dirty: set[int] = set()
+        self.started = 0
+        self.finished = 0
+        self.restored = 0
+        self.snapshots = 0
+
+    def __len__(self) -> int:
+        return len(self._sessions)
+
+    @property
+    def full(self) -> bool:
+        return len(self._sessions) >= self.max_sessions
+
+    def create(self, game_id: int, user_ids: tuple[int, ...], usernames: tuple[str, ...]) -> GameSession:
+        session = self._sessions.get(game_id)
+        if session is None:
+            game = Game(user_ids, secrets.randbits(64))
+            session = self._sessions[game_id] = GameSession(game_id, game, usernames)
+            self._dirty.add(game_id)
+            self.started += 1
+        return session
+
+    def get(self, game_id: int) -> GameSession | None:
+        return self._sessions.get(game_id)
+
+    def adopt(self, session: GameSession) -> GameSession:
+        """Przyjmuje grę odtworzoną z migawki (chyba że w międzyczasie wróciła do pamięci)."""
+        existing = self._sessions.get(session.id)
+        if existing is not None:
+            return existing
+        self._sessions[session.id] = session
+        self.restored += 1
+        return session
+
+    def touch(self, session: GameSession) -> None:
+        """Wołane po każdej akcji: gra trafi do najbliższej migawki."""
+        session.updated_at = time.monotonic()
+        self._dirty.add(session.id)
+        if session.game.finished:
+            self.finished += 1
+
+    def take_dirty(self, game_ids=None) -> dict[int, tuple[int | None, tuple[int, ...], dict]]:
+        """Id wiersza migawki, gracze i wartości wiersza każdej zmienionej gry (lub tylko `game_ids`)."""
+        taken = set(self._dirty) if game_ids is None else self._dirty.intersection(game_ids)
+        self._dirty -= taken
+        values = {}
+        for game_id in taken:
+            session = self._sessions.get(game_id)
+            if session is not None:
+                values[game_id] = (session.row_id, session.game.user_ids, session.to_row_values())
+        return values
+
+    def mark_dirty(self, game_ids) -> None:
+        self._dirty.update(game_id for game_id in game_ids if game_id in self._sessions)
+
+    def mark_saved(self, row_ids: dict[int, int]) -> None:
+        for game_id, row_id in row_ids.items():
+            session = self._sessions.get(game_id)
+            if session is not None:
+                session.row_id = row_id
+
+    def discard(self, game_ids) -> None:
+        for game_id in game_ids:
+            self._sessions.pop(game_id, None)
+            self._dirty.discard(game_id)
+
+    def end_for_player(self, user_id: int) -> list[GameSession]:
+        """Usuwa konto z gier w pamięci: trwające kończy poddaniem (wygrywa przeciwnik) i zwraca wszystkie."""
+        ended = []
+        for session in self._sessions.values():
+            player = session.game.index_of(user_id)
+            if player is None:
+                continue
+            if not session.game.finished:
+                try:
+                    session.apply(player, "resign", None)
+                except MoveError:
+                    pass  # gracz już odpadł z gry
+                self.touch(session)
+            ended.append(session)
+        return ended
+
+    def evict_idle(self) -> int:
+        """Usuwa z pamięci gry bez akcji dłużej niż BATALLA_IDLE_TTL_SECONDS (już zapisane)."""
+        now = time.monotonic()
+        idle = [
+            game_id
+            for game_id, session in self._sessions.items()
+            if game_id not in self._dirty and now - session.updated_at > BATALLA_IDLE_TTL_SECONDS
+        ]
+        for game_id in idle:
+            del self._sessions[game_id]
+        return len(idle)
+
+    def stats(self) -> dict:
+        return {
+            "active": sum(1 for session in self._sessions.values() if not session.game.finished),
+            "in_memory": len(self._sessions),
+            "max_sessions": self.max_sessions,
+            "dirty": len(self._dirty),
+            "started": self.started,
+            "finished": self.finished,
+            "restored": self.restored,
+            "snapshots": self.snapshots,
+        }
+
+
+games = GameRegistry(BATALLA_MAX_SESSIONS)
+
+
+def publish_state(session: GameSession) -> None:
+    event_hub.publish(session.game.user_ids, "batalla.updated", session.state())
+
+
+def _results(user_ids: tuple[int, ...], winner_id: int | None) -> dict[int, str]:
+    return {user_id: WIN if user_id == winner_id else LOSS for user_id in user_ids}
+
+
+def _save_snapshots(
+    values: dict[int, tuple[int | None, tuple[int, ...], dict]]
+) -> tuple[dict[int, int], list[int], list[int]]:
+    """Zapisuje migawki, każdą w osobnym savepoincie (błąd jednej gry nie cofa pozostałych).
+
+    Zwraca id wierszy zapisanych gier, gry osierocone (konto gracza usunięte — nie ma już
+    ich zaproszenia albo graczy) i gry, których zapis się nie udał (do ponowienia).
+    """
+    finished = PHASES[FINISHED]
+    saved, orphaned, failed = {}, [], []
+    with SessionLocal() as db:
+        present = set(db.scalars(select(User.id).where(
+            User.id.in_({user_id for _, user_ids, _ in values.values() for user_id in user_ids})
+        )))
+        by_id = {
+            row.id: row
+            for row in db.scalars(select(BatallaGame).where(
+                BatallaGame.id.in_([row_id for row_id, _, _ in values.values() if row_id is not None])
+            ))
+        }
+        by_invitation = {
+            row.invitation_id: row
+            for row in db.scalars(select(BatallaGame).where(
+                BatallaGame.invitation_id.in_([game_id for game_id, (row_id, _, _) in values.items() if row_id is None])
+            ))
+        }
+        invitations = set(db.scalars(select(GameInvitation.id).where(GameInvitation.id.in_(values))))
+        for game_id, (row_id, user_ids, row_values) in values.items():
+            row = by_id.get(row_id) if row_id is not None else by_invitation.get(game_id)
+            if not present.issuperset(user_ids) or (row is None and game_id not in invitations):
+                orphaned.append(game_id)
+                continue
+            try:
+                with db.begin_nested():
+                    # Wynik do statystyk liczymy raz — przy migawce, która pierwsza zapisuje koniec gry.
+                    if row_values["status"] == finished and (row is None or row.status != finished):
+                        db.execute(game_results(db, BATALLA, _results(user_ids, row_values["winner_id"])))
+                    if row is None:
+                        row = BatallaGame(invitation_id=game_id, **row_values)
+                        db.add(row)
+                    else:
+                        for key, value in row_values.items():
+                            setattr(row, key, value)
+                    db.flush()
+            except SQLAlchemyError:
+                logger.exception("Nie udało się zapisać migawki gry Batalli %s", game_id)
+                failed.append(game_id)
+                continue
+            saved[game_id] = row.id
+        db.commit()
+    return saved, orphaned, failed
+
+
+async def snapshot_games_job() -> None:
+    """Zadanie w tle: zapis migawek gier zmienionych od poprzedniego przebiegu i zwolnienie bezczynnych."""
+    values = games.take_dirty()
+    if values:
+        try:
+            saved, orphaned, failed = await run_in_threadpool(_save_snapshots, values)
+        except Exception:
+            games.mark_dirty(values)
+            raise
+        games.mark_saved(saved)
+        games.mark_dirty(failed)
+        # Konto gracza zostało usunięte (np. w innym procesie) — takiej gry nie da się już zapisać ani podjąć.
+        games.discard(orphaned)
+        games.snapshots += len(saved)
+        logger.debug("Zapisano migawki %s gier Batalli", len(saved))
+        if orphaned:
+            logger.info("Usunięto z pamięci %s gier Batalli graczy z usuniętymi kontami", len(orphaned))
+    evicted = games.evict_idle()
+    if evicted:
+        logger.info("Usunięto z pamięci %s bezczynnych gier Batalli", evicted)
+
+
+async def end_player_games(user_id: int) -> None:
+    """Przed usunięciem konta: kończy jego gry w pamięci (wygrywa przeciwnik), zapisuje je i zwalnia.
+
+    Po usunięciu konta zaproszenie znika kaskadowo, więc gry nie dałoby się już zapisać.
+    """
+    ended = games.end_for_player(user_id)
+    if not ended:
+        return
+    game_ids = [session.id for session in ended]
+    for session in ended:
+        publish_state(session)
+    try:
+        await run_in_threadpool(_save_snapshots, games.take_dirty(game_ids))
+    except Exception:
+        logger.exception("Nie udało się zapisać gier Batalli usuwanego konta %s", user_id)
+    games.discard(game_ids)
@@ -0,0 +1,267 @@
+"""Symulator Monte Carlo do strojenia zasad Batalli (klasy, czesne, kryształki, praktyki).
+
+Użycie:
+    python -m games.batalla.simulator --games 200000
+    python -m games.batalla.simulator zasady.json --games 1000000 --players 3 --policy ostrozna
+
+Gry rozgrywa ten sam silnik co serwer (`Game`), więc wynik symulacji dotyczy dokładnie
+tych zasad, które obowiązują w grach online. Graczami sterują proste polityki, na pytania
+odpowiada rzut z ziarna gry (`exam_roll`: k20 + mądrość + szczęście // 2 przeciw progom
+poziomu). Gry dzielimy na paczki liczone równolegle w procesach; każdy proces zwraca
+tylko sumy (wygrane, długości, krzywe zasobów), które na końcu sumujemy.
+
+Plik zasad to obiekt JSON z polami `Rules`, które mają się różnić od domyślnych, np.
+{"tuition": 2, "classes": {"leniuch": {"coins": 3}}, "exam_thresholds": [7, 10, 13, 16]}.
+Wynik (JSON na stdout albo do --out): odsetek wygranych na klasę i miejsce przy stole,
+długość gier w rundach oraz średnie monety / kryształki / hp / piętro w kolejnych turach.
+"""
+import argparse
+import json
+import logging
+import multiprocessing
+import os
+import random
+import sys
+import time
+from concurrent.futures import ProcessPoolExecutor
+
+from games.batalla.engine import (
+    _CLASS,
+    _COINS,
+    _CRYSTALS,
+    _FLOOR,
+    _HP,
+    FINISHED,
+    FLAG_OUT,
+    MAX_PLAYERS,
+    PENDING_EXAM,
+    STRIDE,
+    Game,
+)
+from games.batalla.rules import CLASS_NAMES, DEFAULT_RULES, Rules, rules_from_config
+
+logger = logging.getLogger("batalla_simulator")
+
+# Zasoby w krzywych (kolumny wiersza gracza).
+CURVE_COLUMNS = (("coins", _COINS), ("crystals", _CRYSTALS), ("hp", _HP), ("floor", _FLOOR))
+# Gra dłuższa niż tyle akcji jest przerywana (zasady bez szans na koniec nie zawieszą symulacji).
+MAX_ACTIONS = 20000
+
+
+def _losowa(game: Game, player: int, options: list[str], rand: random.Random) -> str:
+    return rand.choice(options)
+
+
+def _zachlanna(game: Game, player: int, options: list[str], rand: random.Random) -> str:
+    """Kryształki i awans jak najszybciej, monety zamiast hp."""
+    for option in ("defend", "advance", "crystal", "card", "hint", "coin"):
+        if option in options:
+            return option
+    return "end" if "end" in options else options[0]
+
+
+def _ostrozna(game: Game, player: int, options: list[str], rand: random.Random) -> str:
+    """Najpierw życie i opłacone czesne, dopiero potem kryształki."""
+    low_hp = game._get(player, _HP) <= 2
+    order = ("defend", "advance", "hp", "prepay", "card", "crystal", "hint", "coin") if low_hp else (
+        "defend", "advance", "prepay", "crystal", "card", "hint", "hp", "luck"
+    )
+    for option in order:
+        if option in options:
+            return option
+    return "end" if "end" in options else options[0]
+
+
+POLICIES = {"losowa": _losowa, "zachlanna": _zachlanna, "ostrozna": _ostrozna}
+
+
+def load_rules(path: str | None) -> Rules:
+    if path is None:
+        return DEFAULT_RULES
+    with open(path, encoding="utf-8") as f:
+        config = json.load(f)
+    if not isinstance(config, dict):
+        raise ValueError(f"{path}: oczekiwano obiektu JSON z polami zasad")
+    return rules_from_config(config)
+
+
+def _empty_totals(players: int, curve_turns: int) -> dict:
+    return {
+        "games": 0,
+        "capped": 0,
+        "rounds": 0,
+        "rounds_min": None,
+        "rounds_max": 0,
+        "actions": 0,
+        "seated": dict.fromkeys(CLASS_NAMES, 0),
+        "wins": dict.fromkeys(CLASS_NAMES, 0),
+        "eliminated": dict.fromkeys(CLASS_NAMES, 0),
+        "seat_wins": [0] * players,
+        # klasa -> tura -> [liczba próbek, suma monet, kryształków, hp, pięter]
+        "curves": {name: [[0] * (1 + len(CURVE_COLUMNS)) for _ in range(curve_turns)] for name in CLASS_NAMES},
+    }
+
+
+def _play(game: Game, policies: list, rand: random.Random, totals: dict, curve_turns: int) -> None:
+    players = len(game.user_ids)
+    classes = [CLASS_NAMES[game._get(player, _CLASS)] for player in range(players)]
+    turns = [0] * players
+    actions = 0
+    while game.phase != FINISHED and actions < MAX_ACTIONS:
+        player = game.turn
+        actions += 1
+        pending = game.pending & -game.pending
+        if pending == PENDING_EXAM:
+            game.answer(player, game.exam_roll(player))
+        elif pending:
+            game.choose(player, policies[player](game, player, game.options(), rand))
+        else:
+            turn = turns[player]
+            if turn < curve_turns:
+                row = totals["curves"][classes[player]][turn]
+                row[0] += 1
+                base = player * STRIDE
+                for index, (_, column) in enumerate(CURVE_COLUMNS, 1):
+                    row[index] += game.players[base + column]
+            turns[player] = turn + 1
+            game.roll(player)
+    rounds = max(turns)
+    totals["games"] += 1
+    totals["actions"] += actions
+    totals["rounds"] += rounds
+    totals["rounds_max"] = max(totals["rounds_max"], rounds)
+    totals["rounds_min"] = rounds if totals["rounds_min"] is None else min(totals["rounds_min"], rounds)
+    for player, name in enumerate(classes):
+        totals["seated"][name] += 1
+        if game._has(player, FLAG_OUT):
+            totals["eliminated"][name] += 1
+    if game.winner is None:
+        totals["capped"] += 1
+    else:
+        totals["wins"][classes[game.winner]] += 1
+        totals["seat_wins"][game.winner] += 1
+
+
+def simulate_batch(
+    rules: Rules, seed: int, count: int, players: int, classes: tuple[str, ...] | None,
+    policies: tuple[str, ...], curve_turns: int,
+) -> dict:
+    """Rozgrywa `count` gier od ziarna `seed` (deterministycznie) i zwraca ich sumy."""
+    rand = random.Random(seed)
+    totals = _empty_totals(players, curve_turns)
+    seat_policies = [POLICIES[policies[seat % len(policies)]] for seat in range(players)]
+    user_ids = tuple(range(1, players + 1))
+    for _ in range(count):
+        game = Game(user_ids, rand.getrandbits(64), rules)
+        for player in range(players):
+            game.choose_class(player, classes[player] if classes else rand.choice(CLASS_NAMES))
+        game.events = []
+        _play(game, seat_policies, rand, totals, curve_turns)
+    return totals
+
+
+def _merge(total: dict, part: dict) -> None:
+    for key in ("games", "capped", "rounds", "actions"):
+        total[key] += part[key]
+    total["rounds_max"] = max(total["rounds_max"], part["rounds_max"])
+    if part["rounds_min"] is not None:
+        total["rounds_min"] = part["rounds_min"] if total["rounds_min"] is None else min(total["rounds_min"], part["rounds_min"])
+    for key in ("seated", "wins", "eliminated"):
+        for name, value in part[key].items():
+            total[key][name] += value
+    total["seat_wins"] = [a + b for a, b in zip(total["seat_wins"], part["seat_wins"])]
+    for name, rows in part["curves"].items():
+        for row, other in zip(total["curves"][name], rows):
+            for index, value in enumerate(other):
+                row[index] += value
+
+
+def report(totals: dict, seconds: float) -> dict:
+    games = totals["games"]
+    finished = games - totals["capped"]
+    curves = {}
+    for name, rows in totals["curves"].items():
+        curves[name] = {
+            resource: [round(row[index] / row[0], 3) for row in rows if row[0]]
+            for index, (resource, _) in enumerate(CURVE_COLUMNS, 1)
+        }
+    return {
+        "games": games,
+        "unfinished": totals["capped"],
+        "seconds": round(seconds, 2),
+        "games_per_second": round(games / seconds, 1) if seconds else None,
+        # Odsetek wygranych wśród gier, w których klasa siedziała przy stole.
+        "win_rate": {
+            name: round(totals["wins"][name] / seated, 4) if seated else None
+            for name, seated in totals["seated"].items()
+        },
+        "elimination_rate": {
+            name: round(totals["eliminated"][name] / seated, 4) if seated else None
+            for name, seated in totals["seated"].items()
+        },
+        "seat_win_rate": [round(wins / finished, 4) if finished else None for wins in totals["seat_wins"]],
+        "rounds": {
+            "mean": round(totals["rounds"] / games, 2) if games else None,
+            "min": totals["rounds_min"],
+            "max": totals["rounds_max"],
+        },
+        "actions_per_game": round(totals["actions"] / games, 1) if games else None,
+        "curves": curves,
+    }
+
+
+def main(argv: list[str] | None = None) -> int:
+    parser = argparse.ArgumentParser(description="Symulacja Monte Carlo zasad Wielkiej Studenckiej Batalli")
+    parser.add_argument("rules", nargs="?", help="plik JSON z nadpisaniami zasad (domyślnie zasady z gry)")
+    parser.add_argument("--games", type=int, default=100000)
+    parser.add_argument("--players", type=int, default=2, choices=range(2, MAX_PLAYERS + 1))
+    parser.add_argument("--classes", help="klasy graczy po przecinku (domyślnie losowe w każdej grze)")
+    parser.add_argument("--policy", default="zachlanna",
+                        help=f"polityka graczy lub lista po przecinku dla kolejnych miejsc ({', '.join(POLICIES)})")
+    parser.add_argument("--curve-turns", type=int, default=60, help="ile tur gracza obejmują krzywe zasobów")
+    parser.add_argument("--batch-size", type=int, default=5000)
+    parser.add_argument("--workers", type=int, default=os.cpu_count() or 1)
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--out", help="zapisz raport do pliku zamiast na stdout")
+    args = parser.parse_args(argv)
+
+    logging.basicConfig(level=logging.INFO, format="%(asctime)s %(levelname)s %(name)s: %(message)s")
+    rules = load_rules(args.rules)
+    classes = tuple(args.classes.split(",")) if args.classes else None
+    if classes and (len(classes) != args.players or not set(classes) <= set(CLASS_NAMES)):
+        parser.error(f"--classes: podaj {args.players} klasy spośród {', '.join(CLASS_NAMES)}")
+    policies = tuple(args.policy.split(","))
+    if not set(policies) <= set(POLICIES):
+        parser.error(f"--policy: dostępne polityki to {', '.join(POLICIES)}")
+
+    batches = [
+        (args.seed * 1_000_003 + index, min(args.batch_size, args.games - start))
+        for index, start in enumerate(range(0, args.games, args.batch_size))
+    ]
+    totals = _empty_totals(args.players, args.curve_turns)
+    start = time.perf_counter()
+    with ProcessPoolExecutor(max_workers=args.workers, mp_context=multiprocessing.get_context("spawn")) as executor:
+        futures = [
+            executor.submit(simulate_batch, rules, seed, count, args.players, classes, policies, args.curve_turns)
+            for seed, count in batches
+        ]
+        for done, future in enumerate(futures, 1):
+            _merge(totals, future.result())
+            if done % max(1, len(futures) // 10) == 0:
+                logger.info("Rozegrano %s z %s gier", totals["games"], args.games)
+
+    result = report(totals, time.perf_counter() - start)
+    result["rules"] = args.rules
+    result["players"] = args.players
+    result["policy"] = list(policies)
+    text = json.dumps(result, indent=2, ensure_ascii=False)
+    if args.out:
+        with open(args.out, "w", encoding="utf-8") as f:
+            f.write(text + "\n")
+    else:
+        print(text)
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,10 @@
+from games.sudoku.bank import SUDOKU_BANK_REFILL_SECONDS, puzzle_bank
+from games.sudoku.generator import DIFFICULTIES, Puzzle, generate_puzzle, rate
+from games.sudoku.leaderboard import (
+    SUDOKU_LEADERBOARD_LIMIT_MAX,
+    SUDOKU_LEADERBOARD_REFRESH_SECONDS,
+    leaderboard,
+    rebuild_leaderboard,
+)
+from games.sudoku.solver import count_solutions, has_unique_solution, is_solution, solve
+from games.sudoku.tokens import IssuedPuzzle, issue_puzzle_token, read_puzzle_token
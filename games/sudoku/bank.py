@@ -0,0 +1,82 @@
+import asyncio
+import logging
+import os
+import random
+import threading
+import time
+from collections import deque
+
+from games.sudoku.generator import DIFFICULTIES, Puzzle, generate_puzzle
+
+logger = logging.getLogger(__name__)
+
+SUDOKU_BANK_SIZE = int(os.getenv("SUDOKU_BANK_SIZE", "20"))
+SUDOKU_BANK_REFILL_SECONDS = float(os.getenv("SUDOKU_BANK_REFILL_SECONDS", "60"))
+
+
+class PuzzleBank:
+    """Zapas gotowych plansz na każdy poziom trudności (w pamięci procesu).
+
+    `take` tylko zdejmuje planszę z kolejki; generowaniem zajmuje się zadanie w tle
+    (`refill` w threadpoolu), budzone, gdy zapas spadnie poniżej połowy. Każdy worker
+    ma własny bank.
+    """
+
+    def __init__(self, size: int):
+        self.size = size
+        self._puzzles: dict[str, deque[Puzzle]] = {difficulty: deque() for difficulty in DIFFICULTIES}
+        self._lock = threading.Lock()
+        self._rng = random.Random()
+        self.served = 0
+        self.misses = 0
+        self.generated = 0
+        self.wakeup = asyncio.Event()
+
+    def take(self, difficulty: str) -> Puzzle | None:
+        """Plansza z banku albo None, gdy zapas tego poziomu się wyczerpał. Wołane z pętli zdarzeń."""
+        with self._lock:
+            puzzles = self._puzzles[difficulty]
+            puzzle = puzzles.popleft() if puzzles else None
+            remaining = len(puzzles)
+            if puzzle is None:
+                self.misses += 1
+            else:
+                self.served += 1
+        if remaining < self.size / 2:
+            self.wakeup.set()
+        return puzzle
+
+    def generate(self, difficulty: str) -> Puzzle:
+        return generate_puzzle(difficulty, self._rng)
+
+    def refill(self) -> None:
+        """Dopełnia wszystkie poziomy do `size`, po jednej planszy na poziom na raz,
+        żeby po starcie żaden poziom nie czekał na pozostałe."""
+        start = time.perf_counter()
+        added = 0
+        while True:
+            with self._lock:
+                missing = [d for d, puzzles in self._puzzles.items() if len(puzzles) < self.size]
+            if not missing:
+                break
+            for difficulty in missing:
+                puzzle = self.generate(difficulty)
+                with self._lock:
+                    self._puzzles[difficulty].append(puzzle)
+                    self.generated += 1
+                added += 1
+        if added:
+            logger.info("Bank Sudoku: dodano %s plansz w %.1fs", added, time.perf_counter() - start)
+
+    def stats(self) -> dict:
+        with self._lock:
+            return {
+                "size": self.size,
+                "available": {d: len(puzzles) for d, puzzles in self._puzzles.items()},
+                "served": self.served,
+                "misses": self.misses,
+                "generated": self.generated,
+            }
+
+
+puzzle_bank = PuzzleBank(SUDOKU_BANK_SIZE)
@@ -0,0 +1,166 @@
+"""Generator plansz Sudoku z oceną trudności.
+
+Pełne rozwiązanie powstaje z losowego przeszukiwania pustej planszy, potem
+usuwamy cyfry w losowej kolejności, dopóki rozwiązanie pozostaje jednoznaczne.
+Trudność to nie tylko liczba podpowiedzi: `rate` sprawdza, jakich technik
+potrzebuje człowiek, i plansza trafia na poziom tylko wtedy, gdy ocena się zgadza.
+"""
+import logging
+import random
+from dataclasses import dataclass
+
+from games.sudoku.solver import (
+    ALL_DIGITS,
+    BOX,
+    COL,
+    MASK_DIGITS,
+    POPCOUNT,
+    ROW,
+    UNITS,
+    find_solutions,
+    masks,
+)
+
+logger = logging.getLogger(__name__)
+
+# Oceny z `rate`: same "naked singles", potrzebne "hidden singles", potrzebne zgadywanie.
+NAKED_SINGLES = 1
+HIDDEN_SINGLES = 2
+SEARCH = 3
+
+
+@dataclass(frozen=True)
+class Difficulty:
+    givens: int  # docelowa liczba podpowiedzi (jak removeCells w sudoku/app.js: 81 - usuwane)
+    level: int  # wymagana ocena z `rate`
+    min_seconds: int  # szybszych wyników nie przyjmujemy do rankingu (rozwiązanie automatem)
+
+
+DIFFICULTIES = {
+    "easy": Difficulty(givens=45, level=NAKED_SINGLES, min_seconds=45),
+    "medium": Difficulty(givens=35, level=HIDDEN_SINGLES, min_seconds=60),
+    "hard": Difficulty(givens=27, level=SEARCH, min_seconds=90),
+}
+
+# Po tylu nieudanych próbach bierzemy planszę z oceną najbliższą wymaganej.
+_MAX_ATTEMPTS = 50
+
+
+@dataclass(frozen=True)
+class Puzzle:
+    difficulty: str
+    grid: tuple[int, ...]
+    solution: tuple[int, ...]
+    rating: int
+
+    @property
+    def givens(self) -> int:
+        return sum(1 for value in self.grid if value)
+
+
+def rate(grid: list[int]) -> int:
+    """Najtrudniejsza technika potrzebna do rozwiązania (NAKED_SINGLES / HIDDEN_SINGLES / SEARCH)."""
+    grid = list(grid)
+    state = masks(grid)
+    if state is None:
+        return SEARCH
+    rows, cols, boxes = state
+    level = NAKED_SINGLES
+
+    def place(i: int, digit: int) -> None:
+        bit = 1 << digit
+        grid[i] = digit
+        rows[ROW[i]] |= bit
+        cols[COL[i]] |= bit
+        boxes[BOX[i]] |= bit
+
+    def candidates(i: int) -> int:
+        return ALL_DIGITS & ~(rows[ROW[i]] | cols[COL[i]] | boxes[BOX[i]])
+
+    while True:
+        progress = False
+        for i in range(81):
+            if not grid[i]:
+                mask = candidates(i)
+                if POPCOUNT[mask] == 1:
+                    place(i, MASK_DIGITS[mask][0])
+                    progress = True
+        if progress:
+            continue
+        for unit in UNITS:
+            seen_once = seen_more = 0
+            for i in unit:
+                if not grid[i]:
+                    mask = candidates(i)
+                    seen_more |= seen_once & mask
+                    seen_once |= mask
+            hidden = seen_once & ~seen_more
+            if hidden:
+                for i in unit:
+                    if not grid[i] and candidates(i) & hidden:
+                        place(i, MASK_DIGITS[candidates(i) & hidden][0])
+                        break
+                level = HIDDEN_SINGLES
+                progress = True
+                # Po wpisaniu wracamy do tańszych "naked singles".
+                break
+        if not progress:
+            break
+    return level if all(grid) else SEARCH
+
+
+def generate_full(rng: random.Random) -> list[int]:
+    return find_solutions([0] * 81, limit=1, rng=rng)[0]
+
+
+def _removable(grid: list[int], i: int) -> bool:
+    """Czy po usunięciu pola `i` rozwiązanie nadal jest jednoznaczne.
+
+    Zamiast liczyć wszystkie rozwiązania sprawdzamy tylko, czy plansza da się
+    rozwiązać z inną cyfrą w tym polu — to zwykle jedno krótkie przeszukiwanie.
+    """
+    original = grid[i]
+    grid[i] = 0
+    rows, cols, boxes = masks(grid)
+    others = ALL_DIGITS & ~(rows[ROW[i]] | cols[COL[i]] | boxes[BOX[i]]) & ~(1 << original)
+    unique = True
+    for digit in MASK_DIGITS[others]:
+        grid[i] = digit
+        if find_solutions(grid, limit=1):
+            unique = False
+            break
+    grid[i] = original
+    return unique
+
+
+def dig(solution: list[int], givens: int, rng: random.Random) -> list[int]:
+    """Usuwa cyfry (losowo, z zachowaniem jednoznaczności) aż do `givens` podpowiedzi lub do oporu."""
+    grid = list(solution)
+    remaining = 81
+    positions = list(range(81))
+    rng.shuffle(positions)
+    for i in positions:
+        if remaining <= givens:
+            break
+        if _removable(grid, i):
+            grid[i] = 0
+            remaining -= 1
+    return grid
+
+
+def generate_puzzle(difficulty: str, rng: random.Random | None = None) -> Puzzle:
+    if difficulty not in DIFFICULTIES:
+        raise ValueError(f"Nieznany poziom trudności '{difficulty}'. Dostępne: {', '.join(DIFFICULTIES)}")
+    target = DIFFICULTIES[difficulty]
+    rng = rng or random.Random()
+    best = None
+    for _ in range(_MAX_ATTEMPTS):
+        solution = generate_full(rng)
+        grid = dig(solution, target.givens, rng)
+        candidate = Puzzle(difficulty, tuple(grid), tuple(solution), rate(grid))
+        if candidate.rating == target.level:
+            return candidate
+        if best is None or abs(candidate.rating - target.level) < abs(best.rating - target.level):
+            best = candidate
+    logger.debug("Brak planszy '%s' z oceną %s po %s próbach", difficulty, target.level, _MAX_ATTEMPTS)
+    return best
@@ -0,0 +1,149 @@
+import bisect
+import logging
+import os
+import threading
+from datetime import datetime, timezone
+
+from sqlalchemy import and_, func, select
+
+from database import SessionLocal
+from games.sudoku.generator import DIFFICULTIES
+from models import SudokuResult
+
+logger = logging.getLogger(__name__)
+
+# Ranking jest w pamięci każdego procesu; wyniki zgłoszone w innych workerach
+# pojawiają się po najbliższej odbudowie z bazy.
+SUDOKU_LEADERBOARD_REFRESH_SECONDS = float(os.getenv("SUDOKU_LEADERBOARD_REFRESH_SECONDS", "60"))
+SUDOKU_LEADERBOARD_LIMIT_MAX = int(os.getenv("SUDOKU_LEADERBOARD_LIMIT_MAX", "100"))
+
+
+def _timestamp(value: datetime) -> float:
+    # SQLite zwraca daty bez strefy czasowej — zapisujemy je w UTC.
+    return (value if value.tzinfo is not None else value.replace(tzinfo=timezone.utc)).timestamp()
+
+
+class SudokuLeaderboard:
+    """Najlepsze czasy użytkowników na każdym poziomie.
+
+    Dla poziomu trzymamy posortowaną listę kluczy (sekundy, kiedy, user_id) — przy
+    równym czasie wyżej jest ten, kto uzyskał go wcześniej — i słownik user_id -> klucz.
+    Top-N to wycinek listy, miejsce użytkownika to bisect; nowy rekord to jedno
+    usunięcie i wstawienie, bez sortowania całości.
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._sorted: dict[str, list[tuple[int, float, int]]] = {d: [] for d in DIFFICULTIES}
+        self._best: dict[str, dict[int, tuple[int, float, int]]] = {d: {} for d in DIFFICULTIES}
+        # Wyniki zapisane w trakcie odbudowy mogły nie trafić do odczytu z bazy —
+        # replace_all nakłada je ponownie.
+        self._recent: list[tuple[int, str, int, float]] = []
+        self._rebuilding = False
+        self.ready = False
+
+    def _record(self, user_id: int, difficulty: str, seconds: int, achieved_at: float) -> bool:
+        key = (seconds, achieved_at, user_id)
+        best = self._best[difficulty]
+        ranked = self._sorted[difficulty]
+        previous = best.get(user_id)
+        if previous is not None:
+            if previous <= key:
+                return False
+            del ranked[bisect.bisect_left(ranked, previous)]
+        best[user_id] = key
+        bisect.insort(ranked, key)
+        return True
+
+    def record(self, user_id: int, difficulty: str, seconds: int, achieved_at: datetime) -> bool:
+        """Dodaje wynik; zwraca True, jeśli to nowy najlepszy czas użytkownika."""
+        entry = (user_id, difficulty, seconds, _timestamp(achieved_at))
+        with self._lock:
+            if self._rebuilding:
+                self._recent.append(entry)
+            return self._record(*entry)
+
+    def begin_rebuild(self) -> None:
+        """Wołane przed odczytem z bazy; wyniki od tej chwili zostaną zachowane przy replace_all."""
+        with self._lock:
+            self._rebuilding = True
+            self._recent = []
+
+    def replace_all(self, rows) -> None:
+        """Podmienia ranking na najlepsze wyniki z bazy (user_id, poziom, sekundy, kiedy)."""
+        with self._lock:
+            for difficulty in DIFFICULTIES:
+                self._sorted[difficulty] = []
+                self._best[difficulty] = {}
+            for user_id, difficulty, seconds, achieved_at in rows:
+                if difficulty in self._best:
+                    self._record(user_id, difficulty, seconds, _timestamp(achieved_at))
+            for entry in self._recent:
+                self._record(*entry)
+            self._recent = []
+            self._rebuilding = False
+            self.ready = True
+
+    def forget(self, user_id: int) -> None:
+        with self._lock:
+            for difficulty, best in self._best.items():
+                key = best.pop(user_id, None)
+                if key is not None:
+                    ranked = self._sorted[difficulty]
+                    del ranked[bisect.bisect_left(ranked, key)]
+
+    def top(self, difficulty: str, limit: int) -> list[tuple[int, int, int, float]]:
+        """(miejsce, user_id, sekundy, kiedy) dla `limit` najlepszych."""
+        with self._lock:
+            return [
+                (position + 1, user_id, seconds, achieved_at)
+                for position, (seconds, achieved_at, user_id) in enumerate(self._sorted[difficulty][:limit])
+            ]
+
+    def rank(self, user_id: int, difficulty: str) -> tuple[int, int, int] | None:
+        """(miejsce, najlepszy czas, liczba graczy na poziomie) albo None, gdy brak wyników."""
+        with self._lock:
+            key = self._best[difficulty].get(user_id)
+            if key is None:
+                return None
+            ranked = self._sorted[difficulty]
+            return bisect.bisect_left(ranked, key) + 1, key[0], len(ranked)
+
+    def stats(self) -> dict:
+        with self._lock:
+            return {"players": {d: len(ranked) for d, ranked in self._sorted.items()}, "ready": self.ready}
+
+
+leaderboard = SudokuLeaderboard()
+
+
+def rebuild_leaderboard() -> None:
+    """Odbudowa z bazy: najlepszy czas każdego użytkownika na każdym poziomie (i kiedy go uzyskał)."""
+    leaderboard.begin_rebuild()
+    best = (
+        select(
+            SudokuResult.user_id,
+            SudokuResult.difficulty,
+            func.min(SudokuResult.seconds).label("seconds"),
+        )
+        .group_by(SudokuResult.user_id, SudokuResult.difficulty)
+        .subquery()
+    )
+    query = (
+        select(
+            SudokuResult.user_id,
+            SudokuResult.difficulty,
+            SudokuResult.seconds,
+            func.min(SudokuResult.created_at),
+        )
+        .join(best, and_(
+            SudokuResult.user_id == best.c.user_id,
+            SudokuResult.difficulty == best.c.difficulty,
+            SudokuResult.seconds == best.c.seconds,
+        ))
+        .group_by(SudokuResult.user_id, SudokuResult.difficulty, SudokuResult.seconds)
+    )
+    with SessionLocal() as db:
+        rows = db.execute(query).all()
+    leaderboard.replace_all(rows)
+    logger.debug("Odbudowano ranking Sudoku (%s wyników)", len(rows))
@@ -0,0 +1,120 @@
+"""Solver Sudoku na maskach bitowych.
+
+Plansza to 81 liczb (wierszami), 0 = puste pole. Dla każdego wiersza, kolumny
+i bloku trzymamy maskę użytych cyfr (bit n = cyfra n), więc kandydaci pola to
+jedna operacja OR/NOT. Przeszukiwanie zawsze wybiera pole z najmniejszą liczbą
+kandydatów (MRV) — to wystarcza, żeby rozwiązywać i liczyć rozwiązania
+w milisekundach, bez pełnego dancing links.
+"""
+import random
+
+ALL_DIGITS = 0b1111111110
+
+ROW = [i // 9 for i in range(81)]
+COL = [i % 9 for i in range(81)]
+BOX = [(i // 27) * 3 + (i % 9) // 3 for i in range(81)]
+
+# Pola w tym samym wierszu, kolumnie lub bloku (bez samego pola).
+PEERS = [
+    [j for j in range(81) if j != i and (ROW[j] == ROW[i] or COL[j] == COL[i] or BOX[j] == BOX[i])]
+    for i in range(81)
+]
+# Jednostki (9 wierszy, 9 kolumn, 9 bloków) jako listy pól.
+UNITS = (
+    [[i for i in range(81) if ROW[i] == n] for n in range(9)]
+    + [[i for i in range(81) if COL[i] == n] for n in range(9)]
+    + [[i for i in range(81) if BOX[i] == n] for n in range(9)]
+)
+
+POPCOUNT = [bin(mask).count("1") for mask in range(1 << 10)]
+MASK_DIGITS = [[d for d in range(1, 10) if mask >> d & 1] for mask in range(1 << 10)]
+
+
+def masks(grid: list[int]) -> tuple[list[int], list[int], list[int]] | None:
+    """Maski użytych cyfr (wiersze, kolumny, bloki); None, gdy plansza ma konflikt."""
+    rows, cols, boxes = [0] * 9, [0] * 9, [0] * 9
+    for i, value in enumerate(grid):
+        if not value:
+            continue
+        bit = 1 << value
+        r, c, b = ROW[i], COL[i], BOX[i]
+        if (rows[r] | cols[c] | boxes[b]) & bit:
+            return None
+        rows[r] |= bit
+        cols[c] |= bit
+        boxes[b] |= bit
+    return rows, cols, boxes
+
+
+def _search(grid, rows, cols, boxes, empties, limit, solutions, rng) -> None:
+    best, best_mask, best_count = -1, 0, 10
+    for i in empties:
+        if grid[i]:
+            continue
+        mask = ALL_DIGITS & ~(rows[ROW[i]] | cols[COL[i]] | boxes[BOX[i]])
+        count = POPCOUNT[mask]
+        if count < best_count:
+            best, best_mask, best_count = i, mask, count
+            if count <= 1:
+                break
+    if best < 0:
+        solutions.append(grid.copy())
+        return
+    if best_count == 0:
+        return
+
+    digits = MASK_DIGITS[best_mask]
+    if rng is not None:
+        digits = digits.copy()
+        rng.shuffle(digits)
+    r, c, b = ROW[best], COL[best], BOX[best]
+    for digit in digits:
+        bit = 1 << digit
+        grid[best] = digit
+        rows[r] |= bit
+        cols[c] |= bit
+        boxes[b] |= bit
+        _search(grid, rows, cols, boxes, empties, limit, solutions, rng)
+        rows[r] ^= bit
+        cols[c] ^= bit
+        boxes[b] ^= bit
+        grid[best] = 0
+        if len(solutions) >= limit:
+            return
+
+
+def find_solutions(grid: list[int], limit: int = 1, rng: random.Random | None = None) -> list[list[int]]:
+    """Do `limit` rozwiązań planszy (z `rng` cyfry są próbowane w losowej kolejności)."""
+    state = masks(grid)
+    if state is None:
+        return []
+    work = list(grid)
+    empties = [i for i, value in enumerate(work) if not value]
+    solutions: list[list[int]] = []
+    _search(work, *state, empties, limit, solutions, rng)
+    return solutions
+
+
+def solve(grid: list[int]) -> list[int] | None:
+    solutions = find_solutions(grid, limit=1)
+    return solutions[0] if solutions else None
+
+
+def count_solutions(grid: list[int], limit: int = 2) -> int:
+    """Liczba rozwiązań, liczona najwyżej do `limit` (2 wystarcza do sprawdzenia jednoznaczności)."""
+    return len(find_solutions(grid, limit=limit))
+
+
+def has_unique_solution(grid: list[int]) -> bool:
+    return count_solutions(grid, limit=2) == 1
+
+
+def is_solution(puzzle: list[int], grid: list[int]) -> bool:
+    """Czy `grid` jest pełną, poprawną planszą zgodną z podpowiedziami `puzzle`."""
+    if len(grid) != 81 or len(puzzle) != 81:
+        return False
+    if any(type(value) is not int or not 1 <= value <= 9 for value in grid):
+        return False
+    if any(given and given != value for given, value in zip(puzzle, grid)):
+        return False
+    return masks(grid) is not None
@@ -0,0 +1,50 @@
+import os
+import time
+import uuid
+from dataclasses import dataclass
+from datetime import timedelta
+
+from auth import create_access_token, decode_payload
+from games.sudoku.generator import DIFFICULTIES, Puzzle
+
+# Tyle czasu gracz ma na zgłoszenie wyniku (zapis gry w przeglądarce przechowuje token).
+SUDOKU_TOKEN_TTL_SECONDS = int(os.getenv("SUDOKU_TOKEN_TTL_SECONDS", "86400"))
+
+_SUDOKU_SCOPE = "sudoku"
+
+
+@dataclass(frozen=True)
+class IssuedPuzzle:
+    puzzle_id: str
+    difficulty: str
+    grid: list[int]
+    issued_at: float
+
+
+def issue_puzzle_token(puzzle: Puzzle) -> str:
+    """Podpisany token z planszą: serwer nie musi pamiętać wydanych plansz, a gracz nie może ich podmienić."""
+    return create_access_token(
+        data={
+            "sub": uuid.uuid4().hex,
+            "scope": _SUDOKU_SCOPE,
+            "difficulty": puzzle.difficulty,
+            "grid": "".join(str(value) for value in puzzle.grid),
+            "iat": int(time.time()),
+        },
+        expires_delta=timedelta(seconds=SUDOKU_TOKEN_TTL_SECONDS),
+    )
+
+
+def read_puzzle_token(token: str) -> IssuedPuzzle | None:
+    payload = decode_payload(token, scope=_SUDOKU_SCOPE)
+    if payload is None:
+        return None
+    grid = payload.get("grid", "")
+    if payload.get("difficulty") not in DIFFICULTIES or len(grid) != 81 or not grid.isdigit():
+        return None
+    return IssuedPuzzle(
+        puzzle_id=payload["sub"],
+        difficulty=payload["difficulty"],
+        grid=[int(value) for value in grid],
+        issued_at=float(payload.get("iat", 0)),
+    )
@@ -0,0 +1,10 @@
+from games.tictactoe.engine import Board, MoveError
+from games.tictactoe.sessions import (
+    TICTACTOE_SWEEP_INTERVAL_SECONDS,
+    Match,
+    end_player_matches,
+    matches,
+    publish_state,
+    save_matches,
+    sweep_matches_job,
+)
@@ -0,0 +1,77 @@
+"""Kółko i krzyżyk na bitboardach.
+
+Plansza to dwie 9-bitowe maski (bit i = pole i, wierszami), jedna na gracza.
+Ruch to OR bitu, zajętość to AND z sumą masek, a wygraną sprawdza tablica
+`_WINS` indeksowana maską gracza (512 wpisów liczonych raz przy imporcie) —
+każda z tych operacji jest O(1).
+"""
+X = 0
+O = 1
+SYMBOLS = "XO"
+
+FULL_BOARD = 0b111111111
+
+WINNING_LINES = [
+    (0, 1, 2), (3, 4, 5), (6, 7, 8),
+    (0, 3, 6), (1, 4, 7), (2, 5, 8),
+    (0, 4, 8), (2, 4, 6),
+]
+_LINE_MASKS = [sum(1 << cell for cell in line) for line in WINNING_LINES]
+_WINS = bytes(
+    1 if any(mask & line == line for line in _LINE_MASKS) else 0
+    for mask in range(1 << 9)
+)
+
+
+class MoveError(ValueError):
+    """Niedozwolony ruch (komunikat można pokazać graczowi)."""
+
+
+class Board:
+    __slots__ = ("bits", "turn", "winner", "history")
+
+    def __init__(self, starter: int = X):
+        self.bits = [0, 0]
+        self.turn = starter
+        self.winner: int | None = None
+        self.history = bytearray()  # kolejne zajęte pola (do zapisu i powtórki partii)
+
+    @property
+    def occupied(self) -> int:
+        return self.bits[X] | self.bits[O]
+
+    @property
+    def finished(self) -> bool:
+        return self.winner is not None or self.occupied == FULL_BOARD
+
+    def play(self, player: int, cell: int) -> None:
+        if self.finished:
+            raise MoveError("Gra jest już zakończona")
+        if player != self.turn:
+            raise MoveError("Teraz ruch przeciwnika")
+        if not 0 <= cell < 9:
+            raise MoveError("Nieprawidłowe pole")
+        bit = 1 << cell
+        if self.occupied & bit:
+            raise MoveError("To pole jest już zajęte")
+        self.bits[player] |= bit
+        self.history.append(cell)
+        if _WINS[self.bits[player]]:
+            self.winner = player
+        else:
+            self.turn ^= 1
+
+    def winning_line(self) -> tuple[int, int, int] | None:
+        if self.winner is None:
+            return None
+        mask = self.bits[self.winner]
+        for line, line_mask in zip(WINNING_LINES, _LINE_MASKS):
+            if mask & line_mask == line_mask:
+                return line
+        return None
+
+    def cells(self) -> list[str | None]:
+        return [
+            "X" if self.bits[X] >> i & 1 else "O" if self.bits[O] >> i & 1 else None
+            for i in range(9)
+        ]
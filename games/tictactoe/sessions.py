@@ -0,0 +1,263 @@
+import logging
+import os
+import time
+from datetime import datetime, timezone
+
+from sqlalchemy import select
+from sqlalchemy.exc import SQLAlchemyError
+from starlette.concurrency import run_in_threadpool
+
+from database import SessionLocal
+from events import event_hub
+from games.tictactoe.engine import O, SYMBOLS, X, Board, MoveError
+from models import GameInvitation, TicTacToeMatch, User
+from user_stats import DRAW, LOSS, TICTACTOE, WIN, game_results
+
+logger = logging.getLogger(__name__)
+
+# Partie żyją w pamięci procesu, który przyjął zaproszenie — przy kilku workerach
+# uvicorna obaj gracze muszą trafiać do tego samego procesu (np. sticky sessions).
+TICTACTOE_MAX_SESSIONS = int(os.getenv("TICTACTOE_MAX_SESSIONS", "10000"))
+TICTACTOE_MOVE_TIMEOUT_SECONDS = float(os.getenv("TICTACTOE_MOVE_TIMEOUT_SECONDS", "300"))
+TICTACTOE_SWEEP_INTERVAL_SECONDS = float(os.getenv("TICTACTOE_SWEEP_INTERVAL_SECONDS", "30"))
+# Zakończona partia zostaje chwilę w pamięci, żeby obaj gracze zobaczyli wynik
+# (później stan zwraca endpoint z tabeli tictactoe_matches).
+TICTACTOE_FINISHED_TTL_SECONDS = float(os.getenv("TICTACTOE_FINISHED_TTL_SECONDS", "60"))
+
+# Sposób zakończenia partii (kolumna outcome).
+OUTCOME_LINE = "line"
+OUTCOME_DRAW = "draw"
+OUTCOME_RESIGN = "resign"
+OUTCOME_TIMEOUT = "timeout"
+
+
+class Match:
+    __slots__ = ("id", "player_ids", "usernames", "board", "outcome", "started_at", "updated_at")
+
+    def __init__(self, match_id: int, player_ids: tuple[int, int], usernames: tuple[str, str]):
+        self.id = match_id
+        self.player_ids = player_ids  # (X, O)
+        self.usernames = usernames
+        self.board = Board(starter=X)
+        self.outcome: str | None = None
+        self.started_at = datetime.now(timezone.utc)
+        self.updated_at = time.monotonic()
+
+    @classmethod
+    def from_row(cls, row: TicTacToeMatch, usernames: tuple[str, str]) -> "Match":
+        """Odtwarza zapisaną partię z listy ruchów (do pokazania wyniku po usunięciu z pamięci)."""
+        match = cls(row.invitation_id, (row.player_x_id, row.player_o_id), usernames)
+        for cell in row.moves:
+            match.board.play(match.board.turn, int(cell))
+        if row.outcome in (OUTCOME_RESIGN, OUTCOME_TIMEOUT):
+            match.board.winner = X if row.winner_id == row.player_x_id else O
+        match.outcome = row.outcome
+        match.started_at = row.started_at
+        return match
+
+    def symbol_of(self, user_id: int) -> int | None:
+        if user_id == self.player_ids[X]:
+            return X
+        if user_id == self.player_ids[O]:
+            return O
+        return None
+
+    @property
+    def finished(self) -> bool:
+        return self.outcome is not None
+
+    def play(self, user_id: int, cell: int) -> None:
+        if self.finished:
+            raise MoveError("Gra jest już zakończona")
+        self.board.play(self.symbol_of(user_id), cell)
+        self.updated_at = time.monotonic()
+        if self.board.winner is not None:
+            self.outcome = OUTCOME_LINE
+        elif self.board.finished:
+            self.outcome = OUTCOME_DRAW
+
+    def forfeit(self, loser: int, outcome: str) -> None:
+        """Kończy partię wygraną przeciwnika `loser` (poddanie lub przekroczenie czasu)."""
+        if self.finished:
+            raise MoveError("Gra jest już zakończona")
+        self.board.winner = loser ^ 1
+        self.outcome = outcome
+        self.updated_at = time.monotonic()
+
+    def state(self) -> dict:
+        board = self.board
+        winner = board.winner
+        return {
+            "id": self.id,
+            "board": board.cells(),
+            "players": {SYMBOLS[X]: self.usernames[X], SYMBOLS[O]: self.usernames[O]},
+            "turn": None if self.finished else SYMBOLS[board.turn],
+            "status": "finished" if self.finished else "playing",
+            "outcome": self.outcome,
+            "winner": SYMBOLS[winner] if winner is not None else None,
+            "winning_line": board.winning_line() if self.outcome == OUTCOME_LINE else None,
+            "moves": len(board.history),
+        }
+
+    def results(self) -> dict[int, str]:
+        """Wynik każdego gracza zakończonej partii (do statystyk)."""
+        winner = self.board.winner
+        if winner is None:
+            return dict.fromkeys(self.player_ids, DRAW)
+        return {self.player_ids[winner]: WIN, self.player_ids[winner ^ 1]: LOSS}
+
+    def to_row(self) -> TicTacToeMatch:
+        winner = self.board.winner
+        return TicTacToeMatch(
+            invitation_id=self.id,
+            player_x_id=self.player_ids[X],
+            player_o_id=self.player_ids[O],
+            winner_id=self.player_ids[winner] if winner is not None else None,
+            outcome=self.outcome,
+            moves="".join(str(cell) for cell in self.board.history),
+            started_at=self.started_at,
+            finished_at=datetime.now(timezone.utc),
+        )
+
+
+class MatchRegistry:
+    """Trwające partie w pamięci procesu, kluczem jest id zaakceptowanego zaproszenia.
+
+    Metody wołamy z wątku pętli zdarzeń, więc ruch (sprawdzenie i zapis na planszy)
+    jest atomowy bez blokad. Partia to kilka liczb i krótki bytearray, więc tysiące
+    sesji na proces to pojedyncze megabajty.
+    """
+
+    def __init__(self, max_sessions: int):
+        self.max_sessions = max_sessions
+        self._matches: dict[int, Match] = {}
+        self.started = 0
+        self.finished = 0
+
+    def __len__(self) -> int:
+        return len(self._matches)
+
+    @property
+    def full(self) -> bool:
+        return len(self._matches) >= self.max_sessions
+
+    def create(self, match_id: int, player_ids: tuple[int, int], usernames: tuple[str, str]) -> Match:
+        match = self._matches.get(match_id)
+        if match is None:
+            match = self._matches[match_id] = Match(match_id, player_ids, usernames)
+            self.started += 1
+        return match
+
+    def get(self, match_id: int) -> Match | None:
+        return self._matches.get(match_id)
+
+    def play(self, match: Match, user_id: int, cell: int) -> None:
+        match.play(user_id, cell)
+        if match.finished:
+            self.finished += 1
+
+    def resign(self, match: Match, user_id: int) -> None:
+        match.forfeit(match.symbol_of(user_id), OUTCOME_RESIGN)
+        self.finished += 1
+
+    def end_for_player(self, user_id: int) -> list[Match]:
+        """Przed usunięciem konta: trwające partie gracza przegrywa on sam (poddanie); zwraca je."""
+        ended = []
+        for match_id, match in list(self._matches.items()):
+            symbol = match.symbol_of(user_id)
+            if symbol is None:
+                continue
+            if not match.finished:
+                match.forfeit(symbol, OUTCOME_RESIGN)
+                self.finished += 1
+                ended.append(match)
+            del self._matches[match_id]
+        return ended
+
+    def sweep(self) -> list[Match]:
+        """Usuwa stare zakończone partie i kończy porzucone; zwraca te drugie (do zapisu)."""
+        now = time.monotonic()
+        timed_out = []
+        for match_id, match in list(self._matches.items()):
+            if match.finished:
+                if now - match.updated_at > TICTACTOE_FINISHED_TTL_SECONDS:
+                    del self._matches[match_id]
+            elif now - match.updated_at > TICTACTOE_MOVE_TIMEOUT_SECONDS:
+                match.forfeit(match.board.turn, OUTCOME_TIMEOUT)
+                self.finished += 1
+                timed_out.append(match)
+        return timed_out
+
+    def stats(self) -> dict:
+        return {
+            "active": sum(1 for match in self._matches.values() if not match.finished),
+            "in_memory": len(self._matches),
+            "max_sessions": self.max_sessions,
+            "started": self.started,
+            "finished": self.finished,
+        }
+
+
+matches = MatchRegistry(TICTACTOE_MAX_SESSIONS)
+
+
+def publish_state(match: Match) -> None:
+    event_hub.publish(match.player_ids, "tictactoe.updated", match.state())
+
+
+def _save_matches(finished: list[Match]) -> int:
+    """Zapisuje zakończone partie, każdą w osobnej transakcji; zwraca liczbę zapisanych.
+
+    Partie, których zaproszenie lub gracz zniknęli (usunięte konto), są pomijane —
+    błąd zapisu jednej partii nie cofa pozostałych.
+    """
+    saved = 0
+    with SessionLocal() as db:
+        user_ids = {user_id for match in finished for user_id in match.player_ids}
+        present = set(db.scalars(select(User.id).where(User.id.in_(user_ids))))
+        invitations = set(db.scalars(
+            select(GameInvitation.id).where(GameInvitation.id.in_([match.id for match in finished]))
+        ))
+        for match in finished:
+            if match.id not in invitations or not present.issuperset(match.player_ids):
+                logger.info("Pominięto zapis partii kółka i krzyżyka %s: konto gracza usunięte", match.id)
+                continue
+            try:
+                db.add(match.to_row())
+                db.execute(game_results(db, TICTACTOE, match.results()))
+                db.commit()
+            except SQLAlchemyError:
+                db.rollback()
+                logger.exception("Nie udało się zapisać partii kółka i krzyżyka %s", match.id)
+                continue
+            saved += 1
+    return saved
+
+
+async def save_matches(finished: list[Match]) -> int:
+    """Zapis zakończonych partii w threadpoolu; błąd bazy zostaje w logach (stan gry już opublikowany)."""
+    try:
+        return await run_in_threadpool(_save_matches, finished)
+    except Exception:
+        logger.exception("Nie udało się zapisać %s partii kółka i krzyżyka", len(finished))
+        return 0
+
+
+async def sweep_matches_job() -> None:
+    """Zadanie w tle: porzucone partie przegrywa gracz, na którego ruch czekano; zapis do bazy."""
+    timed_out = matches.sweep()
+    if not timed_out:
+        return
+    for match in timed_out:
+        publish_state(match)
+    await save_matches(timed_out)
+    logger.info("Zakończono %s porzuconych partii kółka i krzyżyka", len(timed_out))
+
+
+async def end_player_matches(user_id: int) -> None:
+    """Przed usunięciem konta: kończy jego partie (wygrywa przeciwnik) i zapisuje je, póki konto istnieje."""
+    ended = matches.end_for_player(user_id)
+    for match in ended:
+        publish_state(match)
+    if ended:
+        await save_matches(ended)
@@ -0,0 +1,78 @@
+import logging
+import os
+from datetime import datetime, timedelta, timezone
+
+from sqlalchemy import select, update
+from starlette.concurrency import run_in_threadpool
+
+from database import SessionLocal
+from etags import INVITATIONS_RECEIVED, INVITATIONS_SENT, change_versions
+from events import event_hub
+from models import GameInvitation, GameInvitationStatus
+
+logger = logging.getLogger(__name__)
+
+GAME_INVITATION_TTL_SECONDS = float(os.getenv("GAME_INVITATION_TTL_SECONDS", "300"))
+GAME_INVITATION_EXPIRY_INTERVAL_SECONDS = float(
+    os.getenv("GAME_INVITATION_EXPIRY_INTERVAL_SECONDS", "60")
+)
+GAME_INVITATION_EXPIRY_BATCH_SIZE = int(os.getenv("GAME_INVITATION_EXPIRY_BATCH_SIZE", "1000"))
+
+
+def expire_stale_invitations(batch_size: int = GAME_INVITATION_EXPIRY_BATCH_SIZE) -> list:
+    """Oznacza jako EXPIRED zaproszenia PENDING starsze niż TTL; zwraca zmienione wiersze.
+
+    UPDATE idzie partiami (krótkie transakcje). SKIP LOCKED i ponowny warunek na
+    status sprawiają, że kilka workerów naraz nie wygasi tego samego zaproszenia dwa razy.
+    """
+    expired = []
+    now = datetime.now(timezone.utc)
+    cutoff = now - timedelta(seconds=GAME_INVITATION_TTL_SECONDS)
+    with SessionLocal() as db:
+        while True:
+            stale_ids = (
+                select(GameInvitation.id)
+                .where(
+                    GameInvitation.status == GameInvitationStatus.PENDING,
+                    GameInvitation.created_at < cutoff,
+                )
+                .limit(batch_size)
+                .with_for_update(skip_locked=True)
+                .scalar_subquery()
+            )
+            rows = db.execute(
+                update(GameInvitation)
+                .where(
+                    GameInvitation.id.in_(stale_ids),
+                    GameInvitation.status == GameInvitationStatus.PENDING,
+                )
+                .values(status=GameInvitationStatus.EXPIRED, updated_at=now)
+                .returning(
+                    GameInvitation.id,
+                    GameInvitation.inviter_id,
+                    GameInvitation.invitee_id,
+                    GameInvitation.game_type,
+                )
+                .execution_options(synchronize_session=False)
+            ).all()
+            db.commit()
+            expired.extend(rows)
+            if len(rows) < batch_size:
+                break
+    if expired:
+        logger.info("Wygasło %s zaproszeń do gier", len(expired))
+    return expired
+
+
+async def expire_invitations_job() -> None:
+    """Zadanie w tle: wygasza zaproszenia i powiadamia obie strony (listy i strumień zdarzeń)."""
+    for invitation_id, inviter_id, invitee_id, game_type in await run_in_threadpool(
+        expire_stale_invitations
+    ):
+        change_versions.bump(INVITATIONS_RECEIVED, invitee_id)
+        change_versions.bump(INVITATIONS_SENT, inviter_id)
+        event_hub.publish([inviter_id, invitee_id], "invitation.expired", {
+            "id": invitation_id,
+            "game_type": game_type,
+            "status": GameInvitationStatus.EXPIRED.value,
+        })
@@ -0,0 +1,80 @@
+// Strumień zdarzeń o zaproszeniach do gier (Server-Sent Events) zamiast pollingu.
+//
+// connectInvitationEvents({
+//     onConnected:    () => {},          // połączono — odśwież stan i wyłącz polling
+//     onDisconnected: () => {},          // brak połączenia — włącz polling awaryjny
+//     onEvent:        (type, data) => {} // invitation.created / accepted / declined / cancelled / expired,
+//                                        // tictactoe.updated (stan partii kółka i krzyżyka)
+// });
+//
+// Zwraca false, jeśli przeglądarka nie obsługuje EventSource (wtedy zostaje polling).
+function connectInvitationEvents(handlers) {
+    if (typeof EventSource === 'undefined') {
+        return false;
+    }
+
+    var EVENT_TYPES = [
+        'invitation.created', 'invitation.accepted', 'invitation.declined',
+        'invitation.cancelled', 'invitation.expired', 'tictactoe.updated',
+        'batalla.updated'
+    ];
+    var RECONNECT_DELAY_MS = 5000;
+    var source = null;
+    var connected = false;
+
+    function setDisconnected() {
+        if (connected) {
+            connected = false;
+            if (handlers.onDisconnected) handlers.onDisconnected();
+        }
+    }
+
+    function scheduleReconnect() {
+        setTimeout(connect, RECONNECT_DELAY_MS);
+    }
+
+    function connect() {
+        var token = localStorage.getItem('access_token');
+        if (!token) return;
+
+        // Bilet jest ważny tylko chwilę, więc po każdym rozłączeniu pobieramy nowy
+        // (nie korzystamy z automatycznego wznawiania EventSource).
+        fetch('/api/events/ticket', {
+            method: 'POST',
+            headers: { 'Authorization': 'Bearer ' + token }
+        })
+        .then(function(r) {
+            if (!r.ok) throw new Error('HTTP ' + r.status);
+            return r.json();
+        })
+        .then(function(data) {
+            source = new EventSource('/api/events/stream?ticket=' + encodeURIComponent(data.ticket));
+            source.addEventListener('ready', function() {
+                connected = true;
+                if (handlers.onConnected) handlers.onConnected();
+            });
+            // Serwer nie nadążył z wysyłką — stan trzeba odświeżyć jak po połączeniu.
+            source.addEventListener('resync', function() {
+                if (handlers.onConnected) handlers.onConnected();
+            });
+            EVENT_TYPES.forEach(function(type) {
+                source.addEventListener(type, function(e) {
+                    if (handlers.onEvent) handlers.onEvent(type, JSON.parse(e.data));
+                });
+            });
+            source.onerror = function() {
+                source.close();
+                setDisconnected();
+                scheduleReconnect();
+            };
+        })
+        .catch(function() {
+            setDisconnected();
+            scheduleReconnect();
+        });
+    }
+
+    // Do pierwszego połączenia strona korzysta z pollingu.
+    connect();
+    return true;
+}
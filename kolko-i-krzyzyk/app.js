@@ -20,6 +20,14 @@ let humanPlayer = 'X';
 let botPlayer = 'O';
 let settingsApplied = false;
 
+// gra z przyjacielem przez serwer: /kolko-i-krzyzyk/?match=<id> (po zaakceptowaniu zaproszenia)
+const matchId = new URLSearchParams(window.location.search).get('match');
+const onlineEl = document.getElementById('online');
+const playersEl = document.getElementById('players');
+const resignBtn = document.getElementById('resign');
+let mySymbol = null;
+let matchPollTimer = null;
+
 const winningCombos = [
   [0,1,2],[3,4,5],[6,7,8],
   [0,3,6],[1,4,7],[2,5,8],
@@ -32,6 +40,7 @@ function updateTurn() {
 
 function handleMove(e){
   if(finished) return;
+  if(matchId){ sendOnlineMove(Number(this.dataset.index)); return; }
   const idx = Number(this.dataset.index);
   if(board[idx]) return;
   board[idx] = currentPlayer;
@@ -156,10 +165,83 @@ resetBtn.addEventListener('click', reset);
 resetScoresBtn?.addEventListener('click', resetScores);
 applySettingsBtn?.addEventListener('click', applySettings);
 
+// gra online — stan planszy, tura i wynik pochodzą z serwera
+function matchRequest(path, options = {}){
+  const token = localStorage.getItem('access_token');
+  return fetch('/api/tictactoe/matches/' + encodeURIComponent(matchId) + path, {
+    ...options,
+    headers: { 'Content-Type': 'application/json', 'Authorization': 'Bearer ' + token }
+  }).then(async res => {
+    const data = await res.json();
+    if(!res.ok) throw new Error(data.detail || 'Błąd serwera');
+    return data;
+  });
+}
+
+function renderMatch(state){
+  if(state.you) mySymbol = state.you;
+  state.board.forEach((value, i) => {
+    cells[i].textContent = value || '';
+    cells[i].classList.toggle('filled', !!value);
+    cells[i].style.background = state.winning_line?.includes(i) ? '#e8f0fe' : '';
+  });
+  board = state.board.slice();
+  finished = state.status === 'finished';
+  currentPlayer = state.turn || currentPlayer;
+  updateTurn();
+  playersEl.textContent = `X: ${state.players.X} — O: ${state.players.O} (grasz jako ${mySymbol})`;
+  resignBtn.classList.toggle('hidden', finished);
+  if(finished){
+    stopMatchPoll();
+    const reasons = { resign: ' (poddanie)', timeout: ' (koniec czasu na ruch)' };
+    messageEl.textContent = state.winner
+      ? (state.winner === mySymbol ? 'Wygrywasz!' : 'Przegrywasz!') + (reasons[state.outcome] || '')
+      : 'Remis!';
+  } else {
+    messageEl.textContent = state.turn === mySymbol ? 'Twój ruch' : 'Czekaj na ruch przeciwnika...';
+  }
+}
+
+function refreshMatch(){
+  matchRequest('').then(renderMatch).catch(e => { messageEl.textContent = e.message; });
+}
+
+function sendOnlineMove(cell){
+  if(currentPlayer !== mySymbol || board[cell]) return;
+  matchRequest('/moves', { method: 'POST', body: JSON.stringify({ cell }) })
+    .then(renderMatch)
+    .catch(e => { messageEl.textContent = e.message; });
+}
+
+function startMatchPoll(){ if(!matchPollTimer && !finished) matchPollTimer = setInterval(refreshMatch, 2000); }
+function stopMatchPoll(){ clearInterval(matchPollTimer); matchPollTimer = null; }
+
+function startOnlineMatch(){
+  document.querySelector('.controls')?.classList.add('hidden');
+  onlineEl.classList.remove('hidden');
+  resignBtn.addEventListener('click', () => {
+    if(confirm('Na pewno chcesz się poddać?')) matchRequest('/resign', { method: 'POST' }).then(renderMatch).catch(e => { messageEl.textContent = e.message; });
+  });
+  refreshMatch();
+  // ruchy przeciwnika przychodzą strumieniem zdarzeń; bez niego — odpytywanie co 2 s
+  const pushAvailable = typeof connectInvitationEvents === 'function' && connectInvitationEvents({
+    onConnected: () => { stopMatchPoll(); refreshMatch(); },
+    onDisconnected: startMatchPoll,
+    onEvent: (type, data) => {
+      if(type === 'tictactoe.updated' && String(data.id) === matchId) renderMatch(data);
+    }
+  });
+  if(!pushAvailable) startMatchPoll();
+}
+
 // inicjalizacja
-loadScores();
-humanPlayer = playerSymbolSelect?.value || 'X';
-botPlayer = humanPlayer === 'X' ? 'O' : 'X';
-currentPlayer = starterSelect?.value || 'X';
-updateTurn();
+if(matchId){
+  startOnlineMatch();
+} else {
+  loadScores();
+  humanPlayer = playerSymbolSelect?.value || 'X';
+  botPlayer = humanPlayer === 'X' ? 'O' : 'X';
+  currentPlayer = starterSelect?.value || 'X';
+  updateTurn();
+}
 // nie rob nic jak bot rozpoczyna
\ No newline at end of file
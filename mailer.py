@@ -0,0 +1,293 @@
+import asyncio
+import logging
+import os
+import random
+import tempfile
+import threading
+from dataclasses import dataclass
+from datetime import datetime, timedelta, timezone
+from pathlib import Path
+
+from sqlalchemy import delete, select, update
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from database import SessionLocal
+from models import EmailOutbox, EmailOutboxStatus
+
+logger = logging.getLogger(__name__)
+
+BREVO_API_KEY = os.getenv("BREVO_API_KEY", "")
+BREVO_SENDER_EMAIL = os.getenv("BREVO_SENDER_EMAIL", "")
+SENDER_NAME = "Wielka Studencka Batalia"
+
+# Sposób wysyłki wiadomości z kolejki:
+#   brevo  — API Brevo (domyślnie, gdy ustawiono BREVO_API_KEY)
+#   log    — tylko wpis w logu, treść na poziomie DEBUG (domyślnie bez klucza)
+#   memory — lista w pamięci procesu (testy)
+#   file   — pliki .html w katalogu EMAIL_FILE_DIR (testy bez dostępu do sieci)
+_SUPPORTED_TRANSPORTS = ["brevo", "log", "memory", "file"]
+EMAIL_TRANSPORT = os.getenv("EMAIL_TRANSPORT", "brevo" if BREVO_API_KEY else "log")
+if EMAIL_TRANSPORT not in _SUPPORTED_TRANSPORTS:
+    raise ValueError(
+        f"Nieobsługiwany transport email: '{EMAIL_TRANSPORT}'. "
+        f"Dostępne opcje: {', '.join(_SUPPORTED_TRANSPORTS)}"
+    )
+# Domyślnie poza katalogiem projektu, który jest serwowany jako pliki statyczne.
+EMAIL_FILE_DIR = os.getenv(
+    "EMAIL_FILE_DIR", os.path.join(tempfile.gettempdir(), "batalia_emails")
+)
+
+EMAIL_OUTBOX_POLL_SECONDS = float(os.getenv("EMAIL_OUTBOX_POLL_SECONDS", "10"))
+EMAIL_OUTBOX_BATCH_SIZE = int(os.getenv("EMAIL_OUTBOX_BATCH_SIZE", "50"))
+EMAIL_MAX_ATTEMPTS = int(os.getenv("EMAIL_MAX_ATTEMPTS", "5"))
+EMAIL_RETRY_BASE_SECONDS = float(os.getenv("EMAIL_RETRY_BASE_SECONDS", "5"))
+EMAIL_RETRY_MAX_SECONDS = float(os.getenv("EMAIL_RETRY_MAX_SECONDS", "600"))
+# Ile czasu worker ma na wysłanie zarezerwowanej partii, zanim inny proces ją przejmie.
+EMAIL_SEND_LEASE_SECONDS = float(os.getenv("EMAIL_SEND_LEASE_SECONDS", "300"))
+
+
+class PermanentEmailError(Exception):
+    """Błąd, którego ponowienie nic nie da (np. odrzucony adres) — bez kolejnych prób."""
+
+
+class BrevoTransport:
+    delivers = True
+
+    def __init__(self, api_key: str, sender_email: str):
+        import sib_api_v3_sdk
+
+        self._sdk = sib_api_v3_sdk
+        configuration = sib_api_v3_sdk.Configuration()
+        configuration.api_key["api-key"] = api_key
+        # Jeden klient na proces — połączenia HTTPS do API są utrzymywane między wysyłkami.
+        self._api = sib_api_v3_sdk.TransactionalEmailsApi(sib_api_v3_sdk.ApiClient(configuration))
+        self._sender = {"name": SENDER_NAME, "email": sender_email}
+
+    def send(self, to_address: str, subject: str, html_content: str) -> None:
+        from sib_api_v3_sdk.rest import ApiException
+
+        message = self._sdk.SendSmtpEmail(
+            to=[{"email": to_address}],
+            sender=self._sender,
+            subject=subject,
+            html_content=html_content,
+        )
+        try:
+            self._api.send_transac_email(message)
+        except ApiException as e:
+            if e.status is not None and 400 <= e.status < 500 and e.status != 429:
+                raise PermanentEmailError(f"Brevo odrzuciło wiadomość ({e.status}): {e.body}") from e
+            raise
+
+
+class LogTransport:
+    delivers = False
+
+    def send(self, to_address: str, subject: str, html_content: str) -> None:
+        logger.info("Email do %s (%s) — nie wysłano, EMAIL_TRANSPORT=log", to_address, subject)
+        logger.debug("Treść emaila do %s: %s", to_address, html_content)
+
+
+class MemoryTransport:
+    delivers = True
+
+    def __init__(self):
+        self.sent: list[dict] = []
+
+    def send(self, to_address: str, subject: str, html_content: str) -> None:
+        self.sent.append({"to": to_address, "subject": subject, "html_content": html_content})
+
+
+class FileTransport:
+    delivers = True
+
+    def __init__(self, directory: str):
+        self.directory = Path(directory)
+        self._counter = 0
+        self._lock = threading.Lock()
+
+    def send(self, to_address: str, subject: str, html_content: str) -> None:
+        self.directory.mkdir(parents=True, exist_ok=True)
+        with self._lock:
+            self._counter += 1
+            name = f"{datetime.now(timezone.utc):%Y%m%dT%H%M%S}-{os.getpid()}-{self._counter}.html"
+        header = f"<!-- To: {to_address}\n     Subject: {subject} -->\n"
+        (self.directory / name).write_text(header + html_content, encoding="utf-8")
+
+
+def _build_transport(name: str):
+    if name == "brevo":
+        return BrevoTransport(BREVO_API_KEY, BREVO_SENDER_EMAIL)
+    if name == "memory":
+        return MemoryTransport()
+    if name == "file":
+        return FileTransport(EMAIL_FILE_DIR)
+    return LogTransport()
+
+
+_transport = None
+_transport_lock = threading.Lock()
+
+
+def get_transport():
+    global _transport
+    with _transport_lock:
+        if _transport is None:
+            _transport = _build_transport(EMAIL_TRANSPORT)
+        return _transport
+
+
+def set_transport(transport) -> None:
+    """Podmienia transport (np. na MemoryTransport w testach)."""
+    global _transport
+    with _transport_lock:
+        _transport = transport
+
+
+# Budzi workera w tym procesie od razu po dodaniu wiadomości (pozostałe procesy
+# odbiorą ją przy najbliższym odpytaniu kolejki).
+outbox_wakeup = asyncio.Event()
+
+
+def enqueue_email(
+    db: AsyncSession,
+    to_address: str,
+    subject: str,
+    html_content: str,
+    expires_at: datetime | None = None,
+) -> None:
+    """Dodaje wiadomość do kolejki w bieżącej transakcji (commit i notify_outbox po stronie wywołującego)."""
+    db.add(EmailOutbox(
+        to_address=to_address,
+        subject=subject,
+        html_content=html_content,
+        expires_at=expires_at,
+    ))
+
+
+def notify_outbox() -> None:
+    outbox_wakeup.set()
+
+
+def _as_utc(value: datetime) -> datetime:
+    return value if value.tzinfo is not None else value.replace(tzinfo=timezone.utc)
+
+
+def _retry_delay(attempts: int) -> float:
+    delay = min(EMAIL_RETRY_BASE_SECONDS * 2 ** (attempts - 1), EMAIL_RETRY_MAX_SECONDS)
+    return delay * random.uniform(0.8, 1.2)
+
+
+@dataclass(frozen=True)
+class _Claim:
+    """Wiadomość zarezerwowana do wysyłki; `attempt` odróżnia tę dzierżawę od późniejszych."""
+
+    id: int
+    to_address: str
+    subject: str
+    html_content: str
+    attempt: int
+
+
+def _claim_batch(batch_size: int) -> tuple[list[_Claim], int]:
+    """Rezerwuje partię wiadomości do wysyłki i od razu zatwierdza transakcję.
+
+    Zarezerwowana wiadomość ma status SENDING, a next_attempt_at oznacza koniec dzierżawy —
+    jeśli worker padnie w trakcie wysyłki, po tym czasie wiadomość podejmie inny proces.
+    FOR UPDATE SKIP LOCKED chroni tylko samą rezerwację, więc wysyłka nie trzyma blokad
+    ani połączenia z puli. Zwraca zarezerwowane wiadomości i liczbę pobranych wierszy.
+    """
+    now = datetime.now(timezone.utc)
+    lease_until = now + timedelta(seconds=EMAIL_SEND_LEASE_SECONDS)
+    claims = []
+    with SessionLocal() as db:
+        messages = db.scalars(
+            select(EmailOutbox)
+            .where(
+                EmailOutbox.status.in_([EmailOutboxStatus.PENDING, EmailOutboxStatus.SENDING]),
+                EmailOutbox.next_attempt_at <= now,
+            )
+            .order_by(EmailOutbox.next_attempt_at)
+            .limit(batch_size)
+            .with_for_update(skip_locked=True)
+        ).all()
+        for message in messages:
+            if message.expires_at is not None and _as_utc(message.expires_at) <= now:
+                message.status = EmailOutboxStatus.FAILED
+                message.last_error = "Wiadomość wygasła przed wysłaniem"
+                logger.warning("Email %s do %s wygasł przed wysłaniem", message.id, message.to_address)
+                continue
+            if message.status == EmailOutboxStatus.SENDING:
+                # Nie wiadomo, czy przerwana wysyłka doszła do skutku — ponawiamy ją.
+                logger.warning("Wygasła dzierżawa wysyłki emaila %s (próba %s)", message.id, message.attempts)
+                if message.attempts >= EMAIL_MAX_ATTEMPTS:
+                    message.status = EmailOutboxStatus.FAILED
+                    message.last_error = "Wysyłka przerwana (wygasła dzierżawa)"
+                    continue
+            message.status = EmailOutboxStatus.SENDING
+            message.attempts += 1
+            message.next_attempt_at = lease_until
+            claims.append(_Claim(
+                message.id, message.to_address, message.subject, message.html_content, message.attempts
+            ))
+        db.commit()
+    return claims, len(messages)
+
+
+def _record_result(claim: _Claim, error: Exception | None) -> None:
+    """Zapisuje wynik wysyłki, o ile dzierżawa nie przeszła w międzyczasie do innego procesu."""
+    leased = (
+        EmailOutbox.id == claim.id,
+        EmailOutbox.status == EmailOutboxStatus.SENDING,
+        EmailOutbox.attempts == claim.attempt,
+    )
+    if error is None:
+        # Treść zawiera m.in. kody resetowania hasła — po wysłaniu nie przechowujemy jej.
+        statement = delete(EmailOutbox).where(*leased)
+    elif isinstance(error, PermanentEmailError) or claim.attempt >= EMAIL_MAX_ATTEMPTS:
+        logger.error(
+            "Nie udało się wysłać emaila %s do %s (próba %s): %s",
+            claim.id, claim.to_address, claim.attempt, error,
+        )
+        statement = update(EmailOutbox).where(*leased).values(
+            status=EmailOutboxStatus.FAILED, last_error=str(error)[:1000]
+        )
+    else:
+        next_attempt_at = datetime.now(timezone.utc) + timedelta(seconds=_retry_delay(claim.attempt))
+        logger.warning(
+            "Błąd wysyłania emaila %s do %s (próba %s), ponowienie o %s: %s",
+            claim.id, claim.to_address, claim.attempt, next_attempt_at, error,
+        )
+        statement = update(EmailOutbox).where(*leased).values(
+            status=EmailOutboxStatus.PENDING, next_attempt_at=next_attempt_at, last_error=str(error)[:1000]
+        )
+    with SessionLocal() as db:
+        if db.execute(statement).rowcount == 0:
+            logger.warning("Dzierżawa emaila %s wygasła przed zapisaniem wyniku wysyłki", claim.id)
+        db.commit()
+
+
+def deliver_pending_emails(batch_size: int = EMAIL_OUTBOX_BATCH_SIZE) -> int:
+    """Wysyła oczekujące wiadomości partiami; zwraca liczbę wysłanych.
+
+    Każda partia to krótka transakcja rezerwacji, wysyłka poza transakcją i osobny,
+    krótki zapis wyniku każdej wiadomości — wolne API dostawcy nie blokuje wierszy
+    ani połączeń z puli, a kilka procesów może obsługiwać kolejkę równolegle.
+    """
+    transport = get_transport()
+    sent = 0
+    while True:
+        claims, fetched = _claim_batch(batch_size)
+        for claim in claims:
+            try:
+                transport.send(claim.to_address, claim.subject, claim.html_content)
+            except Exception as e:
+                _record_result(claim, e)
+            else:
+                _record_result(claim, None)
+                sent += 1
+        if fetched < batch_size:
+            break
+    if sent:
+        logger.info("Wysłano %s emaili z kolejki", sent)
+    return sent
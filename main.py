@@ -1,17 +1,105 @@
 import logging
+from contextlib import asynccontextmanager
 
-from fastapi import FastAPI
+from fastapi import FastAPI, Request, status
 from fastapi.middleware.cors import CORSMiddleware
-from fastapi.staticfiles import StaticFiles
+from fastapi.responses import JSONResponse
+from starlette.concurrency import run_in_threadpool
 
-from routers import auth, friends, game_invitations, profile
+import background
+from auth import HashingOverloadedError, init_password_hashing, shutdown_hash_executor
+from database import async_engine
+from games.batalla import (
+    BATALLA_QUESTIONS_RELOAD_SECONDS,
+    BATALLA_SNAPSHOT_INTERVAL_SECONDS,
+    question_bank,
+    snapshot_games_job,
+)
+from games.sudoku import (
+    SUDOKU_BANK_REFILL_SECONDS,
+    SUDOKU_LEADERBOARD_REFRESH_SECONDS,
+    puzzle_bank,
+    rebuild_leaderboard,
+)
+from games.tictactoe import TICTACTOE_SWEEP_INTERVAL_SECONDS, sweep_matches_job
+from invitation_expiry import GAME_INVITATION_EXPIRY_INTERVAL_SECONDS, expire_invitations_job
+from mailer import EMAIL_OUTBOX_POLL_SECONDS, deliver_pending_emails, outbox_wakeup
+from metrics import MetricsMiddleware
+from password_reset import RESET_TOKEN_SWEEP_INTERVAL_SECONDS, sweep_expired_reset_tokens
+from routers import (
+    auth,
+    avatars,
+    batalla,
+    events,
+    friends,
+    game_invitations,
+    health,
+    metrics,
+    profile,
+    stats,
+    sudoku,
+    tictactoe,
+)
+from static_assets import static_assets
+from user_search import rebuild_search_index
 
 logging.basicConfig(
     level=logging.INFO,
     format="%(asctime)s %(levelname)s %(name)s: %(message)s",
 )
 
-app = FastAPI(title="Wielka Studencka Batalla", version="1.0.0")
+logger = logging.getLogger(__name__)
+
+
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    await run_in_threadpool(init_password_hashing)
+    await run_in_threadpool(rebuild_search_index)
+    await run_in_threadpool(rebuild_leaderboard)
+    await run_in_threadpool(question_bank.reload_if_changed)
+    # Bank plansz Sudoku napełniamy od razu po starcie, a potem przy każdym spadku zapasu.
+    puzzle_bank.wakeup.set()
+    tasks = [
+        background.start_periodic(
+            "sweep_reset_tokens", RESET_TOKEN_SWEEP_INTERVAL_SECONDS, sweep_expired_reset_tokens
+        ),
+        background.start_periodic(
+            "expire_game_invitations",
+            GAME_INVITATION_EXPIRY_INTERVAL_SECONDS,
+            expire_invitations_job,
+        ),
+        background.start_periodic(
+            "email_outbox", EMAIL_OUTBOX_POLL_SECONDS, deliver_pending_emails, wake=outbox_wakeup
+        ),
+        background.start_periodic(
+            "sudoku_puzzle_bank",
+            SUDOKU_BANK_REFILL_SECONDS,
+            puzzle_bank.refill,
+            wake=puzzle_bank.wakeup,
+        ),
+        background.start_periodic(
+            "sudoku_leaderboard", SUDOKU_LEADERBOARD_REFRESH_SECONDS, rebuild_leaderboard
+        ),
+        background.start_periodic(
+            "tictactoe_sweep", TICTACTOE_SWEEP_INTERVAL_SECONDS, sweep_matches_job
+        ),
+        background.start_periodic(
+            "batalla_snapshots", BATALLA_SNAPSHOT_INTERVAL_SECONDS, snapshot_games_job
+        ),
+        background.start_periodic(
+            "batalla_questions", BATALLA_QUESTIONS_RELOAD_SECONDS, question_bank.reload_if_changed
+        ),
+    ]
+    yield
+    await background.stop_all(tasks)
+    # Ostatnie akcje w grach Batalli zapisujemy przed wyjściem, żeby dało się je podjąć po restarcie.
+    await snapshot_games_job()
+    shutdown_hash_executor()
+    if async_engine is not None:
+        await async_engine.dispose()
+
+
+app = FastAPI(title="Wielka Studencka Batalla", version="1.0.0", lifespan=lifespan)
 
 ALLOWED_ORIGINS = [
     "http://localhost",
@@ -32,17 +120,40 @@ app.add_middleware(
     allow_credentials=True,
     allow_methods=["*"],
     allow_headers=["*"],
+    expose_headers=["X-Next-Cursor", "X-Total-Count"],
 )
+# Dodany jako ostatni, więc jest najbardziej zewnętrzny — mierzy też CORS i obsługę błędów.
+app.add_middleware(MetricsMiddleware)
+
+
+@app.exception_handler(HashingOverloadedError)
+async def hashing_overloaded_handler(request: Request, exc: HashingOverloadedError):
+    logger.warning("Odrzucono żądanie %s: %s", request.url.path, exc)
+    return JSONResponse(
+        status_code=status.HTTP_503_SERVICE_UNAVAILABLE,
+        content={"detail": "Serwer jest chwilowo przeciążony, spróbuj ponownie za chwilę"},
+        headers={"Retry-After": "1"},
+    )
+
 
 _API_PREFIX = "/api"
 app.include_router(auth.router, prefix=_API_PREFIX)
 app.include_router(profile.router, prefix=_API_PREFIX)
 app.include_router(friends.router, prefix=_API_PREFIX)
 app.include_router(game_invitations.router, prefix=_API_PREFIX)
+app.include_router(health.router, prefix=_API_PREFIX)
+app.include_router(events.router, prefix=_API_PREFIX)
+app.include_router(avatars.router, prefix=_API_PREFIX)
+app.include_router(sudoku.router, prefix=_API_PREFIX)
+app.include_router(tictactoe.router, prefix=_API_PREFIX)
+app.include_router(batalla.router, prefix=_API_PREFIX)
+app.include_router(stats.router, prefix=_API_PREFIX)
+# Bez prefiksu /api — Prometheus domyślnie pobiera /metrics.
+app.include_router(metrics.router)
 
-# Serwowanie plików statycznych (frontend)
+# Serwowanie plików statycznych (frontend) — tylko katalogi z białej listy w static_assets.py
 # Tabele bazy danych należy tworzyć przez migracje (np. Alembic), nie Base.metadata.create_all
-app.mount("/", StaticFiles(directory=".", html=True), name="static")
+app.mount("/", static_assets, name="static")
 
 
 if __name__ == "__main__":
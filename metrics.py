@@ -0,0 +1,259 @@
+"""Metryki żądań HTTP i zapytań do bazy w formacie Prometheusa (GET /metrics).
+
+Middleware mierzy czas każdego żądania per trasa (szablon ścieżki, np.
+/api/game-invitations/status/{invitation_id}, nie konkretny URL). Zdarzenia
+silnika SQLAlchemy liczą zapytania i czas spędzony w bazie i dopisują je do żądania,
+w którego kontekście zostały wykonane (contextvar — działa też w threadpoolu i w
+greenletach trybu async). Zapytania zadań w tle trafiają do osobnego licznika.
+
+Liczniki są w pamięci procesu: przy kilku workerach każdy proces ma własne, a
+Prometheus powinien pobierać je z każdego procesu osobno.
+"""
+import logging
+import os
+import threading
+import time
+from contextvars import ContextVar
+
+from sqlalchemy import event
+
+logger = logging.getLogger(__name__)
+
+# Żądanie wolniejsze niż tyle ms albo z większą liczbą zapytań trafia do logu (0 = wyłączone).
+METRICS_SLOW_REQUEST_MS = float(os.getenv("METRICS_SLOW_REQUEST_MS", "500"))
+METRICS_SLOW_REQUEST_QUERIES = int(os.getenv("METRICS_SLOW_REQUEST_QUERIES", "20"))
+
+_LATENCY_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+_QUERY_BUCKETS = (0, 1, 2, 3, 5, 10, 20, 50, 100)
+
+# Trasy spoza routerów API (pliki statyczne z montowania "/") i adresy bez dopasowania.
+STATIC_ROUTE = "static"
+UNMATCHED_ROUTE = "unmatched"
+
+
+class _RequestStats:
+    __slots__ = ("queries", "db_seconds")
+
+    def __init__(self):
+        self.queries = 0
+        self.db_seconds = 0.0
+
+
+_current_request: ContextVar[_RequestStats | None] = ContextVar("metrics_request", default=None)
+
+
+def _escape(value: str) -> str:
+    return value.replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n")
+
+
+def _labels(names: tuple[str, ...], values: tuple, extra: str = "") -> str:
+    pairs = [f'{name}="{_escape(str(value))}"' for name, value in zip(names, values)]
+    if extra:
+        pairs.append(extra)
+    return "{" + ",".join(pairs) + "}" if pairs else ""
+
+
+def _number(value: float) -> str:
+    return repr(float(value)) if isinstance(value, float) else str(value)
+
+
+class Histogram:
+    """Histogram z kubełkami jak w Prometheusie (liczniki skumulowane liczone przy eksporcie)."""
+
+    def __init__(self, name: str, documentation: str, labelnames: tuple[str, ...], buckets: tuple):
+        self.name = name
+        self.documentation = documentation
+        self.labelnames = labelnames
+        self.buckets = buckets
+        self._lock = threading.Lock()
+        self._series: dict[tuple, list] = {}
+
+    def observe(self, labels: tuple, value: float) -> None:
+        with self._lock:
+            series = self._series.get(labels)
+            if series is None:
+                # Liczniki kubełków (+Inf na końcu), suma, liczba obserwacji.
+                series = self._series[labels] = [[0] * (len(self.buckets) + 1), 0, 0]
+            counts = series[0]
+            for index, bound in enumerate(self.buckets):
+                if value <= bound:
+                    counts[index] += 1
+                    break
+            else:
+                counts[-1] += 1
+            series[1] += value
+            series[2] += 1
+
+    def render(self) -> list[str]:
+        lines = [f"# HELP {self.name} {self.documentation}", f"# TYPE {self.name} histogram"]
+        with self._lock:
+            series = sorted((labels, [list(data[0]), data[1], data[2]]) for labels, data in self._series.items())
+        for labels, (counts, total, count) in series:
+            cumulative = 0
+            for bound, bucket in zip(self.buckets + ("+Inf",), counts):
+                cumulative += bucket
+                le = f'le="{bound if bound == "+Inf" else _number(bound)}"'
+                lines.append(f"{self.name}_bucket{_labels(self.labelnames, labels, le)} {cumulative}")
+            lines.append(f"{self.name}_sum{_labels(self.labelnames, labels)} {_number(total)}")
+            lines.append(f"{self.name}_count{_labels(self.labelnames, labels)} {count}")
+        return lines
+
+
+class Counter:
+    def __init__(self, name: str, documentation: str, labelnames: tuple[str, ...]):
+        self.name = name
+        self.documentation = documentation
+        self.labelnames = labelnames
+        self._lock = threading.Lock()
+        self._values: dict[tuple, float] = {}
+
+    def inc(self, labels: tuple, amount: float = 1) -> None:
+        with self._lock:
+            self._values[labels] = self._values.get(labels, 0) + amount
+
+    def total(self) -> float:
+        with self._lock:
+            return sum(self._values.values())
+
+    def render(self) -> list[str]:
+        lines = [f"# HELP {self.name} {self.documentation}", f"# TYPE {self.name} counter"]
+        with self._lock:
+            values = sorted(self._values.items())
+        for labels, value in values:
+            lines.append(f"{self.name}{_labels(self.labelnames, labels)} {_number(value)}")
+        return lines
+
+
+class RequestMetrics:
+    def __init__(self):
+        route = ("method", "route")
+        self.duration = Histogram(
+            "http_request_duration_seconds", "Czas obsługi żądania HTTP", route, _LATENCY_BUCKETS
+        )
+        self.requests = Counter("http_requests_total", "Liczba żądań HTTP", route + ("status",))
+        self.queries = Histogram(
+            "http_request_db_queries", "Liczba zapytań do bazy w jednym żądaniu", route, _QUERY_BUCKETS
+        )
+        self.db_seconds = Histogram(
+            "http_request_db_seconds", "Czas zapytań do bazy w jednym żądaniu", route, _LATENCY_BUCKETS
+        )
+        self.slow = Counter(
+            "http_slow_requests_total", "Żądania powyżej progu czasu lub liczby zapytań", route
+        )
+        # Wszystkie zapytania procesu: z żądań HTTP i z zadań w tle.
+        self.db_queries = Counter("db_queries_total", "Liczba zapytań do bazy", ("source",))
+        self.db_query_seconds = Counter("db_query_seconds_total", "Łączny czas zapytań do bazy", ("source",))
+        self._in_progress = 0
+        self._lock = threading.Lock()
+
+    def add_in_progress(self, delta: int) -> None:
+        with self._lock:
+            self._in_progress += delta
+
+    def record(self, method: str, route: str, status: int, seconds: float, stats: _RequestStats) -> None:
+        labels = (method, route)
+        self.duration.observe(labels, seconds)
+        self.requests.inc((method, route, status))
+        self.queries.observe(labels, stats.queries)
+        self.db_seconds.observe(labels, stats.db_seconds)
+        too_slow = METRICS_SLOW_REQUEST_MS > 0 and seconds * 1000 > METRICS_SLOW_REQUEST_MS
+        too_many = 0 < METRICS_SLOW_REQUEST_QUERIES < stats.queries
+        if too_slow or too_many:
+            self.slow.inc(labels)
+            logger.warning(
+                "Wolne żądanie %s %s -> %s: %.0f ms, %s zapytań do bazy (%.0f ms)",
+                method, route, status, seconds * 1000, stats.queries, stats.db_seconds * 1000,
+            )
+
+    def render(self) -> str:
+        lines = []
+        for metric in (
+            self.duration, self.requests, self.queries, self.db_seconds,
+            self.slow, self.db_queries, self.db_query_seconds,
+        ):
+            lines += metric.render()
+        lines += [
+            "# HELP http_requests_in_progress Żądania HTTP w trakcie obsługi",
+            "# TYPE http_requests_in_progress gauge",
+            f"http_requests_in_progress {self._in_progress}",
+        ]
+        return "\n".join(lines) + "\n"
+
+    def stats(self) -> dict:
+        return {
+            "requests": int(self.requests.total()),
+            "in_progress": self._in_progress,
+            "slow": int(self.slow.total()),
+            "db_queries": int(self.db_queries.total()),
+        }
+
+
+request_metrics = RequestMetrics()
+
+
+def _route_template(scope) -> str:
+    route = scope.get("route")
+    if route is not None:
+        return route.path
+    # Montowanie "/" z plikami statycznymi ustawia endpoint, ale nie trasę.
+    return STATIC_ROUTE if scope.get("endpoint") is not None else UNMATCHED_ROUTE
+
+
+class MetricsMiddleware:
+    """Middleware ASGI: czas żądania, status i zapytania do bazy per trasa.
+
+    Dla strumieni zdarzeń (text/event-stream) mierzymy czas do wysłania nagłówków —
+    samo połączenie trwa minutami i zaburzałoby histogram.
+    """
+
+    def __init__(self, app):
+        self.app = app
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+        stats = _RequestStats()
+        token = _current_request.set(stats)
+        start = time.perf_counter()
+        status = 500
+        headers_sent_at = None
+
+        async def send_wrapper(message):
+            nonlocal status, headers_sent_at
+            if message["type"] == "http.response.start":
+                status = message["status"]
+                for name, value in message.get("headers", ()):
+                    if name.lower() == b"content-type" and value.startswith(b"text/event-stream"):
+                        headers_sent_at = time.perf_counter()
+            await send(message)
+
+        request_metrics.add_in_progress(1)
+        try:
+            await self.app(scope, receive, send_wrapper)
+        finally:
+            request_metrics.add_in_progress(-1)
+            _current_request.reset(token)
+            end = headers_sent_at or time.perf_counter()
+            request_metrics.record(scope["method"], _route_template(scope), status, end - start, stats)
+
+
+def instrument_queries(sync_engine) -> None:
+    """Podpina liczenie zapytań i czasu w bazie (dla silnika async: `async_engine.sync_engine`)."""
+
+    @event.listens_for(sync_engine, "before_cursor_execute")
+    def _before_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+        if context is not None:
+            context._metrics_start = time.perf_counter()
+
+    @event.listens_for(sync_engine, "after_cursor_execute")
+    def _after_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+        start = getattr(context, "_metrics_start", None)
+        seconds = time.perf_counter() - start if start is not None else 0.0
+        stats = _current_request.get()
+        source = "background" if stats is None else "request"
+        request_metrics.db_queries.inc((source,))
+        request_metrics.db_query_seconds.inc((source,), seconds)
+        if stats is not None:
+            stats.queries += 1
+            stats.db_seconds += seconds
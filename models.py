@@ -1,4 +1,4 @@
-from sqlalchemy import Column, Integer, String, DateTime, Text, ForeignKey, Enum, UniqueConstraint
+from sqlalchemy import Column, Integer, String, DateTime, Text, ForeignKey, Enum, UniqueConstraint, Index, LargeBinary, text
 from database import Base
 from datetime import datetime, timezone
 import enum
@@ -17,22 +17,43 @@ class GameInvitationStatus(enum.Enum):
     EXPIRED = "expired"
 
 
+class Avatar(Base):
+    """Konfiguracja awatara zapisana raz, adresowana hashem treści (SHA-256 kanonicznego JSON-a)."""
+
+    __tablename__ = "avatars"
+
+    hash = Column(String(64), primary_key=True)
+    config = Column(Text, nullable=False)
+    created_at = Column(DateTime(timezone=True), default=lambda: datetime.now(timezone.utc))
+
+
 class User(Base):
     __tablename__ = "users"
+    __table_args__ = (
+        # Wyszukiwanie ILIKE '%fraza%' (wymaga rozszerzenia pg_trgm, patrz migracja).
+        Index(
+            "ix_users_username_trgm",
+            "username",
+            postgresql_using="gin",
+            postgresql_ops={"username": "gin_trgm_ops"},
+        ),
+    )
 
     id = Column(Integer, primary_key=True, index=True)
     username = Column(String, unique=True, index=True)
     email = Column(String, unique=True, index=True)
     hashed_password = Column(String)
-    reset_token = Column(String, nullable=True)
-    reset_token_expires = Column(DateTime(timezone=True), nullable=True)
-    avatar = Column(Text, nullable=True)  # JSON z konfiguracją awatara
+    avatar_hash = Column(String(64), ForeignKey("avatars.hash"), nullable=True)
 
 
 class Friendship(Base):
     __tablename__ = "friendships"
     __table_args__ = (
         UniqueConstraint("requester_id", "addressee_id", name="uq_friendship_pair"),
+        # Lista znajomych i zaproszeń filtruje po jednej stronie relacji i statusie;
+        # (updated_at, id) to klucz strony "recent" — gałęzie UNION czytają indeks od kursora.
+        Index("ix_friendships_requester_status_updated", "requester_id", "status", "updated_at", "id"),
+        Index("ix_friendships_addressee_status_updated", "addressee_id", "status", "updated_at", "id"),
     )
 
     id = Column(Integer, primary_key=True, index=True)
@@ -40,11 +61,44 @@ class Friendship(Base):
     addressee_id = Column(Integer, ForeignKey("users.id", ondelete="CASCADE"), nullable=False)
     status = Column(Enum(FriendshipStatus), default=FriendshipStatus.PENDING)
     created_at = Column(DateTime(timezone=True), default=lambda: datetime.now(timezone.utc))
-    updated_at = Column(DateTime(timezone=True), default=lambda: datetime.now(timezone.utc), onupdate=lambda: datetime.now(timezone.utc))
+    updated_at = Column(
+        DateTime(timezone=True),
+        nullable=False,
+        default=lambda: datetime.now(timezone.utc),
+        onupdate=lambda: datetime.now(timezone.utc),
+    )
+
+
+# Enum zapisuje w bazie nazwy członków ('PENDING'), nie wartości ('pending').
+_PENDING_INVITATION = text("status = 'PENDING'")
 
 
 class GameInvitation(Base):
     __tablename__ = "game_invitations"
+    __table_args__ = (
+        # Indeksy częściowe obejmują tylko aktywne zaproszenia — rozmiar nie rośnie
+        # z historią zaakceptowanych, odrzuconych i wygasłych.
+        Index(
+            "ix_game_invitations_pending_invitee",
+            "invitee_id",
+            "created_at",
+            postgresql_where=_PENDING_INVITATION,
+            sqlite_where=_PENDING_INVITATION,
+        ),
+        Index(
+            "ix_game_invitations_pending_inviter",
+            "inviter_id",
+            "invitee_id",
+            postgresql_where=_PENDING_INVITATION,
+            sqlite_where=_PENDING_INVITATION,
+        ),
+        Index(
+            "ix_game_invitations_pending_created",
+            "created_at",
+            postgresql_where=_PENDING_INVITATION,
+            sqlite_where=_PENDING_INVITATION,
+        ),
+    )
 
     id = Column(Integer, primary_key=True, index=True)
     inviter_id = Column(Integer, ForeignKey("users.id", ondelete="CASCADE"), nullable=False)
@@ -53,3 +107,104 @@ class GameInvitation(Base):
     status = Column(Enum(GameInvitationStatus), default=GameInvitationStatus.PENDING)
     created_at = Column(DateTime(timezone=True), default=lambda: datetime.now(timezone.utc))
     updated_at = Column(DateTime(timezone=True), default=lambda: datetime.now(timezone.utc), onupdate=lambda: datetime.now(timezone.utc))
+
+
+class PasswordResetToken(Base):
+    __tablename__ = "password_reset_tokens"
+
+    id = Column(Integer, primary_key=True, index=True)
+    user_id = Column(Integer, ForeignKey("users.id", ondelete="CASCADE"), nullable=False, index=True)
+    token_hash = Column(String(64), nullable=False, unique=True)  # HMAC-SHA256 kodu, nie sam kod
+    expires_at = Column(DateTime(timezone=True), nullable=False, index=True)
+    created_at = Column(DateTime(timezone=True), default=lambda: datetime.now(timezone.utc))
+
+
+class EmailOutboxStatus(enum.Enum):
+    PENDING = "pending"
+    SENDING = "sending"  # zarezerwowana przez workera do końca dzierżawy (next_attempt_at)
+    FAILED = "failed"
+
+
+class EmailOutbox(Base):
+    __tablename__ = "email_outbox"
+    __table_args__ = (
+        # Worker pobiera oczekujące wiadomości i wygasłe dzierżawy w kolejności next_attempt_at.
+        Index("ix_email_outbox_status_next_attempt", "status", "next_attempt_at"),
+    )
+
+    id = Column(Integer, primary_key=True, index=True)
+    to_address = Column(String, nullable=False)
+    subject = Column(String, nullable=False)
+    html_content = Column(Text, nullable=False)
+    status = Column(Enum(EmailOutboxStatus), nullable=False, default=EmailOutboxStatus.PENDING)
+    attempts = Column(Integer, nullable=False, default=0)
+    next_attempt_at = Column(DateTime(timezone=True), nullable=False, default=lambda: datetime.now(timezone.utc))
+    expires_at = Column(DateTime(timezone=True), nullable=True)  # po tym czasie wiadomość nie ma sensu (np. kod resetu)
+    last_error = Column(Text, nullable=True)
+    created_at = Column(DateTime(timezone=True), default=lambda: datetime.now(timezone.utc))
+
+
+class SudokuResult(Base):
+    __tablename__ = "sudoku_results"
+    __table_args__ = (
+        # Najlepszy czas użytkownika na poziomie (odbudowa rankingu w pamięci).
+        Index("ix_sudoku_results_user_difficulty_seconds", "user_id", "difficulty", "seconds"),
+    )
+
+    id = Column(Integer, primary_key=True, index=True)
+    user_id = Column(Integer, ForeignKey("users.id", ondelete="CASCADE"), nullable=False)
+    # Identyfikator wydanej planszy (z tokena) — każdą planszę można zgłosić tylko raz.
+    puzzle_id = Column(String(32), nullable=False, unique=True)
+    difficulty = Column(String(10), nullable=False)
+    seconds = Column(Integer, nullable=False)
+    created_at = Column(DateTime(timezone=True), default=lambda: datetime.now(timezone.utc))
+
+
+class TicTacToeMatch(Base):
+    """Zakończona partia kółka i krzyżyka (trwające są tylko w pamięci procesu)."""
+
+    __tablename__ = "tictactoe_matches"
+
+    id = Column(Integer, primary_key=True, index=True)
+    invitation_id = Column(Integer, ForeignKey("game_invitations.id", ondelete="SET NULL"), nullable=True, unique=True)
+    player_x_id = Column(Integer, ForeignKey("users.id", ondelete="CASCADE"), nullable=False, index=True)
+    player_o_id = Column(Integer, ForeignKey("users.id", ondelete="CASCADE"), nullable=False, index=True)
+    winner_id = Column(Integer, ForeignKey("users.id", ondelete="CASCADE"), nullable=True)
+    outcome = Column(String(10), nullable=False)  # line / draw / resign / timeout
+    moves = Column(String(9), nullable=False)  # kolejne pola 0–8, X zaczyna
+    started_at = Column(DateTime(timezone=True), nullable=False)
+    finished_at = Column(DateTime(timezone=True), nullable=False)
+
+
+class BatallaGame(Base):
+    """Migawka gry w Wielką Studencką Batallę (stan z silnika games/batalla, zapisywany co kilka sekund)."""
+
+    __tablename__ = "batalla_games"
+
+    id = Column(Integer, primary_key=True, index=True)
+    invitation_id = Column(Integer, ForeignKey("game_invitations.id", ondelete="SET NULL"), nullable=True, unique=True)
+    status = Column(String(10), nullable=False)  # lobby / playing / finished
+    winner_id = Column(Integer, ForeignKey("users.id", ondelete="SET NULL"), nullable=True)
+    version = Column(Integer, nullable=False)  # liczba wykonanych akcji
+    state = Column(LargeBinary, nullable=False)  # Game.to_snapshot(): ziarno, gracze, talia
+    created_at = Column(DateTime(timezone=True), default=lambda: datetime.now(timezone.utc))
+    updated_at = Column(DateTime(timezone=True), default=lambda: datetime.now(timezone.utc), onupdate=lambda: datetime.now(timezone.utc))
+
+
+class UserStats(Base):
+    """Statystyki gracza aktualizowane przy zdarzeniach (user_stats.py); game_type '*' to sumy i znajomi."""
+
+    __tablename__ = "user_stats"
+
+    # Klucz (user_id, game_type) — strona statystyk czyta wszystkie wiersze gracza jednym zapytaniem po indeksie.
+    user_id = Column(Integer, ForeignKey("users.id", ondelete="CASCADE"), primary_key=True)
+    game_type = Column(String(40), primary_key=True)
+    invited = Column(Integer, nullable=False, default=0)  # wysłane zaproszenia
+    accepted = Column(Integer, nullable=False, default=0)  # przyjęte zaproszenia
+    played = Column(Integer, nullable=False, default=0)
+    won = Column(Integer, nullable=False, default=0)
+    drawn = Column(Integer, nullable=False, default=0)
+    current_streak = Column(Integer, nullable=False, default=0)  # wygrane z rzędu
+    best_streak = Column(Integer, nullable=False, default=0)
+    friends = Column(Integer, nullable=False, default=0)  # tylko w wierszu '*'
+    updated_at = Column(DateTime(timezone=True), default=lambda: datetime.now(timezone.utc), onupdate=lambda: datetime.now(timezone.utc))
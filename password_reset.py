@@ -0,0 +1,86 @@
+import hashlib
+import hmac
+import logging
+import os
+import secrets
+from datetime import datetime, timedelta, timezone
+
+from sqlalchemy import delete, select
+from sqlalchemy.exc import IntegrityError
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from auth import SECRET_KEY
+from database import SessionLocal
+from models import PasswordResetToken, User
+
+logger = logging.getLogger(__name__)
+
+RESET_TOKEN_TTL_MINUTES = 15
+RESET_TOKEN_SWEEP_INTERVAL_SECONDS = float(os.getenv("RESET_TOKEN_SWEEP_INTERVAL_SECONDS", "300"))
+RESET_TOKEN_SWEEP_BATCH_SIZE = int(os.getenv("RESET_TOKEN_SWEEP_BATCH_SIZE", "1000"))
+
+_ISSUE_ATTEMPTS = 5
+
+
+def hash_reset_code(code: str) -> str:
+    # 6-cyfrowy kod ma tylko milion wartości, więc zwykły SHA-256 dałoby się odwrócić
+    # słownikiem — HMAC z SECRET_KEY chroni kody nawet po wycieku tabeli.
+    return hmac.new(SECRET_KEY.encode(), code.encode(), hashlib.sha256).hexdigest()
+
+
+def _generate_code() -> str:
+    return "".join(str(secrets.randbelow(10)) for _ in range(6))
+
+
+async def issue_reset_code(db: AsyncSession, user: User) -> tuple[str, datetime]:
+    """Zapisuje nowy kod resetowania (unieważniając poprzednie) i zwraca go wraz z datą ważności."""
+    await db.execute(delete(PasswordResetToken).where(PasswordResetToken.user_id == user.id))
+    await db.commit()
+
+    expires_at = datetime.now(timezone.utc) + timedelta(minutes=RESET_TOKEN_TTL_MINUTES)
+    for _ in range(_ISSUE_ATTEMPTS):
+        code = _generate_code()
+        db.add(PasswordResetToken(
+            user_id=user.id,
+            token_hash=hash_reset_code(code),
+            expires_at=expires_at,
+        ))
+        try:
+            await db.commit()
+            return code, expires_at
+        except IntegrityError:
+            # Ten sam kod jest właśnie aktywny u innego użytkownika — losujemy ponownie.
+            await db.rollback()
+    raise RuntimeError("Nie udało się wygenerować unikalnego kodu resetowania")
+
+
+async def find_reset_token(db: AsyncSession, code: str) -> PasswordResetToken | None:
+    return await db.scalar(
+        select(PasswordResetToken).where(PasswordResetToken.token_hash == hash_reset_code(code))
+    )
+
+
+def sweep_expired_reset_tokens(batch_size: int = RESET_TOKEN_SWEEP_BATCH_SIZE) -> int:
+    """Usuwa wygasłe kody partiami (krótkie transakcje, bez długich blokad)."""
+    deleted = 0
+    now = datetime.now(timezone.utc)
+    with SessionLocal() as db:
+        while True:
+            expired_ids = (
+                select(PasswordResetToken.id)
+                .where(PasswordResetToken.expires_at < now)
+                .limit(batch_size)
+                .scalar_subquery()
+            )
+            result = db.execute(
+                delete(PasswordResetToken)
+                .where(PasswordResetToken.id.in_(expired_ids))
+                .execution_options(synchronize_session=False)
+            )
+            db.commit()
+            deleted += result.rowcount
+            if result.rowcount < batch_size:
+                break
+    if deleted:
+        logger.info("Usunięto %s wygasłych kodów resetowania hasła", deleted)
+    return deleted
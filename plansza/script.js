@@ -130,7 +130,15 @@ const colors = {
     spodnie: ["czarne", "biale", "szare", "niebieskie"]
 };
 
-function renderAvatar(avatarState, container) {
+// Karty bez dodatków mają jeden <img class="avatar-image"> z obrazkiem wyrenderowanym
+// przez serwer (/api/avatars/<hash>.png). Warstwy składamy tylko tam, gdzie dodatek
+// (zzz, okulary) leży między warstwami awatara.
+function renderAvatar(avatarState, container, avatarUrl) {
+
+    const avatarImage = container.querySelector(".avatar-image");
+    if (avatarImage && avatarUrl) {
+        avatarImage.src = avatarUrl;
+    }
 
     const parts = ["skora", "usta", "oczy", "wlosy", "koszulka", "spodnie"];
 
@@ -210,7 +218,7 @@ document.addEventListener("DOMContentLoaded", () => {
             if (!containers.length) return;
 
             containers.forEach(container => {
-                renderAvatar(avatarState, container); // ✔️ poprawne wywołanie
+                renderAvatar(avatarState, container, userData.avatar_url);
             });
 
         } catch (err) {
@@ -277,8 +285,12 @@ var API_URL = '/api';
 var pendingInvitationId = null;
 var outgoingPollTimer   = null;
 var incomingPollTimer   = null;
+var pushConnected       = false;  // strumień zdarzeń działa — polling wyłączony
 var pendingIncomingId   = null;
 var opponentName        = 'Bot';
+var onlineGameId        = null;   // gra ze znajomym — stan i ruchy na serwerze (/api/batalla)
+var onlineVersion       = null;
+var onlinePollTimer     = null;
 
 function returnToMainPage() {
   window.location.href = '../index.html';
@@ -382,7 +394,11 @@ document.addEventListener("DOMContentLoaded", function() {
     setConfirmationOpen(false);
     document.body.classList.remove('confirmation-open');
     if (overlay) overlay.style.display = 'none';
-    initGame(selectedClass);
+    if (onlineGameId) {
+      startOnlineGame(selectedClass);
+    } else {
+      initGame(selectedClass);
+    }
   });
 }
 
@@ -401,11 +417,12 @@ document.addEventListener("DOMContentLoaded", function() {
       .then(function(r) { return r.json(); })
       .then(function(data) {
         document.getElementById('inc-modal').classList.remove('show');
-        clearInterval(incomingPollTimer);
+        stopIncomingTimer();
         opponentName = data.inviter || 'Znajomy';
+        onlineGameId = data.game_id || null;
         pendingIncomingId = null;
         showClassSelectionPopup();
-        incomingPollTimer = setInterval(checkIncoming, 5000);  // ← WZNÓW POLLING
+        startIncomingTimer();  // ← WZNÓW POLLING (jeśli nie ma strumienia zdarzeń)
     })
       .catch(function(e) { alert('Błąd: ' + e.message); });
     });
@@ -422,8 +439,8 @@ document.addEventListener("DOMContentLoaded", function() {
     .finally(function() {
       document.getElementById('inc-modal').classList.remove('show');
       pendingIncomingId = null;
-      clearInterval(incomingPollTimer);
-      incomingPollTimer = setInterval(checkIncoming, 5000);  // ← WZNÓW POLLING
+      stopIncomingTimer();
+      startIncomingTimer();  // ← WZNÓW POLLING (jeśli nie ma strumienia zdarzeń)
     });
   });
 }
@@ -444,23 +461,40 @@ function openFriendPicker() {
     var list = document.getElementById('fp-list');
     list.innerHTML = '<div class="fp-loading">Wczytuję znajomych...</div>';
     document.getElementById('fp-modal').classList.add('show');
+    loadFriendPickerPage(null);
+}
+
+// Lista znajomych jest stronicowana — kolejne strony po kliknięciu "Pokaż więcej"
+function loadFriendPickerPage(cursor) {
+    var token = localStorage.getItem('access_token');
+    var list = document.getElementById('fp-list');
+    var url = API_URL + '/friends' + (cursor ? '?cursor=' + encodeURIComponent(cursor) : '');
 
-    fetch(API_URL + '/friends', {
+    fetch(url, {
         headers: { 'Authorization': 'Bearer ' + token }
     })
     .then(function(r) {
         if (!r.ok) throw new Error('HTTP ' + r.status);
-        return r.json();
+        var nextCursor = r.headers.get('X-Next-Cursor');
+        return r.json().then(function(friends) { return { friends: friends, nextCursor: nextCursor }; });
     })
-    .then(function(friends) {
-        if (!friends.length) {
+    .then(function(page) {
+        var friends = page.friends;
+        if (!cursor && !friends.length) {
             list.innerHTML = '<p class="fp-empty">Brak znajomych.<br>Dodaj ich w zakładce <a href="../znajomi/">Znajomi</a>!</p>';
-        } else {
-            list.innerHTML = friends.map(function(f) {
-                var safe = escapeHtml(f.username);
-                return '<div class="fp-item"><span class="fp-username">' + safe +
-                    '</span><button class="fp-invite-btn" onclick="inviteFriend(\'' + safe + '\')">Zaproś</button></div>';
-            }).join('');
+            return;
+        }
+        if (!cursor) list.innerHTML = '';
+        var more = document.getElementById('fp-more');
+        if (more) more.remove();
+        list.insertAdjacentHTML('beforeend', friends.map(function(f) {
+            var safe = escapeHtml(f.username);
+            return '<div class="fp-item"><span class="fp-username">' + safe +
+                '</span><button class="fp-invite-btn" onclick="inviteFriend(\'' + safe + '\')">Zaproś</button></div>';
+        }).join(''));
+        if (page.nextCursor) {
+            list.insertAdjacentHTML('beforeend',
+                '<button id="fp-more" class="fp-invite-btn" onclick="loadFriendPickerPage(\'' + page.nextCursor + '\')">Pokaż więcej</button>');
         }
     })
     .catch(function(e) {
@@ -501,7 +535,7 @@ function inviteFriend(username) {
         document.getElementById('wait-name').textContent = username;
         document.getElementById('wait-modal').classList.add('show');
         setFriendBtnWaiting(username);
-        outgoingPollTimer = setInterval(pollOutgoing, 3000);
+        startOutgoingPoll();
     })
     .catch(function(e) { alert('Błąd: ' + e.message); });
 }
@@ -521,7 +555,7 @@ function recoverPendingInvitation(preferredUsername) {
         document.getElementById('wait-name').textContent = username;
         document.getElementById('wait-modal').classList.add('show');
         setFriendBtnWaiting(username);
-        if (!outgoingPollTimer) outgoingPollTimer = setInterval(pollOutgoing, 3000);
+        startOutgoingPoll();
         return null; // zablokuj domyślny handler
     });
 }
@@ -533,25 +567,36 @@ function pollOutgoing() {
         headers: { 'Authorization': 'Bearer ' + token }
     })
     .then(function(r) { return r.json(); })
-    .then(function(data) {
-        if (data.status === 'accepted') {
-            clearInterval(outgoingPollTimer); outgoingPollTimer = null;
-            document.getElementById('wait-modal').classList.remove('show');
-            resetFriendBtn();
-            showClassSelectionPopup();
-        } else if (data.status === 'declined' || data.status === 'expired') {
-            clearInterval(outgoingPollTimer); outgoingPollTimer = null;
-            document.getElementById('wait-modal').classList.remove('show');
-            resetFriendBtn();
-            pendingInvitationId = null;
-            alert('Znajomy ' + (data.status === 'declined' ? 'odrzucił zaproszenie.' : 'nie odpowiedział w czasie.'));
-        }
-    })
+    .then(function(data) { handleOutgoingStatus(data.status); })
     .catch(function() {});
 }
 
-function cancelInvitation() {
+function handleOutgoingStatus(status) {
+    if (status === 'accepted') {
+        stopOutgoingPoll();
+        document.getElementById('wait-modal').classList.remove('show');
+        resetFriendBtn();
+        onlineGameId = pendingInvitationId;  // id gry = id zaproszenia
+        showClassSelectionPopup();
+    } else if (status === 'declined' || status === 'expired') {
+        stopOutgoingPoll();
+        document.getElementById('wait-modal').classList.remove('show');
+        resetFriendBtn();
+        pendingInvitationId = null;
+        alert('Znajomy ' + (status === 'declined' ? 'odrzucił zaproszenie.' : 'nie odpowiedział w czasie.'));
+    }
+}
+
+function startOutgoingPoll() {
+    if (!pushConnected && !outgoingPollTimer) outgoingPollTimer = setInterval(pollOutgoing, 3000);
+}
+
+function stopOutgoingPoll() {
     clearInterval(outgoingPollTimer); outgoingPollTimer = null;
+}
+
+function cancelInvitation() {
+    stopOutgoingPoll();
     document.getElementById('wait-modal').classList.remove('show');
     resetFriendBtn();
     if (!pendingInvitationId) return;
@@ -612,7 +657,61 @@ function resetFriendBtn() {
 
 function startIncomingPoll() {
     checkIncoming();
-    incomingPollTimer = setInterval(checkIncoming, 5000);
+    startIncomingTimer();
+    startInvitationEvents();
+}
+
+function startIncomingTimer() {
+    if (!pushConnected && !incomingPollTimer) incomingPollTimer = setInterval(checkIncoming, 5000);
+}
+
+function stopIncomingTimer() {
+    clearInterval(incomingPollTimer); incomingPollTimer = null;
+}
+
+// Zdarzenia push (js/events.js): przy działającym strumieniu nie ma pollingu,
+// a po utracie połączenia polling wraca do czasu ponownego połączenia.
+function startInvitationEvents() {
+    if (typeof connectInvitationEvents !== 'function') return;
+    connectInvitationEvents({
+        onConnected: function() {
+            pushConnected = true;
+            stopIncomingTimer();
+            stopOutgoingPoll();
+            checkIncoming();
+            if (pendingInvitationId) pollOutgoing();
+            stopOnlinePoll();
+            if (onlineGameId) loadOnlineGame();
+        },
+        onDisconnected: function() {
+            pushConnected = false;
+            startIncomingTimer();
+            if (pendingInvitationId) startOutgoingPoll();
+            if (onlineGameId) startOnlinePoll();
+        },
+        onEvent: function(type, data) {
+            if (type === 'batalla.updated') {
+                if (data.id === onlineGameId) applyOnlineState(data);
+                return;
+            }
+            if (data.game_type !== 'wielka-studencka-batalla') return;
+            if (type === 'invitation.created') {
+                showIncomingInvitation(data.id, data.inviter_username);
+            } else if ((type === 'invitation.cancelled' || type === 'invitation.expired') && data.id === pendingIncomingId) {
+                document.getElementById('inc-modal').classList.remove('show');
+                pendingIncomingId = null;
+            } else if (data.id === pendingInvitationId) {
+                handleOutgoingStatus(data.status);
+            }
+        }
+    });
+}
+
+function showIncomingInvitation(id, username) {
+    if (pendingIncomingId || document.getElementById('inc-modal').classList.contains('show')) return;
+    pendingIncomingId = id;
+    document.getElementById('inc-from').textContent = username;
+    document.getElementById('inc-modal').classList.add('show');
 }
 
 function checkPendingOutgoing() {
@@ -631,7 +730,7 @@ function checkPendingOutgoing() {
         document.getElementById('wait-name').textContent = inv.invitee_username;
         document.getElementById('wait-modal').classList.add('show');
         setFriendBtnWaiting(inv.invitee_username);
-        if (!outgoingPollTimer) outgoingPollTimer = setInterval(pollOutgoing, 3000);
+        startOutgoingPoll();
     })
     .catch(function() {});
 }
@@ -647,11 +746,7 @@ function checkIncoming() {
     .then(function(r) { return r.json(); })
     .then(function(invs) {
       var inv = invs.find(function(i) { return i.game_type === 'wielka-studencka-batalla'; });
-    if (inv && !pendingIncomingId) {  // ← DODAJ WARUNEK
-      pendingIncomingId = inv.id;
-      document.getElementById('inc-from').textContent = inv.inviter.username;
-      document.getElementById('inc-modal').classList.add('show');
-    }
+      if (inv) showIncomingInvitation(inv.id, inv.inviter.username);
   })
     .catch(function() {});
 }
@@ -731,6 +826,10 @@ function initGame(playerClass) {
 }
 
 function rollDice() {
+    if (onlineGameId) {
+        onlineAction('roll');
+        return;
+    }
     if (!gameState || gameState.rolled || gameState.gameOver) return;
     var player = gameState.players[gameState.turn];
     if (player.skip) {
@@ -803,8 +902,8 @@ function updateGamePanel() {
     document.getElementById('gp-p1').classList.toggle('gp-active', gameState.turn === 0 && !gameState.gameOver);
     document.getElementById('gp-p2').classList.toggle('gp-active', gameState.turn === 1 && !gameState.gameOver);
 
-    _prevStats[0] = { hp: p1.hp, wisdom: p1.wisdom, luck: p1.luck };
-    _prevStats[1] = { hp: p2.hp, wisdom: p2.wisdom, luck: p2.luck };
+    _prevStats[0] = { hp: p1.hp, wisdom: p1.wisdom, luck: p1.luck, coins: p1.coins, crystals: p1.crystals };
+    _prevStats[1] = { hp: p2.hp, wisdom: p2.wisdom, luck: p2.luck, coins: p2.coins, crystals: p2.crystals };
 }
 
 function renderStatBar(id, player, prev) {
@@ -828,6 +927,14 @@ function renderStatBar(id, player, prev) {
         '<span class="s-hp'  + hpFlash  + '">' + hearts              + hpDelta  + '</span>' +
         '<span class="s-wis' + wisFlash + '">' + '🧠 ' + player.wisdom + wisDelta + '</span>' +
         '<span class="s-luk' + lukFlash + '">' + '⭐ '  + player.luck   + lukDelta + '</span>';
+
+    // Monety i kryształki są tylko w grze online (zasady z serwera).
+    if (player.coins === undefined) return;
+    var coinDelta = (prev && prev.coins    !== player.coins)    ? getDelta(prev.coins,    player.coins)    : '';
+    var crysDelta = (prev && prev.crystals !== player.crystals) ? getDelta(prev.crystals, player.crystals) : '';
+    el.innerHTML +=
+        '<span class="s-coin">' + '💰 ' + player.coins + coinDelta + '</span>' +
+        '<span class="s-crys">' + '💎 ' + player.crystals + crysDelta + ' · piętro ' + player.floor + '</span>';
 }
 
 function getDelta(oldVal, newVal) {
@@ -839,4 +946,180 @@ function getDelta(oldVal, newVal) {
 function showMsg(text) {
     var el = document.getElementById('gp-msg');
     if (el) el.textContent = text;
-}
\ No newline at end of file
+}
+
+// ==========================================
+// GRA ONLINE (silnik na serwerze: /api/batalla)
+// ==========================================
+// Serwer pilnuje zasad, rzuca kostką i losuje karty; klient tylko wysyła akcje
+// i rysuje stan, który przychodzi w odpowiedzi albo zdarzeniem batalla.updated.
+
+var POLA_NAZWY = {
+    start: 'Start', sala: 'Sala', lazienka: 'Łazienka', aula: 'Aula', dziekanat: 'Dziekanat',
+    praktyki: 'Praktyki', szansa: 'Szansa', biblioteka: 'Biblioteka', strefarelaksu: 'Strefa relaksu'
+};
+
+var POZIOMY_PYTAN = ['łatwe', 'średnie', 'trudne', 'bardzo trudne'];
+
+var OPCJE_NAZWY = {
+    bonus:      { coin: '+1 moneta', hp: '+1 HP', luck: '+1 szczęście' },
+    biblioteka: { hint: 'Podpowiedź (1 moneta)', crystal: '2 monety → kryształek', end: 'Dalej' },
+    dziekanat:  {
+        prepay: 'Czesne z góry', hp: '2 monety → 1 HP', crystal: '3 monety → kryształek',
+        card: 'Karta krótszych praktyk', advance: 'Wyższe piętro', defend: 'Obrona', end: 'Wyjdź'
+    }
+};
+
+function startOnlineGame(playerClass) {
+    _prevStats = [null, null];
+    onlineVersion = null;
+    document.getElementById('gp-p1').style.display    = 'flex';
+    document.getElementById('gp-p2').style.display    = 'flex';
+    document.getElementById('dice-panel').style.display = 'flex';
+    document.getElementById('dice-btn').disabled = true;
+    showMsg('Czekamy na wybór klasy przeciwnika...');
+    onlineAction('class', playerClass);
+    startOnlinePoll();
+}
+
+function onlineAction(action, value) {
+    var token = localStorage.getItem('access_token');
+    document.getElementById('dice-btn').disabled = true;
+    return fetch(API_URL + '/batalla/games/' + onlineGameId + '/actions', {
+        method: 'POST',
+        headers: { 'Authorization': 'Bearer ' + token, 'Content-Type': 'application/json' },
+        // Wersja stanu chroni przed podwójnym kliknięciem; klasy obaj gracze wybierają naraz.
+        body: JSON.stringify({ action: action, value: value || null, version: action === 'class' ? null : onlineVersion })
+    })
+    .then(function(r) {
+        return r.json().then(function(d) { return { ok: r.ok, data: d }; });
+    })
+    .then(function(res) {
+        if (res.ok) {
+            applyOnlineState(res.data);
+        } else {
+            showMsg(res.data.detail || 'Niedozwolony ruch');
+            loadOnlineGame();
+        }
+    })
+    .catch(function(e) { showMsg('Błąd: ' + e.message); });
+}
+
+function loadOnlineGame() {
+    if (!onlineGameId) return;
+    var token = localStorage.getItem('access_token');
+    fetch(API_URL + '/batalla/games/' + onlineGameId, {
+        headers: { 'Authorization': 'Bearer ' + token }
+    })
+    .then(function(r) { return r.ok ? r.json() : null; })
+    .then(function(state) { if (state) applyOnlineState(state); })
+    .catch(function() {});
+}
+
+function startOnlinePoll() {
+    if (!pushConnected && !onlinePollTimer) onlinePollTimer = setInterval(loadOnlineGame, 2000);
+}
+
+function stopOnlinePoll() {
+    clearInterval(onlinePollTimer); onlinePollTimer = null;
+}
+
+function applyOnlineState(state) {
+    if (onlineVersion !== null && state.version < onlineVersion) return;  // spóźnione zdarzenie
+    onlineVersion = state.version;
+
+    // Własny panel zawsze na dole (indeks 0), jak w grze z botem.
+    var order = state.you === 0 ? [0, 1] : [1, 0];
+    gameState = {
+        players: order.map(function(i) {
+            var p = state.players[i];
+            return {
+                id: i, name: p.username + (i === state.you ? ' (Ty)' : ''), pos: p.cell, klass: p.class || '?',
+                hp: p.hp, luck: p.luck, wisdom: p.wisdom, coins: p.coins, crystals: p.crystals, floor: p.floor
+            };
+        }),
+        turn: state.turn === null ? -1 : order.indexOf(state.turn),
+        rolled: false,
+        gameOver: state.phase === 'finished',
+    };
+    placeTokens();
+    updateGamePanel();
+    if (state.last_roll) document.getElementById('dice-num').textContent = state.last_roll;
+
+    var myTurn = state.phase === 'playing' && state.turn === state.you;
+    document.getElementById('dice-btn').disabled = !myTurn || !!state.pending;
+    renderOnlineChoices(myTurn ? state : null);
+
+    var msg = describeOnlineEvents(state);
+    if (state.phase === 'lobby') {
+        msg = 'Czekamy na wybór klasy przeciwnika...';
+    } else if (state.phase === 'playing') {
+        var hint;
+        if (state.question) {
+            hint = (myTurn ? '' : state.players[state.turn].username + ' odpowiada: ') + state.question.question;
+        } else if (myTurn) {
+            hint = state.pending ? 'Wybierz, co robisz.' : 'Twoja tura – rzuć kostką!';
+        } else {
+            hint = 'Tura ' + state.players[state.turn].username + '...';
+        }
+        msg = msg ? msg + ' · ' + hint : hint;
+    } else {
+        stopOnlinePoll();
+    }
+    showMsg(msg);
+}
+
+function renderOnlineChoices(state) {
+    var box = document.getElementById('gp-choices');
+    if (!box) return;
+    box.innerHTML = '';
+    if (!state || !state.pending) return;
+    if (state.question) {
+        state.question.answers.forEach(function(answer) {
+            var btn = document.createElement('button');
+            btn.textContent = answer.text;
+            btn.addEventListener('click', function() {
+                box.innerHTML = '';
+                onlineAction('answer', String(answer.index));
+            });
+            box.appendChild(btn);
+        });
+        return;
+    }
+    var labels = OPCJE_NAZWY[state.pending] || {};
+    state.options.forEach(function(option) {
+        var btn = document.createElement('button');
+        btn.textContent = labels[option] || option;
+        btn.addEventListener('click', function() {
+            box.innerHTML = '';
+            onlineAction('choose', option);
+        });
+        box.appendChild(btn);
+    });
+}
+
+function describeOnlineEvents(state) {
+    return state.events.map(function(e) {
+        var n = state.players[e.player].username;
+        switch (e.type) {
+            case 'start':   return 'Gra rozpoczęta!';
+            case 'roll':    return n + ' wyrzuca ' + e.value;
+            case 'field':   return POLA_NAZWY[e.field] || e.field;
+            case 'exam':    return (e.questions > 1 ? e.questions + ' pytania' : 'pytanie') + ' (' + POZIOMY_PYTAN[e.level] + ')';
+            case 'answer':  return e.correct ? '✔ dobra odpowiedź' : '✘ zła odpowiedź';
+            case 'exam_result': return 'wynik: ' + e.correct + '/' + e.questions;
+            case 'card':    return 'Szansa: "' + e.text + '"';
+            case 'tuition':
+                if (e.paid) return n + ' płaci czesne';
+                if (e.lost === 'crystal') return n + ' nie ma na czesne → -1 kryształek';
+                if (e.lost === 'floor') return n + ' nie ma na czesne → piętro niżej';
+                return n + ' nie ma na czesne';
+            case 'skip':    return n + ' traci turę (praktyki)';
+            case 'floor':   return n + ' wchodzi na piętro ' + (e.floor + 1);
+            case 'resign':  return n + ' poddaje grę';
+            case 'out':     return n + ' odpada z gry';
+            case 'win':     return '🎓 Wygrywa ' + n + '!';
+            default:        return '';
+        }
+    }).filter(Boolean).join(' · ');
+}
@@ -1,22 +1,23 @@
 import logging
-import os
-import secrets
 from datetime import datetime, timedelta, timezone
 
-import sib_api_v3_sdk
-from sib_api_v3_sdk.rest import ApiException
 from fastapi import APIRouter, Depends, HTTPException, status
-from sqlalchemy.orm import Session
+from sqlalchemy import select
+from sqlalchemy.ext.asyncio import AsyncSession
 
 from auth import (
     ACCESS_TOKEN_EXPIRE_MINUTES,
+    HashingOverloadedError,
     create_access_token,
-    get_password_hash,
-    verify_password,
+    get_password_hash_async,
+    password_needs_rehash,
+    verify_password_async,
 )
-from database import get_db
-from dependencies import get_current_user
+from database import get_async_db
+from dependencies import get_current_user, invalidate_user_cache
+from mailer import enqueue_email, get_transport, notify_outbox
 from models import User
+from password_reset import find_reset_token, issue_reset_code
 from schemas import (
     PasswordReset,
     PasswordResetRequest,
@@ -25,40 +26,30 @@ from schemas import (
     UserLogin,
     UserResponse,
 )
+from user_search import index_user
 
 logger = logging.getLogger(__name__)
 
-BREVO_API_KEY = os.getenv("BREVO_API_KEY", "")
-
 router = APIRouter(tags=["auth"])
 
 
-def _send_email(to_address: str, subject: str, html_content: str) -> None:
-    configuration = sib_api_v3_sdk.Configuration()
-    configuration.api_key["api-key"] = BREVO_API_KEY
-    api_instance = sib_api_v3_sdk.TransactionalEmailsApi(sib_api_v3_sdk.ApiClient(configuration))
-    send_smtp_email = sib_api_v3_sdk.SendSmtpEmail(
-        to=[{"email": to_address}],
-        sender={"name": "Wielka Studencka Batalia", "email": os.getenv("BREVO_SENDER_EMAIL", "")},
-        subject=subject,
-        html_content=html_content,
-    )
-    api_instance.send_transac_email(send_smtp_email)
-
-
 @router.get("/")
-def read_root():
+async def read_root():
     return {"message": "Wielka Studencka Batalla API"}
 
 
+async def _get_user_by_email(db: AsyncSession, email: str) -> User | None:
+    return await db.scalar(select(User).where(User.email == email))
+
+
 @router.post("/register", response_model=UserResponse, status_code=status.HTTP_201_CREATED)
-def register(user_data: UserCreate, db: Session = Depends(get_db)):
-    if db.query(User).filter(User.email == user_data.email).first():
+async def register(user_data: UserCreate, db: AsyncSession = Depends(get_async_db)):
+    if await _get_user_by_email(db, user_data.email):
         raise HTTPException(
             status_code=status.HTTP_400_BAD_REQUEST,
             detail="Email już zarejestrowany",
         )
-    if db.query(User).filter(User.username == user_data.username).first():
+    if await db.scalar(select(User).where(User.username == user_data.username)):
         raise HTTPException(
             status_code=status.HTTP_400_BAD_REQUEST,
             detail="Nazwa użytkownika już zajęta",
@@ -66,24 +57,39 @@ def register(user_data: UserCreate, db: Session = Depends(get_db)):
     new_user = User(
         username=user_data.username,
         email=user_data.email,
-        hashed_password=get_password_hash(user_data.password),
+        hashed_password=await get_password_hash_async(user_data.password),
     )
     db.add(new_user)
-    db.commit()
-    db.refresh(new_user)
+    await db.commit()
+    await db.refresh(new_user)
+    index_user(new_user.id, new_user.username)
     logger.info("Zarejestrowano: %s (ID: %s)", new_user.email, new_user.id)
     return new_user
 
 
+async def _rehash_password(db: AsyncSession, user: User, password: str) -> None:
+    # Hash ma nieaktualne parametry (np. po kalibracji kosztu) — przeliczamy go,
+    # skoro znamy hasło. Przy przeciążonej puli hashowania po prostu odkładamy to.
+    try:
+        user.hashed_password = await get_password_hash_async(password)
+    except HashingOverloadedError:
+        return
+    await db.commit()
+    invalidate_user_cache(user.email)
+    logger.info("Zaktualizowano parametry hasha hasła dla: %s", user.email)
+
+
 @router.post("/login", response_model=Token)
-def login(user_data: UserLogin, db: Session = Depends(get_db)):
-    user = db.query(User).filter(User.email == user_data.email).first()
-    if not user or not verify_password(user_data.password, user.hashed_password):
+async def login(user_data: UserLogin, db: AsyncSession = Depends(get_async_db)):
+    user = await _get_user_by_email(db, user_data.email)
+    if not user or not await verify_password_async(user_data.password, user.hashed_password):
         raise HTTPException(
             status_code=status.HTTP_401_UNAUTHORIZED,
             detail="Nieprawidłowy email lub hasło",
             headers={"WWW-Authenticate": "Bearer"},
         )
+    if password_needs_rehash(user.hashed_password):
+        await _rehash_password(db, user, user_data.password)
     access_token = create_access_token(
         data={"sub": user.email},
         expires_delta=timedelta(minutes=ACCESS_TOKEN_EXPIRE_MINUTES),
@@ -92,61 +98,54 @@ def login(user_data: UserLogin, db: Session = Depends(get_db)):
 
 
 @router.post("/verify-token", response_model=UserResponse)
-def verify_token(current_user: User = Depends(get_current_user)):
+async def verify_token(current_user: User = Depends(get_current_user)):
     return current_user
 
 
 @router.post("/password-reset-request")
-def request_password_reset(
-    reset_request: PasswordResetRequest, db: Session = Depends(get_db)
+async def request_password_reset(
+    reset_request: PasswordResetRequest, db: AsyncSession = Depends(get_async_db)
 ):
-    user = db.query(User).filter(User.email == reset_request.email).first()
+    user = await _get_user_by_email(db, reset_request.email)
     if not user:
         return {"message": "Jeśli email istnieje w systemie, wysłano link do resetowania hasła"}
 
-    reset_token = "".join([str(secrets.randbelow(10)) for _ in range(6)])
-    user.reset_token = reset_token
-    user.reset_token_expires = datetime.now(timezone.utc) + timedelta(minutes=15)
-    db.commit()
-
-    if BREVO_API_KEY:
-        try:
-            _send_email(
-                to_address=user.email,
-                subject="Wielka Studencka Batalia - Kod resetowania hasła",
-                html_content=_build_reset_email_html(reset_token),
-            )
-            logger.info("Email z kodem wysłany do %s", user.email)
-            return {
-                "message": "Kod resetowania został wysłany na podany adres email",
-                "email_sent": True,
-            }
-        except ApiException as e:
-            logger.error("Błąd wysyłania emaila (Brevo): %s", e)
-            return {"message": "Błąd wysyłania emaila", "email_sent": False}
-    else:
-        logger.debug(
-            "Reset token dla %s: %s (ważny do: %s)",
-            user.email,
-            reset_token,
-            user.reset_token_expires,
-        )
+    reset_token, reset_token_expires = await issue_reset_code(db, user)
+
+    # Wysyłkę robi worker kolejki (mailer.deliver_pending_emails) — wolne API
+    # dostawcy nie wydłuża odpowiedzi, a błędy przejściowe są ponawiane.
+    enqueue_email(
+        db,
+        to_address=user.email,
+        subject="Wielka Studencka Batalia - Kod resetowania hasła",
+        html_content=_build_reset_email_html(reset_token),
+        expires_at=reset_token_expires,
+    )
+    await db.commit()
+    notify_outbox()
+    logger.info("Email z kodem dodany do kolejki dla %s", user.email)
+
+    if get_transport().delivers:
         return {
-            "message": "Jeśli email istnieje w systemie, wysłano link do resetowania hasła",
-            "email_sent": False,
+            "message": "Kod resetowania został wysłany na podany adres email",
+            "email_sent": True,
         }
+    return {
+        "message": "Jeśli email istnieje w systemie, wysłano link do resetowania hasła",
+        "email_sent": False,
+    }
 
 
 @router.post("/password-reset")
-def reset_password(reset_data: PasswordReset, db: Session = Depends(get_db)):
-    user = db.query(User).filter(User.reset_token == reset_data.token).first()
-    if not user:
+async def reset_password(reset_data: PasswordReset, db: AsyncSession = Depends(get_async_db)):
+    reset_token = await find_reset_token(db, reset_data.token)
+    if not reset_token:
         raise HTTPException(
             status_code=status.HTTP_400_BAD_REQUEST,
             detail="Nieprawidłowy token resetowania",
         )
 
-    token_expires = user.reset_token_expires
+    token_expires = reset_token.expires_at
     if token_expires.tzinfo is None:
         token_expires = token_expires.replace(tzinfo=timezone.utc)
     if token_expires < datetime.now(timezone.utc):
@@ -155,10 +154,11 @@ def reset_password(reset_data: PasswordReset, db: Session = Depends(get_db)):
             detail="Token resetowania wygasł",
         )
 
-    user.hashed_password = get_password_hash(reset_data.new_password)
-    user.reset_token = None
-    user.reset_token_expires = None
-    db.commit()
+    user = await db.get(User, reset_token.user_id)
+    user.hashed_password = await get_password_hash_async(reset_data.new_password)
+    await db.delete(reset_token)
+    await db.commit()
+    invalidate_user_cache(user.email)
     logger.info("Zresetowano hasło dla: %s", user.email)
     return {"message": "Hasło zostało zresetowane pomyślnie"}
 
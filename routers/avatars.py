@@ -0,0 +1,28 @@
+from fastapi import APIRouter, Depends, HTTPException, Path, Request, Response, status
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from avatars import AVATAR_RENDER_VERSION, get_avatar_png
+from database import get_async_db
+from etags import is_not_modified
+
+router = APIRouter(tags=["avatars"])
+
+# Adres zawiera hash treści (i wersję renderowania), więc odpowiedź nigdy się nie zmienia.
+_CACHE_HEADERS = {"Cache-Control": "public, max-age=31536000, immutable"}
+
+
+@router.get("/avatars/{avatar_hash}.png")
+async def get_avatar_image(
+    request: Request,
+    avatar_hash: str = Path(..., pattern="^[0-9a-f]{64}$"),
+    db: AsyncSession = Depends(get_async_db),
+):
+    """Awatar wyrenderowany do PNG (bez logowania — adres jest hashem konfiguracji)."""
+    etag = f'"{avatar_hash}.{AVATAR_RENDER_VERSION}"'
+    headers = {"ETag": etag, **_CACHE_HEADERS}
+    if is_not_modified(request, etag):
+        return Response(status_code=status.HTTP_304_NOT_MODIFIED, headers=headers)
+    png = await get_avatar_png(db, avatar_hash)
+    if png is None:
+        raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="Awatar nie znaleziony")
+    return Response(content=png, media_type="image/png", headers=headers)
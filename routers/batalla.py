@@ -0,0 +1,105 @@
+import logging
+
+from fastapi import APIRouter, Depends, HTTPException, status
+from sqlalchemy import select
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from database import get_async_db
+from dependencies import get_current_user
+from games.batalla import LEVELS, Game, GameSession, MoveError, games, publish_state, question_bank
+from models import BatallaGame, User
+from schemas import BatallaAction
+
+logger = logging.getLogger(__name__)
+
+router = APIRouter(tags=["batalla"])
+
+
+def _state_for(session: GameSession, user_id: int) -> dict:
+    return {**session.state(), "you": session.game.index_of(user_id)}
+
+
+async def _load_game(db: AsyncSession, game_id: int, current_user: User) -> GameSession:
+    """Gra z pamięci, a po restarcie lub wyrzuceniu z pamięci — odtworzona z ostatniej migawki."""
+    session = games.get(game_id)
+    if session is None:
+        row = await db.scalar(select(BatallaGame).where(BatallaGame.invitation_id == game_id))
+        if row is not None:
+            game = Game.from_snapshot(row.state)
+            if games.full and not game.finished:
+                raise HTTPException(
+                    status_code=status.HTTP_503_SERVICE_UNAVAILABLE,
+                    detail="Zbyt wiele trwających gier, spróbuj ponownie za chwilę",
+                    headers={"Retry-After": "5"},
+                )
+            usernames = dict((
+                await db.execute(select(User.id, User.username).where(User.id.in_(game.user_ids)))
+            ).all())
+            session = GameSession(
+                game_id, game, tuple(usernames.get(user_id, "?") for user_id in game.user_ids), row_id=row.id
+            )
+            if not game.finished:
+                session = games.adopt(session)
+    if session is None or session.game.index_of(current_user.id) is None:
+        raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="Gra nie znaleziona")
+    return session
+
+
+@router.get("/batalla/games/{game_id}")
+async def get_game(
+    game_id: int,
+    db: AsyncSession = Depends(get_async_db),
+    current_user: User = Depends(get_current_user),
+):
+    session = await _load_game(db, game_id, current_user)
+    return _state_for(session, current_user.id)
+
+
+@router.post("/batalla/games/{game_id}/actions")
+async def play_action(
+    game_id: int,
+    action: BatallaAction,
+    db: AsyncSession = Depends(get_async_db),
+    current_user: User = Depends(get_current_user),
+):
+    """Jedna akcja gracza (klasa, rzut kostką, wybór na polu, odpowiedź, poddanie) sprawdzona przez silnik."""
+    session = await _load_game(db, game_id, current_user)
+    game = session.game
+    if action.version is not None and action.version != game.version:
+        raise HTTPException(
+            status_code=status.HTTP_409_CONFLICT, detail="Stan gry się zmienił, odśwież planszę"
+        )
+    try:
+        session.apply(game.index_of(current_user.id), action.action, action.value)
+    except MoveError as exc:
+        raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail=str(exc))
+    games.touch(session)
+    publish_state(session)
+    if game.finished:
+        logger.info(
+            "Koniec gry Batalla %s: wygrywa %s (%s)",
+            game_id,
+            session.usernames[game.winner],
+            ", ".join(session.usernames),
+        )
+    return _state_for(session, current_user.id)
+
+
+@router.get("/batalla/games/{game_id}/question")
+async def get_question(
+    game_id: int,
+    db: AsyncSession = Depends(get_async_db),
+    current_user: User = Depends(get_current_user),
+):
+    """Bieżące pytanie w grze (bez poprawnej odpowiedzi) — z pamięci, bez zapytań do bazy."""
+    session = await _load_game(db, game_id, current_user)
+    if session.question is None:
+        raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="W tej chwili nie ma pytania")
+    return session.state()["question"]
+
+
+@router.get("/batalla/questions")
+async def get_question_topics():
+    """Tematy w banku pytań i liczba pytań na każdym poziomie trudności."""
+    questions = question_bank.current
+    return {"levels": list(LEVELS), "topics": questions.counts(), "version": questions.version}
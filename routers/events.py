@@ -0,0 +1,84 @@
+import asyncio
+import json
+import logging
+import os
+import time
+from datetime import timedelta
+
+from fastapi import APIRouter, Depends, HTTPException, Query, Request, status
+from fastapi.responses import StreamingResponse
+
+from auth import create_access_token, decode_token
+from dependencies import get_current_user
+from events import event_hub
+from models import User
+
+logger = logging.getLogger(__name__)
+
+EVENTS_TICKET_TTL_SECONDS = int(os.getenv("EVENTS_TICKET_TTL_SECONDS", "60"))
+EVENTS_KEEPALIVE_SECONDS = float(os.getenv("EVENTS_KEEPALIVE_SECONDS", "15"))
+# Po tym czasie serwer zamyka strumień, a klient łączy się ponownie z nowym biletem
+# (otwarte strumienie nie blokują wtedy restartu serwera w nieskończoność).
+EVENTS_STREAM_MAX_SECONDS = float(os.getenv("EVENTS_STREAM_MAX_SECONDS", "300"))
+
+_EVENTS_SCOPE = "events"
+
+router = APIRouter(tags=["events"])
+
+
+@router.post("/events/ticket")
+async def create_events_ticket(current_user: User = Depends(get_current_user)):
+    """Krótkotrwały bilet do strumienia zdarzeń.
+
+    EventSource nie pozwala ustawić nagłówka Authorization, więc zamiast tokena
+    dostępu w URL (i logach) przekazujemy bilet ważny tylko przy nawiązaniu połączenia.
+    """
+    ticket = create_access_token(
+        data={"sub": str(current_user.id), "scope": _EVENTS_SCOPE},
+        expires_delta=timedelta(seconds=EVENTS_TICKET_TTL_SECONDS),
+    )
+    return {"ticket": ticket}
+
+
+def _format_event(event: dict) -> str:
+    return f"id: {event['id']}\nevent: {event['type']}\ndata: {json.dumps(event['data'])}\n\n"
+
+
+async def _event_stream(request: Request, user_id: int):
+    queue = event_hub.subscribe(user_id)
+    deadline = time.monotonic() + EVENTS_STREAM_MAX_SECONDS
+    try:
+        yield "retry: 5000\n\n"
+        # Po (ponownym) połączeniu klient odświeża stan — zdarzenia z przerwy przepadły.
+        yield "event: ready\ndata: {}\n\n"
+        while time.monotonic() < deadline:
+            try:
+                event = await asyncio.wait_for(queue.get(), timeout=EVENTS_KEEPALIVE_SECONDS)
+            except asyncio.TimeoutError:
+                if await request.is_disconnected():
+                    break
+                yield ": ping\n\n"
+                continue
+            yield _format_event(event)
+    finally:
+        event_hub.unsubscribe(user_id, queue)
+
+
+@router.get("/events/stream")
+async def stream_events(request: Request, ticket: str = Query(...)):
+    """Strumień Server-Sent Events z zaproszeniami do gier zalogowanego użytkownika.
+
+    Uwierzytelnienie biletem z /events/ticket — bez zapytań do bazy, także przez
+    cały czas trwania połączenia.
+    """
+    user_id = decode_token(ticket, scope=_EVENTS_SCOPE)
+    if user_id is None:
+        raise HTTPException(
+            status_code=status.HTTP_401_UNAUTHORIZED,
+            detail="Nieprawidłowy lub wygasły bilet",
+        )
+    return StreamingResponse(
+        _event_stream(request, int(user_id)),
+        media_type="text/event-stream",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"},
+    )
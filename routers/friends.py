@@ -1,28 +1,42 @@
+import base64
+import json
 import logging
+import os
 from datetime import datetime, timezone
+from typing import Literal
 
-from fastapi import APIRouter, Depends, HTTPException, Query, status
-from sqlalchemy.orm import Session, aliased
+from fastapi import APIRouter, Depends, HTTPException, Query, Request, Response, status
+from sqlalchemy import case, func, or_, select, tuple_, union_all
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy.orm import aliased
 
-from database import get_db
+from avatars import avatar_url
+from database import get_async_db
 from dependencies import get_current_user
+from etags import FRIEND_REQUESTS, FRIENDS, change_versions, not_modified_response, set_etag
 from models import Friendship, FriendshipStatus, User
 from schemas import FriendRequest, UserResponse
+from user_stats import friends_changed
+from user_search import memory_index_ready, search_index
 
 logger = logging.getLogger(__name__)
 
+FRIENDS_PAGE_SIZE = int(os.getenv("FRIENDS_PAGE_SIZE", "50"))
+FRIENDS_PAGE_SIZE_MAX = int(os.getenv("FRIENDS_PAGE_SIZE_MAX", "200"))
+USER_SEARCH_LIMIT = 10
+
 router = APIRouter(tags=["friends"])
 
 
 @router.post("/friends/request")
-def send_friend_request(
+async def send_friend_request(
     friend_request: FriendRequest,
-    db: Session = Depends(get_db),
+    db: AsyncSession = Depends(get_async_db),
     current_user: User = Depends(get_current_user),
 ):
-    addressee = db.query(User).filter(
-        User.username == friend_request.addressee_username
-    ).first()
+    addressee = await db.scalar(
+        select(User).where(User.username == friend_request.addressee_username)
+    )
     if not addressee:
         raise HTTPException(
             status_code=status.HTTP_404_NOT_FOUND,
@@ -34,10 +48,10 @@ def send_friend_request(
             detail="Nie możesz zaprosić samego siebie",
         )
 
-    existing = db.query(Friendship).filter(
+    existing = await db.scalar(select(Friendship).where(
         ((Friendship.requester_id == current_user.id) & (Friendship.addressee_id == addressee.id))
         | ((Friendship.requester_id == addressee.id) & (Friendship.addressee_id == current_user.id))
-    ).first()
+    ))
 
     if existing:
         if existing.status == FriendshipStatus.ACCEPTED:
@@ -57,8 +71,9 @@ def send_friend_request(
         status=FriendshipStatus.PENDING,
     )
     db.add(new_friendship)
-    db.commit()
-    db.refresh(new_friendship)
+    await db.commit()
+    await db.refresh(new_friendship)
+    change_versions.bump(FRIEND_REQUESTS, addressee.id)
     logger.info("Wysłano zaproszenie: %s -> %s", current_user.username, addressee.username)
     return {
         "message": f"Wysłano zaproszenie do {addressee.username}",
@@ -67,20 +82,30 @@ def send_friend_request(
 
 
 @router.get("/friends/requests")
-def get_friend_requests(
-    db: Session = Depends(get_db),
+async def get_friend_requests(
+    request: Request,
+    response: Response,
+    db: AsyncSession = Depends(get_async_db),
     current_user: User = Depends(get_current_user),
 ):
+    # Wersję bierzemy przed zapytaniem — zmiana w trakcie da klientowi nowy ETag.
+    etag = change_versions.etag(FRIEND_REQUESTS, current_user.id)
+    not_modified = not_modified_response(request, etag)
+    if not_modified is not None:
+        return not_modified
+    set_etag(response, etag)
+
     RequesterAlias = aliased(User)
     rows = (
-        db.query(Friendship, RequesterAlias)
-        .join(RequesterAlias, Friendship.requester_id == RequesterAlias.id)
-        .filter(
-            Friendship.addressee_id == current_user.id,
-            Friendship.status == FriendshipStatus.PENDING,
+        await db.execute(
+            select(Friendship, RequesterAlias)
+            .join(RequesterAlias, Friendship.requester_id == RequesterAlias.id)
+            .where(
+                Friendship.addressee_id == current_user.id,
+                Friendship.status == FriendshipStatus.PENDING,
+            )
         )
-        .all()
-    )
+    ).all()
     return [
         {
             "friendship_id": f.id,
@@ -92,12 +117,12 @@ def get_friend_requests(
 
 
 @router.post("/friends/accept/{friendship_id}")
-def accept_friend_request(
+async def accept_friend_request(
     friendship_id: int,
-    db: Session = Depends(get_db),
+    db: AsyncSession = Depends(get_async_db),
     current_user: User = Depends(get_current_user),
 ):
-    friendship = db.query(Friendship).filter(Friendship.id == friendship_id).first()
+    friendship = await db.get(Friendship, friendship_id)
     if not friendship:
         raise HTTPException(
             status_code=status.HTTP_404_NOT_FOUND,
@@ -116,9 +141,12 @@ def accept_friend_request(
 
     friendship.status = FriendshipStatus.ACCEPTED
     friendship.updated_at = datetime.now(timezone.utc)
-    db.commit()
+    await db.execute(friends_changed(db, (current_user.id, friendship.requester_id), 1))
+    await db.commit()
+    change_versions.bump(FRIEND_REQUESTS, current_user.id)
+    change_versions.bump(FRIENDS, current_user.id, friendship.requester_id)
 
-    requester = db.query(User).filter(User.id == friendship.requester_id).first()
+    requester = await db.get(User, friendship.requester_id)
     logger.info(
         "Zaakceptowano zaproszenie: %s <-> %s", current_user.username, requester.username
     )
@@ -129,12 +157,12 @@ def accept_friend_request(
 
 
 @router.post("/friends/reject/{friendship_id}")
-def reject_friend_request(
+async def reject_friend_request(
     friendship_id: int,
-    db: Session = Depends(get_db),
+    db: AsyncSession = Depends(get_async_db),
     current_user: User = Depends(get_current_user),
 ):
-    friendship = db.query(Friendship).filter(Friendship.id == friendship_id).first()
+    friendship = await db.get(Friendship, friendship_id)
     if not friendship:
         raise HTTPException(
             status_code=status.HTTP_404_NOT_FOUND,
@@ -152,10 +180,11 @@ def reject_friend_request(
         )
 
     requester_id = friendship.requester_id
-    db.delete(friendship)
-    db.commit()
+    await db.delete(friendship)
+    await db.commit()
+    change_versions.bump(FRIEND_REQUESTS, current_user.id)
 
-    requester = db.query(User).filter(User.id == requester_id).first()
+    requester = await db.get(User, requester_id)
     logger.info(
         "Odrzucono zaproszenie: %s <- %s",
         current_user.username,
@@ -164,52 +193,136 @@ def reject_friend_request(
     return {"message": "Odrzucono zaproszenie"}
 
 
+def _encode_cursor(values: list) -> str:
+    return base64.urlsafe_b64encode(json.dumps(values).encode()).decode().rstrip("=")
+
+
+def _decode_cursor(cursor: str, order: str) -> list:
+    try:
+        values = json.loads(base64.urlsafe_b64decode(cursor + "=" * (-len(cursor) % 4)))
+        if (
+            not isinstance(values, list)
+            or len(values) != 2
+            or not isinstance(values[0], str)
+            or not isinstance(values[1], int)
+        ):
+            raise ValueError(values)
+        if order == "recent":
+            values[0] = datetime.fromisoformat(values[0])
+        return values
+    except ValueError:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail="Nieprawidłowy kursor",
+        )
+
+
+def _friends_page(user_id: int, order: str, after: list | None, limit: int):
+    """Jedna strona znajomych: UNION ALL wysłanych i odebranych zaproszeń z paginacją po kluczu.
+
+    Każda gałąź ma własny warunek kursora i LIMIT. Dla "recent" gałęzie czytają indeksy
+    (requester_id, status, updated_at, id) i (addressee_id, status, updated_at, id) od
+    kursora, więc koszt strony nie zależy od liczby znajomych przed kursorem.
+    """
+    if order == "username":
+        sort_column, descending = User.username, False
+    else:
+        # updated_at jest NOT NULL — porównanie krotek z NULL zgubiłoby wiersze.
+        sort_column, descending = Friendship.updated_at, True
+
+    def branch(own_column, friend_column):
+        query = (
+            select(
+                User.id,
+                User.username,
+                User.email,
+                User.avatar_hash,
+                Friendship.id.label("friendship_id"),
+                sort_column.label("sort_key"),
+            )
+            .join(User, friend_column == User.id)
+            .where(own_column == user_id, Friendship.status == FriendshipStatus.ACCEPTED)
+        )
+        key = tuple_(sort_column, Friendship.id)
+        if after is not None:
+            query = query.where(key < tuple_(*after) if descending else key > tuple_(*after))
+        if descending:
+            query = query.order_by(sort_column.desc(), Friendship.id.desc())
+        else:
+            query = query.order_by(sort_column, Friendship.id)
+        return select(query.limit(limit).subquery())
+
+    page = union_all(
+        branch(Friendship.requester_id, Friendship.addressee_id),
+        branch(Friendship.addressee_id, Friendship.requester_id),
+    ).subquery()
+    if descending:
+        ordering = (page.c.sort_key.desc(), page.c.friendship_id.desc())
+    else:
+        ordering = (page.c.sort_key, page.c.friendship_id)
+    return select(page).order_by(*ordering).limit(limit)
+
+
 @router.get("/friends")
-def get_friends(
-    db: Session = Depends(get_db),
+async def get_friends(
+    request: Request,
+    response: Response,
+    order: Literal["username", "recent"] = "username",
+    cursor: str | None = None,
+    limit: int = Query(FRIENDS_PAGE_SIZE, ge=1, le=FRIENDS_PAGE_SIZE_MAX),
+    db: AsyncSession = Depends(get_async_db),
     current_user: User = Depends(get_current_user),
 ):
-    FriendAlias = aliased(User)
-
-    sent = (
-        db.query(Friendship, FriendAlias)
-        .join(FriendAlias, Friendship.addressee_id == FriendAlias.id)
-        .filter(
-            Friendship.requester_id == current_user.id,
-            Friendship.status == FriendshipStatus.ACCEPTED,
-        )
-        .all()
-    )
-    received = (
-        db.query(Friendship, FriendAlias)
-        .join(FriendAlias, Friendship.requester_id == FriendAlias.id)
-        .filter(
-            Friendship.addressee_id == current_user.id,
-            Friendship.status == FriendshipStatus.ACCEPTED,
+    etag = change_versions.etag(FRIENDS, current_user.id)
+    not_modified = not_modified_response(request, etag)
+    if not_modified is not None:
+        return not_modified
+    set_etag(response, etag)
+
+    after = _decode_cursor(cursor, order) if cursor else None
+
+    # Pobieramy jeden wiersz więcej, żeby wiedzieć, czy jest następna strona.
+    rows = (await db.execute(_friends_page(current_user.id, order, after, limit + 1))).all()
+    if len(rows) > limit:
+        rows = rows[:limit]
+        last = rows[-1]
+        sort_key = last.sort_key.isoformat() if order == "recent" else last.sort_key
+        response.headers["X-Next-Cursor"] = _encode_cursor([sort_key, last.friendship_id])
+
+    if cursor is None:
+        total = await db.scalar(
+            select(func.count())
+            .select_from(Friendship)
+            .where(
+                or_(
+                    Friendship.requester_id == current_user.id,
+                    Friendship.addressee_id == current_user.id,
+                ),
+                Friendship.status == FriendshipStatus.ACCEPTED,
+            )
         )
-        .all()
-    )
+        response.headers["X-Total-Count"] = str(total)
 
     return [
         {
-            "id": friend.id,
-            "username": friend.username,
-            "email": friend.email,
-            "avatar": friend.avatar,
-            "friendship_id": friendship.id,
+            "id": row.id,
+            "username": row.username,
+            "email": row.email,
+            "avatar_url": avatar_url(row.avatar_hash),
+            "friendship_id": row.friendship_id,
             "friendship_status": "accepted",
         }
-        for friendship, friend in sent + received
+        for row in rows
     ]
 
 
 @router.delete("/friends/{friendship_id}")
-def remove_friend(
+async def remove_friend(
     friendship_id: int,
-    db: Session = Depends(get_db),
+    db: AsyncSession = Depends(get_async_db),
     current_user: User = Depends(get_current_user),
 ):
-    friendship = db.query(Friendship).filter(Friendship.id == friendship_id).first()
+    friendship = await db.get(Friendship, friendship_id)
     if not friendship:
         raise HTTPException(
             status_code=status.HTTP_404_NOT_FOUND,
@@ -220,55 +333,79 @@ def remove_friend(
             status_code=status.HTTP_403_FORBIDDEN,
             detail="Nie możesz usunąć tej znajomości",
         )
-    db.delete(friendship)
-    db.commit()
+    if friendship.status == FriendshipStatus.ACCEPTED:
+        await db.execute(friends_changed(db, (friendship.requester_id, friendship.addressee_id), -1))
+    await db.delete(friendship)
+    await db.commit()
+    change_versions.bump(FRIENDS, friendship.requester_id, friendship.addressee_id)
     logger.info("Usunięto znajomość ID: %s", friendship_id)
     return {"message": "Usunięto znajomego"}
 
 
+def _escape_like(value: str) -> str:
+    return value.replace("\\", "\\\\").replace("%", "\\%").replace("_", "\\_")
+
+
+def _users_with_friendship(current_user_id: int):
+    # Status znajomości dołączany w tym samym zapytaniu (LEFT JOIN w obie strony relacji).
+    friendship_join = or_(
+        (Friendship.requester_id == current_user_id) & (Friendship.addressee_id == User.id),
+        (Friendship.requester_id == User.id) & (Friendship.addressee_id == current_user_id),
+    )
+    return (
+        select(User, Friendship)
+        .outerjoin(Friendship, friendship_join)
+        .where(User.id != current_user_id)
+    )
+
+
+def _ranked_search(statement, query: str, dialect: str):
+    escaped = _escape_like(query)
+    is_prefix = case((User.username.ilike(f"{escaped}%", escape="\\"), 0), else_=1)
+    # Na PostgreSQL ILIKE '%q%' korzysta z indeksu GIN pg_trgm (ix_users_username_trgm).
+    statement = statement.where(User.username.ilike(f"%{escaped}%", escape="\\"))
+    if dialect == "postgresql":
+        ranking = (is_prefix, func.similarity(User.username, query).desc(), User.username)
+    else:
+        ranking = (is_prefix, func.length(User.username), User.username)
+    return statement.order_by(*ranking).limit(USER_SEARCH_LIMIT)
+
+
+def _friendship_annotation(friendship: Friendship | None, current_user_id: int) -> str:
+    if friendship is None:
+        return "none"
+    if friendship.status == FriendshipStatus.ACCEPTED:
+        return "friends"
+    if friendship.status == FriendshipStatus.PENDING:
+        return "pending_sent" if friendship.requester_id == current_user_id else "pending_received"
+    return "none"
+
+
 @router.get("/users/search")
-def search_users(
+async def search_users(
     query: str = Query(..., min_length=1),
-    db: Session = Depends(get_db),
+    db: AsyncSession = Depends(get_async_db),
     current_user: User = Depends(get_current_user),
 ):
-    users = (
-        db.query(User)
-        .filter(User.username.ilike(f"%{query}%"), User.id != current_user.id)
-        .limit(10)
-        .all()
-    )
+    statement = _users_with_friendship(current_user.id)
+    if memory_index_ready():
+        user_ids = search_index.search(query, USER_SEARCH_LIMIT, exclude_id=current_user.id)
+        if not user_ids:
+            return []
+        rows = (await db.execute(statement.where(User.id.in_(user_ids)))).all()
+        position = {user_id: i for i, user_id in enumerate(user_ids)}
+        rows.sort(key=lambda row: position[row[0].id])
+    else:
+        rows = (await db.execute(_ranked_search(statement, query, db.bind.dialect.name))).all()
 
-    user_ids = [u.id for u in users]
-    friendships = db.query(Friendship).filter(
-        ((Friendship.requester_id == current_user.id) & Friendship.addressee_id.in_(user_ids))
-        | (Friendship.requester_id.in_(user_ids) & (Friendship.addressee_id == current_user.id))
-    ).all()
-
-    friendship_map: dict[int, Friendship] = {}
-    for f in friendships:
-        other_id = f.addressee_id if f.requester_id == current_user.id else f.requester_id
-        friendship_map[other_id] = f
-
-    results = []
-    for user in users:
-        f = friendship_map.get(user.id)
-        friendship_status = "none"
-        friendship_id = None
-        if f:
-            if f.status == FriendshipStatus.ACCEPTED:
-                friendship_status = "friends"
-            elif f.status == FriendshipStatus.PENDING:
-                friendship_status = (
-                    "pending_sent" if f.requester_id == current_user.id else "pending_received"
-                )
-            friendship_id = f.id
-        results.append({
+    return [
+        {
             "id": user.id,
             "username": user.username,
             "email": user.email,
-            "avatar": user.avatar,
-            "friendship_status": friendship_status,
-            "friendship_id": friendship_id,
-        })
-    return results
+            "avatar_url": avatar_url(user.avatar_hash),
+            "friendship_status": _friendship_annotation(friendship, current_user.id),
+            "friendship_id": friendship.id if friendship else None,
+        }
+        for user, friendship in rows
+    ]
@@ -1,47 +1,106 @@
 import logging
 from datetime import datetime, timezone
 
-from fastapi import APIRouter, Depends, HTTPException, status
-from sqlalchemy.orm import Session, aliased
+from fastapi import APIRouter, Depends, HTTPException, Request, Response, status
+from sqlalchemy import select, update
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy.orm import aliased
+from sqlalchemy.orm.attributes import set_committed_value
 
-from database import get_db
+from avatars import avatar_url
+from database import get_async_db
 from dependencies import get_current_user
+from etags import (
+    INVITATIONS_RECEIVED,
+    INVITATIONS_SENT,
+    change_versions,
+    not_modified_response,
+    set_etag,
+)
+from events import event_hub
+from games.batalla import games as batalla_games
+from games.tictactoe import matches
 from models import Friendship, FriendshipStatus, GameInvitation, GameInvitationStatus, User
 from schemas import GameInvitationCreate
+from user_stats import invitation_accepted, invitation_sent
 
 logger = logging.getLogger(__name__)
 
 router = APIRouter(tags=["game_invitations"])
 
+# Gry rozgrywane na serwerze — zaakceptowanie zaproszenia od razu tworzy partię.
+_TICTACTOE = "kolko-i-krzyzyk"
+_BATALLA = "wielka-studencka-batalla"
+_ONLINE_GAMES = {_TICTACTOE: matches, _BATALLA: batalla_games}
+
+
+def _invitation_changed(invitation: GameInvitation) -> None:
+    change_versions.bump(INVITATIONS_RECEIVED, invitation.invitee_id)
+    change_versions.bump(INVITATIONS_SENT, invitation.inviter_id)
+
+
+async def _set_status(db: AsyncSession, invitation: GameInvitation, new_status: GameInvitationStatus) -> None:
+    """Zmienia status tylko zaproszenia, które wciąż jest PENDING (warunkowy UPDATE).
+
+    Chroni przed wyścigiem z zadaniem wygaszającym i z drugą stroną: zaproszenie
+    wygaszone po odczycie, a przed zapisem nie zostanie już zaakceptowane.
+    """
+    now = datetime.now(timezone.utc)
+    result = await db.execute(
+        update(GameInvitation)
+        .where(GameInvitation.id == invitation.id, GameInvitation.status == GameInvitationStatus.PENDING)
+        .values(status=new_status, updated_at=now)
+        .execution_options(synchronize_session=False)
+    )
+    if result.rowcount == 0:
+        await db.rollback()
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail="Zaproszenie nie jest już aktywne",
+        )
+    # Obiekt w sesji odpowiada już bazie — bez ponownego (bezwarunkowego) UPDATE przy commit.
+    set_committed_value(invitation, "status", new_status)
+    set_committed_value(invitation, "updated_at", now)
+
+
+def _publish(user_id: int, event_type: str, invitation: GameInvitation, **extra) -> None:
+    # Zdarzenia trafiają tylko do strony, która musi zareagować (zamiast pollingu).
+    event_hub.publish([user_id], event_type, {
+        "id": invitation.id,
+        "game_type": invitation.game_type,
+        "status": invitation.status.value,
+        **extra,
+    })
+
 
 @router.post("/game-invitations/send")
-def send_game_invitation(
+async def send_game_invitation(
     invitation: GameInvitationCreate,
-    db: Session = Depends(get_db),
+    db: AsyncSession = Depends(get_async_db),
     current_user: User = Depends(get_current_user),
 ):
-    invitee = db.query(User).filter(User.username == invitation.invitee_username).first()
+    invitee = await db.scalar(select(User).where(User.username == invitation.invitee_username))
     if not invitee:
         raise HTTPException(
             status_code=status.HTTP_404_NOT_FOUND,
             detail="Użytkownik nie znaleziony",
         )
 
-    friendship = db.query(Friendship).filter(
+    friendship = await db.scalar(select(Friendship).where(
         ((Friendship.requester_id == current_user.id) & (Friendship.addressee_id == invitee.id))
         | ((Friendship.requester_id == invitee.id) & (Friendship.addressee_id == current_user.id))
-    ).first()
+    ))
     if not friendship or friendship.status != FriendshipStatus.ACCEPTED:
         raise HTTPException(
             status_code=status.HTTP_403_FORBIDDEN,
             detail="Możesz zapraszać tylko znajomych",
         )
 
-    existing = db.query(GameInvitation).filter(
+    existing = await db.scalar(select(GameInvitation).where(
         GameInvitation.inviter_id == current_user.id,
         GameInvitation.invitee_id == invitee.id,
         GameInvitation.status == GameInvitationStatus.PENDING,
-    ).first()
+    ))
     if existing:
         raise HTTPException(
             status_code=status.HTTP_400_BAD_REQUEST,
@@ -55,8 +114,11 @@ def send_game_invitation(
         status=GameInvitationStatus.PENDING,
     )
     db.add(new_invitation)
-    db.commit()
-    db.refresh(new_invitation)
+    await db.execute(invitation_sent(db, current_user.id, invitation.game_type))
+    await db.commit()
+    await db.refresh(new_invitation)
+    _invitation_changed(new_invitation)
+    _publish(invitee.id, "invitation.created", new_invitation, inviter_username=current_user.username)
     logger.info(
         "Zaproszenie do gry: %s -> %s (%s)",
         current_user.username,
@@ -70,21 +132,30 @@ def send_game_invitation(
 
 
 @router.get("/game-invitations/received")
-def get_received_game_invitations(
-    db: Session = Depends(get_db),
+async def get_received_game_invitations(
+    request: Request,
+    response: Response,
+    db: AsyncSession = Depends(get_async_db),
     current_user: User = Depends(get_current_user),
 ):
+    etag = change_versions.etag(INVITATIONS_RECEIVED, current_user.id)
+    not_modified = not_modified_response(request, etag)
+    if not_modified is not None:
+        return not_modified
+    set_etag(response, etag)
+
     InviterAlias = aliased(User)
     rows = (
-        db.query(GameInvitation, InviterAlias)
-        .join(InviterAlias, GameInvitation.inviter_id == InviterAlias.id)
-        .filter(
-            GameInvitation.invitee_id == current_user.id,
-            GameInvitation.status == GameInvitationStatus.PENDING,
+        await db.execute(
+            select(GameInvitation, InviterAlias)
+            .join(InviterAlias, GameInvitation.inviter_id == InviterAlias.id)
+            .where(
+                GameInvitation.invitee_id == current_user.id,
+                GameInvitation.status == GameInvitationStatus.PENDING,
+            )
+            .order_by(GameInvitation.created_at.desc())
         )
-        .order_by(GameInvitation.created_at.desc())
-        .all()
-    )
+    ).all()
     return [
         {
             "id": inv.id,
@@ -92,7 +163,7 @@ def get_received_game_invitations(
                 "id": u.id,
                 "username": u.username,
                 "email": u.email,
-                "avatar": u.avatar,
+                "avatar_url": avatar_url(u.avatar_hash),
             },
             "game_type": inv.game_type,
             "status": inv.status.value,
@@ -103,12 +174,12 @@ def get_received_game_invitations(
 
 
 @router.post("/game-invitations/accept/{invitation_id}")
-def accept_game_invitation(
+async def accept_game_invitation(
     invitation_id: int,
-    db: Session = Depends(get_db),
+    db: AsyncSession = Depends(get_async_db),
     current_user: User = Depends(get_current_user),
 ):
-    invitation = db.query(GameInvitation).filter(GameInvitation.id == invitation_id).first()
+    invitation = await db.get(GameInvitation, invitation_id)
     if not invitation:
         raise HTTPException(
             status_code=status.HTTP_404_NOT_FOUND,
@@ -124,12 +195,53 @@ def accept_game_invitation(
             status_code=status.HTTP_400_BAD_REQUEST,
             detail="Zaproszenie nie jest już aktywne",
         )
+    inviter = await db.get(User, invitation.inviter_id)
+    if inviter is None:
+        # Konto zapraszającego usunięto po wysłaniu zaproszenia — nie ma z kim grać.
+        await _set_status(db, invitation, GameInvitationStatus.EXPIRED)
+        await db.commit()
+        _invitation_changed(invitation)
+        raise HTTPException(
+            status_code=status.HTTP_410_GONE,
+            detail="Zapraszający usunął konto",
+        )
+    registry = _ONLINE_GAMES.get(invitation.game_type)
+    if registry is not None and registry.full:
+        raise HTTPException(
+            status_code=status.HTTP_503_SERVICE_UNAVAILABLE,
+            detail="Zbyt wiele trwających gier, spróbuj ponownie za chwilę",
+            headers={"Retry-After": "5"},
+        )
 
-    invitation.status = GameInvitationStatus.ACCEPTED
-    invitation.updated_at = datetime.now(timezone.utc)
-    db.commit()
+    await _set_status(db, invitation, GameInvitationStatus.ACCEPTED)
+    await db.execute(invitation_accepted(db, current_user.id, invitation.game_type))
+    await db.commit()
+    _invitation_changed(invitation)
 
-    inviter = db.query(User).filter(User.id == invitation.inviter_id).first()
+    extra = {}
+    if invitation.game_type == _TICTACTOE:
+        # Zapraszający gra krzyżykiem i zaczyna; id partii = id zaproszenia.
+        matches.create(
+            invitation.id,
+            (invitation.inviter_id, current_user.id),
+            (inviter.username, current_user.username),
+        )
+        extra["match_id"] = invitation.id
+    elif invitation.game_type == _BATALLA:
+        # Zapraszający zaczyna; gra startuje, gdy obaj gracze wybiorą klasy.
+        batalla_games.create(
+            invitation.id,
+            (invitation.inviter_id, current_user.id),
+            (inviter.username, current_user.username),
+        )
+        extra["game_id"] = invitation.id
+    _publish(
+        invitation.inviter_id,
+        "invitation.accepted",
+        invitation,
+        invitee_username=current_user.username,
+        **extra,
+    )
     logger.info(
         "Zaproszenie zaakceptowane: %s zaakceptował zaproszenie od %s",
         current_user.username,
@@ -139,16 +251,17 @@ def accept_game_invitation(
         "message": "Zaproszenie zaakceptowane",
         "game_type": invitation.game_type,
         "inviter": inviter.username,
+        **extra,
     }
 
 
 @router.post("/game-invitations/decline/{invitation_id}")
-def decline_game_invitation(
+async def decline_game_invitation(
     invitation_id: int,
-    db: Session = Depends(get_db),
+    db: AsyncSession = Depends(get_async_db),
     current_user: User = Depends(get_current_user),
 ):
-    invitation = db.query(GameInvitation).filter(GameInvitation.id == invitation_id).first()
+    invitation = await db.get(GameInvitation, invitation_id)
     if not invitation:
         raise HTTPException(
             status_code=status.HTTP_404_NOT_FOUND,
@@ -160,28 +273,34 @@ def decline_game_invitation(
             detail="To nie Twoje zaproszenie",
         )
 
-    invitation.status = GameInvitationStatus.DECLINED
-    invitation.updated_at = datetime.now(timezone.utc)
-    db.commit()
+    await _set_status(db, invitation, GameInvitationStatus.DECLINED)
+    await db.commit()
+    _invitation_changed(invitation)
+    _publish(
+        invitation.inviter_id,
+        "invitation.declined",
+        invitation,
+        invitee_username=current_user.username,
+    )
     logger.info("Zaproszenie odrzucone przez: %s", current_user.username)
     return {"message": "Zaproszenie odrzucone"}
 
 
 @router.get("/game-invitations/status/{invitation_id}")
-def get_game_invitation_status(
+async def get_game_invitation_status(
     invitation_id: int,
-    db: Session = Depends(get_db),
+    db: AsyncSession = Depends(get_async_db),
     current_user: User = Depends(get_current_user),
 ):
     """Sprawdź status zaproszenia (dostępne dla obu stron: zapraszającego i zaproszonego)."""
-    invitation = db.query(GameInvitation).filter(GameInvitation.id == invitation_id).first()
+    invitation = await db.get(GameInvitation, invitation_id)
     if not invitation:
         raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="Zaproszenie nie znalezione")
     if invitation.inviter_id != current_user.id and invitation.invitee_id != current_user.id:
         raise HTTPException(status_code=status.HTTP_403_FORBIDDEN, detail="Brak dostępu do tego zaproszenia")
 
-    invitee = db.query(User).filter(User.id == invitation.invitee_id).first()
-    inviter = db.query(User).filter(User.id == invitation.inviter_id).first()
+    invitee = await db.get(User, invitation.invitee_id)
+    inviter = await db.get(User, invitation.inviter_id)
     return {
         "id": invitation.id,
         "status": invitation.status.value,
@@ -192,13 +311,13 @@ def get_game_invitation_status(
 
 
 @router.post("/game-invitations/cancel/{invitation_id}")
-def cancel_game_invitation(
+async def cancel_game_invitation(
     invitation_id: int,
-    db: Session = Depends(get_db),
+    db: AsyncSession = Depends(get_async_db),
     current_user: User = Depends(get_current_user),
 ):
     """Anuluj wysłane zaproszenie (tylko zapraszający)."""
-    invitation = db.query(GameInvitation).filter(GameInvitation.id == invitation_id).first()
+    invitation = await db.get(GameInvitation, invitation_id)
     if not invitation:
         raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="Zaproszenie nie znalezione")
     if invitation.inviter_id != current_user.id:
@@ -206,30 +325,45 @@ def cancel_game_invitation(
     if invitation.status != GameInvitationStatus.PENDING:
         raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail="Zaproszenie nie jest już aktywne")
 
-    invitation.status = GameInvitationStatus.EXPIRED
-    invitation.updated_at = datetime.now(timezone.utc)
-    db.commit()
+    await _set_status(db, invitation, GameInvitationStatus.EXPIRED)
+    await db.commit()
+    _invitation_changed(invitation)
+    _publish(
+        invitation.invitee_id,
+        "invitation.cancelled",
+        invitation,
+        inviter_username=current_user.username,
+    )
     logger.info("Zaproszenie anulowane przez: %s", current_user.username)
     return {"message": "Zaproszenie anulowane"}
 
 
 @router.get("/game-invitations/my-pending")
-def get_my_pending_invitations(
-    db: Session = Depends(get_db),
+async def get_my_pending_invitations(
+    request: Request,
+    response: Response,
+    db: AsyncSession = Depends(get_async_db),
     current_user: User = Depends(get_current_user),
 ):
     """Zwraca aktywne (PENDING) zaproszenia wysłane przez zalogowanego użytkownika."""
+    etag = change_versions.etag(INVITATIONS_SENT, current_user.id)
+    not_modified = not_modified_response(request, etag)
+    if not_modified is not None:
+        return not_modified
+    set_etag(response, etag)
+
     InviteeAlias = aliased(User)
     rows = (
-        db.query(GameInvitation, InviteeAlias)
-        .join(InviteeAlias, GameInvitation.invitee_id == InviteeAlias.id)
-        .filter(
-            GameInvitation.inviter_id == current_user.id,
-            GameInvitation.status == GameInvitationStatus.PENDING,
+        await db.execute(
+            select(GameInvitation, InviteeAlias)
+            .join(InviteeAlias, GameInvitation.invitee_id == InviteeAlias.id)
+            .where(
+                GameInvitation.inviter_id == current_user.id,
+                GameInvitation.status == GameInvitationStatus.PENDING,
+            )
+            .order_by(GameInvitation.created_at.desc())
         )
-        .order_by(GameInvitation.created_at.desc())
-        .all()
-    )
+    ).all()
     return [
         {
             "id": inv.id,
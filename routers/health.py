@@ -0,0 +1,40 @@
+from fastapi import APIRouter, Request
+
+from auth import hash_pool_status
+from avatars import avatar_cache
+from database import pool_status
+from dependencies import has_metrics_access, user_cache
+from events import event_hub
+from games.batalla import games, question_bank
+from games.sudoku import leaderboard, puzzle_bank
+from games.tictactoe import matches
+from metrics import request_metrics
+from static_assets import static_assets
+
+router = APIRouter(tags=["health"])
+
+
+@router.get("/health")
+async def health(request: Request):
+    """Stan procesu: pula połączeń z bazą, cache użytkowników i awatarów, pula hashowania haseł
+    i połączenia strumienia zdarzeń, cache plików statycznych, bank plansz i ranking Sudoku,
+    partie kółka i krzyżyka, gry Batalli i bank pytań, liczniki żądań HTTP.
+
+    Szczegóły widzi tylko monitoring (zob. METRICS_TOKEN), pozostali dostają sam status."""
+    if not has_metrics_access(request):
+        return {"status": "ok"}
+    return {
+        "status": "ok",
+        "db_pool": pool_status(),
+        "user_cache": user_cache.stats(),
+        "avatar_cache": avatar_cache.stats(),
+        "hash_pool": hash_pool_status(),
+        "events": event_hub.stats(),
+        "static": static_assets.stats(),
+        "sudoku_bank": puzzle_bank.stats(),
+        "sudoku_leaderboard": leaderboard.stats(),
+        "tictactoe": matches.stats(),
+        "batalla": games.stats(),
+        "batalla_questions": question_bank.stats(),
+        "requests": request_metrics.stats(),
+    }
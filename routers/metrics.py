@@ -0,0 +1,13 @@
+from fastapi import APIRouter, Depends
+from fastapi.responses import PlainTextResponse
+
+from dependencies import require_metrics_access
+from metrics import request_metrics
+
+router = APIRouter(tags=["metrics"])
+
+
+@router.get("/metrics", response_class=PlainTextResponse, dependencies=[Depends(require_metrics_access)])
+async def metrics():
+    """Histogramy czasu żądań i liczby zapytań do bazy per trasa w formacie Prometheusa."""
+    return PlainTextResponse(request_metrics.render(), media_type="text/plain; version=0.0.4")
@@ -1,40 +1,62 @@
 import logging
 
 from fastapi import APIRouter, Depends, HTTPException, status
-from sqlalchemy.orm import Session
-
-from auth import get_password_hash, verify_password
-from database import get_db
-from dependencies import get_current_user
-from models import User
-from schemas import AvatarUpdate, DeleteAccountRequest, ProfileUpdate, UserResponse
+from sqlalchemy import or_, select
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from auth import get_password_hash_async, verify_password_async
+from avatars import avatar_url, canonical_avatar, get_avatar_config, store_avatar
+from database import get_async_db
+from dependencies import get_current_user, invalidate_user_cache
+from etags import change_versions
+from games.batalla import end_player_games
+from games.sudoku import leaderboard
+from games.tictactoe import end_player_matches
+from models import Friendship, FriendshipStatus, User
+from schemas import AvatarUpdate, DeleteAccountRequest, MeResponse, ProfileUpdate, UserResponse
+from user_search import forget_user, index_user
+from user_stats import friends_changed
 
 logger = logging.getLogger(__name__)
 
 router = APIRouter(tags=["profile"])
 
 
-@router.get("/me", response_model=UserResponse)
-def get_me(current_user: User = Depends(get_current_user)):
-    return current_user
+@router.get("/me", response_model=MeResponse)
+async def get_me(
+    db: AsyncSession = Depends(get_async_db),
+    current_user: User = Depends(get_current_user),
+):
+    me = MeResponse.model_validate(current_user)
+    me.avatar = await get_avatar_config(db, current_user.avatar_hash)
+    return me
 
 
 @router.post("/avatar")
-def update_avatar(
+async def update_avatar(
     avatar_data: AvatarUpdate,
-    db: Session = Depends(get_db),
+    db: AsyncSession = Depends(get_async_db),
     current_user: User = Depends(get_current_user),
 ):
-    current_user.avatar = avatar_data.avatar
-    db.commit()
+    try:
+        config = canonical_avatar(avatar_data.avatar)
+    except ValueError as exc:
+        raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail=str(exc))
+    avatar_hash = await store_avatar(db, config)
+    changed = avatar_hash != current_user.avatar_hash
+    current_user.avatar_hash = avatar_hash
+    await db.commit()
+    if changed:
+        invalidate_user_cache(current_user.email)
+        change_versions.bump_profiles()
     logger.info("Zapisano awatar dla: %s", current_user.email)
-    return {"message": "Awatar zapisany pomyślnie"}
+    return {"message": "Awatar zapisany pomyślnie", "avatar_url": avatar_url(avatar_hash)}
 
 
 @router.put("/profile")
-def update_profile(
+async def update_profile(
     profile_data: ProfileUpdate,
-    db: Session = Depends(get_db),
+    db: AsyncSession = Depends(get_async_db),
     current_user: User = Depends(get_current_user),
 ):
     if not profile_data.current_password:
@@ -42,14 +64,17 @@ def update_profile(
             status_code=status.HTTP_400_BAD_REQUEST,
             detail="Podaj obecne hasło aby dokonać zmian",
         )
-    if not verify_password(profile_data.current_password, current_user.hashed_password):
+    if not await verify_password_async(
+        profile_data.current_password, current_user.hashed_password
+    ):
         raise HTTPException(
             status_code=status.HTTP_400_BAD_REQUEST,
             detail="Nieprawidłowe obecne hasło",
         )
 
+    previous_email = current_user.email
     if profile_data.username and profile_data.username != current_user.username:
-        if db.query(User).filter(User.username == profile_data.username).first():
+        if await db.scalar(select(User).where(User.username == profile_data.username)):
             raise HTTPException(
                 status_code=status.HTTP_400_BAD_REQUEST,
                 detail="Ta nazwa użytkownika jest już zajęta",
@@ -57,7 +82,7 @@ def update_profile(
         current_user.username = profile_data.username
 
     if profile_data.email and profile_data.email != current_user.email:
-        if db.query(User).filter(User.email == profile_data.email).first():
+        if await db.scalar(select(User).where(User.email == profile_data.email)):
             raise HTTPException(
                 status_code=status.HTTP_400_BAD_REQUEST,
                 detail="Ten adres email jest już zajęty",
@@ -65,10 +90,13 @@ def update_profile(
         current_user.email = profile_data.email
 
     if profile_data.new_password:
-        current_user.hashed_password = get_password_hash(profile_data.new_password)
+        current_user.hashed_password = await get_password_hash_async(profile_data.new_password)
 
-    db.commit()
-    db.refresh(current_user)
+    await db.commit()
+    await db.refresh(current_user)
+    invalidate_user_cache(previous_email, current_user.email)
+    index_user(current_user.id, current_user.username)
+    change_versions.bump_profiles()
     logger.info("Zaktualizowano profil dla: %s", current_user.email)
     return {
         "message": "Profil zaktualizowany pomyślnie",
@@ -77,19 +105,37 @@ def update_profile(
 
 
 @router.delete("/account")
-def delete_account(
+async def delete_account(
     body: DeleteAccountRequest,
-    db: Session = Depends(get_db),
+    db: AsyncSession = Depends(get_async_db),
     current_user: User = Depends(get_current_user),
 ):
-    if not verify_password(body.password, current_user.hashed_password):
+    if not await verify_password_async(body.password, current_user.hashed_password):
         raise HTTPException(
             status_code=status.HTTP_401_UNAUTHORIZED,
             detail="Nieprawidłowe hasło",
         )
+    user_id = current_user.id
     username = current_user.username
     email = current_user.email
-    db.delete(current_user)
-    db.commit()
+    # Gry w pamięci kończymy i zapisujemy, póki konto i zaproszenia jeszcze istnieją.
+    await end_player_games(user_id)
+    await end_player_matches(user_id)
+    # Znajomości znikną kaskadowo razem z kontem — znajomym zmniejszamy licznik w tej samej transakcji.
+    friendships = (await db.execute(
+        select(Friendship.requester_id, Friendship.addressee_id).where(
+            or_(Friendship.requester_id == user_id, Friendship.addressee_id == user_id),
+            Friendship.status == FriendshipStatus.ACCEPTED,
+        )
+    )).all()
+    friend_ids = [a if b == user_id else b for a, b in friendships]
+    if friend_ids:
+        await db.execute(friends_changed(db, friend_ids, -1))
+    await db.delete(current_user)
+    await db.commit()
+    invalidate_user_cache(email)
+    forget_user(user_id)
+    leaderboard.forget(user_id)
+    change_versions.bump_profiles()
     logger.info("Usunięto konto: %s (%s)", username, email)
     return {"message": "Konto zostało usunięte pomyślnie"}
@@ -0,0 +1,20 @@
+from fastapi import APIRouter, Depends
+from sqlalchemy import select
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from database import get_async_db
+from dependencies import get_current_user
+from models import User, UserStats
+from user_stats import summary
+
+router = APIRouter(tags=["stats"])
+
+
+@router.get("/stats/me")
+async def get_my_stats(
+    db: AsyncSession = Depends(get_async_db),
+    current_user: User = Depends(get_current_user),
+):
+    """Statystyki zalogowanego gracza: sumy, rozbicie na gry, serie wygranych i liczba znajomych."""
+    rows = (await db.scalars(select(UserStats).where(UserStats.user_id == current_user.id))).all()
+    return summary(rows)
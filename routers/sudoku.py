@@ -0,0 +1,163 @@
+import logging
+import math
+import time
+from datetime import datetime, timezone
+
+from fastapi import APIRouter, Depends, HTTPException, Query, Response, status
+from sqlalchemy import select
+from sqlalchemy.exc import IntegrityError
+from sqlalchemy.ext.asyncio import AsyncSession
+from starlette.concurrency import run_in_threadpool
+
+from avatars import avatar_url
+from database import get_async_db
+from dependencies import get_current_user
+from games.sudoku import (
+    DIFFICULTIES,
+    SUDOKU_LEADERBOARD_LIMIT_MAX,
+    is_solution,
+    issue_puzzle_token,
+    leaderboard,
+    puzzle_bank,
+    read_puzzle_token,
+)
+from models import SudokuResult, User
+from schemas import (
+    SUDOKU_DIFFICULTIES,
+    SudokuLeaderboardEntry,
+    SudokuPuzzleResponse,
+    SudokuRank,
+    SudokuResultCreate,
+    SudokuResultResponse,
+)
+from user_stats import SUDOKU, WIN, game_results
+
+logger = logging.getLogger(__name__)
+
+router = APIRouter(tags=["sudoku"])
+
+# Zapas na różnicę zegarów i opóźnienie sieci przy porównaniu czasu gry z czasem od wydania planszy.
+_CLOCK_SLACK_SECONDS = 5
+
+
+@router.get("/sudoku/puzzle", response_model=SudokuPuzzleResponse)
+async def get_puzzle(response: Response, difficulty: SUDOKU_DIFFICULTIES = "medium"):
+    """Nowa plansza z banku (z jednoznacznym rozwiązaniem i oceną trudności)."""
+    puzzle = puzzle_bank.take(difficulty)
+    if puzzle is None:
+        # Bank jeszcze się nie zapełnił (świeży start) — generujemy od ręki, poza pętlą zdarzeń.
+        puzzle = await run_in_threadpool(puzzle_bank.generate, difficulty)
+    response.headers["Cache-Control"] = "no-store"
+    return {
+        "difficulty": puzzle.difficulty,
+        "puzzle": list(puzzle.grid),
+        "givens": puzzle.givens,
+        "token": issue_puzzle_token(puzzle),
+    }
+
+
+@router.post("/sudoku/results", response_model=SudokuResultResponse, status_code=status.HTTP_201_CREATED)
+async def submit_result(
+    result: SudokuResultCreate,
+    db: AsyncSession = Depends(get_async_db),
+    current_user: User = Depends(get_current_user),
+):
+    """Zapisuje czas po sprawdzeniu, że rozwiązanie pasuje do wydanej planszy (każda plansza raz).
+
+    Do rankingu trafia czas zmierzony przez serwer (od wydania planszy), nie zgłoszony
+    przez klienta — czas z przeglądarki służy tylko do sprawdzenia spójności.
+    """
+    issued = read_puzzle_token(result.token)
+    if issued is None:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST, detail="Nieprawidłowy lub wygasły token planszy"
+        )
+    if not is_solution(issued.grid, result.solution):
+        raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail="Rozwiązanie nie pasuje do planszy")
+    elapsed = time.time() - issued.issued_at
+    if result.seconds > elapsed + _CLOCK_SLACK_SECONDS:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail="Czas gry jest dłuższy niż czas od pobrania planszy",
+        )
+    seconds = max(1, math.ceil(elapsed))
+    if seconds < DIFFICULTIES[issued.difficulty].min_seconds:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail="Plansza rozwiązana zbyt szybko, wynik nie trafi do rankingu",
+        )
+
+    achieved_at = datetime.now(timezone.utc)
+    db.add(SudokuResult(
+        user_id=current_user.id,
+        puzzle_id=issued.puzzle_id,
+        difficulty=issued.difficulty,
+        seconds=seconds,
+        created_at=achieved_at,
+    ))
+    await db.execute(game_results(db, SUDOKU, {current_user.id: WIN}))
+    try:
+        await db.commit()
+    except IntegrityError:
+        await db.rollback()
+        raise HTTPException(
+            status_code=status.HTTP_409_CONFLICT, detail="Wynik dla tej planszy został już zapisany"
+        )
+
+    new_best = leaderboard.record(current_user.id, issued.difficulty, seconds, achieved_at)
+    rank, best_seconds, players = leaderboard.rank(current_user.id, issued.difficulty)
+    logger.info(
+        "Wynik Sudoku %s: %ss (%s) dla: %s", issued.difficulty, seconds, issued.puzzle_id, current_user.email
+    )
+    return {
+        "difficulty": issued.difficulty,
+        "seconds": seconds,
+        "new_best": new_best,
+        "rank": rank,
+        "best_seconds": best_seconds,
+        "players": players,
+    }
+
+
+@router.get("/sudoku/leaderboard", response_model=list[SudokuLeaderboardEntry])
+async def get_leaderboard(
+    difficulty: SUDOKU_DIFFICULTIES = "medium",
+    limit: int = Query(10, ge=1, le=SUDOKU_LEADERBOARD_LIMIT_MAX),
+    db: AsyncSession = Depends(get_async_db),
+):
+    """Najlepsze czasy na poziomie (jeden wpis na gracza) — z rankingu w pamięci, nie z sortowania tabeli."""
+    top = leaderboard.top(difficulty, limit)
+    if not top:
+        return []
+    users = {
+        user_id: (username, avatar_hash)
+        for user_id, username, avatar_hash in (
+            await db.execute(
+                select(User.id, User.username, User.avatar_hash).where(User.id.in_([entry[1] for entry in top]))
+            )
+        ).all()
+    }
+    # Konta usunięte po ostatniej odbudowie rankingu pomijamy (miejsca zostają jak w rankingu).
+    return [
+        {
+            "rank": rank,
+            "username": users[user_id][0],
+            "avatar_url": avatar_url(users[user_id][1]),
+            "seconds": seconds,
+            "achieved_at": datetime.fromtimestamp(achieved_at, timezone.utc),
+        }
+        for rank, user_id, seconds, achieved_at in top
+        if user_id in users
+    ]
+
+
+@router.get("/sudoku/leaderboard/me", response_model=list[SudokuRank])
+async def get_my_ranks(current_user: User = Depends(get_current_user)):
+    """Miejsce zalogowanego gracza na każdym poziomie, na którym ma wynik."""
+    ranks = []
+    for difficulty in DIFFICULTIES:
+        position = leaderboard.rank(current_user.id, difficulty)
+        if position is not None:
+            rank, best_seconds, players = position
+            ranks.append({"difficulty": difficulty, "rank": rank, "best_seconds": best_seconds, "players": players})
+    return ranks
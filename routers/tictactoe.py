@@ -0,0 +1,98 @@
+import logging
+
+from fastapi import APIRouter, Depends, HTTPException, status
+from sqlalchemy import select
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy.orm import aliased
+
+from database import get_async_db
+from dependencies import get_current_user
+from games.tictactoe import Match, MoveError, matches, publish_state, save_matches
+from games.tictactoe.engine import SYMBOLS
+from models import TicTacToeMatch, User
+from schemas import TicTacToeMove
+
+logger = logging.getLogger(__name__)
+
+router = APIRouter(tags=["tictactoe"])
+
+
+def _state_for(match: Match, user_id: int) -> dict:
+    return {**match.state(), "you": SYMBOLS[match.symbol_of(user_id)]}
+
+
+def _active_match(match_id: int, current_user: User) -> Match:
+    match = matches.get(match_id)
+    if match is None or match.finished:
+        raise HTTPException(
+            status_code=status.HTTP_404_NOT_FOUND,
+            detail="Partia nie znaleziona lub już zakończona",
+        )
+    if match.symbol_of(current_user.id) is None:
+        raise HTTPException(status_code=status.HTTP_403_FORBIDDEN, detail="To nie Twoja partia")
+    return match
+
+
+async def _publish_and_save(match: Match) -> None:
+    """Stan w pamięci jest już zmieniony — błąd zapisu do bazy nie może zamienić odpowiedzi w 500."""
+    publish_state(match)
+    if match.finished:
+        await save_matches([match])
+        logger.info(
+            "Koniec partii kółka i krzyżyka %s: %s (%s vs %s)",
+            match.id,
+            match.outcome,
+            *match.usernames,
+        )
+
+
+@router.get("/tictactoe/matches/{match_id}")
+async def get_match(
+    match_id: int,
+    db: AsyncSession = Depends(get_async_db),
+    current_user: User = Depends(get_current_user),
+):
+    """Stan partii — z pamięci, a po jej usunięciu odtworzony z zapisanych ruchów."""
+    match = matches.get(match_id)
+    if match is None:
+        PlayerX, PlayerO = aliased(User), aliased(User)
+        found = (
+            await db.execute(
+                select(TicTacToeMatch, PlayerX.username, PlayerO.username)
+                .join(PlayerX, TicTacToeMatch.player_x_id == PlayerX.id)
+                .join(PlayerO, TicTacToeMatch.player_o_id == PlayerO.id)
+                .where(TicTacToeMatch.invitation_id == match_id)
+            )
+        ).first()
+        if found is not None:
+            row, username_x, username_o = found
+            match = Match.from_row(row, (username_x, username_o))
+    if match is None or match.symbol_of(current_user.id) is None:
+        raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="Partia nie znaleziona")
+    return _state_for(match, current_user.id)
+
+
+@router.post("/tictactoe/matches/{match_id}/moves")
+async def make_move(
+    match_id: int,
+    move: TicTacToeMove,
+    current_user: User = Depends(get_current_user),
+):
+    match = _active_match(match_id, current_user)
+    try:
+        matches.play(match, current_user.id, move.cell)
+    except MoveError as exc:
+        raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail=str(exc))
+    await _publish_and_save(match)
+    return _state_for(match, current_user.id)
+
+
+@router.post("/tictactoe/matches/{match_id}/resign")
+async def resign_match(
+    match_id: int,
+    current_user: User = Depends(get_current_user),
+):
+    match = _active_match(match_id, current_user)
+    matches.resign(match, current_user.id)
+    await _publish_and_save(match)
+    return _state_for(match, current_user.id)
@@ -1,7 +1,9 @@
-from pydantic import BaseModel, ConfigDict, EmailStr, Field, field_validator
+from pydantic import BaseModel, ConfigDict, EmailStr, Field, computed_field, field_validator
 from datetime import datetime
 from typing import Literal, Optional
 
+from avatars import avatar_url
+
 
 class UserCreate(BaseModel):
     username: str = Field(..., min_length=3, max_length=50)
@@ -26,6 +28,16 @@ class UserResponse(BaseModel):
     id: int
     username: str
     email: str
+    avatar_hash: str | None = None
+
+    @computed_field
+    @property
+    def avatar_url(self) -> str | None:
+        return avatar_url(self.avatar_hash)
+
+
+class MeResponse(UserResponse):
+    # Pełna konfiguracja tylko dla właściciela (listy dostają sam adres obrazka).
     avatar: str | None = None
 
 
@@ -85,7 +97,7 @@ class FriendResponse(BaseModel):
     id: int
     username: str
     email: str
-    avatar: str | None = None
+    avatar_url: str | None = None
     friendship_status: str
     friendship_id: int
 
@@ -107,3 +119,49 @@ class GameInvitationResponse(BaseModel):
     game_type: str
     status: str
     created_at: datetime
+
+
+SUDOKU_DIFFICULTIES = Literal["easy", "medium", "hard"]
+
+
+class SudokuPuzzleResponse(BaseModel):
+    difficulty: str
+    puzzle: list[int]  # 81 pól wierszami, 0 = puste
+    givens: int
+    token: str  # podpisana plansza — potrzebna przy zgłaszaniu wyniku
+
+
+class SudokuResultCreate(BaseModel):
+    token: str
+    solution: list[int] = Field(..., min_length=81, max_length=81)
+    seconds: int = Field(..., ge=1)
+
+
+class SudokuRank(BaseModel):
+    difficulty: str
+    rank: int
+    best_seconds: int
+    players: int
+
+
+class SudokuResultResponse(SudokuRank):
+    seconds: int
+    new_best: bool
+
+
+class SudokuLeaderboardEntry(BaseModel):
+    rank: int
+    username: str
+    avatar_url: str | None = None
+    seconds: int
+    achieved_at: datetime
+
+
+class TicTacToeMove(BaseModel):
+    cell: int = Field(..., ge=0, le=8)  # pola wierszami, 0 = lewy górny róg
+
+
+class BatallaAction(BaseModel):
+    action: Literal["class", "roll", "choose", "answer", "resign"]
+    value: str | None = None  # klasa postaci, wybrana opcja albo numer odpowiedzi
+    version: int | None = None  # wersja stanu widziana przez klienta (ochrona przed podwójnym kliknięciem)
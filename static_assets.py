@@ -0,0 +1,500 @@
+import argparse
+import gzip
+import hashlib
+import json
+import logging
+import os
+import posixpath
+import re
+import threading
+import time
+from collections import OrderedDict
+from collections.abc import Container
+from dataclasses import dataclass, field
+from pathlib import Path
+from urllib.parse import unquote
+
+from starlette.concurrency import run_in_threadpool
+from starlette.datastructures import Headers
+from starlette.requests import Request
+from starlette.responses import FileResponse, PlainTextResponse, RedirectResponse, Response
+from starlette.types import Receive, Scope, Send
+
+from etags import is_not_modified
+
+try:
+    import brotli
+except ImportError:  # opcjonalne — bez niego serwujemy gzip (i gotowe pliki .br, jeśli są)
+    brotli = None
+
+logger = logging.getLogger(__name__)
+
+STATIC_ROOT = Path(os.getenv("STATIC_ROOT", Path(__file__).resolve().parent))
+
+# Tylko te katalogi (i pliki z tymi rozszerzeniami) są publiczne — kod backendu,
+# .env, migracje itd. leżą obok frontendu, ale nie są serwowane.
+STATIC_DIRS = [
+    "css", "js", "haslo", "img_glowna", "karty", "kolko-i-krzyzyk", "logowanie", "plansza",
+    "regulamin", "rejestracja", "statystyki", "sudoku", "uczelnia", "wybor awatara", "zasady",
+    "znajomi", "optimized",
+]
+STATIC_ROOT_FILES = ["index.html"]
+_CONTENT_TYPES = {
+    ".html": "text/html",
+    ".css": "text/css",
+    ".js": "application/javascript; charset=utf-8",
+    ".json": "application/json",
+    ".txt": "text/plain",
+    ".svg": "image/svg+xml",
+    ".png": "image/png",
+    ".jpg": "image/jpeg",
+    ".jpeg": "image/jpeg",
+    ".gif": "image/gif",
+    ".webp": "image/webp",
+    ".avif": "image/avif",
+    ".ico": "image/x-icon",
+    ".woff2": "font/woff2",
+}
+_COMPRESSIBLE = {".html", ".css", ".js", ".json", ".txt", ".svg"}
+
+# Wersjonowane adresy: style.<hash>.css — treść pod takim adresem nigdy się nie zmienia.
+_HASH_LENGTH = 10
+_FINGERPRINT_RE = re.compile(r"^(?P<stem>.+)\.(?P<hash>[0-9a-f]{%d})(?P<ext>\.[^./]+)$" % _HASH_LENGTH)
+_IMMUTABLE = "public, max-age=31536000, immutable"
+_REVALIDATE = "no-cache"
+
+# Odwołania do plików w HTML (src/href) i CSS (url(...)) są przepisywane na wersjonowane adresy.
+_HTML_REF_RE = re.compile(r"""(?P<prefix>\b(?:src|href)\s*=\s*)(?P<quote>["'])(?P<ref>[^"']+)(?P=quote)""", re.I)
+_CSS_REF_RE = re.compile(r"""(?P<prefix>url\(\s*)(?P<quote>["']?)(?P<ref>[^"')]+)(?P=quote)""", re.I)
+_REWRITTEN = {".html": _HTML_REF_RE, ".css": _CSS_REF_RE}
+
+# Manifest wariantów AVIF/WebP/PNG z build_images.py.
+IMAGE_MANIFEST = "optimized/manifest.json"
+_IMAGE_MIME_TYPES = {"avif": "image/avif", "webp": "image/webp", "png": "image/png"}
+
+STATIC_CACHE_MAX_BYTES = int(os.getenv("STATIC_CACHE_MAX_BYTES", str(16 * 1024 * 1024)))
+STATIC_CACHE_MAX_FILE_BYTES = int(os.getenv("STATIC_CACHE_MAX_FILE_BYTES", str(256 * 1024)))
+# Sprawdzanie mtime serwowanego pliku przy każdym żądaniu (zmienione pliki widać bez
+# restartu) — do pracy lokalnej. Na produkcji pliki się nie zmieniają, więc domyślnie wyłączone.
+STATIC_AUTO_RELOAD = os.getenv("STATIC_AUTO_RELOAD", "false").lower() in ("1", "true", "yes")
+_RESCAN_MIN_INTERVAL_SECONDS = 1.0
+
+
+@dataclass
+class _Asset:
+    path: Path
+    size: int
+    mtime_ns: int
+    extension: str
+    content_type: str
+    digest: str = ""
+    # Kodowanie -> gotowy plik obok źródła (style.css.br / style.css.gz).
+    precompressed: dict[str, Path] = field(default_factory=dict)
+
+    @property
+    def compressible(self) -> bool:
+        return self.extension in _COMPRESSIBLE
+
+    @property
+    def rewritten(self) -> bool:
+        return self.extension in _REWRITTEN
+
+    @property
+    def fingerprint(self) -> str:
+        return self.digest[:_HASH_LENGTH]
+
+    def etag(self, encoding: str) -> str:
+        suffix = "" if encoding == "identity" else f"-{encoding}"
+        return f'"{self.digest[:20]}{suffix}"'
+
+
+class _ByteLRU:
+    """Cache LRU treści plików z limitem łącznej liczby bajtów (bezpieczny wątkowo)."""
+
+    def __init__(self, max_bytes: int):
+        self.max_bytes = max_bytes
+        self.hits = 0
+        self.misses = 0
+        self._size = 0
+        self._data: OrderedDict[tuple, bytes] = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, key: tuple) -> bytes | None:
+        with self._lock:
+            body = self._data.get(key)
+            if body is None:
+                self.misses += 1
+                return None
+            self._data.move_to_end(key)
+            self.hits += 1
+            return body
+
+    def set(self, key: tuple, body: bytes) -> None:
+        if len(body) > self.max_bytes:
+            return
+        with self._lock:
+            previous = self._data.pop(key, None)
+            if previous is not None:
+                self._size -= len(previous)
+            self._data[key] = body
+            self._size += len(body)
+            while self._size > self.max_bytes:
+                _, evicted = self._data.popitem(last=False)
+                self._size -= len(evicted)
+
+    def discard(self, relatives: Container[str]) -> None:
+        """Usuwa wpisy (wszystkie kodowania) plików o podanych ścieżkach."""
+        with self._lock:
+            for key in [key for key in self._data if key[0] in relatives]:
+                self._size -= len(self._data.pop(key))
+
+    def stats(self) -> dict:
+        with self._lock:
+            return {
+                "hits": self.hits,
+                "misses": self.misses,
+                "entries": len(self._data),
+                "bytes": self._size,
+                "max_bytes": self.max_bytes,
+            }
+
+
+def _is_whitelisted(relative: str) -> bool:
+    parts = relative.split("/")
+    if any(part.startswith(".") for part in parts):
+        return False
+    if posixpath.splitext(relative)[1].lower() not in _CONTENT_TYPES:
+        return False
+    return relative in STATIC_ROOT_FILES or (len(parts) > 1 and parts[0] in STATIC_DIRS)
+
+
+def _fingerprinted_name(relative: str, fingerprint: str) -> str:
+    stem, extension = posixpath.splitext(relative)
+    return f"{stem}.{fingerprint}{extension}"
+
+
+def _compress(body: bytes, encoding: str) -> bytes:
+    if encoding == "br":
+        return brotli.compress(body, quality=11)
+    return gzip.compress(body, compresslevel=9, mtime=0)
+
+
+class AssetManifest:
+    """Spis serwowanych plików: rozmiar, mtime, hash treści i gotowe warianty .br/.gz.
+
+    Hash HTML i CSS liczony jest po przepisaniu odwołań, więc zmiana obrazka
+    zmienia też adres arkusza, który go używa (i strony, która używa arkusza).
+    """
+
+    def __init__(self, root: Path):
+        self.root = root
+        self._lock = threading.Lock()
+        self._assets: dict[str, _Asset] = {}
+        # Oryginał -> [(typ MIME, ścieżka wariantu)], od najmniejszego pliku.
+        self.image_variants: dict[str, list[tuple[str, str]]] = {}
+        self._scanned_at = 0.0
+        self.scan()
+
+    def get(self, relative: str) -> _Asset | None:
+        return self._assets.get(relative)
+
+    def __len__(self) -> int:
+        return len(self._assets)
+
+    def __iter__(self):
+        return iter(sorted(self._assets.items()))
+
+    def scan(self) -> None:
+        with self._lock:
+            self._scan()
+
+    def _scan(self) -> None:
+        assets: dict[str, _Asset] = {}
+        for name in STATIC_ROOT_FILES + STATIC_DIRS:
+            top = self.root / name
+            paths = [top] if top.is_file() else sorted(p for p in top.rglob("*") if p.is_file())
+            for path in paths:
+                relative = path.relative_to(self.root).as_posix()
+                if not _is_whitelisted(relative):
+                    continue
+                stat = path.stat()
+                extension = path.suffix.lower()
+                assets[relative] = _Asset(
+                    path=path,
+                    size=stat.st_size,
+                    mtime_ns=stat.st_mtime_ns,
+                    extension=extension,
+                    content_type=_CONTENT_TYPES[extension],
+                )
+
+        image_variants = self._load_image_variants(assets)
+
+        # Najpierw pliki bez odwołań, potem obrazki z wariantami, CSS i na końcu HTML.
+        def order(item: tuple[str, _Asset]) -> int:
+            relative, asset = item
+            if asset.extension in _REWRITTEN:
+                return 2 if asset.extension == ".css" else 3
+            return 1 if relative in image_variants else 0
+
+        for relative, asset in sorted(assets.items(), key=order):
+            digest = hashlib.sha256(self._render(relative, asset, assets))
+            # Przebudowa wariantów zmienia adres oryginału — inaczej immutable trzymałby stary wariant.
+            for _, path in image_variants.get(relative, ()):
+                digest.update(assets[path].digest.encode())
+            asset.digest = digest.hexdigest()
+            if asset.compressible and not asset.rewritten:
+                for encoding, suffix in (("br", ".br"), ("gzip", ".gz")):
+                    variant = asset.path.with_name(asset.path.name + suffix)
+                    if variant.is_file() and variant.stat().st_mtime_ns >= asset.mtime_ns:
+                        asset.precompressed[encoding] = variant
+
+        self._assets = assets
+        self.image_variants = image_variants
+        self._scanned_at = time.monotonic()
+        logger.info("Zeskanowano pliki statyczne: %s plików w %s", len(assets), self.root)
+
+    def _load_image_variants(self, assets: dict[str, _Asset]) -> dict[str, list[tuple[str, str]]]:
+        """Warianty, którymi można zastąpić oryginał bez utraty jakości (najwyższa gęstość)."""
+        manifest_asset = assets.get(IMAGE_MANIFEST)
+        if manifest_asset is None:
+            return {}
+        try:
+            manifest = json.loads(manifest_asset.path.read_text(encoding="utf-8"))
+        except ValueError:
+            logger.warning("Nieprawidłowy %s — serwuję oryginalne obrazki", IMAGE_MANIFEST)
+            return {}
+        image_variants = {}
+        for relative, entry in manifest.get("images", {}).items():
+            variants = sorted(
+                (variant["bytes"], _IMAGE_MIME_TYPES[variant["format"]], variant["path"])
+                for variant in entry["variants"]
+                if variant["width"] == entry.get("serve_width") and variant["path"] in assets
+            )
+            if relative in assets and variants:
+                image_variants[relative] = [(mime, path) for _, mime, path in variants]
+        return image_variants
+
+    def rescan_if_stale(self, asset: _Asset) -> set[str]:
+        """Skanuje ponownie, jeśli plik zmienił się na dysku; zwraca ścieżki plików o innej treści.
+
+        Zmiana jednego pliku może zmienić hash stron i arkuszy, które się do niego odwołują,
+        więc porównujemy hashe wszystkich plików. Nowe pliki pojawiają się przy najbliższym
+        skanie — adresy spoza manifestu nie wywołują skanowania.
+        """
+        try:
+            stat = asset.path.stat()
+        except FileNotFoundError:
+            stat = None
+        if stat is not None and (stat.st_mtime_ns, stat.st_size) == (asset.mtime_ns, asset.size):
+            return set()
+        with self._lock:
+            if time.monotonic() - self._scanned_at < _RESCAN_MIN_INTERVAL_SECONDS:
+                return set()
+            previous = {relative: item.digest for relative, item in self._assets.items()}
+            self._scan()
+            current = {relative: item.digest for relative, item in self._assets.items()}
+        return {
+            relative
+            for relative in previous.keys() | current.keys()
+            if previous.get(relative) != current.get(relative)
+        }
+
+    def render(self, relative: str, asset: _Asset) -> bytes:
+        return self._render(relative, asset, self._assets)
+
+    def _render(self, relative: str, asset: _Asset, assets: dict[str, _Asset]) -> bytes:
+        body = asset.path.read_bytes()
+        pattern = _REWRITTEN.get(asset.extension)
+        if pattern is None:
+            return body
+        base = posixpath.dirname(relative)
+
+        def replace(match: re.Match) -> str:
+            ref = match.group("ref")
+            if re.match(r"^(?:[a-z][a-z0-9+.-]*:|//|#|/)", ref, re.I):
+                return match.group(0)
+            path, sep, rest = ref, "", ""
+            split = re.search(r"[?#]", ref)
+            if split:
+                path, sep, rest = ref[:split.start()], ref[split.start()], ref[split.start() + 1:]
+            target = posixpath.normpath(posixpath.join(base, unquote(path)))
+            referenced = assets.get(target)
+            # Strony HTML zostają pod stałymi adresami (linki, zakładki).
+            if referenced is None or referenced.extension == ".html" or not referenced.digest:
+                return match.group(0)
+            new_ref = _fingerprinted_name(path, referenced.fingerprint) + sep + rest
+            return f"{match.group('prefix')}{match.group('quote')}{new_ref}{match.group('quote')}"
+
+        return pattern.sub(replace, body.decode("utf-8")).encode("utf-8")
+
+
+def _accepted_encodings(headers: Headers) -> list[str]:
+    """Kodowania z Accept-Encoding (q > 0) w kolejności naszych preferencji: br, gzip."""
+    accepted = {}
+    for item in headers.get("accept-encoding", "").split(","):
+        name, _, params = item.strip().partition(";")
+        quality = 1.0
+        for param in params.split(";"):
+            key, _, value = param.strip().partition("=")
+            if key == "q":
+                try:
+                    quality = float(value)
+                except ValueError:
+                    quality = 0.0
+        accepted[name.strip().lower()] = quality
+    wildcard = accepted.get("*", 0.0)
+    return [name for name in ("br", "gzip") if accepted.get(name, wildcard) > 0]
+
+
+class StaticAssets:
+    """Aplikacja ASGI serwująca frontend z białej listy katalogów.
+
+    - `/plansza/` → `plansza/index.html`, `/plansza` → przekierowanie na `/plansza/`
+    - `style.<hash>.css` (hash z manifestu) → `Cache-Control: immutable` na rok;
+      zwykłe adresy → `no-cache` z silnym ETagiem (rewalidacja kończy się 304)
+    - br/gzip według Accept-Encoding: gotowy plik `.br`/`.gz` z dysku albo
+      kompresja w locie, a małe pliki (także skompresowane) trzymane w LRU
+    - obrazki z manifestu build_images.py: najmniejszy wariant AVIF/WebP/PNG,
+      który przeglądarka akceptuje (nagłówek Accept)
+    """
+
+    def __init__(self, root: Path = STATIC_ROOT):
+        self.manifest = AssetManifest(root)
+        self.cache = _ByteLRU(STATIC_CACHE_MAX_BYTES)
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send) -> None:
+        assert scope["type"] == "http"
+        request = Request(scope, receive)
+        if request.method not in ("GET", "HEAD"):
+            response = PlainTextResponse("Method Not Allowed", status_code=405, headers={"Allow": "GET, HEAD"})
+        else:
+            response = await self._respond(request)
+        await response(scope, receive, send)
+
+    def _lookup(self, url_path: str) -> tuple[str | None, _Asset | None, bool]:
+        """Zwraca (ścieżka względna, plik, czy adres ma aktualny hash)."""
+        relative = url_path.lstrip("/")
+        if relative == "" or relative.endswith("/"):
+            relative += "index.html"
+        asset = self.manifest.get(relative)
+        if asset is not None:
+            return relative, asset, False
+        match = _FINGERPRINT_RE.match(relative)
+        if match:
+            original = match.group("stem") + match.group("ext")
+            asset = self.manifest.get(original)
+            if asset is not None:
+                # Nieaktualny hash (np. stara strona z cache) dostaje bieżącą treść bez immutable.
+                return original, asset, asset.fingerprint == match.group("hash")
+        return None, None, False
+
+    async def _respond(self, request: Request) -> Response:
+        url_path = request.scope["path"]
+        relative, asset, fingerprinted = self._lookup(url_path)
+        if STATIC_AUTO_RELOAD and asset is not None:
+            changed = await run_in_threadpool(self.manifest.rescan_if_stale, asset)
+            if changed:
+                self.cache.discard(changed)
+            # Po skanie manifest ma nowe obiekty plików (nawet gdy treść się nie zmieniła).
+            relative, asset, fingerprinted = self._lookup(url_path)
+
+        if asset is None:
+            if self.manifest.get(url_path.strip("/") + "/index.html") is not None:
+                return RedirectResponse(request.url.replace(path=url_path + "/"), status_code=307)
+            return PlainTextResponse("Not Found", status_code=404)
+
+        vary = []
+        if relative in self.manifest.image_variants:
+            vary.append("Accept")
+            accept = request.headers.get("accept", "")
+            for mime, path in self.manifest.image_variants[relative]:
+                variant = self.manifest.get(path)
+                if variant is not None and (mime == "image/png" or mime in accept):
+                    relative, asset = path, variant
+                    break
+
+        encoding = "identity"
+        if asset.compressible:
+            for candidate in _accepted_encodings(request.headers):
+                if candidate == "gzip" or candidate in asset.precompressed or brotli is not None:
+                    encoding = candidate
+                    break
+
+        etag = asset.etag(encoding)
+        headers = {
+            "ETag": etag,
+            "Cache-Control": _IMMUTABLE if fingerprinted else _REVALIDATE,
+        }
+        if asset.compressible:
+            vary.append("Accept-Encoding")
+        if vary:
+            headers["Vary"] = ", ".join(vary)
+        if encoding != "identity":
+            headers["Content-Encoding"] = encoding
+        if is_not_modified(request, etag):
+            return Response(status_code=304, headers=headers)
+
+        if encoding in asset.precompressed:
+            return FileResponse(
+                asset.precompressed[encoding],
+                headers=headers,
+                media_type=asset.content_type,
+                method=request.method,
+            )
+        if asset.size > STATIC_CACHE_MAX_FILE_BYTES and encoding == "identity" and not asset.rewritten:
+            return FileResponse(asset.path, headers=headers, media_type=asset.content_type, method=request.method)
+
+        key = (relative, asset.digest, encoding)
+        body = self.cache.get(key)
+        if body is None:
+            body = await run_in_threadpool(self._load, relative, asset, encoding)
+            if len(body) <= STATIC_CACHE_MAX_FILE_BYTES:
+                self.cache.set(key, body)
+        if request.method == "HEAD":
+            headers["Content-Length"] = str(len(body))
+            return Response(headers=headers, media_type=asset.content_type)
+        return Response(body, headers=headers, media_type=asset.content_type)
+
+    def _load(self, relative: str, asset: _Asset, encoding: str) -> bytes:
+        body = self.manifest.render(relative, asset)
+        return body if encoding == "identity" else _compress(body, encoding)
+
+    def stats(self) -> dict:
+        return {"files": len(self.manifest), "cache": self.cache.stats()}
+
+
+static_assets = StaticAssets()
+
+
+def precompress(root: Path = STATIC_ROOT, min_size: int = 256) -> int:
+    """Zapisuje obok plików tekstowych warianty .gz (i .br, jeśli jest moduł brotli).
+
+    HTML i CSS są pomijane — ich treść zależy od hashy innych plików, więc
+    kompresujemy je w locie (i trzymamy w LRU).
+    """
+    manifest = AssetManifest(root)
+    written = 0
+    for relative, asset in manifest:
+        if not asset.compressible or asset.rewritten or asset.size < min_size:
+            continue
+        body = asset.path.read_bytes()
+        for encoding, suffix in (("br", ".br"), ("gzip", ".gz")):
+            if encoding == "br" and brotli is None:
+                continue
+            compressed = _compress(body, encoding)
+            if len(compressed) >= len(body):
+                continue
+            asset.path.with_name(asset.path.name + suffix).write_bytes(compressed)
+            written += 1
+            print(f"{relative}{suffix}: {len(body)} -> {len(compressed)} B")
+    return written
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Kompresja plików statycznych (.gz/.br) przed wdrożeniem")
+    parser.add_argument("--root", type=Path, default=STATIC_ROOT)
+    parser.add_argument("--min-size", type=int, default=256, help="Pomiń pliki mniejsze niż tyle bajtów")
+    args = parser.parse_args()
+    if brotli is None:
+        print("Brak modułu brotli — zapisuję tylko warianty .gz")
+    print(f"Zapisano {precompress(args.root, args.min_size)} plików")
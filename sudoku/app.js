@@ -28,6 +28,7 @@ let givens = new Set();
 
 let puzzle = null; 
 let initialPuzzle = null;
+let puzzleToken = null; // podpisana plansza z serwera — potrzebna do zgłoszenia wyniku do rankingu
 let elapsedSeconds = 0;
 let timerInterval = null;
 let timerRunning = false;
@@ -286,21 +287,42 @@ function removeCells(full, difficulty){
   return board;
 }
 
-function newGame(){
+// plansza z banku serwera (/api/sudoku/puzzle); 0 w odpowiedzi = puste pole
+async function fetchPuzzle(diff){
+  const res = await fetch('/api/sudoku/puzzle?difficulty=' + encodeURIComponent(diff));
+  if(!res.ok) throw new Error('HTTP ' + res.status);
+  const data = await res.json();
+  const puzzle = data.puzzle.map(v => v || null);
+  // serwer nie wysyła rozwiązania (ranking) — plansza ma jedno, więc liczymy je tutaj
+  const solution = puzzle.slice();
+  solveBacktrack(solution);
+  return { puzzle, solution, token: data.token };
+}
+
+// zapasowo (np. strona otwarta bez serwera) — generator w przeglądarce
+function generateLocal(diff){
+  const full = generateFull();
+  return { puzzle: removeCells(full, diff), solution: full.slice(), token: null };
+}
+
+async function newGame(){
   messageEl.textContent = 'Generowanie...';
-  setTimeout(()=>{
-    const full = generateFull();
-    solution = full.slice();
-    const diff = difficultySelect.value;
-    const pz = removeCells(full, diff);
-    puzzle = pz.slice();
-    initialPuzzle = pz.slice();
-    setBoardToUI(puzzle, true);
-      eliminateImpossibleCandidates();
-    resetTimer();
-    startTimer();
-    messageEl.textContent = 'Gotowe — powodzenia!';
-  }, 20);
+  const diff = difficultySelect.value;
+  let game;
+  try{ game = await fetchPuzzle(diff); }
+  catch(e){
+    await new Promise(resolve => setTimeout(resolve, 20));
+    game = generateLocal(diff);
+  }
+  solution = game.solution;
+  puzzleToken = game.token;
+  puzzle = game.puzzle.slice();
+  initialPuzzle = game.puzzle.slice();
+  setBoardToUI(puzzle, true);
+    eliminateImpossibleCandidates();
+  resetTimer();
+  startTimer();
+  messageEl.textContent = 'Gotowe — powodzenia!';
 }
 
 function solve(){
@@ -329,7 +351,7 @@ function highlightConflicts(board){
 
 function saveState(showMessage = false){
   if(!initialPuzzle){ if(showMessage) messageEl.textContent = 'Brak gry do zapisania.'; return; }
-  const state = { initialPuzzle, current: getBoardFromUI(), solution, difficulty: difficultySelect.value, elapsedSeconds, timerRunning, candidates: serializeCandidates(), savedAt: new Date().toISOString() };
+  const state = { initialPuzzle, current: getBoardFromUI(), solution, puzzleToken, difficulty: difficultySelect.value, elapsedSeconds, timerRunning, candidates: serializeCandidates(), savedAt: new Date().toISOString() };
   try{ 
     localStorage.setItem('sudoku-save', JSON.stringify(state)); 
     savedAtEl.textContent = state.savedAt; 
@@ -350,6 +372,7 @@ function loadState(){
 function loadStateFromObject(st){
   initialPuzzle = st.initialPuzzle?.slice() || null;
   solution = st.solution?.slice() || null;
+  puzzleToken = st.puzzleToken || null;
   const current = st.current?.slice();
   if(current) setBoardToUI(current, false);
   if(st.candidates) deserializeCandidates(st.candidates);
@@ -386,7 +409,7 @@ function eliminateImpossibleCandidates(){
 // Eksport / Import
 function exportState(){
   if(!initialPuzzle){ messageEl.textContent = 'Brak gry do eksportu.'; return; }
-  const st = { initialPuzzle, current: getBoardFromUI(), solution, difficulty: difficultySelect.value, elapsedSeconds, candidates: serializeCandidates(), savedAt: new Date().toISOString() };
+  const st = { initialPuzzle, current: getBoardFromUI(), solution, puzzleToken, difficulty: difficultySelect.value, elapsedSeconds, candidates: serializeCandidates(), savedAt: new Date().toISOString() };
   const blob = new Blob([JSON.stringify(st, null, 2)], {type: 'application/json'});
   const url = URL.createObjectURL(blob);
   const a = Object.assign(document.createElement('a'), { href: url, download: 'sudoku-save-'+new Date().toISOString().replace(/[:.]/g,'-')+'.json' });
@@ -431,6 +454,7 @@ function check(){
     if(solveBacktrack(board.slice())){
       messageEl.textContent = 'Gratulacje — poprawne rozwiązanie!';
       try{ addResult(difficultySelect?.value || 'unknown', elapsedSeconds); } catch(e){}
+      submitResult(board, elapsedSeconds);
       pauseTimer();
       boardEl.classList.add('win'); 
       setTimeout(()=> boardEl.classList.remove('win'), 1200);
@@ -470,6 +494,7 @@ const clearLeaderboardBtn = document.getElementById('clearLeaderboard');
 const leaderboardEl = document.getElementById('leaderboard');
 const leaderboardTableBody = document.querySelector('#leaderboardTable tbody');
 const leaderboardFilter = document.getElementById('leaderboardFilter');
+const myRankEl = document.getElementById('myRank');
 
 function getLeaderboard(){
   try{ const raw = localStorage.getItem('sudoku-leaderboard'); return raw ? JSON.parse(raw) : []; } catch(e){ return []; }
@@ -489,13 +514,66 @@ function addResult(difficulty, seconds){
 
 function formatTime(s){ const mm = String(Math.floor(s/60)).padStart(2,'0'); const ss = String(s%60).padStart(2,'0'); return mm+':'+ss; }
 
-function renderLeaderboard(){
+function escapeHtml(text){ const div = document.createElement('div'); div.textContent = text; return div.innerHTML; }
+
+function leaderboardRow(rank, player, difficulty, seconds, date){
+  return `<tr><td>${rank}</td><td>${escapeHtml(player)}</td><td>${difficulty}</td><td>${formatTime(seconds)}</td><td>${new Date(date).toLocaleString()}</td></tr>`;
+}
+
+function renderLocalLeaderboard(filter){
+  const filtered = getLeaderboard().filter(r => filter === 'all' || r.difficulty === filter);
+  leaderboardTableBody.innerHTML = filtered.map((row,i) => leaderboardRow(i+1, 'Ty', row.difficulty, row.seconds, row.date)).join('');
+}
+
+// wspólny ranking z serwera (najlepszy czas każdego gracza); bez serwera — wyniki z localStorage
+async function renderLeaderboard(){
   if(!leaderboardTableBody) return;
   const filter = leaderboardFilter?.value || 'all';
-  const filtered = getLeaderboard().filter(r => filter === 'all' || r.difficulty === filter);
-  leaderboardTableBody.innerHTML = filtered.map((row,i) => 
-    `<tr><td>${i+1}</td><td>${row.difficulty}</td><td>${formatTime(row.seconds)}</td><td>${new Date(row.date).toLocaleString()}</td></tr>`
-  ).join('');
+  const difficulties = filter === 'all' ? ['easy', 'medium', 'hard'] : [filter];
+  try{
+    const lists = await Promise.all(difficulties.map(async diff => {
+      const res = await fetch('/api/sudoku/leaderboard?limit=10&difficulty=' + diff);
+      if(!res.ok) throw new Error('HTTP ' + res.status);
+      return (await res.json()).map(row => ({ ...row, difficulty: diff }));
+    }));
+    leaderboardTableBody.innerHTML = lists.flat().map(row => leaderboardRow(row.rank, row.username, row.difficulty, row.seconds, row.achieved_at)).join('');
+  }catch(e){
+    renderLocalLeaderboard(filter);
+    return;
+  }
+  renderMyRank();
+}
+
+async function renderMyRank(){
+  const token = localStorage.getItem('access_token');
+  if(!myRankEl || !token) return;
+  try{
+    const res = await fetch('/api/sudoku/leaderboard/me', { headers: { 'Authorization': 'Bearer ' + token } });
+    if(!res.ok) return;
+    const ranks = await res.json();
+    myRankEl.textContent = ranks.length
+      ? 'Twoje miejsca: ' + ranks.map(r => `${r.difficulty} — ${r.rank}/${r.players} (${formatTime(r.best_seconds)})`).join(', ')
+      : '';
+  }catch(e){}
+}
+
+// zgłoszenie wyniku — serwer sprawdza rozwiązanie z podpisaną planszą; każdą planszę można zgłosić raz
+async function submitResult(board, seconds){
+  const token = localStorage.getItem('access_token');
+  if(!puzzleToken || !token) return;
+  const body = JSON.stringify({ token: puzzleToken, solution: board, seconds: Math.max(1, seconds) });
+  puzzleToken = null;
+  try{
+    const res = await fetch('/api/sudoku/results', {
+      method: 'POST',
+      headers: { 'Content-Type': 'application/json', 'Authorization': 'Bearer ' + token },
+      body
+    });
+    const data = await res.json();
+    if(res.ok) messageEl.textContent += ` Miejsce w rankingu: ${data.rank}/${data.players}` + (data.new_best ? ' (nowy rekord!)' : '');
+    saveState();
+    if(!leaderboardEl?.classList.contains('hidden')) renderLeaderboard();
+  }catch(e){}
 }
 
 function clearLeaderboard(){ saveLeaderboard([]); renderLeaderboard(); }
@@ -0,0 +1,61 @@
+"""Hash zapisany przy niższym koszcie jest przeliczany przy logowaniu."""
+import asyncio
+import os
+
+os.environ.setdefault("HASH_WORKERS", "0")
+
+from sqlalchemy import create_engine
+from sqlalchemy.orm import sessionmaker
+from sqlalchemy.pool import StaticPool
+
+import auth
+from database import SyncSessionAdapter
+from models import Base, User
+from routers.auth import login
+from schemas import UserLogin
+
+PASSWORD = "secret-haslo-1"
+
+
+def _rounds(hashed: str) -> int:
+    return auth.pwd_context.handler().from_string(hashed).rounds
+
+
+def test_login_rehashes_password_hashed_at_old_cost():
+    engine = create_engine("sqlite://", connect_args={"check_same_thread": False}, poolclass=StaticPool)
+    Base.metadata.create_all(engine)
+    Session = sessionmaker(bind=engine, autoflush=False, expire_on_commit=False)
+    previous = auth.hash_settings()
+    try:
+        old_rounds = auth._MIN_ROUNDS[auth._HASH_SCHEME]
+        auth.configure_password_hashing(auth._context_settings(old_rounds))
+        with Session() as db:
+            db.add(User(username="ala", email="ala@example.com", hashed_password=auth.get_password_hash(PASSWORD)))
+            db.commit()
+
+        # Nowa kalibracja podniosła koszt — stary hash powinien zostać przeliczony.
+        auth.configure_password_hashing(auth._context_settings(old_rounds + 1))
+        with Session() as db:
+            old_hash = db.query(User).one().hashed_password
+        assert _rounds(old_hash) == old_rounds
+        assert auth.password_needs_rehash(old_hash)
+
+        async def _login():
+            db = SyncSessionAdapter(Session())
+            try:
+                return await login(UserLogin(email="ala@example.com", password=PASSWORD), db)
+            finally:
+                await db.close()
+
+        token = asyncio.run(_login())
+        assert token["access_token"]
+
+        with Session() as db:
+            new_hash = db.query(User).one().hashed_password
+        assert new_hash != old_hash
+        assert _rounds(new_hash) == old_rounds + 1
+        assert not auth.password_needs_rehash(new_hash)
+        assert auth.verify_password(PASSWORD, new_hash)
+    finally:
+        auth.configure_password_hashing(previous)
+        engine.dispose()
@@ -0,0 +1,147 @@
+import bisect
+import heapq
+import logging
+import os
+import threading
+from collections import defaultdict
+
+from sqlalchemy import select
+
+from database import SessionLocal
+from models import User
+
+logger = logging.getLogger(__name__)
+
+# Wyszukiwanie użytkowników po nazwie:
+#   database — zapytanie ILIKE z indeksem trigramowym pg_trgm (domyślnie)
+#   memory   — indeks w pamięci procesu (SQLite, testy, pojedynczy proces; w kilku
+#              workerach każdy ma własną kopię, aktualizowaną tylko przez swoje żądania)
+_SUPPORTED_SEARCH_BACKENDS = ["database", "memory"]
+USER_SEARCH_BACKEND = os.getenv("USER_SEARCH_BACKEND", "database")
+if USER_SEARCH_BACKEND not in _SUPPORTED_SEARCH_BACKENDS:
+    raise ValueError(
+        f"Nieobsługiwany backend wyszukiwania: '{USER_SEARCH_BACKEND}'. "
+        f"Dostępne opcje: {', '.join(_SUPPORTED_SEARCH_BACKENDS)}"
+    )
+
+_MAX_GRAM = 3
+
+
+def _grams(text: str, size: int) -> set[str]:
+    return {text[i:i + size] for i in range(len(text) - size + 1)}
+
+
+class UserSearchIndex:
+    """Indeks nazw użytkowników: posortowana lista (prefiksy, bisect) i n-gramy 1–3 (podciągi).
+
+    Wyniki są w tej samej kolejności co w bazie: najpierw nazwy zaczynające się od
+    zapytania (dokładne trafienie jako pierwsze), potem pozostałe od najkrótszych.
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._names: dict[int, str] = {}
+        self._sorted: list[tuple[str, int]] = []
+        self._grams: dict[str, set[int]] = defaultdict(set)
+        self.ready = False
+
+    def __len__(self) -> int:
+        return len(self._names)
+
+    def _add(self, user_id: int, username: str) -> None:
+        name = username.lower()
+        self._names[user_id] = name
+        bisect.insort(self._sorted, (name, user_id))
+        for size in range(1, _MAX_GRAM + 1):
+            for gram in _grams(name, size):
+                self._grams[gram].add(user_id)
+
+    def _remove(self, user_id: int) -> None:
+        name = self._names.pop(user_id, None)
+        if name is None:
+            return
+        position = bisect.bisect_left(self._sorted, (name, user_id))
+        del self._sorted[position]
+        for size in range(1, _MAX_GRAM + 1):
+            for gram in _grams(name, size):
+                postings = self._grams[gram]
+                postings.discard(user_id)
+                if not postings:
+                    del self._grams[gram]
+
+    def replace_all(self, users) -> None:
+        with self._lock:
+            self._names.clear()
+            self._sorted.clear()
+            self._grams.clear()
+            for user_id, username in users:
+                self._add(user_id, username)
+            self.ready = True
+
+    def add(self, user_id: int, username: str) -> None:
+        with self._lock:
+            self._remove(user_id)
+            self._add(user_id, username)
+
+    def remove(self, user_id: int) -> None:
+        with self._lock:
+            self._remove(user_id)
+
+    def search(self, query: str, limit: int, exclude_id: int | None = None) -> list[int]:
+        query = query.lower()
+        if not query:
+            return []
+        with self._lock:
+            found: list[int] = []
+            position = bisect.bisect_left(self._sorted, (query,))
+            while position < len(self._sorted) and len(found) < limit:
+                name, user_id = self._sorted[position]
+                if not name.startswith(query):
+                    break
+                if user_id != exclude_id:
+                    found.append(user_id)
+                position += 1
+            if len(found) == limit:
+                return found
+
+            # Podciągi: przecięcie list n-gramów (od najkrótszej), potem weryfikacja.
+            size = min(len(query), _MAX_GRAM)
+            postings = sorted((self._grams.get(gram, set()) for gram in _grams(query, size)), key=len)
+            if not postings or not postings[0]:
+                return found
+            candidates = set(postings[0]).intersection(*postings[1:])
+            taken = set(found)
+            matches = (
+                (len(self._names[user_id]), self._names[user_id], user_id)
+                for user_id in candidates
+                if user_id not in taken
+                and user_id != exclude_id
+                and query in self._names[user_id]
+            )
+            found.extend(user_id for _, _, user_id in heapq.nsmallest(limit - len(found), matches))
+            return found
+
+
+search_index = UserSearchIndex()
+
+
+def rebuild_search_index() -> None:
+    if USER_SEARCH_BACKEND != "memory":
+        return
+    with SessionLocal() as db:
+        search_index.replace_all(db.execute(select(User.id, User.username)).all())
+    logger.info("Zbudowano indeks wyszukiwania użytkowników (%s nazw)", len(search_index))
+
+
+def memory_index_ready() -> bool:
+    return USER_SEARCH_BACKEND == "memory" and search_index.ready
+
+
+def index_user(user_id: int, username: str) -> None:
+    if memory_index_ready():
+        search_index.add(user_id, username)
+
+
+def forget_user(user_id: int) -> None:
+    if memory_index_ready():
+        search_index.remove(user_id)
@@ -0,0 +1,239 @@
+"""Statystyki graczy (strona statystyki/) utrzymywane przyrostowo w tabeli user_stats.
+
+Zdarzenie (wysłane lub przyjęte zaproszenie, koniec gry, nowy albo usunięty znajomy)
+dopisuje się do wierszy gracza jednym UPSERT-em w tej samej transakcji co samo
+zdarzenie — strona statystyk czyta gotowe liczby po kluczu głównym, zamiast liczyć
+po game_invitations i tabelach partii. Każde zdarzenie trafia do wiersza swojej gry
+i do wiersza '*' (sumy ze wszystkich gier i liczba znajomych).
+
+Odbudowa całej tabeli z historii (po migracji albo gdy liczby się rozjadą):
+    python user_stats.py --rebuild
+"""
+import argparse
+import json
+import logging
+import sys
+import time
+from collections import defaultdict
+
+from sqlalchemy import case, delete, func, insert, literal, select, union_all
+
+from database import engine
+from models import (
+    BatallaGame,
+    Friendship,
+    FriendshipStatus,
+    GameInvitation,
+    GameInvitationStatus,
+    SudokuResult,
+    TicTacToeMatch,
+    UserStats,
+)
+
+logger = logging.getLogger("user_stats")
+
+ALL_GAMES = "*"
+WIN = "win"
+LOSS = "loss"
+DRAW = "draw"
+
+# Nazwy gier jak w game_invitations.game_type.
+TICTACTOE = "kolko-i-krzyzyk"
+BATALLA = "wielka-studencka-batalla"
+SUDOKU = "sudoku"
+
+_COUNTERS = ("invited", "accepted", "played", "won", "drawn", "friends")
+_COLUMNS = _COUNTERS + ("current_streak", "best_streak")
+
+
+def _dialect_insert(db):
+    if db.bind.dialect.name == "sqlite":
+        from sqlalchemy.dialects.sqlite import insert as dialect_insert
+    else:
+        from sqlalchemy.dialects.postgresql import insert as dialect_insert
+    return dialect_insert
+
+
+def _rows(user_id: int, game_type: str | None, **counters) -> list[dict]:
+    """Wiersz gry i wiersz '*' dla jednego zdarzenia (seria to 1 po wygranej, inaczej 0)."""
+    row = dict.fromkeys(_COLUMNS, 0)
+    row.update(counters)
+    row["current_streak"] = row["best_streak"] = row["won"]
+    rows = [{"user_id": user_id, "game_type": ALL_GAMES, **row}]
+    if game_type is not None:
+        rows.append({**rows[0], "game_type": game_type})
+    return rows
+
+
+def _upsert(db, rows: list[dict]):
+    # Stała kolejność wierszy — dwie transakcje blokują je w tej samej kolejności (bez zakleszczeń).
+    rows.sort(key=lambda row: (row["user_id"], row["game_type"]))
+    statement = _dialect_insert(db)(UserStats).values(rows)
+    excluded = statement.excluded
+    table = UserStats.__table__.c
+    result = excluded.played > 0
+    values = {name: table[name] + excluded[name] for name in _COUNTERS}
+    # Wygrana przedłuża serię, porażka i remis ją zerują, zdarzenia bez wyniku jej nie ruszają.
+    values["current_streak"] = case(
+        (~result, table.current_streak),
+        (excluded.won > 0, table.current_streak + 1),
+        else_=0,
+    )
+    values["best_streak"] = case(
+        (result & (excluded.won > 0) & (table.current_streak >= table.best_streak), table.current_streak + 1),
+        else_=table.best_streak,
+    )
+    values["updated_at"] = func.now()
+    return statement.on_conflict_do_update(index_elements=["user_id", "game_type"], set_=values)
+
+
+def invitation_sent(db, user_id: int, game_type: str):
+    """Instrukcja do wykonania w transakcji zdarzenia (`db.execute`) — tak samo niżej."""
+    return _upsert(db, _rows(user_id, game_type, invited=1))
+
+
+def invitation_accepted(db, user_id: int, game_type: str):
+    return _upsert(db, _rows(user_id, game_type, accepted=1))
+
+
+def game_results(db, game_type: str, results: dict[int, str]):
+    """Koniec gry: `results` to wynik każdego gracza (WIN / LOSS / DRAW)."""
+    rows = []
+    for user_id, outcome in results.items():
+        rows += _rows(user_id, game_type, played=1, won=int(outcome == WIN), drawn=int(outcome == DRAW))
+    return _upsert(db, rows)
+
+
+def friends_changed(db, user_ids, delta: int):
+    rows = []
+    for user_id in user_ids:
+        rows += _rows(user_id, None, friends=delta)
+    return _upsert(db, rows)
+
+
+def _counters(row: UserStats) -> dict:
+    return {
+        "invited": row.invited,
+        "accepted": row.accepted,
+        "played": row.played,
+        "won": row.won,
+        "drawn": row.drawn,
+        "lost": row.played - row.won - row.drawn,
+        "current_streak": row.current_streak,
+        "best_streak": row.best_streak,
+    }
+
+
+def summary(rows: list[UserStats]) -> dict:
+    """Odpowiedź dla strony statystyk z wierszy jednego gracza."""
+    total = next((row for row in rows if row.game_type == ALL_GAMES), None)
+    empty = UserStats(**dict.fromkeys(_COLUMNS, 0))
+    return {
+        **_counters(total or empty),
+        "friends": max(0, total.friends) if total is not None else 0,
+        "games": {row.game_type: _counters(row) for row in rows if row.game_type != ALL_GAMES},
+    }
+
+
+def _results_query():
+    """Wyniki wszystkich zakończonych gier (gracz, gra, wynik, czas) w kolejności chronologicznej."""
+    parts = []
+    for player in (TicTacToeMatch.player_x_id, TicTacToeMatch.player_o_id):
+        outcome = case(
+            (TicTacToeMatch.winner_id == player, WIN),
+            (TicTacToeMatch.winner_id.is_(None), DRAW),
+            else_=LOSS,
+        )
+        parts.append(select(
+            player.label("user_id"), literal(TICTACTOE).label("game_type"),
+            outcome.label("outcome"), TicTacToeMatch.finished_at.label("at"),
+        ))
+    for player in (GameInvitation.inviter_id, GameInvitation.invitee_id):
+        outcome = case((BatallaGame.winner_id == player, WIN), else_=LOSS)
+        parts.append(
+            select(
+                player.label("user_id"), literal(BATALLA).label("game_type"),
+                outcome.label("outcome"), BatallaGame.updated_at.label("at"),
+            )
+            .join(GameInvitation, GameInvitation.id == BatallaGame.invitation_id)
+            .where(BatallaGame.status == "finished")
+        )
+    parts.append(select(
+        SudokuResult.user_id.label("user_id"), literal(SUDOKU).label("game_type"),
+        literal(WIN).label("outcome"), SudokuResult.created_at.label("at"),
+    ))
+    results = union_all(*parts).subquery()
+    return select(results.c.user_id, results.c.game_type, results.c.outcome).order_by(results.c.at)
+
+
+def rebuild(batch_size: int = 5000) -> dict:
+    """Przelicza całą tabelę z historii (zapytania grupujące + jeden przebieg po wynikach gier)."""
+    stats: dict[tuple[int, str], dict] = defaultdict(lambda: dict.fromkeys(_COLUMNS, 0))
+
+    def add(user_id: int, game_type: str | None, name: str, value: int) -> None:
+        stats[user_id, ALL_GAMES][name] += value
+        if game_type is not None:
+            stats[user_id, game_type][name] += value
+
+    with engine.begin() as conn:
+        invited = select(GameInvitation.inviter_id, GameInvitation.game_type, func.count()).group_by(
+            GameInvitation.inviter_id, GameInvitation.game_type
+        )
+        for user_id, game_type, count in conn.execute(invited):
+            add(user_id, game_type, "invited", count)
+        accepted = (
+            select(GameInvitation.invitee_id, GameInvitation.game_type, func.count())
+            .where(GameInvitation.status == GameInvitationStatus.ACCEPTED)
+            .group_by(GameInvitation.invitee_id, GameInvitation.game_type)
+        )
+        for user_id, game_type, count in conn.execute(accepted):
+            add(user_id, game_type, "accepted", count)
+        for side in (Friendship.requester_id, Friendship.addressee_id):
+            friends = select(side, func.count()).where(Friendship.status == FriendshipStatus.ACCEPTED).group_by(side)
+            for user_id, count in conn.execute(friends):
+                add(user_id, None, "friends", count)
+
+        results = conn.execution_options(stream_results=True, yield_per=batch_size).execute(_results_query())
+        for user_id, game_type, outcome in results:
+            for key in ((user_id, game_type), (user_id, ALL_GAMES)):
+                row = stats[key]
+                row["played"] += 1
+                if outcome == WIN:
+                    row["won"] += 1
+                    row["current_streak"] += 1
+                    row["best_streak"] = max(row["best_streak"], row["current_streak"])
+                else:
+                    row["drawn"] += outcome == DRAW
+                    row["current_streak"] = 0
+
+        conn.execute(delete(UserStats))
+        batch = []
+        for (user_id, game_type), row in stats.items():
+            batch.append({"user_id": user_id, "game_type": game_type, **row})
+            if len(batch) >= batch_size:
+                conn.execute(insert(UserStats), batch)
+                batch = []
+        if batch:
+            conn.execute(insert(UserStats), batch)
+    return {"rows": len(stats), "users": len({user_id for user_id, _ in stats})}
+
+
+def main(argv: list[str] | None = None) -> int:
+    parser = argparse.ArgumentParser(description="Statystyki graczy (tabela user_stats)")
+    parser.add_argument("--rebuild", action="store_true", help="przelicz całą tabelę z historii gier i zaproszeń")
+    parser.add_argument("--batch-size", type=int, default=5000)
+    args = parser.parse_args(argv)
+    if not args.rebuild:
+        parser.print_help()
+        return 1
+
+    logging.basicConfig(level=logging.INFO, format="%(asctime)s %(levelname)s %(name)s: %(message)s")
+    start = time.perf_counter()
+    result = rebuild(args.batch_size)
+    result["seconds"] = round(time.perf_counter() - start, 2)
+    print(json.dumps(result, indent=2))
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -41,6 +41,14 @@ function getInitials(username) {
     return username.substring(0, 2).toUpperCase();
 }
 
+// Awatar z serwera (PNG pod adresem z hashem, cache'owany przez przeglądarkę) albo inicjały
+function avatarPreview(user) {
+    if (user.avatar_url) {
+        return `<div class="avatar-preview"><img src="${user.avatar_url}" alt="${getInitials(user.username)}"></div>`;
+    }
+    return `<div class="avatar-preview">${getInitials(user.username)}</div>`;
+}
+
 // Wyszukaj użytkowników
 async function searchUsers() {
     const query = document.getElementById('searchInput').value.trim();
@@ -117,11 +125,12 @@ async function loadFriendRequests() {
     }
 }
 
-// Pobierz listę znajomych
-async function loadFriends() {
+// Pobierz listę znajomych (stronami — kolejne po kliknięciu "Pokaż więcej")
+async function loadFriends(cursor = null) {
     try {
         const token = getToken();
-        const response = await fetch(`${API_URL}/friends`, {
+        const params = cursor ? `?cursor=${encodeURIComponent(cursor)}` : '';
+        const response = await fetch(`${API_URL}/friends${params}`, {
             headers: { 'Authorization': `Bearer ${token}` }
         });
         
@@ -130,17 +139,29 @@ async function loadFriends() {
         }
 
         const friends = await safeJsonParse(response);
+        const nextCursor = response.headers.get('X-Next-Cursor');
         const friendsDiv = document.getElementById('friendsList');
         const countSpan = document.getElementById('friendCount');
-        
-        countSpan.textContent = friends.length;
 
-        if (friends.length === 0) {
-            friendsDiv.innerHTML = '<div class="empty-state">Nie masz jeszcze znajomych. Użyj wyszukiwarki powyżej!</div>';
-            return;
+        if (!cursor) {
+            countSpan.textContent = response.headers.get('X-Total-Count') || friends.length;
+
+            if (friends.length === 0) {
+                friendsDiv.innerHTML = '<div class="empty-state">Nie masz jeszcze znajomych. Użyj wyszukiwarki powyżej!</div>';
+                return;
+            }
+            friendsDiv.innerHTML = '';
         }
 
-        friendsDiv.innerHTML = friends.map(friend => createUserCard(friend, 'friend')).join('');
+        const loadMoreBtn = document.getElementById('loadMoreFriends');
+        if (loadMoreBtn) {
+            loadMoreBtn.remove();
+        }
+        friendsDiv.insertAdjacentHTML('beforeend', friends.map(friend => createUserCard(friend, 'friend')).join(''));
+        if (nextCursor) {
+            friendsDiv.insertAdjacentHTML('beforeend',
+                `<button id="loadMoreFriends" class="btn-secondary" onclick="loadFriends('${nextCursor}')">Pokaż więcej</button>`);
+        }
     } catch (error) {
         console.error('Błąd:', error);
         showToast('Błąd pobierania znajomych', 'error');
@@ -149,7 +170,6 @@ async function loadFriends() {
 
 // Stwórz kartę użytkownika
 function createUserCard(user, type) {
-    const initials = getInitials(user.username);
     let actions = '';
     let status = '';
 
@@ -188,7 +208,7 @@ function createUserCard(user, type) {
     return `
         <div class="user-card">
             <div class="user-info">
-                <div class="avatar-preview">${initials}</div>
+                ${avatarPreview(user)}
                 <div class="user-details">
                     <div class="username">${user.username}</div>
                     <div class="email">${user.email}</div>
@@ -408,11 +428,10 @@ async function loadGameInvitations() {
         };
 
         invitationsDiv.innerHTML = invitations.map(inv => {
-            const initials = getInitials(inv.inviter.username);
             return `
                 <div class="user-card game-invitation-card">
                     <div class="user-info">
-                        <div class="avatar-preview">${initials}</div>
+                        ${avatarPreview(inv.inviter)}
                         <div class="user-details">
                             <div class="username">${inv.inviter.username}</div>
                             <div class="game-type">zaprasza Cię do gry: <strong>${gameNames[inv.game_type]}</strong></div>
@@ -469,7 +488,7 @@ async function acceptGameInvitation(invitationId, gameType) {
         // Przekieruj do odpowiedniej gry
          const gameUrls = {
       'wielka-studencka-batalla': '/plansza/?invite_accepted=' + invitationId,  // ← ZMIANA
-      'kolko-i-krzyzyk': '/kolko-i-krzyzyk/',
+      'kolko-i-krzyzyk': '/kolko-i-krzyzyk/?match=' + data.match_id,
       'sudoku': '/sudoku/'
     };
         
@@ -527,10 +546,35 @@ loadFriendRequests();
 loadFriends();
 loadGameInvitations();
 
-// Auto-odświeżanie zaproszeń co 30 sekund
-setInterval(() => {
-    loadGameInvitations();
-}, 30000);
+// Zaproszenia do gier odświeżane po zdarzeniach z serwera; bez strumienia
+// (brak EventSource lub zerwane połączenie) — co 30 sekund.
+let gameInvitationsTimer = setInterval(loadGameInvitations, 30000);
+
+if (typeof connectInvitationEvents === 'function') {
+    connectInvitationEvents({
+        onConnected: () => {
+            clearInterval(gameInvitationsTimer);
+            gameInvitationsTimer = null;
+            loadGameInvitations();
+        },
+        onDisconnected: () => {
+            if (!gameInvitationsTimer) {
+                gameInvitationsTimer = setInterval(loadGameInvitations, 30000);
+            }
+        },
+        onEvent: (type, data) => {
+            if (type === 'invitation.created' || type === 'invitation.cancelled' || type === 'invitation.expired') {
+                loadGameInvitations();
+            } else if (type === 'invitation.accepted' && data.match_id) {
+                // Znajomy przyjął zaproszenie do gry online — partia już czeka na serwerze.
+                showToast(`${data.invitee_username} przyjął zaproszenie! Przechodzę do gry...`, 'success');
+                setTimeout(() => {
+                    window.location.href = '/kolko-i-krzyzyk/?match=' + data.match_id;
+                }, 1500);
+            }
+        }
+    });
+}
 
 // Zamknij modal po kliknięciu poza nim
 window.onclick = function(event) {